@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+AGOグループ 統合コマンドライン
+各サブコマンドの依存（Whisper・torch・notion-client など）は、そのサブコマンドを
+実行したときにだけ読み込む。cronで頻繁に呼ぶ stats・sync-notion は分析・音声処理の
+モジュールを読み込まないため、起動が速い
+
+    python ago.py analyze [--auto] [分析オプション]   ファイルを分析（--autoで対話なし）
+    python ago.py sync-notion [--days N]              Notionから議事録を同期
+    python ago.py transcribe FILE... [--model M]      音声ファイルを文字起こし
+    python ago.py dedupe [--dry-run]                  Notion議事録の重複を削除
+    python ago.py migrate {notion,structure}          データを新しいディレクトリ構造に移行
+    python ago.py validate                            移行結果を検証
+    python ago.py stats [--runs [種別]]                データの統計・実行履歴の推移
+"""
+import sys
+import argparse
+from typing import List, Optional
+
+
+def _run_analyze(argv: List[str]) -> int:
+    """ファイルを分析"""
+    from bin.analyze import main as analyze_main, add_analysis_arguments
+
+    parser = argparse.ArgumentParser(prog="ago.py analyze", description="AGO Group インテリジェント業務分析")
+    parser.add_argument('--auto', action='store_true', help='対話なしで全ファイルを自動分析（cron向け）')
+    add_analysis_arguments(parser)
+    args = parser.parse_args(argv)
+    if args.auto:
+        from analyze_auto import main as auto_main
+        auto_main(args)
+    else:
+        analyze_main(args)
+    return 0
+
+
+def _run_sync_notion(argv: List[str]) -> int:
+    """Notionから議事録を同期"""
+    parser = argparse.ArgumentParser(prog="ago.py sync-notion", description="Notionから議事録を同期")
+    parser.add_argument('--days', type=int, default=7, help='同期する日数（デフォルト: 7日）')
+    args = parser.parse_args(argv)
+
+    from notion_sync import main as sync_main
+    return sync_main(days=args.days)
+
+
+def _run_transcribe(argv: List[str]) -> int:
+    """音声ファイルを文字起こし"""
+    parser = argparse.ArgumentParser(prog="ago.py transcribe", description="音声ファイルを文字起こし")
+    parser.add_argument('files', nargs='+', help='音声ファイル')
+    parser.add_argument('--model', default=None, help='Whisperモデル（省略時は音声の長さから自動選択）')
+    parser.add_argument('--language', default='ja', help='言語コード（既定: ja、autoで自動判定）')
+    parser.add_argument('--output-dir', default='output/transcripts', help='文字起こし結果の保存先')
+    args = parser.parse_args(argv)
+
+    from pathlib import Path
+    from scripts.audio_processor_no_ffmpeg import process_audio_without_ffmpeg
+
+    output_dir = Path(args.output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    failed = 0
+    for file in args.files:
+        text_path, metadata = process_audio_without_ffmpeg(Path(file), output_dir, model_size=args.model,
+                                                           language=args.language)
+        if "error" in metadata:
+            failed += 1
+            print(f"❌ {file}: {metadata['error']}")
+        else:
+            print(f"✅ {file} → {text_path}")
+    return 1 if failed else 0
+
+
+def _run_dedupe(argv: List[str]) -> int:
+    """Notion議事録の重複を削除"""
+    parser = argparse.ArgumentParser(prog="ago.py dedupe", description="Notion議事録の重複ファイルを削除")
+    parser.add_argument('--dry-run', action='store_true', help='削除せずに重複件数だけ表示')
+    args = parser.parse_args(argv)
+
+    from scripts import clean_duplicates
+    if not args.dry_run:
+        return clean_duplicates.main()
+
+    from pathlib import Path
+    stats = clean_duplicates.clean_duplicates(Path("data/sources/notion"), dry_run=True)
+    print(f"📊 内容による重複: {stats['content_duplicates']}件 / 命名による重複: {stats['naming_duplicates']}件 "
+          f"/ 削除対象: {stats['total_removed']}件")
+    return 0
+
+
+def _run_migrate(argv: List[str]) -> int:
+    """データを新しいディレクトリ構造に移行"""
+    parser = argparse.ArgumentParser(prog="ago.py migrate", description="データを新しいディレクトリ構造に移行")
+    parser.add_argument('target', choices=['notion', 'structure'],
+                        help='notion: 00_newのNotionデータを data/sources/notion へ / structure: 新構造へ同期')
+    parser.add_argument('--dry-run', action='store_true', help='structure: コピーせずに対象だけ表示')
+    args = parser.parse_args(argv)
+
+    if args.target == 'notion':
+        from scripts.migrate_notion_data import migrate_notion_data, verify_migration
+        migrate_notion_data()
+        verify_migration()
+        return 0
+
+    from scripts.sync_to_new_structure import main as sync_main
+    return 0 if sync_main(dry_run=args.dry_run) else 1
+
+
+def _run_validate(argv: List[str]) -> int:
+    """移行結果を検証"""
+    argparse.ArgumentParser(prog="ago.py validate", description="移行結果を検証").parse_args(argv)
+
+    from scripts.validate_migration import main as validate_main
+    return 0 if validate_main() else 1
+
+
+def _run_stats(argv: List[str]) -> int:
+    """データの統計・実行履歴の推移"""
+    parser = argparse.ArgumentParser(prog="ago.py stats", description="データの統計と実行履歴")
+    parser.add_argument('--runs', nargs='?', const='analysis', default=None, metavar='KIND',
+                        help='実行履歴の推移を表示（analysis, notion_sync, migration など）')
+    parser.add_argument('--limit', type=int, default=10, help='実行履歴の表示件数')
+    args = parser.parse_args(argv)
+
+    if args.runs:
+        from scripts.run_history import show_trend
+        show_trend(args.runs, args.limit)
+    else:
+        from scripts.data_manager import DataManager
+        DataManager().get_statistics()
+    return 0
+
+
+# サブコマンド名 → (説明, 実行関数)
+COMMANDS = {
+    "analyze": ("ファイルを分析（--autoで対話なし）", _run_analyze),
+    "sync-notion": ("Notionから議事録を同期", _run_sync_notion),
+    "transcribe": ("音声ファイルを文字起こし", _run_transcribe),
+    "dedupe": ("Notion議事録の重複を削除", _run_dedupe),
+    "migrate": ("データを新しいディレクトリ構造に移行", _run_migrate),
+    "validate": ("移行結果を検証", _run_validate),
+    "stats": ("データの統計・実行履歴の推移", _run_stats),
+}
+
+
+def print_usage():
+    """サブコマンドの一覧を表示"""
+    print("使用方法: python ago.py <サブコマンド> [オプション]\n")
+    for name, (description, _) in COMMANDS.items():
+        print(f"  {name:12s} {description}")
+    print("\n各サブコマンドのオプションは python ago.py <サブコマンド> --help で表示")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    サブコマンドを実行（指定したサブコマンドのモジュールだけを読み込む）
+
+    Args:
+        argv: 引数（省略時はコマンドライン引数）
+
+    Returns:
+        終了コード
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] in ("-h", "--help"):
+        print_usage()
+        return 0
+    if argv[0] not in COMMANDS:
+        print(f"❌ 不明なサブコマンド: {argv[0]}\n")
+        print_usage()
+        return 2
+    return COMMANDS[argv[0]][1](argv[1:]) or 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
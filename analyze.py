@@ -18,7 +18,7 @@ try:
 except ImportError:
     NOTION_AVAILABLE = False
 
-from bin.analyze import main as analyze_main
+from bin.analyze import main as analyze_main, add_analysis_arguments
 
 
 def main():
@@ -50,6 +50,9 @@ def main():
         help='Notion同期のみ実行（分析は行わない）'
     )
     
+    # 分析オプション
+    add_analysis_arguments(parser)
+    
     # 引数を解析
     args = parser.parse_args()
     
@@ -107,7 +110,7 @@ def main():
     
     # 通常の分析処理を実行
     print("\n🚀 分析処理を開始します...\n")
-    analyze_main()
+    analyze_main(args)
     
     return 0
 
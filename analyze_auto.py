@@ -3,71 +3,117 @@
 自動分析スクリプト（インタラクティブ入力なし）
 """
 import sys
+import argparse
 from pathlib import Path
+from typing import Optional
 
 # プロジェクトルートをPythonパスに追加
 sys.path.insert(0, str(Path(__file__).parent))
 
-from bin.analyze import IntelligentBusinessAnalyzer
+from bin.analyze import IntelligentBusinessAnalyzer, add_analysis_arguments, get_metrics_job
 from scripts.data_manager import DataManager
+from scripts.tracing import enable_tracing, export_trace
+from scripts.metrics import REGISTRY, start_http_server
+from scripts.memory_profiler import enable_memory_profiling, export_memory_profile
+from scripts.cpu_profiler import enable_cpu_profiling, export_cpu_profile
+from scripts.run_history import RunRecorder, describe_inputs
+from scripts.structured_logging import setup_logging, flush_logging
 
-def auto_analyze():
-    """全ファイルを自動的に分析"""
+def auto_analyze(args: argparse.Namespace) -> IntelligentBusinessAnalyzer:
+    """全ファイルを自動的に分析（実行履歴の記録用に分析器を返す）"""
     print("🚀 AGO Group インテリジェント業務分析システム（自動モード）\n")
     
-    analyzer = IntelligentBusinessAnalyzer()
+    deadline_seconds = args.deadline_minutes * 60 if args.deadline_minutes else None
+    analyzer = IntelligentBusinessAnalyzer(deadline_seconds=deadline_seconds, cascade=args.cascade,
+                                           language=args.language, pipeline=args.pipeline,
+                                           resume_run_id=args.resume, retry_failed=args.retry_failed)
     analyzer.auto_mode = True  # 自動モードを有効化
     dm = DataManager()
     
+    # ワーカーモードでは共有スプールから1件ずつ取得（他のホストと同時実行可）
+    if args.worker:
+        analyzer.run_worker()
+        analyzer._show_summary()
+        return analyzer
+    
     # ファイルタイプ別に取得
     files_by_type = dm.get_new_files_by_type()
     total_files = sum(len(files) for files in files_by_type.values())
     
     if total_files == 0:
         print("📂 data/00_new/ にファイルが見つかりません")
-        return
+        return analyzer
     
     print(f"🔍 {total_files}個のファイルを自動分析します\n")
     
-    # 全ファイルを収集
-    all_files = []
-    
     if files_by_type['audio']:
         print(f"🎵 音声ファイル: {len(files_by_type['audio'])}個")
         for file in files_by_type['audio']:
             size_mb = file.stat().st_size / (1024 * 1024)
             print(f"   - {file.name} ({size_mb:.1f} MB)")
-            all_files.append(file)
     
     if files_by_type['text']:
         print(f"📄 テキストファイル: {len(files_by_type['text'])}個")
         for file in files_by_type['text']:
             print(f"   - {file.name}")
-            all_files.append(file)
     
     print("\n" + "=" * 50 + "\n")
     
-    # 全ファイルを分析（フィードバックなし）
-    for i, file in enumerate(all_files, 1):
-        print(f"[{i}/{total_files}] {file.name} を処理中...")
-        try:
-            analyzer._analyze_single_file(file)
-            print(f"✅ {file.name} の分析完了\n")
-        except Exception as e:
-            print(f"❌ {file.name} の処理中にエラー: {e}\n")
-            continue
+    # 全ファイルを予測処理時間の短い順に分析（短い音声メモはまとめてバッチ文字起こし、フィードバックなし）
+    analyzer.run_batch({
+        'audio': files_by_type['audio'],
+        'text': files_by_type['text']
+    })
     
     # サマリー表示
     analyzer._show_summary()
     
+    flush_logging()
     print("\n✨ 自動分析が完了しました！")
     print(f"📊 処理されたファイル: {len(analyzer.results)}個")
     print("📁 結果は output/intelligent_analysis/ に保存されました")
+    return analyzer
 
-if __name__ == "__main__":
+def main(args: Optional[argparse.Namespace] = None):
+    """コマンドライン実行（ago.py analyze --auto からも呼ばれる）"""
+    if args is None:
+        parser = argparse.ArgumentParser(description='AGO Group 自動分析（インタラクティブ入力なし）')
+        add_analysis_arguments(parser)
+        args = parser.parse_args()
+    
+    setup_logging(args.log_level, quiet=args.quiet)
+    if args.trace is not None:
+        enable_tracing()
+    if args.metrics_port:
+        start_http_server(args.metrics_port)
+    if args.profile_memory is not None:
+        enable_memory_profiling()
+    if args.profile_cpu is not None:
+        enable_cpu_profiling(args.profile_cpu_stages.split(",") if args.profile_cpu_stages else None)
+    recorder = RunRecorder("worker" if args.worker else "analysis",
+                           inputs=describe_inputs(Path("data/00_new")), options=vars(args))
+    status, analyzer = "completed", None
     try:
-        auto_analyze()
+        analyzer = auto_analyze(args)
+    except KeyboardInterrupt:
+        status = "interrupted"
+        print("\n\n⚠️  分析を中断しました")
     except Exception as e:
+        status = "failed"
         print(f"\n❌ エラーが発生しました: {e}")
         import traceback
-        traceback.print_exc()
\ No newline at end of file
+        traceback.print_exc()
+    finally:
+        recorder.finish(status, analyzed=len(analyzer.results) if analyzer else 0)
+        if args.trace is not None:
+            export_trace(args.trace or None)
+        if args.profile_memory is not None:
+            export_memory_profile(args.profile_memory or None)
+        if args.profile_cpu is not None:
+            export_cpu_profile(args.profile_cpu or None)
+        # ワーカーは中断時も単独実行のago_analysis.promを上書きしない
+        REGISTRY.write_textfile(get_metrics_job(args.worker))
+
+
+if __name__ == "__main__":
+    main()
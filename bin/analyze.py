@@ -5,6 +5,7 @@ LLMベースの次世代分析ツール（音声ファイル対応版）
 """
 import os
 import sys
+import argparse
 from pathlib import Path
 from datetime import datetime
 import json
@@ -15,17 +16,58 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 
 # from scripts.llm_analyzer import InteractiveAnalyzer  # 削除済み
 from scripts.data_manager import DataManager
+from scripts.tracing import span, enable_tracing, export_trace
+from scripts.metrics import REGISTRY, FILES_FAILED, TRANSCRIPTIONS, record_ingest, start_http_server
+from scripts.memory_profiler import enable_memory_profiling, export_memory_profile
+from scripts.cpu_profiler import enable_cpu_profiling, export_cpu_profile
+from scripts.run_history import RunRecorder, describe_inputs
+from scripts.structured_logging import get_logger, setup_logging, flush_logging
 # ffmpeg不要バージョンを強制使用
 from scripts.audio_processor_no_ffmpeg import process_audio_without_ffmpeg as process_audio_file
 
+logger = get_logger("analyzer")
+
 
 class IntelligentBusinessAnalyzer:
     """ビジネスデータをインテリジェントに分析"""
     
-    def __init__(self):
+    def __init__(self, deadline_seconds: Optional[float] = None, cascade: bool = False,
+                 language: str = "ja", pipeline: bool = False, resume_run_id: Optional[str] = None,
+                 retry_failed: bool = False):
+        """
+        初期化
+        
+        Args:
+            deadline_seconds: 音声ファイルの文字起こし締切（投入からの秒数、Noneで無制限）
+            cascade: 低信頼区間のみ高精度モデルで再デコードするカスケード方式を使うか
+            language: 音声の言語コード（autoは冒頭30秒で判定）
+            pipeline: 一括処理をステージパイプラインで実行するか
+            resume_run_id: 中断した一括処理の実行ID（完了済みのステージを省略して再開）
+            retry_failed: 一括処理で再試行キューの失敗ファイル（試行時刻を過ぎたもの）だけを処理するか
+        """
+        from scripts.checkpoint_manager import CheckpointManager
+        from scripts.retry_queue import RetryQueue
+        
         # self.analyzer = InteractiveAnalyzer()  # 削除済み
         self.data_manager = DataManager()
         self.results = []
+        self.deadline_seconds = deadline_seconds
+        self.cascade = cascade
+        self.language = language
+        self.pipeline = pipeline
+        self.pretranscribed: Dict[Path, Tuple[Path, Dict]] = {}
+        self.prefetcher = None
+        self.abstract_learner = None
+        self.checkpoint = CheckpointManager(resume_run_id)
+        self.retry_queue = RetryQueue()
+        self.retry_failed = retry_failed
+        # 取り込みファイルの処理権（パイプラインはアーカイブまで保持）と、別の実行が処理中だったファイル
+        self.claims: Dict[Path, Any] = {}
+        self.unclaimed: set = set()
+        # textfileコレクター用のジョブ名（ワーカーモードではワーカーごとに分ける）
+        self.metrics_job = "analysis"
+        # ワーカーモードで処理中のファイルのリース（ステージの合間に保持を確認する）
+        self.lease = None
         
     def analyze_all_files(self):
         """data/00_new内の全ファイルを分析"""
@@ -87,8 +129,7 @@ class IntelligentBusinessAnalyzer:
         choice = input("\n分析するファイルを選択してください (番号 or 'all' で全て): ")
         
         if choice.lower() == 'all':
-            for file in all_files:
-                self._analyze_single_file(file)
+            self.run_batch(files_by_type)
         else:
             try:
                 selected = all_files[int(choice) - 1]
@@ -100,71 +141,537 @@ class IntelligentBusinessAnalyzer:
         self._show_summary()
     
     def _analyze_single_file(self, file_path: Path):
-        """単一ファイルを分析"""
+        """単一ファイルを分析（別の実行が処理中・処理済みのファイルはスキップ）"""
+        try:
+            # 一括処理では事前に取得済みの処理権を引き継ぐ
+            claim = self.claims.pop(file_path, None) or self.data_manager.claim_file(file_path)
+            if claim is None:
+                self._skip_unclaimed(file_path)
+                return
+            with claim:
+                self._analyze_claimed_file(file_path)
+        finally:
+            # 先読み音声を使わずに終わった（スキップ・再開・失敗）場合も枠を空ける
+            if self.prefetcher:
+                self.prefetcher.discard(file_path)
+    
+    def _skip_unclaimed(self, file_path: Path):
+        """処理権を取れなかったファイルを記録（結果は処理している側が再試行キューに反映する）"""
+        self.unclaimed.add(file_path)
+        logger.info("⏭️  %s は別の実行が処理中か処理済みです（スキップ）", file_path.name,
+                    extra={"file": file_path.name})
+    
+    def _claim_batch(self, files_by_type: Dict[str, List[Path]]) -> Dict[str, List[Path]]:
+        """
+        一括処理の対象ファイルの処理権を先に取得
+        
+        バッチ文字起こし・先読みデコードは処理権を取得できたファイルだけに行い、
+        別の実行が処理中のファイルを重複してデコード・文字起こししない
+        
+        Returns:
+            処理権を取得できたファイル（ファイルタイプ別）
+        """
+        claimed = {}
+        for file_type, files in files_by_type.items():
+            claimed[file_type] = []
+            for file_path in files:
+                claim = self.data_manager.claim_file(file_path)
+                if claim is None:
+                    self._skip_unclaimed(file_path)
+                    continue
+                self.claims[file_path] = claim
+                claimed[file_type].append(file_path)
+        return claimed
+    
+    def _release_claims(self):
+        """パイプラインで保持したままの処理権を手放す（途中で除外・中断されたファイル）"""
+        for file_path in list(self.claims):
+            claim = self.claims.pop(file_path, None)
+            if claim is not None:
+                claim.release()
+    
+    def _analyze_claimed_file(self, file_path: Path):
+        """処理権を取得済みのファイルを分析"""
         import time
         start_time = time.time()
         
-        print(f"\n\n📊 {file_path.name} を分析中...\n")
-        
-        # ファイルタイプ判定
         file_type = self.data_manager.get_file_type(file_path)
+        size_bytes = file_path.stat().st_size if file_path.exists() else 0
+        record_ingest(file_type, size_bytes)
+        with span("file", category="file", file=file_path.name, file_type=file_type,
+                  size_bytes=size_bytes):
+            logger.info("\n\n📊 %s を分析中...\n", file_path.name, extra={"file": file_path.name})
+            
+            if self._resume_completed(file_path):
+                return
+            
+            # 音声ファイルの場合は先に文字起こし
+            if file_type == 'audio':
+                text_file_path, transcription_result = self._process_audio_file(file_path)
+                self._check_lease()
+                # 文字起こし結果を使ってLLM解析
+                analysis = self._perform_llm_analysis(text_file_path, is_audio=True, 
+                                                    original_file=file_path,
+                                                    audio_metadata=self._get_transcription_metadata(transcription_result))
+            else:
+                # 通常のLLM解析
+                analysis = self._perform_llm_analysis(file_path)
+            
+            # 結果を表示
+            self._present_analysis(analysis)
+            
+            # フィードバックを収集
+            improved_analysis = self._collect_feedback(analysis)
+            
+            # 結果を保存
+            self.results.append(improved_analysis)
+            self._save_analysis(file_path, improved_analysis)
+            
+            # 処理時間を表示
+            end_time = time.time()
+            processing_time = end_time - start_time
+            logger.info("\n⏱️  処理時間: %.1f秒", processing_time,
+                        extra={"file": file_path.name, "processing_sec": round(processing_time, 2)})
+    
+    def run_batch(self, files_by_type: Dict[str, List[Path]]) -> Dict[str, Any]:
+        """全ファイルを一括処理（--pipeline指定時はステージパイプライン）"""
+        from scripts.checkpoint_manager import gc_checkpoints
+        
+        removed = gc_checkpoints(keep=self.checkpoint.run_id)
+        if removed:
+            print(f"🧹 古いチェックポイントを{removed}件削除しました")
+        if self.checkpoint.resumed:
+            done = self.checkpoint.summary()
+            print(f"🔖 実行 {self.checkpoint.run_id} を再開します "
+                  f"(文字起こし済み {done.get('transcribe', 0)} / 保存済み {done.get('persist', 0)} / "
+                  f"アーカイブ済み {done.get('archive', 0)})")
+        else:
+            print(f"🔖 実行ID: {self.checkpoint.run_id}（中断した場合は --resume {self.checkpoint.run_id} で再開）")
+        
+        files_by_type = self._select_retryable(files_by_type)
+        try:
+            files_by_type = self._claim_batch(files_by_type)
+            # 短い音声メモはまとめてバッチ文字起こし
+            self.pretranscribe_short_clips(files_by_type.get('audio', []))
+            if self.pipeline:
+                report = self.run_pipeline(files_by_type)
+            else:
+                report = self.run_scheduled(files_by_type)
+        finally:
+            # スケジュールから外れたファイルの処理権も手放す
+            self._release_claims()
+        self.checkpoint.finish()
+        return report
+    
+    def run_worker(self) -> Dict[str, int]:
+        """
+        ワーカーモード: 共有データディレクトリのスプールからリース付きでジョブを取得して処理
+        
+        複数ホストで同時に起動しても、各ファイルを処理するのは1台だけになる
+        （各ワーカーが取り込みフォルダを確認してチケットを登録し、処理が止まった
+        ワーカーのジョブはリース切れ後に別のワーカーが引き継ぐ）
+        """
+        from scripts.work_spool import WorkSpool
+        
+        spool = WorkSpool(intake_dir=self.data_manager.new_dir)
+        # 同じtextfileディレクトリを共有する他のワーカーの出力を上書きしない
+        self.metrics_job = get_metrics_job(worker=True)
+        removed = spool.gc()
+        if removed:
+            print(f"🧹 完了チケットを{removed}件削除しました")
+        return spool.run(self._analyze_leased_file, list_files=self.data_manager.get_new_files,
+                         accept=self._is_retryable)
+    
+    def _analyze_leased_file(self, file_path: Path, lease):
+        """リースを取得したファイルを分析して結果を再試行キューに反映"""
+        from scripts.work_spool import LeaseLostError, LeaseDeferredError
+        
+        job = {"path": file_path, "file_type": self.data_manager.get_file_type(file_path)}
+        self.lease = lease
+        self.unclaimed.discard(file_path)
+        try:
+            self._analyze_single_file(file_path)
+        except LeaseLostError:
+            # 引き取ったワーカーが処理するため失敗としては記録しない
+            self.unclaimed.add(file_path)
+            self._record_outcome(job)
+            raise
+        except Exception as e:
+            self._record_outcome(job, e)
+            raise
+        finally:
+            self.lease = None
+            # ワーカーは長時間動くため1件ごとにtextfileを更新
+            REGISTRY.write_textfile(self.metrics_job)
+        self._record_outcome(job)
+        if file_path in self.unclaimed and file_path.exists():
+            # リース切れ前の保持者がまだ処理中（中断するまでチケットを後回しにする）
+            raise LeaseDeferredError(f"{file_path.name} は別の実行が処理中です")
+    
+    def _check_lease(self):
+        """ワーカーモードでリースを失っていれば中断（LeaseLostError）"""
+        if self.lease is not None:
+            self.lease.check()
+    
+    def _is_retryable(self, file_path: Path) -> bool:
+        """
+        この実行で処理する対象か
         
-        # 音声ファイルの場合は先に文字起こし
-        if file_type == 'audio':
-            text_file_path, transcription_result = self._process_audio_file(file_path)
-            # 文字起こし結果を使ってLLM解析
-            analysis = self._perform_llm_analysis(text_file_path, is_audio=True, 
-                                                original_file=file_path,
-                                                audio_metadata=transcription_result['metadata'])
+        --retry-failed指定時は再試行時刻を過ぎた失敗ファイルのみ、
+        それ以外はバックオフ中の失敗ファイルを除く全ファイル
+        """
+        if self.retry_failed:
+            entry = self.retry_queue.get_entry(file_path)
+            return entry is not None and not self.retry_queue.is_deferred(file_path)
+        return not self.retry_queue.is_deferred(file_path)
+    
+    def _select_retryable(self, files_by_type: Dict[str, List[Path]]) -> Dict[str, List[Path]]:
+        """再試行キューの状態で処理対象を絞り込む"""
+        selected = {file_type: [path for path in files if self._is_retryable(path)]
+                    for file_type, files in files_by_type.items()}
+        skipped = (sum(len(files) for files in files_by_type.values())
+                   - sum(len(files) for files in selected.values()))
+        if self.retry_failed:
+            print(f"🔁 再試行キューの失敗ファイルのみを処理します（{sum(len(f) for f in selected.values())}件）")
+        elif skipped:
+            print(f"⏸️  再試行待ちの失敗ファイル{skipped}件をスキップします（--retry-failed で待ち時間後に再処理）")
+        return selected
+    
+    def _record_outcome(self, job: Dict[str, Any], error: Optional[BaseException] = None):
+        """一括処理の結果を再試行キューに反映（失敗は試行回数を増やし、成功はキューから外す）"""
+        claim = self.claims.pop(job["path"], None)
+        if claim is not None:
+            claim.release()
+        if job["path"] in self.unclaimed:
+            return
+        if error is None:
+            self.retry_queue.record_success(job["path"])
         else:
-            # 通常のLLM解析
-            analysis = self._perform_llm_analysis(file_path)
+            FILES_FAILED.labels(job["file_type"]).inc()
+            self.retry_queue.record_failure(job["path"], job["file_type"], error)
+    
+    def _resume_completed(self, file_path: Path) -> bool:
+        """
+        チェックポイントで保存まで完了しているファイルを片付ける
         
-        # 結果を表示
-        self._present_analysis(analysis)
+        Returns:
+            以降の処理が不要ならTrue
+        """
+        if self.checkpoint.is_completed(file_path, "archive"):
+            logger.info("⏭️  %s はこの実行で処理済みです（スキップ）", file_path.name)
+            return True
         
-        # フィードバックを収集
-        improved_analysis = self._collect_feedback(analysis)
+        persisted = self.checkpoint.get_stage(file_path, "persist")
+        if persisted is None or not Path(persisted["output_file"]).exists():
+            return False
         
-        # 結果を保存
-        self.results.append(improved_analysis)
-        self._save_analysis(file_path, improved_analysis)
+        # 解析結果の保存後に中断したファイルはアーカイブだけ行う
+        logger.info("⏭️  %s は解析結果を保存済みです（アーカイブのみ実行）", file_path.name)
+        output_file = Path(persisted["output_file"])
+        with open(output_file, 'r', encoding='utf-8') as f:
+            self.results.append(json.load(f))
+        self._archive_file(file_path, output_file)
+        return True
+    
+    def run_pipeline(self, files_by_type: Dict[str, List[Path]]) -> Dict[str, Any]:
+        """
+        取り込み→デコード→文字起こし→抽出→知識適用→保存→アーカイブの
+        ステージパイプラインで全ファイルを処理（フィードバック入力なし）
+        """
+        from scripts.job_scheduler import JobScheduler
+        from scripts.pipeline_engine import PipelineEngine, Stage, print_pipeline_report
         
-        # 処理時間を表示
-        end_time = time.time()
-        processing_time = end_time - start_time
-        print(f"\n⏱️  処理時間: {processing_time:.1f}秒")
+        # 投入順は予測処理時間の短い順
+        jobs = JobScheduler().build_jobs(files_by_type)
+        engine = PipelineEngine([
+            Stage("ingest", self._stage_ingest),
+            Stage("decode", self._stage_decode),
+            Stage("transcribe", self._stage_transcribe),
+            Stage("extract", self._stage_extract),
+            Stage("apply_knowledge", self._stage_apply_knowledge),
+            Stage("persist", self._stage_persist),
+            Stage("archive", self._stage_archive),
+        ])
+        try:
+            report = engine.run(jobs)
+            for job in report["results"]:
+                self._record_outcome(job)
+            for failure in report["failures"]:
+                self._record_outcome(failure["item"], failure["exception"])
+        finally:
+            self._release_claims()
+        print_pipeline_report(report)
+        return report
     
-    def _process_audio_file(self, audio_path: Path) -> Tuple[Path, Dict]:
-        """音声ファイルを処理して文字起こし"""
-        print("🎵 音声ファイルを検出しました。文字起こしを開始します...")
+    def _stage_ingest(self, job: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        取り込み: 処理開始までに消えたファイル、別の実行が処理中のファイル、
+        チェックポイントで保存済みのファイルは除外（処理権はアーカイブ後に手放す）
+        """
+        if not job["path"].exists():
+            logger.warning("⚠️  ファイルが見つかりません（スキップ）: %s", job['path'].name)
+            return None
+        claim = self.claims.pop(job["path"], None) or self.data_manager.claim_file(job["path"])
+        if claim is None:
+            self._skip_unclaimed(job["path"])
+            return None
+        if self._resume_completed(job["path"]):
+            claim.release()
+            return None
+        self.claims[job["path"]] = claim
+        record_ingest(job["file_type"], job["path"].stat().st_size)
+        logger.info("📥 %s を受け付けました", job['path'].name, extra={"file": job['path'].name})
+        return dict(job)
+    
+    def _stage_decode(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        """デコード: 音声を16kHzで読み込む（締切モード・バッチ処理済み・文字起こし済みは対象外）"""
+        if (job["file_type"] == 'audio' and self.deadline_seconds is None
+                and job["path"] not in self.pretranscribed
+                and self._get_checkpointed_transcription(job["path"]) is None):
+            import librosa
+            job["audio_data"], _ = librosa.load(str(job["path"]), sr=16000)
+        return job
+    
+    def _stage_transcribe(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        """文字起こし: メモリに余裕ができてから音声を文字起こし"""
+        if job["file_type"] != 'audio':
+            return job
         
-        # 出力ディレクトリ（一時的にdata/01_analyzedの今日の日付フォルダに保存）
+        from scripts.memory_admission import get_admission_controller
+        with get_admission_controller().admit(job.get("audio_bytes", 0), job["path"].name,
+                                              model_size=job.get("model"), device=job.get("device", "cpu")):
+            text_path, transcription_result = self._process_audio_file(
+                job["path"], audio_data=job.pop("audio_data", None)
+            )
+        job["text_path"] = text_path
+        job["audio_metadata"] = self._get_transcription_metadata(transcription_result)
+        return job
+    
+    def _stage_extract(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        """抽出: 人物・ワークフロー・インサイトを解析"""
+        if job["file_type"] == 'audio':
+            job["analysis"] = self._perform_llm_analysis(
+                job["text_path"], is_audio=True, original_file=job["path"],
+                audio_metadata=job["audio_metadata"]
+            )
+        else:
+            job["analysis"] = self._perform_llm_analysis(job["path"])
+        return job
+    
+    def _stage_apply_knowledge(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        """知識適用: 過去の修正から学習したパターンを人物情報に適用"""
+        if self.abstract_learner is None:
+            from scripts.abstract_learner import AbstractLearner
+            self.abstract_learner = AbstractLearner()
+        
+        analysis = job["analysis"]
+        enhanced = self.abstract_learner.apply_abstract_knowledge(
+            dict(analysis, identified_persons=analysis.get('persons', []))
+        )
+        enhanced['persons'] = enhanced.pop('identified_persons')
+        job["analysis"] = enhanced
+        return job
+    
+    def _stage_persist(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        """保存: 解析結果を表示してJSONに保存"""
+        self._present_analysis(job["analysis"])
+        self.results.append(job["analysis"])
+        job["output_file"] = self._write_analysis(job["path"], job["analysis"])
+        return job
+    
+    def _stage_archive(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        """アーカイブ: 元ファイルを処理済みフォルダに移動"""
+        self._archive_file(job["path"], job["output_file"])
+        return job
+    
+    def run_scheduled(self, files_by_type: Dict[str, List[Path]]) -> Dict[str, Any]:
+        """予測処理時間の短い順・優先順位順に全ファイルを分析"""
+        from scripts.job_scheduler import JobScheduler, print_schedule_report
+        
+        scheduler = JobScheduler()
+        jobs = scheduler.build_jobs(files_by_type)
+        
+        # フィードバック入力がある対話モードでは1件ずつ処理
+        parallel = (getattr(self, 'auto_mode', False) or not sys.stdin.isatty())
+        self._start_prefetch(jobs)
+        try:
+            report = scheduler.run(jobs, self._analyze_single_file, parallel=parallel)
+        finally:
+            if self.prefetcher:
+                self.prefetcher.close()
+                self.prefetcher = None
+        for job in jobs:
+            if "status" in job:
+                self._record_outcome(job, job.get("exception"))
+        print_schedule_report(report)
+        return report
+    
+    def _start_prefetch(self, jobs: List[Dict[str, Any]]):
+        """実行順に音声を先読みデコード（締切モードは子プロセスで読み込むため対象外）"""
+        if self.deadline_seconds is not None:
+            return
+        
+        # 処理権を持つファイルのみ（バッチ処理済み・チェックポイントで文字起こし済みはデコード不要）
+        audio_paths = [job["path"] for job in jobs
+                       if job["file_type"] == 'audio' and job["path"] in self.claims
+                       and job["path"] not in self.pretranscribed
+                       and self.checkpoint.get_stage(job["path"], "persist") is None
+                       and self._get_checkpointed_transcription(job["path"]) is None]
+        if len(audio_paths) < 2:
+            return
+        
+        from scripts.audio_prefetcher import AudioPrefetcher
+        self.prefetcher = AudioPrefetcher(audio_paths).start()
+    
+    def pretranscribe_short_clips(self, audio_files: List[Path]):
+        """短い音声メモをまとめてバッチ文字起こし（結果は個別処理時に再利用）"""
+        if self.cascade or len(audio_files) < 2:
+            return
+        
+        try:
+            from scripts.batch_transcriber import select_short_clips, transcribe_short_clips
+            
+            # 処理権を取得した音声のみ（再開時は文字起こし済みの音声を除く）
+            audio_files = [path for path in audio_files
+                           if path in self.claims
+                           and self._get_checkpointed_transcription(path) is None]
+            short_clips = select_short_clips(audio_files)
+            if len(short_clips) < 2:
+                return
+            
+            self.pretranscribed.update(
+                transcribe_short_clips(short_clips, self._get_audio_output_dir(), language=self.language)
+            )
+        except Exception as e:
+            # バッチ処理に失敗しても個別処理で続行できる
+            logger.warning("⚠️ バッチ文字起こしに失敗しました（個別処理で続行）: %s", e)
+    
+    def _get_audio_output_dir(self) -> Path:
+        """文字起こし結果の出力ディレクトリ（data/01_analyzedの今日の日付フォルダ）"""
         today = datetime.now().strftime("%Y-%m-%d")
-        output_dir = Path("data/01_analyzed") / today
+        return Path("data/01_analyzed") / today
+    
+    def _get_checkpointed_transcription(self, audio_path: Path) -> Optional[Tuple[Path, Dict]]:
+        """チェックポイントに記録された文字起こし結果（テキストが残っている場合のみ）"""
+        record = self.checkpoint.get_stage(audio_path, "transcribe")
+        if record is None or not Path(record["text_path"]).exists():
+            return None
+        return Path(record["text_path"]), record["metadata"]
+    
+    def _process_audio_file(self, audio_path: Path, audio_data=None) -> Tuple[Path, Dict]:
+        """音声ファイルを処理して文字起こし（audio_dataはデコード済みの16kHz音声）"""
+        # 中断前の実行で文字起こし済みならその結果を使う
+        checkpointed = self._get_checkpointed_transcription(audio_path)
+        if checkpointed is not None:
+            logger.info("🔖 チェックポイントの文字起こし結果を使用します")
+            return checkpointed
+        
+        text_path, transcription_result = self._transcribe_audio_file(audio_path, audio_data)
+        # フォールバックのプレースホルダーは解析せず、失敗として再試行キューに回す
+        if "error" in transcription_result:
+            from scripts.retry_queue import TranscriptionFailedError
+            raise TranscriptionFailedError(
+                transcription_result["error"],
+                error_type=transcription_result.get("error_type", "unknown_error"),
+                model=transcription_result.get("model_attempted")
+            )
+        TRANSCRIPTIONS.labels(transcription_result.get("model_used", "unknown")).inc()
+        self.checkpoint.mark(audio_path, "transcribe", text_path=str(text_path),
+                             metadata=transcription_result)
+        return text_path, transcription_result
+    
+    def _transcribe_audio_file(self, audio_path: Path, audio_data=None) -> Tuple[Path, Dict]:
+        """音声ファイルを文字起こし（バッチ処理済み・重複録音の結果があれば再利用）"""
+        # バッチ処理済みの短い音声メモはその結果を使う
+        if audio_path in self.pretranscribed:
+            logger.info("📦 バッチ文字起こし済みの結果を使用します")
+            return self.pretranscribed.pop(audio_path)
+        
+        logger.debug("🎵 音声ファイルを検出しました。文字起こしを開始します...")
+        
+        # 出力ディレクトリ（一時的にdata/01_analyzedの今日の日付フォルダに保存）
+        output_dir = self._get_audio_output_dir()
         
         try:
-            # 音声処理実行
+            # 先読み済みの音声があれば読み込みを省略
+            if audio_data is None and self.prefetcher:
+                audio_data = self.prefetcher.get(audio_path)
+            
+            # 別形式で再アップロードされた同じ録音なら既存の文字起こしを再利用
+            fingerprint, audio_data, duplicate = self._check_acoustic_duplicate(audio_path, audio_data)
+            if duplicate:
+                return duplicate
+            
+            # 音声処理実行（メモリ不足・モデルエラーで失敗した音声は前回より小さいモデルで再試行）
             text_path, transcription_result = process_audio_file(
-                audio_path, output_dir, model_size=None, language="ja"
+                audio_path, output_dir, model_size=self.retry_queue.get_model_hint(audio_path),
+                language=self.language,
+                deadline_seconds=self.deadline_seconds, cascade=self.cascade,
+                audio_data=audio_data
             )
-            print(f"✅ 音声ファイルの文字起こしが完了しました")
+            logger.debug("✅ 音声ファイルの文字起こしが完了しました")
+            
+            # 失敗時のフォールバック結果は登録しない
+            if fingerprint is not None and len(fingerprint) > 0 and "error" not in transcription_result:
+                from scripts.audio_fingerprint import FingerprintIndex
+                FingerprintIndex().add(audio_path, fingerprint, text_path, transcription_result)
             return text_path, transcription_result
         except ImportError as e:
-            print(f"❌ Whisperモジュールがインストールされていません: {e}")
-            print("   pip install openai-whisper でインストールしてください")
+            logger.error("❌ Whisperモジュールがインストールされていません: %s\n"
+                         "   pip install openai-whisper でインストールしてください", e)
             raise
         except MemoryError as e:
-            print(f"❌ メモリ不足です。より軽いモデル（tiny/base）を試してください: {e}")
+            logger.error("❌ メモリ不足です。より軽いモデル（tiny/base）を試してください: %s", e,
+                         extra={"file": audio_path.name})
             raise
         except FileNotFoundError as e:
-            print(f"❌ 音声ファイルが見つかりません: {e}")
+            logger.error("❌ 音声ファイルが見つかりません: %s", e, extra={"file": audio_path.name})
             raise
         except Exception as e:
-            print(f"❌ 音声処理エラー: {e}")
-            print("   ファイルが破損している可能性があります")
+            logger.error("❌ 音声処理エラー: %s\n   ファイルが破損している可能性があります", e,
+                         extra={"file": audio_path.name})
             raise
     
+    def _check_acoustic_duplicate(self, audio_path: Path, audio_data):
+        """
+        音響フィンガープリントで処理済み録音と照合
+        
+        Returns:
+            (フィンガープリント, 音声配列, 一致時は(テキストファイルパス, メタデータ))
+        """
+        from scripts.audio_processor_config import FINGERPRINT_SETTINGS
+        if not FINGERPRINT_SETTINGS["enable_fingerprint"]:
+            return None, audio_data, None
+        
+        try:
+            import librosa
+            from scripts.audio_fingerprint import FingerprintIndex, compute_fingerprint, reuse_transcript
+            
+            if audio_data is None:
+                with span("decode", file=audio_path.name, size_bytes=audio_path.stat().st_size):
+                    audio_data, _ = librosa.load(str(audio_path), sr=16000)
+            with span("fingerprint", file=audio_path.name) as fingerprint_span:
+                fingerprint = compute_fingerprint(audio_data)
+                entry = FingerprintIndex().find_match(fingerprint)
+                fingerprint_span.set(frames=len(fingerprint), duplicate=entry is not None)
+            if entry is None:
+                return fingerprint, audio_data, None
+            
+            match = entry["match"]
+            logger.info("🔁 %s と同じ録音です（ビット誤り率 %.2f, ずれ %+.1f秒）。既存の文字起こしを再利用します",
+                        entry['filename'], match['bit_error_rate'], match['offset_sec'],
+                        extra={"file": audio_path.name})
+            return fingerprint, audio_data, reuse_transcript(entry, audio_path, self._get_audio_output_dir())
+        except Exception as e:
+            # 照合に失敗しても通常の文字起こしで続行できる
+            logger.warning("⚠️ 音響フィンガープリントの照合に失敗しました（通常処理で続行）: %s", e)
+            return None, audio_data, None
+    
+    @staticmethod
+    def _get_transcription_metadata(transcription_result: Dict) -> Dict:
+        """文字起こし結果からメタデータを取り出す（AudioProcessor形式とメタデータ単体の両方に対応）"""
+        return transcription_result.get('metadata', transcription_result)
+    
     def _get_audio_metadata(self, transcription_path: Path) -> Optional[Dict]:
         """音声ファイルのメタデータを取得"""
         try:
@@ -188,6 +695,16 @@ class IntelligentBusinessAnalyzer:
     def _perform_llm_analysis(self, file_path: Path, is_audio: bool = False, 
                            original_file: Optional[Path] = None,
                            audio_metadata: Optional[Dict] = None) -> Dict[str, Any]:
+        """LLMによる解析（人物・ワークフロー・インサイトの抽出区間としてトレース）"""
+        with span("extract", file=file_path.name, is_audio=is_audio) as extract_span:
+            analysis = self._run_llm_analysis(file_path, is_audio, original_file, audio_metadata)
+            extract_span.set(persons=len(analysis.get('persons', [])),
+                             workflows=len(analysis.get('workflows', [])))
+        return analysis
+    
+    def _run_llm_analysis(self, file_path: Path, is_audio: bool = False,
+                          original_file: Optional[Path] = None,
+                          audio_metadata: Optional[Dict] = None) -> Dict[str, Any]:
         """LLMによる解析（実際の実装ではAPIを使用）"""
         
         # ファイル内容を読み込み
@@ -248,7 +765,7 @@ class IntelligentBusinessAnalyzer:
             }
             
         except Exception as e:
-            print(f"⚠️ LLM分析エラー（フォールバック実行）: {e}")
+            logger.warning("⚠️ LLM分析エラー（フォールバック実行）: %s", e)
             # エラー時は詳細なプレースホルダーを返す
             return {
                 'file_name': file_info,
@@ -262,6 +779,7 @@ class IntelligentBusinessAnalyzer:
     
     def _present_analysis(self, analysis: Dict[str, Any]):
         """解析結果を見やすく表示"""
+        flush_logging()
         print("=" * 50)
         print("📋 解析結果")
         print("=" * 50)
@@ -329,30 +847,42 @@ class IntelligentBusinessAnalyzer:
     
     def _save_analysis(self, file_path: Path, analysis: Dict[str, Any]):
         """解析結果を保存し、ファイルを処理済みフォルダに移動"""
+        output_file = self._write_analysis(file_path, analysis)
+        self._archive_file(file_path, output_file)
+    
+    def _write_analysis(self, file_path: Path, analysis: Dict[str, Any]) -> Path:
+        """解析結果をJSONに保存"""
+        self._check_lease()
         output_dir = Path("output/intelligent_analysis")
         output_dir.mkdir(parents=True, exist_ok=True)
         
         output_file = output_dir / f"{file_path.stem}_analysis.json"
         
-        with open(output_file, 'w', encoding='utf-8') as f:
+        with span("save", file=file_path.name), open(output_file, 'w', encoding='utf-8') as f:
             json.dump(analysis, f, ensure_ascii=False, indent=2)
         
-        print(f"\n✅ 解析結果を保存しました: {output_file}")
-        
-        # データ管理システムで処理済みフォルダに移動
+        logger.info("\n✅ 解析結果を保存しました: %s", output_file, extra={"file": file_path.name})
+        self.checkpoint.mark(file_path, "persist", output_file=str(output_file))
+        return output_file
+    
+    def _archive_file(self, file_path: Path, output_file: Path):
+        """データ管理システムで処理済みフォルダに移動"""
+        self._check_lease()
         success = self.data_manager.move_to_analyzed(
             file_path, 
             str(output_file)
         )
         
         if not success:
-            print("⚠️  このファイルは既に処理済みです")
+            logger.warning("⚠️  このファイルは既に処理済みです")
+        self.checkpoint.mark(file_path, "archive")
     
     def _show_summary(self):
         """全体のサマリーを表示"""
         if not self.results:
             return
         
+        flush_logging()
         print("\n\n" + "=" * 50)
         print("📊 分析サマリー")
         print("=" * 50)
@@ -373,20 +903,153 @@ class IntelligentBusinessAnalyzer:
         print("\n詳細は output/intelligent_analysis/ フォルダをご確認ください")
 
 
-def main():
+def get_metrics_job(worker: bool = False) -> str:
+    """textfileコレクター用のジョブ名（ワーカーはホスト名-プロセスIDごとに別ファイル）"""
+    if not worker:
+        return "analysis"
+    from scripts.work_spool import get_worker_id
+    return f"analysis_{get_worker_id().replace('@', '_')}"
+
+
+def add_analysis_arguments(parser: argparse.ArgumentParser):
+    """分析処理のコマンドライン引数を追加"""
+    parser.add_argument(
+        '--deadline-minutes',
+        type=float,
+        default=None,
+        help='音声ファイルの文字起こし締切（投入からの分数）。締切に間に合うモデルを自動選択'
+    )
+    parser.add_argument(
+        '--cascade',
+        action='store_true',
+        help='高速モデルで全体を文字起こしし、低信頼区間のみ高精度モデルで再デコード'
+    )
+    parser.add_argument(
+        '--language',
+        default='ja',
+        help='音声の言語コード（ja, en など）。autoは冒頭30秒で言語を判定（既定: ja）'
+    )
+    parser.add_argument(
+        '--pipeline',
+        action='store_true',
+        help='一括処理をステージパイプライン（上限付きキューで接続）で実行し、ステージ別の稼働率を表示'
+    )
+    parser.add_argument(
+        '--resume',
+        metavar='RUN_ID',
+        default=None,
+        help='中断した一括処理を実行IDを指定して再開（完了済みのファイル・ステージは省略）'
+    )
+    parser.add_argument(
+        '--retry-failed',
+        action='store_true',
+        help='再試行キューの失敗ファイル（バックオフの待ち時間を過ぎたもの）だけを再処理'
+    )
+    parser.add_argument(
+        '--worker',
+        action='store_true',
+        help='ワーカーモード: 共有データディレクトリのスプールからリース付きでジョブを取得（複数ホストで同時実行可）'
+    )
+    parser.add_argument(
+        '--trace',
+        nargs='?',
+        const='',
+        default=None,
+        metavar='PATH',
+        help='ステージ別のトレースを記録し、Chrome/Perfetto形式のJSONに出力（省略時は output/traces/）'
+    )
+    parser.add_argument(
+        '--metrics-port',
+        type=int,
+        default=None,
+        metavar='PORT',
+        help='実行中のメトリクスを http://127.0.0.1:PORT/metrics で公開（終了時のtextfile出力は常に行う）'
+    )
+    parser.add_argument(
+        '--profile-memory',
+        nargs='?',
+        const='',
+        default=None,
+        metavar='PATH',
+        help='ステージ・ファイル別のメモリピークと確保箇所を記録し、JSONに出力（省略時は output/profiles/）'
+    )
+    parser.add_argument(
+        '--profile-cpu',
+        nargs='?',
+        const='',
+        default=None,
+        metavar='PATH',
+        help='CPUプロファイルを .pstats と折りたたみスタック（.collapsed）に出力（省略時は output/profiles/）'
+    )
+    parser.add_argument(
+        '--profile-cpu-stages',
+        default=None,
+        metavar='STAGES',
+        help='CPUプロファイルの対象ステージをカンマ区切りで指定（例: decode,transcribe、省略時は全ステージ）'
+    )
+    parser.add_argument(
+        '--log-level',
+        default=None,
+        metavar='SPEC',
+        help='ログレベル（例: INFO、DEBUG、INFO,audio=DEBUG,data_manager=WARNING）。省略時は環境変数AGO_LOG_LEVEL'
+    )
+    parser.add_argument(
+        '--quiet',
+        action='store_true',
+        help='ファイル・ステップごとのログを出さず、警告とエラーのみ出力'
+    )
+
+
+def main(args: Optional[argparse.Namespace] = None):
     """メイン実行関数"""
+    if args is None:
+        parser = argparse.ArgumentParser(description='AGO Group インテリジェント業務分析システム')
+        add_analysis_arguments(parser)
+        args = parser.parse_args()
+    
+    setup_logging(args.log_level, quiet=args.quiet)
     print("🚀 AGO Group インテリジェント業務分析システム 起動中...\n")
     
-    analyzer = IntelligentBusinessAnalyzer()
+    if args.trace is not None:
+        enable_tracing()
+    if args.metrics_port:
+        start_http_server(args.metrics_port)
+    if args.profile_memory is not None:
+        enable_memory_profiling()
+    if args.profile_cpu is not None:
+        enable_cpu_profiling(args.profile_cpu_stages.split(",") if args.profile_cpu_stages else None)
+    
+    deadline_seconds = args.deadline_minutes * 60 if args.deadline_minutes else None
+    analyzer = IntelligentBusinessAnalyzer(deadline_seconds=deadline_seconds, cascade=args.cascade,
+                                           language=args.language, pipeline=args.pipeline,
+                                           resume_run_id=args.resume, retry_failed=args.retry_failed)
+    recorder = RunRecorder("worker" if args.worker else "analysis",
+                           inputs=describe_inputs(analyzer.data_manager.new_dir), options=vars(args))
+    status = "completed"
     
     try:
-        analyzer.analyze_all_files()
+        if args.worker:
+            analyzer.auto_mode = True
+            analyzer.run_worker()
+        else:
+            analyzer.analyze_all_files()
     except KeyboardInterrupt:
+        status = "interrupted"
         print("\n\n⚠️  分析を中断しました")
     except Exception as e:
+        status = "failed"
         print(f"\n❌ エラーが発生しました: {e}")
         import traceback
         traceback.print_exc()
+    finally:
+        recorder.finish(status, analyzed=len(analyzer.results))
+        if args.trace is not None:
+            export_trace(args.trace or None)
+        if args.profile_memory is not None:
+            export_memory_profile(args.profile_memory or None)
+        if args.profile_cpu is not None:
+            export_cpu_profile(args.profile_cpu or None)
+        REGISTRY.write_textfile(get_metrics_job(args.worker))
 
 
 if __name__ == "__main__":
@@ -53,12 +53,19 @@ class SmartBusinessAnalyzer:
             print("❌ 無効な選択です")
             return
         
-        # フィードバック学習を適用した分析
-        print(f"\n\n🔍 {selected_file.name} を分析中...")
-        analysis = self.analyzer.analyze_with_feedback(selected_file)
+        # 別の実行（自動分析など）が処理中のファイルは対象外
+        claim = self.data_manager.claim_file(selected_file)
+        if claim is None:
+            print(f"⏭️  {selected_file.name} は別の実行が処理中か処理済みです")
+            return
         
-        # 結果を保存
-        self._save_analysis(selected_file, analysis)
+        with claim:
+            # フィードバック学習を適用した分析
+            print(f"\n\n🔍 {selected_file.name} を分析中...")
+            analysis = self.analyzer.analyze_with_feedback(selected_file)
+            
+            # 結果を保存
+            self._save_analysis(selected_file, analysis)
         
         print("\n✅ 分析完了！学習内容は次回の分析に活用されます")
     
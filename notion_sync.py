@@ -10,12 +10,15 @@ import sys
 from pathlib import Path
 from datetime import datetime, timedelta
 import json
+from typing import Optional
 
 # プロジェクトルートをPATHに追加
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 try:
     from scripts.notion_connector import NotionConnector
+    from scripts.metrics import REGISTRY
+    from scripts.run_history import RunRecorder
     NOTION_AVAILABLE = True
 except ImportError:
     print("❌ notion-clientがインストールされていません")
@@ -23,8 +26,13 @@ except ImportError:
     sys.exit(1)
 
 
-def main():
-    """メイン処理 - NotionからAGOグループの議事録を同期"""
+def main(days: Optional[int] = None):
+    """
+    メイン処理 - NotionからAGOグループの議事録を同期
+    
+    Args:
+        days: 同期日数（省略時はコマンドライン引数、それもなければ7日）
+    """
     
     print("=" * 60)
     print("🚀 AGOグループ Notion議事録同期ツール")
@@ -47,19 +55,21 @@ def main():
         return 1
     
     # 同期日数の設定（デフォルト：7日）
-    if len(sys.argv) > 1:
+    if days is None and len(sys.argv) > 1:
         try:
             days = int(sys.argv[1])
         except ValueError:
             print("❌ 引数は数値で指定してください")
             print("使用例: python notion_sync.py 7")
             return 1
-    else:
+    elif days is None:
         days = 7
     
     print(f"📅 過去{days}日間の議事録を同期します...")
     print()
     
+    recorder = RunRecorder("notion_sync", options={"days": days})
+    status, saved_files = "completed", []
     try:
         # Notion接続
         connector = NotionConnector()
@@ -93,8 +103,12 @@ def main():
         return 0
         
     except Exception as e:
+        status = "failed"
         print(f"❌ 同期エラー: {e}")
         return 1
+    finally:
+        recorder.finish(status, pages_saved=len(saved_files), errors=int(status == "failed"))
+        REGISTRY.write_textfile("notion_sync")
 
 
 if __name__ == "__main__":
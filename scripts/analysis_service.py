@@ -0,0 +1,451 @@
+#!/usr/bin/env python3
+"""
+ローカルHTTP分析サービス
+テキスト・音声のアップロードを受け付けて分析ジョブとして非同期に処理する。
+LLMAnalyzer・知識ベース（AbstractLearner）・Whisperモデルは起動時に読み込んで
+全リクエストで共有するため、1件ごとの処理時間にプロセス起動やモデル読み込みは含まれない
+
+    POST /jobs?name=会議.m4a        本文にファイルの中身（JSONなら {"name", "text"}）→ 202 {"job_id", ...}
+    GET  /jobs/{job_id}             状態と進捗
+    GET  /jobs/{job_id}/events      進捗のストリーム（text/event-stream）
+    GET  /jobs/{job_id}/result      分析結果
+    GET  /health                    読み込み済みモデルとキューの状態
+    GET  /metrics                   Prometheus形式のメトリクス
+
+例: curl --data-binary @memo.txt "http://127.0.0.1:8765/jobs?name=memo.txt"
+"""
+import json
+import time
+import uuid
+import asyncio
+import argparse
+import threading
+import urllib.parse
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+# 設定・共通処理のインポート（相対/絶対インポートの両方に対応）
+try:
+    from .audio_processor_config import SERVICE_SETTINGS, global_config
+    from .date_utils import get_now
+    from .metrics import REGISTRY, QUEUE_DEPTH, record_ingest
+except ImportError:
+    from audio_processor_config import SERVICE_SETTINGS, global_config
+    from date_utils import get_now
+    from metrics import REGISTRY, QUEUE_DEPTH, record_ingest
+
+HTTP_REASONS = {200: "OK", 202: "Accepted", 400: "Bad Request", 404: "Not Found",
+                405: "Method Not Allowed", 409: "Conflict", 411: "Length Required",
+                413: "Payload Too Large", 500: "Internal Server Error"}
+TERMINAL_STATUSES = ("completed", "failed")
+
+
+class AnalysisJob:
+    """分析ジョブ（進捗イベントと結果を保持）"""
+
+    def __init__(self, name: str, file_type: str, language: str,
+                 source_path: Optional[Path] = None, text: Optional[str] = None):
+        self.job_id = uuid.uuid4().hex[:12]
+        self.name = name
+        self.file_type = file_type
+        self.language = language
+        self.source_path = source_path
+        self.text = text
+        self.status = "queued"
+        self.events: List[Dict[str, Any]] = []
+        self.subscribers: List[asyncio.Queue] = []
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.created_at = get_now()
+        self.enqueued = time.time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """状態をJSON用の辞書に変換（結果本体は含めない）"""
+        return {
+            "job_id": self.job_id,
+            "name": self.name,
+            "file_type": self.file_type,
+            "status": self.status,
+            "created_at": self.created_at,
+            "queue_wait_sec": round(self.started - self.enqueued, 3) if self.started else None,
+            "service_sec": round(self.finished - self.started, 3) if self.finished and self.started else None,
+            "error": self.error,
+            "events": self.events,
+        }
+
+
+class AnalysisService:
+    """ウォーム状態の分析エンジンを共有する非同期HTTPサービス"""
+
+    def __init__(self, settings: Optional[Dict[str, Any]] = None):
+        """
+        初期化
+
+        Args:
+            settings: SERVICE_SETTINGSの上書き
+        """
+        self.settings = dict(SERVICE_SETTINGS, **(settings or {}))
+        self.work_dir = Path(self.settings["work_dir"])
+        self.upload_dir = self.work_dir / "uploads"
+        self.transcript_dir = self.work_dir / "transcripts"
+        for directory in (self.upload_dir, self.transcript_dir):
+            directory.mkdir(parents=True, exist_ok=True)
+
+        self.jobs: "OrderedDict[str, AnalysisJob]" = OrderedDict()
+        self.executor = ThreadPoolExecutor(max_workers=self.settings["workers"],
+                                           thread_name_prefix="analysis")
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.queue: Optional[asyncio.Queue] = None
+        self.llm_analyzer = None
+        self.learner = None
+        self.data_manager = None
+        self.warm_models: List[str] = []
+        self._learner_lock = threading.Lock()
+
+    def warm(self):
+        """分析エンジン・知識ベース・Whisperモデルを読み込む（起動時に1回）"""
+        try:
+            from .llm_analyzer import LLMAnalyzer
+            from .abstract_learner import AbstractLearner
+            from .data_manager import DataManager
+        except ImportError:
+            from llm_analyzer import LLMAnalyzer
+            from abstract_learner import AbstractLearner
+            from data_manager import DataManager
+
+        self.llm_analyzer = LLMAnalyzer()
+        self.learner = AbstractLearner()
+        self.data_manager = DataManager()
+
+        for model_size in self.settings["warm_models"]:
+            try:
+                try:
+                    from .model_cache import get_whisper_model
+                except ImportError:
+                    from model_cache import get_whisper_model
+                get_whisper_model(model_size)
+                self.warm_models.append(model_size)
+            except Exception as e:
+                # 音声なしでもテキスト分析は提供できる
+                print(f"⚠️ Whisper {model_size}モデルを読み込めません（音声は初回リクエスト時に読み込み）: {e}")
+        print(f"🔥 分析エンジンを読み込みました (Whisper: {', '.join(self.warm_models) or 'なし'})")
+
+    # ---- ジョブ処理 ----
+
+    def _publish(self, job: AnalysisJob, stage: str, **data):
+        """進捗イベントを記録して購読中のストリームに配信（イベントループ上で呼ぶ）"""
+        event = dict(data, stage=stage, at=get_now())
+        job.events.append(event)
+        for subscriber in job.subscribers:
+            subscriber.put_nowait(event)
+
+    def _emit(self, job: AnalysisJob, stage: str, **data):
+        """ワーカースレッドから進捗イベントを送る"""
+        self.loop.call_soon_threadsafe(lambda: self._publish(job, stage, **data))
+
+    async def _worker(self):
+        """キューからジョブを取り出してスレッドプールで処理"""
+        while True:
+            job = await self.queue.get()
+            QUEUE_DEPTH.labels("service").set(self.queue.qsize())
+            job.started = time.time()
+            job.status = "running"
+            await self.loop.run_in_executor(self.executor, self._run_job, job)
+            job.finished = time.time()
+            self._publish(job, job.status, service_sec=round(job.finished - job.started, 3),
+                          error=job.error)
+            self.queue.task_done()
+
+    def _run_job(self, job: AnalysisJob):
+        """ジョブ本体（ワーカースレッドで実行）"""
+        try:
+            text, audio_metadata = job.text, None
+            if job.file_type == 'audio':
+                text, audio_metadata = self._transcribe(job)
+
+            self._emit(job, "analyzing", char_count=len(text))
+            analysis = self.llm_analyzer.analyze_text(text, job.name, job.file_type == 'audio',
+                                                      audio_metadata)
+
+            self._emit(job, "applying_knowledge", persons=len(analysis.get('identified_persons', [])))
+            with self._learner_lock:
+                analysis = self.learner.apply_abstract_knowledge(analysis)
+
+            job.result = analysis
+            job.status = "completed"
+        except Exception as e:
+            job.error = str(e)
+            job.status = "failed"
+            print(f"❌ ジョブ {job.job_id} ({job.name}) の処理中にエラー: {e}")
+        finally:
+            # アップロードされた音声は文字起こし後に不要
+            if job.source_path is not None:
+                job.source_path.unlink(missing_ok=True)
+            job.text = None
+
+    def _transcribe(self, job: AnalysisJob):
+        """
+        アップロードされた音声を共有のWhisperモデルで文字起こし
+
+        起動時に読み込んだモデル（先頭、読み込めなかった場合は推奨モデル）を使い、
+        メモリ受付制御を通してから実行する
+        （同時に複数の長い音声をデコードしてメモリ上限を超えないようにする）
+        """
+        try:
+            from .audio_processor_no_ffmpeg import process_audio_without_ffmpeg
+            from .deadline_planner import get_audio_duration
+            from .memory_admission import get_admission_controller, estimate_audio_bytes
+            from .model_cache import get_default_device, get_device_label
+        except ImportError:
+            from audio_processor_no_ffmpeg import process_audio_without_ffmpeg
+            from deadline_planner import get_audio_duration
+            from memory_admission import get_admission_controller, estimate_audio_bytes
+            from model_cache import get_default_device, get_device_label
+
+        if self.warm_models:
+            model_size = self.warm_models[0]
+        else:
+            size_mb = job.source_path.stat().st_size / (1024 * 1024)
+            model_size = global_config.get_recommended_model(job.source_path, size_mb)
+        audio_bytes = estimate_audio_bytes(get_audio_duration(job.source_path))
+        with get_admission_controller().admit(audio_bytes, job.name, model_size=model_size,
+                                              device=get_device_label(get_default_device())):
+            self._emit(job, "transcribing")
+            text_path, metadata = process_audio_without_ffmpeg(
+                job.source_path, self.transcript_dir, language=job.language, model_size=model_size
+            )
+        # フォールバックのプレースホルダーは分析しない
+        if "error" in metadata:
+            raise RuntimeError(f"文字起こしに失敗しました: {metadata['error']}")
+        self._emit(job, "transcribed", audio_duration_sec=metadata.get("audio_duration_sec"),
+                   model=metadata.get("model_used"))
+        return text_path.read_text(encoding='utf-8'), metadata
+
+    def _register(self, job: AnalysisJob):
+        """ジョブを登録してキューに入れる（上限を超えた完了ジョブは古いものから破棄）"""
+        self.jobs[job.job_id] = job
+        while len(self.jobs) > self.settings["max_jobs_kept"]:
+            oldest = next((j for j in self.jobs.values() if j.status in TERMINAL_STATUSES), None)
+            if oldest is None:
+                break
+            del self.jobs[oldest.job_id]
+        self._publish(job, "queued", queue_depth=self.queue.qsize())
+        self.queue.put_nowait(job)
+        QUEUE_DEPTH.labels("service").set(self.queue.qsize())
+
+    # ---- HTTP ----
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """1接続につき1リクエストを処理"""
+        try:
+            request_line = (await reader.readline()).decode('latin-1').strip()
+            if not request_line:
+                return
+            method, target, _ = request_line.split(" ", 2)
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                key, _, value = line.decode('latin-1').partition(":")
+                headers[key.strip().lower()] = value.strip()
+
+            url = urllib.parse.urlsplit(target)
+            query = {key: values[-1] for key, values in urllib.parse.parse_qs(url.query).items()}
+            parts = [part for part in url.path.split("/") if part]
+            await self._route(method, parts, query, headers, reader, writer)
+        except Exception as e:
+            print(f"❌ リクエスト処理エラー: {e}")
+            try:
+                await self._send_json(writer, 500, {"error": str(e)})
+            except ConnectionError:
+                pass
+        finally:
+            writer.close()
+
+    async def _route(self, method: str, parts: List[str], query: Dict[str, str],
+                     headers: Dict[str, str], reader: asyncio.StreamReader,
+                     writer: asyncio.StreamWriter):
+        """パスに応じて処理を振り分け"""
+        if parts == ["health"]:
+            await self._send_json(writer, 200, {
+                "status": "ok",
+                "warm_models": self.warm_models,
+                "queue_depth": self.queue.qsize(),
+                "jobs": len(self.jobs),
+            })
+        elif parts == ["metrics"]:
+            body = REGISTRY.render().encode('utf-8')
+            writer.write(
+                f"HTTP/1.1 200 OK\r\nContent-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode('latin-1') + body
+            )
+            await writer.drain()
+        elif parts == ["jobs"] and method == "POST":
+            await self._create_job(query, headers, reader, writer)
+        elif parts == ["jobs"]:
+            await self._send_json(writer, 200, {"jobs": [
+                {key: value for key, value in job.to_dict().items() if key != "events"}
+                for job in self.jobs.values()
+            ]})
+        elif len(parts) in (2, 3) and parts[0] == "jobs":
+            job = self.jobs.get(parts[1])
+            if job is None:
+                await self._send_json(writer, 404, {"error": "ジョブが見つかりません"})
+            elif len(parts) == 2:
+                await self._send_json(writer, 200, job.to_dict())
+            elif parts[2] == "events":
+                await self._stream_events(job, writer)
+            elif parts[2] == "result":
+                if job.status in TERMINAL_STATUSES:
+                    await self._send_json(writer, 200 if job.result else 409,
+                                          job.result or {"error": job.error, "status": job.status})
+                else:
+                    await self._send_json(writer, 409, {"status": job.status, "error": "処理中です"})
+            else:
+                await self._send_json(writer, 404, {"error": "不明なパスです"})
+        else:
+            await self._send_json(writer, 404, {"error": "不明なパスです"})
+
+    async def _create_job(self, query: Dict[str, str], headers: Dict[str, str],
+                          reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """アップロードを受け付けてジョブを作成"""
+        if "content-length" not in headers:
+            await self._send_json(writer, 411, {"error": "Content-Lengthが必要です"})
+            return
+        try:
+            length = int(headers["content-length"])
+        except ValueError:
+            length = -1
+        if length < 0:
+            await self._send_json(writer, 400, {"error": "Content-Lengthが不正です"})
+            return
+        if length > self.settings["max_upload_mb"] * 1024 * 1024:
+            await self._send_json(writer, 413, {"error": f"上限は{self.settings['max_upload_mb']}MBです"})
+            return
+
+        language = query.get("language", self.settings["language"])
+        if headers.get("content-type", "").startswith("application/json"):
+            try:
+                payload = json.loads(await reader.readexactly(length))
+            except ValueError as e:
+                # JSONDecodeErrorに加え、UTF-8として読めない本文（UnicodeDecodeError）も400にする
+                await self._send_json(writer, 400, {"error": f"JSONを解析できません: {e}"})
+                return
+            if not isinstance(payload, dict) or not isinstance(payload.get("text"), str):
+                await self._send_json(writer, 400, {"error": "JSONには文字列の\"text\"が必要です"})
+                return
+            job = AnalysisJob(str(payload.get("name", "request.txt")), "text", language, text=payload["text"])
+        else:
+            name = Path(query.get("name", "upload.txt")).name
+            file_type = query.get("type") or self.data_manager.get_file_type(Path(name))
+            if file_type == 'audio':
+                job = AnalysisJob(name, file_type, language)
+                job.source_path = self.upload_dir / f"{job.job_id}{Path(name).suffix}"
+                await self._receive_file(reader, length, job.source_path)
+            else:
+                body = await reader.readexactly(length)
+                job = AnalysisJob(name, file_type, language, text=body.decode('utf-8', errors='replace'))
+
+        record_ingest(job.file_type, length)
+        self._register(job)
+        await self._send_json(writer, 202, {
+            "job_id": job.job_id,
+            "status_url": f"/jobs/{job.job_id}",
+            "events_url": f"/jobs/{job.job_id}/events",
+            "result_url": f"/jobs/{job.job_id}/result",
+        })
+
+    @staticmethod
+    async def _receive_file(reader: asyncio.StreamReader, length: int, dest_path: Path):
+        """本文を1MBずつファイルに書き出す（大きな音声をメモリに載せない）"""
+        remaining = length
+        with open(dest_path, 'wb') as f:
+            while remaining > 0:
+                chunk = await reader.readexactly(min(remaining, 1024 * 1024))
+                f.write(chunk)
+                remaining -= len(chunk)
+
+    async def _stream_events(self, job: AnalysisJob, writer: asyncio.StreamWriter):
+        """進捗イベントをServer-Sent Eventsで配信（完了・失敗で終了）"""
+        subscriber: asyncio.Queue = asyncio.Queue()
+        job.subscribers.append(subscriber)
+        try:
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream; charset=utf-8\r\n"
+                         b"Cache-Control: no-cache\r\nConnection: close\r\n\r\n")
+            for event in list(job.events):
+                writer.write(self._format_event(event))
+            await writer.drain()
+            if job.status in TERMINAL_STATUSES:
+                return
+            while True:
+                event = await subscriber.get()
+                writer.write(self._format_event(event))
+                await writer.drain()
+                if event["stage"] in TERMINAL_STATUSES:
+                    return
+        finally:
+            job.subscribers.remove(subscriber)
+
+    @staticmethod
+    def _format_event(event: Dict[str, Any]) -> bytes:
+        return f"event: {event['stage']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n".encode('utf-8')
+
+    @staticmethod
+    async def _send_json(writer: asyncio.StreamWriter, status: int, payload: Dict[str, Any]):
+        """JSONレスポンスを送信"""
+        body = json.dumps(payload, ensure_ascii=False, indent=2).encode('utf-8')
+        writer.write(
+            f"HTTP/1.1 {status} {HTTP_REASONS.get(status, '')}\r\n"
+            f"Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode('latin-1') + body
+        )
+        await writer.drain()
+
+    async def serve(self, host: Optional[str] = None, port: Optional[int] = None):
+        """サービスを起動して停止されるまで待ち受ける"""
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue()
+        workers = [asyncio.create_task(self._worker()) for _ in range(self.settings["workers"])]
+        server = await asyncio.start_server(self._handle, host or self.settings["host"],
+                                            port or self.settings["port"])
+        address = server.sockets[0].getsockname()
+        print(f"🌐 分析サービスを起動しました: http://{address[0]}:{address[1]} "
+              f"(ワーカー {self.settings['workers']})")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            for worker in workers:
+                worker.cancel()
+            self.executor.shutdown(wait=False)
+
+
+def main():
+    """分析サービスを起動"""
+    parser = argparse.ArgumentParser(description='AGO Group ローカル分析サービス')
+    parser.add_argument('--host', default=SERVICE_SETTINGS["host"])
+    parser.add_argument('--port', type=int, default=SERVICE_SETTINGS["port"])
+    parser.add_argument('--workers', type=int, default=SERVICE_SETTINGS["workers"],
+                        help='同時に処理するジョブ数')
+    parser.add_argument('--warm-model', action='append', default=None,
+                        help='起動時に読み込むWhisperモデル（複数指定可、既定: base）')
+    args = parser.parse_args()
+
+    settings = {"workers": args.workers}
+    if args.warm_model is not None:
+        settings["warm_models"] = args.warm_model
+    service = AnalysisService(settings)
+    service.warm()
+    try:
+        asyncio.run(service.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        print("\n👋 分析サービスを停止しました")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+音響フィンガープリントによる録音の重複検出
+デコード済み音声の粗いスペクトログラムから帯域エネルギー差の符号を
+32ビット/フレームのサブフィンガープリントとして計算し（Haitsma-Kalker方式）、
+data/fingerprintsのインデックスと照合する。
+Zoomの.mp4とスマホの.m4aのように形式が違っても同じ録音なら既存の文字起こしを再利用する
+"""
+import os
+import json
+import hashlib
+import threading
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+# 設定・共通処理のインポート（相対/絶対インポートの両方に対応）
+try:
+    from .audio_processor_config import FINGERPRINT_SETTINGS
+    from .date_utils import get_now
+except ImportError:
+    from audio_processor_config import FINGERPRINT_SETTINGS
+    from date_utils import get_now
+
+SAMPLE_RATE = 16000
+BITS_PER_FRAME = 32
+
+
+def compute_fingerprint(audio_data, sample_rate: int = SAMPLE_RATE):
+    """
+    音声配列からフィンガープリントを計算
+
+    Args:
+        audio_data: モノラル音声配列
+        sample_rate: サンプルレート
+
+    Returns:
+        フレームごとの32ビット値（numpy.uint32配列）
+    """
+    import numpy as np
+
+    settings = FINGERPRINT_SETTINGS
+    frame_size = settings["frame_size"]
+    hop = int(sample_rate * settings["hop_seconds"])
+    audio = np.asarray(audio_data, dtype=np.float32)
+    if len(audio) < frame_size + hop:
+        return np.zeros(0, dtype=np.uint32)
+
+    # 33帯域（対数間隔）への割り当て
+    freqs = np.fft.rfftfreq(frame_size, 1 / sample_rate)
+    edges = np.geomspace(settings["min_freq"], settings["max_freq"], BITS_PER_FRAME + 2)
+    band_index = np.digitize(freqs, edges) - 1
+    in_range = (band_index >= 0) & (band_index <= BITS_PER_FRAME)
+    band_matrix = np.zeros((in_range.sum(), BITS_PER_FRAME + 1), dtype=np.float32)
+    band_matrix[np.arange(in_range.sum()), band_index[in_range]] = 1.0
+
+    # 長い録音でもメモリを抑えるためブロック単位でSTFT
+    n_frames = 1 + (len(audio) - frame_size) // hop
+    window = np.hanning(frame_size).astype(np.float32)
+    offsets = np.arange(frame_size)
+    energies = np.empty((n_frames, BITS_PER_FRAME + 1), dtype=np.float32)
+    for block_start in range(0, n_frames, 1024):
+        starts = np.arange(block_start, min(block_start + 1024, n_frames)) * hop
+        frames = audio[starts[:, None] + offsets] * window
+        spectrum = np.abs(np.fft.rfft(frames, axis=1)) ** 2
+        energies[block_start:block_start + len(starts)] = spectrum[:, in_range] @ band_matrix
+
+    # 隣接帯域のエネルギー差の時間変化の符号を1ビットにする
+    band_diff = energies[:, :-1] - energies[:, 1:]
+    bits = (band_diff[1:] - band_diff[:-1]) > 0
+    return np.packbits(bits, axis=1, bitorder="little").view("<u4").ravel().astype(np.uint32)
+
+
+def bit_error_rate(a, b) -> float:
+    """同じ長さのフィンガープリント間のビット誤り率"""
+    import numpy as np
+
+    if len(a) == 0:
+        return 1.0
+    diff = np.bitwise_xor(a, b)
+    return float(np.unpackbits(diff.view(np.uint8)).sum()) / (len(a) * BITS_PER_FRAME)
+
+
+def match_fingerprints(query, stored) -> Optional[Dict[str, float]]:
+    """
+    2つのフィンガープリントが同じ録音か判定
+
+    間引いたフレームの値が完全一致する位置から時間ずれの候補を投票で求め、
+    上位候補について重なり区間のビット誤り率を確認する。
+    重なりは長い方の録音に対する割合で判定する（途中で切れたアップロードや
+    長い会議から切り出したクリップは、同じ録音でも文字起こしを使い回せない）
+
+    Args:
+        query: 新しい録音のフィンガープリント
+        stored: 登録済み録音のフィンガープリント
+
+    Returns:
+        一致した場合は{"bit_error_rate", "offset_sec", "overlap_ratio"}、しなければNone
+    """
+    import numpy as np
+    from collections import Counter
+
+    settings = FINGERPRINT_SETTINGS
+    shorter = min(len(query), len(stored))
+    longer = max(len(query), len(stored))
+    if shorter == 0 or shorter / longer < settings["min_overlap_ratio"]:
+        return None
+
+    order = np.argsort(stored, kind="stable")
+    sorted_values = stored[order]
+    positions = np.arange(0, len(query), settings["lookup_step"])
+    left = np.searchsorted(sorted_values, query[positions], side="left")
+    right = np.searchsorted(sorted_values, query[positions], side="right")
+
+    votes = Counter({0: 0})  # 同時に録音開始したケースは常に候補に含める
+    for position, lo, hi in zip(positions, left, right):
+        if 0 < hi - lo <= settings["max_hits_per_value"]:
+            for stored_position in order[lo:hi]:
+                votes[int(stored_position) - int(position)] += 1
+
+    best = None
+    for offset, _ in votes.most_common(3):
+        query_start = max(0, -offset)
+        stored_start = max(0, offset)
+        length = min(len(query) - query_start, len(stored) - stored_start)
+        if length <= 0 or length / longer < settings["min_overlap_ratio"]:
+            continue
+        ber = bit_error_rate(query[query_start:query_start + length],
+                             stored[stored_start:stored_start + length])
+        if ber <= settings["max_bit_error_rate"] and (best is None or ber < best["bit_error_rate"]):
+            best = {
+                "bit_error_rate": round(ber, 4),
+                "offset_sec": round(offset * settings["hop_seconds"], 2),
+                "overlap_ratio": round(length / longer, 3),
+            }
+    return best
+
+
+class FingerprintIndex:
+    """登録済み録音のフィンガープリントと文字起こし結果の対応表"""
+
+    _lock = threading.Lock()
+
+    def __init__(self, index_dir: Optional[str] = None):
+        """
+        初期化
+
+        Args:
+            index_dir: インデックスの保存先（省略時は設定値）
+        """
+        self.index_dir = Path(index_dir or FINGERPRINT_SETTINGS["index_dir"])
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        self.index_path = self.index_dir / "index.json"
+
+    def _load_entries(self) -> List[Dict[str, Any]]:
+        """登録済みエントリを読み込み"""
+        if not self.index_path.exists():
+            return []
+        with open(self.index_path, 'r', encoding='utf-8') as f:
+            return json.load(f).get("recordings", [])
+
+    def _save_entries(self, entries: List[Dict[str, Any]]):
+        """エントリを保存（一時ファイル経由で置き換え）"""
+        tmp_path = self.index_path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"recordings": entries}, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.index_path)
+
+    def find_match(self, fingerprint) -> Optional[Dict[str, Any]]:
+        """
+        同じ録音の登録済みエントリを検索
+
+        Args:
+            fingerprint: 新しい録音のフィンガープリント
+
+        Returns:
+            一致したエントリ（"match"に照合結果）、なければNone
+        """
+        import numpy as np
+
+        with self._lock:
+            entries = self._load_entries()
+
+        best = None
+        for entry in entries:
+            fingerprint_path = self.index_dir / entry["fingerprint_file"]
+            if not fingerprint_path.exists() or not Path(entry["transcript"]).exists():
+                continue
+            match = match_fingerprints(fingerprint, np.load(fingerprint_path))
+            if match and (best is None or match["bit_error_rate"] < best["match"]["bit_error_rate"]):
+                best = dict(entry, match=match)
+        return best
+
+    def add(self, audio_path: Path, fingerprint, transcript_path: Path,
+            metadata: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        録音を登録
+
+        Args:
+            audio_path: 音声ファイルパス
+            fingerprint: フィンガープリント
+            transcript_path: 文字起こしテキストのパス
+            metadata: 文字起こしのメタデータ
+
+        Returns:
+            登録したエントリ
+        """
+        import numpy as np
+
+        fingerprint_id = hashlib.sha1(fingerprint.tobytes()).hexdigest()[:16]
+        entry = {
+            "id": fingerprint_id,
+            "filename": audio_path.name,
+            "fingerprint_file": f"{fingerprint_id}.npy",
+            "frames": int(len(fingerprint)),
+            "transcript": str(transcript_path),
+            "metadata": metadata,
+            "registered_at": get_now(),
+        }
+        np.save(self.index_dir / entry["fingerprint_file"], fingerprint)
+
+        with self._lock:
+            entries = [e for e in self._load_entries() if e["id"] != fingerprint_id]
+            entries.append(entry)
+            self._save_entries(entries)
+        return entry
+
+
+def reuse_transcript(entry: Dict[str, Any], audio_path: Path,
+                     output_dir: Path) -> Tuple[Path, Dict[str, Any]]:
+    """
+    一致した録音の文字起こし結果を新しいファイル名で保存
+
+    Args:
+        entry: FingerprintIndex.find_matchの戻り値
+        audio_path: 新しい音声ファイルパス
+        output_dir: 出力ディレクトリ
+
+    Returns:
+        (テキストファイルパス, メタデータ)
+    """
+    try:
+        from .audio_processor_no_ffmpeg import save_transcription_outputs
+    except ImportError:
+        from audio_processor_no_ffmpeg import save_transcription_outputs
+
+    transcribed_text = Path(entry["transcript"]).read_text(encoding='utf-8')
+    metadata = dict(entry.get("metadata", {}))
+    metadata.pop("segment_store", None)
+    metadata.update({
+        "original_file": audio_path.name,
+        "processing_time_sec": 0.0,
+        "duplicate_of": entry["filename"],
+        "fingerprint_match": entry["match"],
+    })
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    text_path = save_transcription_outputs(audio_path, output_dir, transcribed_text, metadata)
+    return text_path, metadata
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+音声デコードの先読み
+バッチ実行時、現在のファイルを文字起こししている間に次のK件を
+バックグラウンドスレッドでデコード・16kHzリサンプルしておき、
+librosaの読み込み時間を推論の裏に隠す
+"""
+import time
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# 設定のインポート（相対/絶対インポートの両方に対応）
+try:
+    from .audio_processor_config import BATCH_PROCESSING
+    from .tracing import span
+    from .structured_logging import get_logger
+except ImportError:
+    from audio_processor_config import BATCH_PROCESSING
+    from tracing import span
+    from structured_logging import get_logger
+
+logger = get_logger("audio")
+
+SAMPLE_RATE = 16000
+
+
+class AudioPrefetcher:
+    """指定順に音声を先読みデコードする生産者スレッド"""
+
+    def __init__(self, audio_paths: List[Path], depth: Optional[int] = None):
+        """
+        初期化
+
+        Args:
+            audio_paths: 処理順の音声ファイルパス
+            depth: 先読みする最大件数（省略時は設定値）
+        """
+        self.audio_paths = list(audio_paths)
+        self.depth = depth or BATCH_PROCESSING["prefetch_depth"]
+
+        self._planned = set(self.audio_paths)
+        self._ready: Dict[Path, Any] = {}
+        self._errors: Dict[Path, Exception] = {}
+        self._discarded = set()
+        self._condition = threading.Condition()
+        # デコード済みで未取得の件数をdepth以下に抑える（メモリ上限）
+        self._slots = threading.Semaphore(self.depth)
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="audio-prefetch", daemon=True)
+
+        self.stats = {"decoded": 0, "decode_sec": 0.0, "wait_sec": 0.0, "hits": 0}
+
+    def start(self) -> "AudioPrefetcher":
+        """先読みを開始"""
+        logger.info("🔮 音声の先読みを開始: %dファイル (先読み%d件)", len(self.audio_paths), self.depth)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        """処理順にデコードしてキューに積む"""
+        try:
+            import librosa
+        except ImportError as e:
+            with self._condition:
+                self._errors.update({path: e for path in self.audio_paths})
+                self._condition.notify_all()
+            return
+
+        for path in self.audio_paths:
+            self._slots.acquire()
+            if self._closed:
+                return
+            with self._condition:
+                if path in self._discarded:
+                    self._slots.release()
+                    continue
+
+            started = time.time()
+            try:
+                with span("decode", file=path.name, prefetch=True):
+                    audio_data, _ = librosa.load(str(path), sr=SAMPLE_RATE)
+            except Exception as e:
+                # 読み込み失敗は取得側で通常の読み込みに任せる（エラーもそこで報告）
+                with self._condition:
+                    if path in self._discarded:
+                        # デコード中に不要になった（取得されないため枠をここで戻す）
+                        self._slots.release()
+                        continue
+                    self._errors[path] = e
+                    self._condition.notify_all()
+                continue
+
+            with self._condition:
+                self.stats["decoded"] += 1
+                self.stats["decode_sec"] += time.time() - started
+                if path in self._discarded:
+                    # デコード中に不要になった
+                    self._slots.release()
+                    continue
+                self._ready[path] = audio_data
+                self._condition.notify_all()
+
+    def get(self, audio_path: Path) -> Optional[Any]:
+        """
+        先読み済みの音声を取得（デコード中なら完了まで待つ）
+
+        Args:
+            audio_path: 音声ファイルパス
+
+        Returns:
+            16kHzの音声配列。先読み対象外・読み込み失敗ならNone
+        """
+        with self._condition:
+            if audio_path not in self._planned or self._closed:
+                return None
+            self._planned.discard(audio_path)
+
+            started = time.time()
+            while audio_path not in self._ready and audio_path not in self._errors:
+                self._condition.wait()
+            self.stats["wait_sec"] += time.time() - started
+
+            if self._errors.pop(audio_path, None) is not None:
+                audio_data = None
+            else:
+                audio_data = self._ready.pop(audio_path)
+                self.stats["hits"] += 1
+
+        self._slots.release()
+        return audio_data
+
+    def discard(self, audio_path: Path):
+        """
+        取得しないことになった音声を破棄して枠を空ける（取得済み・対象外なら何もしない）
+
+        スキップしたファイルの枠が空かないと、depth件で生産者が止まり以降のget()が待ち続ける
+
+        Args:
+            audio_path: 音声ファイルパス
+        """
+        with self._condition:
+            if audio_path not in self._planned:
+                return
+            self._planned.discard(audio_path)
+            if audio_path in self._ready or audio_path in self._errors:
+                self._ready.pop(audio_path, None)
+                self._errors.pop(audio_path, None)
+                release = True
+            else:
+                # 未デコード・デコード中なら生産者側で枠を戻す
+                self._discarded.add(audio_path)
+                release = False
+        if release:
+            self._slots.release()
+
+    def close(self):
+        """先読みを停止し、未取得の音声を破棄"""
+        with self._condition:
+            self._closed = True
+            self._ready.clear()
+            self._errors.clear()
+        # 空き待ちの生産者スレッドを起こして終了させる
+        self._slots.release()
+        if self._thread.is_alive():
+            self._thread.join(timeout=60)
+
+        if self.stats["decoded"]:
+            hidden = max(self.stats["decode_sec"] - self.stats["wait_sec"], 0.0)
+            logger.info("🔮 先読み: %d/%dファイル / デコード %.1f秒 (うち推論の裏で %.1f秒) / 待ち %.1f秒",
+                        self.stats['hits'], len(self.audio_paths), self.stats['decode_sec'], hidden,
+                        self.stats['wait_sec'])
+
+    def __enter__(self) -> "AudioPrefetcher":
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -22,29 +22,46 @@ except ImportError:
     print("    pip install openai-whisper")
     sys.exit(1)
 
-# date_utilsのインポート
+# date_utils・テレメトリのインポート
 try:
     from .date_utils import get_now
+    from .audio_telemetry import probe_audio_duration, get_telemetry_store, get_thread_count
+    from .audio_processor_config import ERROR_HANDLING
+    from .model_cache import use_quantization
+    from .quantized_whisper import load_quantized_model
+    from .segment_store import save_segments, get_segment_store_path
+    from .language_router import resolve_language
+    from .tracing import span
 except ImportError:
     from date_utils import get_now
+    from audio_telemetry import probe_audio_duration, get_telemetry_store, get_thread_count
+    from audio_processor_config import ERROR_HANDLING
+    from model_cache import use_quantization
+    from quantized_whisper import load_quantized_model
+    from segment_store import save_segments, get_segment_store_path
+    from language_router import resolve_language
+    from tracing import span
 
 
 class AudioProcessor:
     """音声ファイルを処理するクラス"""
     
-    def __init__(self, model_size: str = "turbo", device: Optional[str] = None):
+    def __init__(self, model_size: str = "turbo", device: Optional[str] = None,
+                 quantize: Optional[bool] = None):
         """
         初期化
         
         Args:
             model_size: Whisperモデルのサイズ（tiny, base, small, medium, large, turbo）
             device: 使用デバイス（None, cuda, cpu, mps）
+            quantize: CPU使用時にint8量子化モデルを使うか（Noneで設定値）
             
         注意:
             デフォルトは'turbo'モデル（Large V3 Turbo - 高精度で6倍高速）
             MPSデバイス対応（M1/M2 Mac GPU最適化）
         """
         self.model_size = model_size
+        self.quantize = quantize
         
         # デバイスの自動選択とMPS対応（フォールバック機能付き）
         if device is None:
@@ -62,16 +79,16 @@ class AudioProcessor:
         
         # モデルのロード（デバイスフォールバック対応）
         try:
-            self.model = whisper.load_model(model_size, device=self.device)
-            print(f"✅ Whisperモデル（{model_size}）のロード完了 - デバイス: {self.device}")
+            self.model = self._load_model()
+            print(f"✅ Whisperモデル（{model_size}）のロード完了 - デバイス: {self.device_label}")
         except Exception as e:
             # MPSで失敗した場合、CPUにフォールバック
             if self.device == "mps":
                 print(f"⚠️  MPS使用中にエラー発生、CPUにフォールバック中...")
                 try:
                     self.device = "cpu"
-                    self.model = whisper.load_model(model_size, device=self.device)
-                    print(f"✅ Whisperモデル（{model_size}）のロード完了 - デバイス: {self.device} (フォールバック)")
+                    self.model = self._load_model()
+                    print(f"✅ Whisperモデル（{model_size}）のロード完了 - デバイス: {self.device_label} (フォールバック)")
                 except Exception as fallback_error:
                     print(f"❌ CPUフォールバックも失敗: {fallback_error}")
                     raise
@@ -79,13 +96,56 @@ class AudioProcessor:
                 print(f"❌ モデルのロードに失敗しました: {e}")
                 raise
     
+    @property
+    def device_label(self) -> str:
+        """表示・テレメトリ用のデバイス名（int8量子化時は"cpu-int8"）"""
+        return f"{self.device}-int8" if use_quantization(self.device, self.quantize) else self.device
+    
+    def _load_model(self):
+        """現在のデバイスでモデルをロード（CPUかつ量子化有効ならint8モデル）"""
+        if use_quantization(self.device, self.quantize):
+            return load_quantized_model(self.model_size)
+        return whisper.load_model(self.model_size, device=self.device)
+    
+    def _get_transcribe_options(self, language: str) -> Dict:
+        """文字起こしオプション（最適化設定）"""
+        options = {
+            "beam_size": 2,           # ビームサーチで精度向上
+            "temperature": 0.0,       # 確定的デコード
+            "best_of": 1,            # 高速化のため1回のみ
+            "patience": 1.0          # デコード忍耐度
+        }
+        
+        # 言語固定設定（精度大幅向上）
+        if language != "auto":
+            options["language"] = language
+        return options
+    
+    def transcribe_array(self, audio_data, language: str = "ja",
+                         initial_prompt: Optional[str] = None) -> Dict:
+        """
+        デコード済み音声配列（16kHz）を文字起こし
+        
+        Args:
+            audio_data: 16kHzモノラルのfloat32配列
+            language: 言語コード
+            initial_prompt: 直前の文脈（逐次文字起こしでの継続性向上用）
+            
+        Returns:
+            Whisperの文字起こし結果
+        """
+        options = self._get_transcribe_options(language)
+        if initial_prompt:
+            options["initial_prompt"] = initial_prompt
+        return self.model.transcribe(audio_data, fp16=(self.device != "cpu"), **options)
+    
     def transcribe_audio(self, audio_path: Path, language: str = "ja") -> Dict:
         """
         音声ファイルを文字起こし
         
         Args:
             audio_path: 音声ファイルパス
-            language: 言語コード（ja=日本語, en=英語, auto=自動検出）
+            language: 言語コード（ja=日本語, en=英語, auto=冒頭で判定）
         
         Returns:
             文字起こし結果の辞書
@@ -97,32 +157,41 @@ class AudioProcessor:
         print(f"\n🎵 音声ファイル処理開始: {audio_path.name}")
         print(f"   サイズ: {file_size_mb:.1f} MB")
         
+        # ヘッダーから音声長を取得（テレメトリ記録用）
+        header_duration = probe_audio_duration(audio_path)
+        
         try:
-            # 最適化された文字起こし設定
-            options = {
-                "beam_size": 2,           # ビームサーチで精度向上
-                "temperature": 0.0,       # 確定的デコード
-                "best_of": 1,            # 高速化のため1回のみ
-                "patience": 1.0          # デコード忍耐度
-            }
-            
-            # 言語固定設定（精度大幅向上）
-            if language != "auto":
-                options["language"] = language
+            # 自動判定は冒頭30秒だけで行い、本処理は言語を固定して実行
+            language = resolve_language(audio_path, language, model=self.model)
+            options = self._get_transcribe_options(language)
             
             # 文字起こし実行（最適化設定）
             print(f"   🚀 最適化文字起こし中... ({self.model_size}モデル + ビームサーチ)")
-            result = self.model.transcribe(str(audio_path), **options)
+            with span("transcribe", file=audio_path.name, size_mb=round(file_size_mb, 2),
+                      model=self.model_size, device=self.device_label) as transcribe_span:
+                result = self.model.transcribe(str(audio_path), **options)
+                transcribe_span.set(char_count=len(result["text"]), language=result.get("language", language))
             
             # 処理時間計算
             processing_time = time.time() - start_time
             
-            # 音声の長さを推定（セグメントから）
-            if result.get("segments"):
+            # 音声の長さ（ヘッダー値を優先、なければセグメントから推定）
+            if header_duration:
+                audio_duration = header_duration
+            elif result.get("segments"):
                 audio_duration = result["segments"][-1]["end"]
             else:
                 audio_duration = 0
             
+            # 実測値をテレメトリに記録
+            telemetry = get_telemetry_store()
+            if telemetry and audio_duration > 0:
+                telemetry.record(
+                    audio_path.name, audio_duration, self.model_size, self.device_label,
+                    processing_time, threads=get_thread_count(),
+                    beam_size=options["beam_size"], best_of=options["best_of"]
+                )
+            
             # 結果をまとめる
             transcription_result = {
                 "text": result["text"],
@@ -135,7 +204,7 @@ class AudioProcessor:
                     "processing_time_sec": round(processing_time, 2),
                     "transcription_date": get_now(),
                     "model_used": self.model_size,
-                    "device": self.device,
+                    "device": self.device_label,
                     "char_count": len(result["text"]),
                     "detected_language": result.get("language", "unknown")
                 }
@@ -157,6 +226,9 @@ class AudioProcessor:
         """
         文字起こし結果を保存
         
+        セグメント（時刻・対数確率・トークンID）は列指向の.npzに分けて保存し、
+        JSONには本文とメタデータのみを書き込む
+        
         Args:
             result: 文字起こし結果
             output_dir: 出力ディレクトリ
@@ -179,14 +251,23 @@ class AudioProcessor:
             # 本文
             f.write(result['text'])
         
-        # JSONファイル保存（詳細情報付き）
+        # セグメント保存（時間範囲の検索用）
+        segments = result.get("segments", [])
+        segments_path = get_segment_store_path(output_dir, base_filename)
+        save_segments(segments_path, segments)
+        
+        # JSONファイル保存（セグメント本体はストアを参照）
         json_path = output_dir / f"{base_filename}_transcription.json"
+        summary = {key: value for key, value in result.items() if key != "segments"}
+        summary["segments_count"] = len(segments)
+        summary["segment_store"] = segments_path.name
         with open(json_path, 'w', encoding='utf-8') as f:
-            json.dump(result, f, ensure_ascii=False, indent=2)
+            json.dump(summary, f, ensure_ascii=False, indent=2)
         
         print(f"📄 保存完了:")
         print(f"   - テキスト: {text_path.relative_to(output_dir.parent.parent)}")
         print(f"   - 詳細情報: {json_path.relative_to(output_dir.parent.parent)}")
+        print(f"   - セグメント: {segments_path.relative_to(output_dir.parent.parent)}")
         
         return text_path, json_path
     
@@ -194,12 +275,22 @@ class AudioProcessor:
         """
         処理時間の推定
         
+        実測テレメトリがあればヘッダーの音声長 × 実時間係数で推定し、
+        なければファイルサイズと目安の処理速度から推定する
+        
         Args:
             audio_path: 音声ファイルパス
             
         Returns:
             推定処理時間（秒）
         """
+        telemetry = get_telemetry_store()
+        duration = probe_audio_duration(audio_path)
+        if telemetry and duration:
+            estimate = telemetry.estimate_processing_seconds(self.model_size, self.device_label, duration)
+            if estimate is not None:
+                return estimate
+        
         file_size_mb = audio_path.stat().st_size / (1024 * 1024)
         
         # モデルサイズによる処理速度の目安（MB/秒）
@@ -227,6 +318,9 @@ class AudioProcessor:
         """
         音声ファイルの品質を推定してモデルサイズを推奨
         
+        ファイル名から推奨モデルを決め、実測テレメトリがある場合は
+        目標処理時間に収まるモデルまで段階的に下げる
+        
         Args:
             audio_path: 音声ファイルパス
             
@@ -234,27 +328,43 @@ class AudioProcessor:
             推奨モデルサイズ
         """
         file_size_mb = audio_path.stat().st_size / (1024 * 1024)
+        telemetry = get_telemetry_store()
+        duration = probe_audio_duration(audio_path)
         
         # ファイル名から品質を推定
         filename_lower = audio_path.name.lower()
         
+        keyword_model = None
         # 会議録音の場合
         if any(keyword in filename_lower for keyword in ['会議', 'meeting', 'zoom', 'teams', '録音']):
-            return "medium"  # ノイズが多い可能性
-        
+            keyword_model = "medium"  # ノイズが多い可能性
         # インタビューの場合
-        if any(keyword in filename_lower for keyword in ['interview', 'インタビュー', '対談']):
-            return "small"  # 比較的クリア
+        elif any(keyword in filename_lower for keyword in ['interview', 'インタビュー', '対談']):
+            keyword_model = "small"  # 比較的クリア
         
         # ファイルサイズから推定（Claude Code環境最適化）
         if file_size_mb > 50:   # 大きいファイル（50MB超）
-            return "tiny"       # タイムアウト回避優先
+            size_model = "tiny"       # タイムアウト回避優先
         elif file_size_mb > 20: # 中程度ファイル（20-50MB）
-            return "base"       # バランス重視
+            size_model = "base"       # バランス重視
         elif file_size_mb < 5:  # 小さいファイル（5MB未満）
-            return "small"      # 高精度可能
+            size_model = "small"      # 高精度可能
         else:                   # 標準ファイル（5-20MB）
-            return "base"       # デフォルト推奨
+            size_model = "base"       # デフォルト推奨
+        heuristic_model = keyword_model or size_model
+        
+        # 実測スループットで目標時間内に収まるモデルを選択（未計測の大きいモデルは推定どおり試す）
+        if telemetry and duration:
+            fallback_models = ERROR_HANDLING["fallback_models"]
+            candidates = fallback_models
+            if keyword_model in fallback_models:
+                candidates = fallback_models[fallback_models.index(keyword_model):]
+            measured_model = telemetry.select_model(duration, self.device_label, candidates,
+                                                    heuristic_model=heuristic_model)
+            if measured_model:
+                return measured_model
+        
+        return heuristic_model
 
 
 def process_audio_file(audio_path: Path, output_dir: Path, 
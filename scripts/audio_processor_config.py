@@ -48,7 +48,9 @@ ERROR_HANDLING = {
     "max_retries": 3,
     "retry_delay_seconds": 5,
     "fallback_models": ["medium", "small", "base", "tiny"],  # 失敗時の代替モデル順序
-    "memory_threshold_gb": 4.0,  # メモリ不足判定の閾値
+    "memory_threshold_gb": 4.0,  # メモリ不足判定の閾値（音声ジョブの予測RSS上限）
+    "memory_pressure_free_gb": 1.0,  # 空きメモリがこれを下回ったら受付を一時停止
+    "admission_poll_seconds": 1.0,   # 受付待ち中にメモリ状況を確認する間隔
     "timeout_seconds": 3600  # 1時間のタイムアウト
 }
 
@@ -57,7 +59,14 @@ BATCH_PROCESSING = {
     "enable_parallel": True,
     "max_parallel_jobs": 2,  # 同時処理数（メモリ考慮）
     "priority_order": ["audio", "text", "document", "email"],  # 処理優先順位
-    "chunk_duration_seconds": 600  # 長い音声の分割単位（10分）
+    "chunk_duration_seconds": 600,  # 長い音声の分割単位（10分）
+    "short_clip_max_seconds": 60,   # これ以下の短い音声メモはまとめてバッチ推論
+    "short_clip_batch_size": 16,    # 1回のエンコーダ呼び出しにまとめる30秒窓の数
+    "short_clip_model": "base",     # バッチ推論に使うモデル
+    "short_clip_overlap_seconds": 2,  # 30秒窓の境界で語が切れないよう隣り合う窓を重ねる長さ
+    "sjf_bucket_seconds": 30,       # 予測処理時間がこの幅に収まるジョブは優先順位で並べる
+    "text_throughput_mb_per_sec": 2.0,  # テキスト系ファイルの処理速度の目安
+    "prefetch_depth": 2             # 文字起こし中に先読みデコードしておく音声ファイル数
 }
 
 # 音声品質設定
@@ -82,7 +91,18 @@ LANGUAGE_SETTINGS = {
         "en": ["the", "and", "is", "are", "hello"],
         "zh": ["的", "是", "在", "有", "我"],
         "ko": ["입니다", "습니다", "있습니다"]
-    }
+    },
+    # language="auto"時の言語ルーティング（冒頭のみで判定し、フォルダ単位でキャッシュ）
+    "detection_seconds": 30,            # 言語判定に使う冒頭の長さ
+    "detection_model": "base",          # 判定用の軽量モデル
+    "min_probability": 0.8,             # これ未満の判定はキーワード統計を優先
+    "mixed_probability": 0.2,           # 2位の言語がこれ以上なら混在とみなす（キャッシュしない）
+    "cache_path": "data/language_routing.json",
+    "cache_min_confirmations": 2,       # 同じ判定がこの回数続いたフォルダは判定を省略
+    "cache_ttl_days": 7,                # 最後の判定からこの日数を過ぎたキャッシュは使わない
+    "cache_recheck_every": 5,           # キャッシュを使ってもこの回数に1回は判定し直す
+    # 言語の異なる録音が混ざる取り込みフォルダ（フォルダ単位ではキャッシュしない）
+    "uncached_folders": ["data/00_new", "data/sources/notion"]
 }
 
 # キャッシュ設定
@@ -100,6 +120,170 @@ PROGRESS_SETTINGS = {
     "detailed_logging": True
 }
 
+# 処理時間テレメトリ設定（実測値による処理時間推定・モデル選択）
+TELEMETRY_SETTINGS = {
+    "enable_telemetry": True,
+    "store_path": "data/telemetry/transcription_runs.jsonl",
+    "min_samples": 3,                   # 実時間係数を採用する最小実行回数
+    "max_records": 5000,                # 保持する最大レコード数（古いものから削除）
+    "target_processing_seconds": 600    # モデル自動選択時の目標処理時間（10分）
+}
+
+# デコード設定プロファイル（精度の高い順、cost_factorは"balanced"比の処理時間）
+DECODE_PROFILES = [
+    {"name": "accurate", "beam_size": 5, "best_of": 5, "cost_factor": 1.8},
+    {"name": "balanced", "beam_size": 2, "best_of": 1, "cost_factor": 1.0},
+    {"name": "fast", "beam_size": None, "best_of": 1, "cost_factor": 0.7}
+]
+
+# 締切（レイテンシ予算）付き処理設定
+DEADLINE_SETTINGS = {
+    "safety_margin": 0.8,          # 予算のうち予測処理時間に使う割合
+    "timeout_grace_factor": 1.5,   # 予算超過後の再試行で予測時間に掛ける猶予
+    "measure_from_drop": True,     # 予算を取り込みフォルダで最初に見つけた時刻から数える（mtimeは使わない）
+    # テレメトリ未蓄積時の実時間係数の目安（CPU、処理時間 ÷ 音声長）
+    "default_real_time_factors": {
+        "tiny": 0.1, "base": 0.2, "small": 0.5,
+        "medium": 1.5, "large": 3.0, "turbo": 0.8
+    }
+}
+
+# 2段階カスケード文字起こし設定（高速モデル → 低信頼区間のみ高精度モデル）
+CASCADE_SETTINGS = {
+    "fast_model": "base",
+    "accurate_model": "medium",
+    "avg_logprob_threshold": -0.8,        # これ未満の区間を再デコード
+    "no_speech_prob_threshold": 0.5,      # これ超の区間を再デコード
+    "compression_ratio_threshold": 2.4,   # これ超（繰り返し出力）の区間を再デコード
+    "padding_seconds": 0.5,               # 再デコード区間の前後余白
+    "merge_gap_seconds": 1.0,             # この間隔以内の低信頼区間はまとめる
+    "max_window_seconds": 30.0            # 再デコード1回あたりの最大長（Whisperの窓長）
+}
+
+# CPU向けint8動的量子化設定（GPUのない環境で大きめのモデルを使うため）
+QUANTIZATION_SETTINGS = {
+    "enable_int8_cpu": False,                 # Trueでcpuデバイスのモデルを量子化してロード
+    "cache_dir": "cache/whisper/quantized",   # 量子化済みstate_dictの保存先
+    "benchmark_language": "ja"                # ベンチマーク時の言語
+}
+
+# 音響フィンガープリントによる再アップロード録音の重複検出
+FINGERPRINT_SETTINGS = {
+    "enable_fingerprint": True,
+    "index_dir": "data/fingerprints",
+    "frame_size": 2048,            # STFTの窓長（16kHzで128ms）
+    "hop_seconds": 0.1,            # フレーム間隔
+    "min_freq": 300,               # 帯域分割の下限周波数（Hz）
+    "max_freq": 2000,              # 帯域分割の上限周波数（Hz）
+    "lookup_step": 4,              # 照合に使うフレームの間引き間隔
+    "max_hits_per_value": 32,      # これより多く一致する値（無音など）は照合に使わない
+    "max_bit_error_rate": 0.30,    # これ以下のビット誤り率なら同一録音とみなす
+    "min_overlap_ratio": 0.8       # 長い方の録音に対する重なりの最小割合（長さが近い録音のみ同一とみなす）
+}
+
+# 書き込み中の録音（WAV）の逐次文字起こし設定
+LIVE_TRANSCRIPTION_SETTINGS = {
+    "window_seconds": 30.0,        # 1回に文字起こしする長さ（Whisperの窓長）
+    "overlap_seconds": 4.0,        # 窓の重なり（境界で切れた発話を拾い直す）
+    "poll_seconds": 2.0,           # ファイルの伸びを確認する間隔
+    "idle_timeout_seconds": 120,   # この時間伸びなければ録音終了とみなす
+    "max_lag_seconds": 90.0        # 文字起こしの遅れがこれを超えたら軽いモデルに切り替える
+}
+
+# ステージパイプライン設定（--pipeline）
+PIPELINE_SETTINGS = {
+    "queue_size": 4,   # ステージ間キューの上限（満杯なら上流が待つ）
+    "stages": {
+        "ingest": {"executor": "inline", "concurrency": 1},
+        "decode": {"executor": "thread", "concurrency": 1},
+        "transcribe": {"executor": "thread", "concurrency": 2},
+        "extract": {"executor": "thread", "concurrency": 2},
+        "apply_knowledge": {"executor": "inline", "concurrency": 1},
+        "persist": {"executor": "inline", "concurrency": 1},
+        "archive": {"executor": "inline", "concurrency": 1}
+    }
+}
+
+# 一括処理のチェックポイント設定（中断したバッチを--resumeで再開）
+CHECKPOINT_SETTINGS = {
+    "checkpoint_dir": "data/.checkpoints",
+    "keep_generations": 2,   # まとめ直し（開始・再開・終了時）ごとにローテーションして残す世代数（破損時の復旧用）
+    "max_age_days": 14       # これより古いチェックポイントは起動時に削除
+}
+
+# 失敗ファイルの再試行キュー設定
+RETRY_SETTINGS = {
+    "queue_path": "data/.retry_queue.json",
+    "dead_letter_dir": "data/03_failed",   # 再試行回数を使い切ったファイルの移動先
+    "max_attempts": 3,                     # この回数失敗したらデッドレターに移動
+    "backoff_base_seconds": 300,           # 1回目の失敗後の待ち時間（失敗ごとに2倍）
+    "backoff_max_seconds": 6 * 3600        # 待ち時間の上限
+}
+
+# 複数ホストのワーカーモード設定（共有データディレクトリ上のスプールでジョブを分配）
+# 共有ディレクトリはflockをホスト間で扱えること（NFSv4、またはlockd付きのNFSv3。SMB・local_lockは不可）
+WORKER_SETTINGS = {
+    "spool_dir": "data/.spool",
+    "lease_seconds": 300,        # ハートビートが途絶えてからジョブを再割り当てするまでの時間
+    "heartbeat_seconds": 30,     # リースを延長する間隔
+    "poll_seconds": 5,           # ジョブがないときの取り込みフォルダの確認間隔
+    "max_leases": 3,             # この回数リースが切れたジョブは失敗扱い（ワーカーを落とすファイル対策）
+    "idle_exit_seconds": None,   # ジョブがない状態がこれだけ続いたら終了（Noneで常駐）
+    "done_retention_days": 7     # 完了チケットを残す日数
+}
+
+# ローカルHTTP分析サービス設定
+SERVICE_SETTINGS = {
+    "host": "127.0.0.1",
+    "port": 8765,
+    "workers": 2,                  # 同時に処理するジョブ数
+    "work_dir": "data/.service",   # アップロードと文字起こし結果の保存先
+    "max_upload_mb": 500,
+    "max_jobs_kept": 1000,         # メモリに保持する完了ジョブ数（古いものから破棄）
+    "warm_models": ["base"],       # 起動時に読み込んでおくWhisperモデル
+    "language": "ja"               # ?language=auto で自動判定
+}
+
+# メトリクス設定（Prometheus形式）
+METRICS_SETTINGS = {
+    "textfile_dir": "data/metrics",  # node_exporterのtextfileコレクター用（ago_{job}.prom、空なら書き出さない）
+    "http_port": 9108                # --metrics-port省略時の/metricsのポート
+}
+
+# メモリプロファイル設定（--profile-memory）
+MEMORY_PROFILE_SETTINGS = {
+    "report_dir": "output/profiles",
+    "traceback_frames": 1,           # 確保箇所として記録するフレーム数
+    "rss_interval_seconds": 0.2,     # RSSを取得する間隔
+    "top_n": 10,                     # ステージごとに報告する確保箇所の数
+    # 開始・終了時にスナップショットを取るステージ（スナップショットは重いので絞る）
+    "snapshot_stages": ["file", "decode", "transcribe", "extract", "save"]
+}
+
+# CPUプロファイル設定（--profile-cpu）
+CPU_PROFILE_SETTINGS = {
+    "output_dir": "output/profiles",
+    "stages": [],                       # プロファイルするステージ（空なら全ステージ、--profile-cpu-stagesで指定）
+    "sample_interval_seconds": 0.005,   # 折りたたみスタックのサンプリング間隔
+    "max_stack_depth": 64
+}
+
+# 実行履歴設定（scripts/run_history.py）
+RUN_HISTORY_SETTINGS = {
+    "store_dir": "data/.runs",                                     # 種別ごとのマニフェストの保存先
+    "keep_runs": 500,                                              # 種別ごとに残す実行数
+    "knowledge_base_path": "data/feedback/abstract_knowledge.json" # 変更検知用にハッシュを記録
+}
+
+# 構造化ログの設定
+LOGGING_SETTINGS = {
+    "log_path": "logs/ago.jsonl",   # JSON Linesの出力先（空文字で出力しない）
+    "console": True,                # コンソールにメッセージを表示
+    "default_level": "INFO",        # 全体の既定レベル
+    "levels": {},                   # サブシステムごとのレベル（例: {"audio": "DEBUG"}）
+    "queue_size": 10000             # 満杯時は警告未満のログを破棄
+}
+
 class AudioProcessorConfig:
     """音声処理の設定管理クラス"""
     
@@ -116,13 +300,18 @@ class AudioProcessorConfig:
         cache_dir = Path(self.get_cache_dir())
         cache_dir.mkdir(parents=True, exist_ok=True)
     
-    def get_recommended_model(self, file_path: Path, file_size_mb: float) -> str:
+    def get_recommended_model(self, file_path: Path, file_size_mb: float,
+                              device: str = "cpu") -> str:
         """
         ファイルに応じた推奨モデルを取得
         
+        実測テレメトリがあれば、ヘッダーの音声長と実時間係数から
+        目標処理時間に収まる最大のモデルを選ぶ
+        
         Args:
             file_path: ファイルパス
             file_size_mb: ファイルサイズ（MB）
+            device: 推論デバイス
             
         Returns:
             推奨モデル名
@@ -130,16 +319,49 @@ class AudioProcessorConfig:
         filename_lower = file_path.name.lower()
         
         # キーワードベースの推奨
+        keyword_model = None
         for category, rules in MODEL_SELECTION_RULES.items():
             if any(keyword in filename_lower for keyword in rules["keywords"]):
-                return rules["recommended_model"]
+                keyword_model = rules["recommended_model"]
+                break
         
         # サイズベースの推奨
+        size_model = "medium"  # デフォルト
         for size_rule in SIZE_BASED_MODEL_SELECTION:
             if file_size_mb <= size_rule["max_size_mb"]:
-                return size_rule["model"]
+                size_model = size_rule["model"]
+                break
+        heuristic_model = keyword_model or size_model
+        
+        # 実測スループットに基づく推奨（未計測の大きいモデルは推奨どおり試す）
+        measured_model = self._get_measured_model(file_path, device, keyword_model, heuristic_model)
+        return measured_model or heuristic_model
+    
+    def _get_measured_model(self, file_path: Path, device: str,
+                            upper_model: Optional[str] = None,
+                            heuristic_model: Optional[str] = None) -> Optional[str]:
+        """テレメトリの実時間係数から目標時間内に収まるモデルを選択"""
+        try:
+            from .audio_telemetry import get_telemetry_store, probe_audio_duration
+        except ImportError:
+            from audio_telemetry import get_telemetry_store, probe_audio_duration
+        
+        telemetry = get_telemetry_store()
+        if telemetry is None:
+            return None
+        
+        duration = probe_audio_duration(file_path)
+        if not duration:
+            return None
         
-        return "medium"  # デフォルト
+        candidates = ERROR_HANDLING["fallback_models"]
+        if upper_model in candidates:
+            candidates = candidates[candidates.index(upper_model):]
+        return telemetry.select_model(
+            duration, device, candidates,
+            self.config_overrides.get("target_processing_seconds"),
+            heuristic_model=heuristic_model
+        )
     
     def get_fallback_model(self, current_model: str) -> Optional[str]:
         """
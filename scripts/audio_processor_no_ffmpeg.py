@@ -7,10 +7,101 @@ import os
 import sys
 import wave
 import json
+import time
 from pathlib import Path
-from typing import Dict, Any, Optional, Tuple
+from typing import Dict, Any, List, Optional, Tuple
 import logging
 
+# テレメトリのインポート（相対/絶対インポートの両方に対応）
+try:
+    from .audio_telemetry import probe_audio_duration, get_telemetry_store, get_thread_count
+    from .model_cache import get_whisper_model, get_device_label, model_inference
+    from .segment_store import save_segments, get_segment_store_path
+    from .language_router import resolve_language
+    from .retry_queue import classify_error
+    from .tracing import span
+    from .structured_logging import get_logger
+except ImportError:
+    from audio_telemetry import probe_audio_duration, get_telemetry_store, get_thread_count
+    from model_cache import get_whisper_model, get_device_label, model_inference
+    from segment_store import save_segments, get_segment_store_path
+    from language_router import resolve_language
+    from retry_queue import classify_error
+    from tracing import span
+    from structured_logging import get_logger
+
+logger = get_logger("audio")
+
+
+def save_transcription_outputs(audio_path: Path, output_dir: Path, transcribed_text: str,
+                               metadata: Dict[str, Any],
+                               segments: Optional[List[Dict[str, Any]]] = None) -> Path:
+    """
+    文字起こしテキストとメタデータを保存
+    
+    Args:
+        audio_path: 元の音声ファイルパス
+        output_dir: 出力ディレクトリ
+        transcribed_text: 文字起こしテキスト
+        metadata: メタデータ
+        segments: Whisperのセグメント（指定時は_segments.npzに保存）
+        
+    Returns:
+        テキストファイルパス
+    """
+    # テキストファイルとして保存
+    text_filename = f"{audio_path.stem}_transcribed.txt"
+    text_path = output_dir / text_filename
+    
+    with open(text_path, 'w', encoding='utf-8') as f:
+        f.write(transcribed_text)
+    
+    # セグメントを列指向ストアに保存
+    if segments:
+        segments_path = get_segment_store_path(output_dir, audio_path.stem)
+        save_segments(segments_path, segments)
+        metadata["segment_store"] = segments_path.name
+    
+    # メタデータも保存
+    metadata_path = output_dir / f"{audio_path.stem}_metadata.json"
+    with open(metadata_path, 'w', encoding='utf-8') as f:
+        json.dump(metadata, f, ensure_ascii=False, indent=2)
+    
+    logger.debug("💾 処理結果保存: %s", text_path)
+    return text_path
+
+def select_model_by_size(audio_path: Path) -> str:
+    """ファイルサイズからモデルを選択（Claude Code環境最適化）"""
+    file_size_mb = audio_path.stat().st_size / (1024 * 1024)
+    if file_size_mb < 5:        # 5MB未満
+        return "small"          # 高精度重視
+    elif file_size_mb < 15:     # 15MB未満
+        return "base"           # バランス最適（デフォルト）
+    else:                       # 15MB以上
+        return "tiny"           # 速度重視・タイムアウト回避優先
+
+def select_transcription_model(audio_path: Path, device: str,
+                               header_duration: Optional[float] = None) -> str:
+    """
+    自動選択のモデル（実測テレメトリ優先、実測がなければファイルサイズで選択）
+
+    Args:
+        audio_path: 音声ファイルパス
+        device: 推論デバイス（"cpu", "cuda"）
+        header_duration: ヘッダーから取得済みの音声の長さ（省略時は取得する）
+
+    Returns:
+        モデルサイズ
+    """
+    size_model = select_model_by_size(audio_path)
+    telemetry = get_telemetry_store()
+    if header_duration is None:
+        header_duration = probe_audio_duration(audio_path)
+    if telemetry and header_duration:
+        return telemetry.select_model(header_duration, get_device_label(device),
+                                      heuristic_model=size_model) or size_model
+    return size_model
+
 def install_pydub_if_needed():
     """pydubが必要な場合はインストール"""
     try:
@@ -31,96 +122,118 @@ def process_audio_without_ffmpeg(
     audio_path: Path, 
     output_dir: Path, 
     model_size: Optional[str] = None, 
-    language: str = "ja"
+    language: str = "ja",
+    deadline_seconds: Optional[float] = None,
+    cascade: bool = False,
+    audio_data: Optional[Any] = None
 ) -> Tuple[Path, Dict[str, Any]]:
     """
     ffmpegを使わずに音声ファイルを処理
+    
+    deadline_secondsを指定すると、締切内に終わるモデル・デコード設定を選び、
+    タイムアウト時は代替モデルに切り替えながら実行する（model_sizeは無視）
+    
+    cascade=Trueの場合は高速モデルで全体を処理し、低信頼区間だけを
+    高精度モデル（model_size指定時はそのモデル）で再デコードする
+    
+    audio_dataに先読み済みの16kHz音声配列を渡すと、読み込みを省略する
+    
+    language="auto"の場合は冒頭30秒だけで言語を判定してから処理する
     """
-    print(f"🎵 音声ファイル処理開始: {audio_path.name}")
+    logger.info("🎵 音声ファイル処理開始: %s", audio_path.name, extra={"file": audio_path.name})
     
     # 出力ディレクトリ作成
     output_dir.mkdir(parents=True, exist_ok=True)
     
+    # 言語ルーティング（指定済みならそのまま）
+    language = resolve_language(audio_path, language, audio_data)
+    
     try:
+        if deadline_seconds is not None:
+            return _process_with_deadline(audio_path, output_dir, language, deadline_seconds)
+        if cascade:
+            return _process_with_cascade(audio_path, output_dir, language, model_size, audio_data)
+        
         # Whisperをインポート
         import whisper
-        print("✅ Whisperモジュール読み込み完了")
+        import torch
+        logger.debug("✅ Whisperモジュール読み込み完了")
+        device = "cuda" if torch.cuda.is_available() else "cpu"
         
-        # モデルサイズを自動選択（Claude Code環境最適化）
+        # モデルサイズを自動選択（実測テレメトリ優先、実測がなければファイルサイズで選択）
+        telemetry = get_telemetry_store()
+        header_duration = probe_audio_duration(audio_path)
         if model_size is None:
-            file_size_mb = audio_path.stat().st_size / (1024 * 1024)
-            if file_size_mb < 5:        # 5MB未満
-                model_size = "small"    # 高精度重視
-            elif file_size_mb < 15:     # 15MB未満  
-                model_size = "base"     # バランス最適（デフォルト）
-            elif file_size_mb < 50:     # 50MB未満
-                model_size = "tiny"     # 速度重視
-            else:                       # 50MB以上
-                model_size = "tiny"     # タイムアウト回避優先
-        
-        print(f"🤖 使用モデル: {model_size}")
-        
-        # Whisperモデル読み込み
-        print("📥 Whisperモデル読み込み中...")
-        model = whisper.load_model(model_size)
+            model_size = select_transcription_model(audio_path, device, header_duration)
+        
+        logger.debug("🤖 使用モデル: %s", model_size, extra={"file": audio_path.name, "model": model_size})
+        
+        # Whisperモデル読み込み（ロード済みなら再利用）
+        model = get_whisper_model(model_size, device)
         
         # 音声ファイルの直接処理（ffmpeg不要）
-        print("🔄 音声を文字起こし中...")
+        logger.debug("🔄 音声を文字起こし中...")
         
         # librosaを使用してWhisperで処理
         import librosa
         
-        # 音声ファイルをlibrosaで読み込み
-        print("📂 librosaで音声ファイル読み込み中...")
-        audio_data, sr = librosa.load(str(audio_path), sr=16000)
+        # 音声ファイルをlibrosaで読み込み（先読み済みならそのまま使用）
+        if audio_data is None:
+            logger.debug("📂 librosaで音声ファイル読み込み中...")
+            with span("decode", file=audio_path.name, size_bytes=audio_path.stat().st_size):
+                audio_data, sr = librosa.load(str(audio_path), sr=16000)
         
-        # Whisperで文字起こし
-        result = model.transcribe(
-            audio_data,
-            language=language,
-            verbose=False
-        )
+        # Whisperで文字起こし（処理時間は推論ロックの待ち時間を除いて計測）
+        with model_inference(model), \
+                span("transcribe", file=audio_path.name, model=model_size,
+                     device=get_device_label(device), audio_sec=round(len(audio_data) / 16000, 1)) as transcribe_span:
+            transcribe_start = time.time()
+            result = model.transcribe(
+                audio_data,
+                language=language,
+                verbose=False
+            )
+            transcribe_span.set(char_count=len(result["text"]))
+        processing_time = time.time() - transcribe_start
+        audio_duration = header_duration or len(audio_data) / 16000
+        
+        # 実測値をテレメトリに記録
+        if telemetry and audio_duration > 0:
+            telemetry.record(
+                audio_path.name, audio_duration, model_size, get_device_label(device),
+                processing_time, threads=get_thread_count(), profile="fast"
+            )
         
         # 結果を取得
         transcribed_text = result["text"]
         segments = result.get("segments", [])
         
-        print(f"✅ 文字起こし完了: {len(transcribed_text)}文字")
-        
-        # テキストファイルとして保存
-        text_filename = f"{audio_path.stem}_transcribed.txt"
-        text_path = output_dir / text_filename
-        
-        with open(text_path, 'w', encoding='utf-8') as f:
-            f.write(transcribed_text)
+        logger.info("✅ 文字起こし完了: %d文字", len(transcribed_text),
+                    extra={"file": audio_path.name, "model": model_size,
+                           "processing_sec": round(processing_time, 2)})
         
         # メタデータ作成
         metadata = {
             "original_file": audio_path.name,
-            "audio_duration_sec": result.get("duration", 0),
+            "audio_duration_sec": round(audio_duration, 2),
+            "processing_time_sec": round(processing_time, 2),
             "char_count": len(transcribed_text),
             "model_used": model_size,
             "language": language,
             "segments_count": len(segments)
         }
         
-        # メタデータも保存
-        metadata_path = output_dir / f"{audio_path.stem}_metadata.json"
-        with open(metadata_path, 'w', encoding='utf-8') as f:
-            json.dump(metadata, f, ensure_ascii=False, indent=2)
-        
-        print(f"💾 処理結果保存: {text_path}")
+        text_path = save_transcription_outputs(audio_path, output_dir, transcribed_text, metadata, segments)
         return text_path, metadata
         
     except ImportError as e:
-        print(f"❌ Whisperが利用できません: {e}")
-        print("   pip install openai-whisper でインストールしてください")
+        logger.error("❌ Whisperが利用できません: %s\n   pip install openai-whisper でインストールしてください", e)
         raise
     except Exception as e:
-        print(f"❌ 音声処理エラー: {e}")
+        logger.error("❌ 音声処理エラー: %s", e, extra={"file": audio_path.name, "error_type": classify_error(e)})
         
         # フォールバック: ダミーテキストファイル作成
-        print("🔄 フォールバック処理中...")
+        logger.info("🔄 フォールバック処理中...")
         
         text_filename = f"{audio_path.stem}_fallback.txt"
         text_path = output_dir / text_filename
@@ -142,12 +255,106 @@ def process_audio_without_ffmpeg(
             "audio_duration_sec": 0,
             "char_count": len(fallback_text),
             "model_used": "fallback",
+            "model_attempted": model_size,
             "language": language,
-            "error": str(e)
+            "error": str(e),
+            "error_type": classify_error(e)
         }
         
         return text_path, metadata
 
+def _process_with_deadline(audio_path: Path, output_dir: Path, language: str,
+                           deadline_seconds: float) -> Tuple[Path, Dict[str, Any]]:
+    """締切付きで文字起こしして結果を保存"""
+    try:
+        from .deadline_planner import transcribe_with_deadline
+    except ImportError:
+        from deadline_planner import transcribe_with_deadline
+    import torch
+    
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    result, run_info = transcribe_with_deadline(audio_path, deadline_seconds, language, device)
+    
+    transcribed_text = result["text"]
+    logger.info("✅ 文字起こし完了: %d文字 (%sモデル, 締切%s)", len(transcribed_text), run_info['model'],
+                '内' if run_info['met_deadline'] else '超過', extra={"file": audio_path.name})
+    
+    metadata = {
+        "original_file": audio_path.name,
+        "audio_duration_sec": run_info["audio_duration_sec"],
+        "processing_time_sec": run_info["processing_time_sec"],
+        "char_count": len(transcribed_text),
+        "model_used": run_info["model"],
+        "language": language,
+        "segments_count": len(result.get("segments", [])),
+        "decode_profile": run_info["profile"],
+        "deadline": {
+            "budget_seconds": deadline_seconds,
+            "met_deadline": run_info["met_deadline"],
+            "attempts": run_info["attempts"]
+        }
+    }
+    
+    text_path = save_transcription_outputs(audio_path, output_dir, transcribed_text, metadata,
+                                           result.get("segments"))
+    return text_path, metadata
+
+def _process_with_cascade(audio_path: Path, output_dir: Path, language: str,
+                          accurate_model: Optional[str] = None,
+                          audio_data: Optional[Any] = None) -> Tuple[Path, Dict[str, Any]]:
+    """カスケード方式で文字起こしして結果を保存"""
+    try:
+        from .cascade_transcriber import cascade_transcribe
+        from .model_cache import get_default_device, get_device_label
+    except ImportError:
+        from cascade_transcriber import cascade_transcribe
+        from model_cache import get_default_device, get_device_label
+    import librosa
+    
+    device = get_default_device()
+    if audio_data is None:
+        logger.debug("📂 librosaで音声ファイル読み込み中...")
+        with span("decode", file=audio_path.name, size_bytes=audio_path.stat().st_size):
+            audio_data, _ = librosa.load(str(audio_path), sr=16000)
+    audio_duration = len(audio_data) / 16000
+    
+    with span("transcribe", file=audio_path.name, mode="cascade",
+              audio_sec=round(audio_duration, 1)) as transcribe_span:
+        result = cascade_transcribe(audio_data, language=language,
+                                    accurate_model=accurate_model, device=device)
+        transcribe_span.set(char_count=len(result["text"]))
+    stats = result["cascade"]
+    
+    # 実測値をテレメトリに記録（1段目は全体、2段目は再デコード区間の長さで記録）
+    telemetry = get_telemetry_store()
+    if telemetry and audio_duration > 0:
+        device_label = get_device_label(device)
+        telemetry.record(audio_path.name, audio_duration, stats["fast_model"], device_label,
+                         stats["fast_processing_sec"], mode="cascade-fast", cascade_stage="fast")
+        if stats["redecoded_seconds"] > 0:
+            telemetry.record(audio_path.name, stats["redecoded_seconds"], stats["accurate_model"],
+                             device_label, stats["accurate_processing_sec"],
+                             mode="cascade-accurate", cascade_stage="accurate")
+    
+    transcribed_text = result["text"]
+    logger.info("✅ 文字起こし完了: %d文字 (再デコード %.0f%%)", len(transcribed_text),
+                stats['redecoded_ratio'] * 100, extra={"file": audio_path.name})
+    
+    metadata = {
+        "original_file": audio_path.name,
+        "audio_duration_sec": round(audio_duration, 2),
+        "processing_time_sec": round(stats["fast_processing_sec"] + stats["accurate_processing_sec"], 2),
+        "char_count": len(transcribed_text),
+        "model_used": f"{stats['fast_model']}+{stats['accurate_model']}",
+        "language": language,
+        "segments_count": len(result["segments"]),
+        "cascade": stats
+    }
+    
+    text_path = save_transcription_outputs(audio_path, output_dir, transcribed_text, metadata,
+                                           result["segments"])
+    return text_path, metadata
+
 def test_audio_processing():
     """音声処理のテスト"""
     print("🧪 音声処理システムテスト")
@@ -0,0 +1,466 @@
+#!/usr/bin/env python3
+"""
+音声処理テレメトリ
+文字起こしの実測値（音声長・モデル・デバイス・スレッド数・処理時間）を記録し、
+モデル別の実時間係数（処理時間 ÷ 音声長）を算出して処理時間推定とモデル選択に使う
+"""
+import os
+import json
+import wave
+import struct
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from statistics import median
+from typing import Dict, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windowsではプロセス間ロックなし
+    fcntl = None
+
+# date_utils・設定のインポート（相対/絶対インポートの両方に対応）
+try:
+    from .date_utils import get_now
+    from .audio_processor_config import TELEMETRY_SETTINGS, ERROR_HANDLING, DECODE_PROFILES
+except ImportError:
+    from date_utils import get_now
+    from audio_processor_config import TELEMETRY_SETTINGS, ERROR_HANDLING, DECODE_PROFILES
+
+
+# MP3ビットレート表（kbps）: MPEG-1 Layer III / MPEG-2,2.5 Layer III
+_MP3_BITRATES = {
+    1: [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    2: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+_MP3_SAMPLE_RATES = {
+    3: [44100, 48000, 32000],   # MPEG-1
+    2: [22050, 24000, 16000],   # MPEG-2
+    0: [11025, 12000, 8000],    # MPEG-2.5
+}
+
+
+def probe_audio_duration(audio_path: Path) -> Optional[float]:
+    """
+    ファイルヘッダーから音声の長さを取得（デコードなし）
+
+    Args:
+        audio_path: 音声ファイルパス
+
+    Returns:
+        音声の長さ（秒）。判定できない場合はNone
+    """
+    suffix = audio_path.suffix.lower()
+
+    try:
+        if suffix == '.wav':
+            with wave.open(str(audio_path), 'rb') as wf:
+                if wf.getframerate() > 0:
+                    return wf.getnframes() / wf.getframerate()
+        elif suffix in ('.mp4', '.m4a', '.aac'):
+            duration = _probe_mp4_duration(audio_path)
+            if duration is not None:
+                return duration
+        elif suffix == '.mp3':
+            duration = _probe_mp3_duration(audio_path)
+            if duration is not None:
+                return duration
+    except Exception:
+        pass
+
+    # soundfile（libsndfile）が読めるヘッダーならそれを使う
+    try:
+        import soundfile
+        info = soundfile.info(str(audio_path))
+        if info.duration > 0:
+            return float(info.duration)
+    except Exception:
+        pass
+
+    return None
+
+
+def _probe_mp4_duration(audio_path: Path) -> Optional[float]:
+    """MP4/M4Aのmoov/mvhdボックスから長さを取得"""
+    with open(audio_path, 'rb') as f:
+        file_size = os.fstat(f.fileno()).st_size
+
+        def find_box(target: bytes, start: int, end: int) -> Optional[tuple]:
+            pos = start
+            while pos + 8 <= end:
+                f.seek(pos)
+                size, box_type = struct.unpack('>I4s', f.read(8))
+                header = 8
+                if size == 1:
+                    size = struct.unpack('>Q', f.read(8))[0]
+                    header = 16
+                elif size == 0:
+                    size = end - pos
+                if size < header:
+                    return None
+                if box_type == target:
+                    return pos + header, pos + size
+                pos += size
+            return None
+
+        moov = find_box(b'moov', 0, file_size)
+        if not moov:
+            return None
+        mvhd = find_box(b'mvhd', moov[0], moov[1])
+        if not mvhd:
+            return None
+
+        f.seek(mvhd[0])
+        version = f.read(4)[0]
+        if version == 1:
+            f.read(16)  # creation_time, modification_time
+            timescale, duration = struct.unpack('>IQ', f.read(12))
+        else:
+            f.read(8)
+            timescale, duration = struct.unpack('>II', f.read(8))
+
+        if timescale > 0:
+            return duration / timescale
+    return None
+
+
+def _probe_mp3_duration(audio_path: Path) -> Optional[float]:
+    """MP3の先頭フレーム（Xing/Infoヘッダーまたはビットレート）から長さを推定"""
+    file_size = audio_path.stat().st_size
+    with open(audio_path, 'rb') as f:
+        head = f.read(10)
+        offset = 0
+        # ID3v2タグをスキップ
+        if head[:3] == b'ID3' and len(head) == 10:
+            tag_size = (head[6] << 21) | (head[7] << 14) | (head[8] << 7) | head[9]
+            offset = 10 + tag_size
+
+        f.seek(offset)
+        data = f.read(4096)
+
+    for i in range(len(data) - 4):
+        if data[i] != 0xFF or (data[i + 1] & 0xE0) != 0xE0:
+            continue
+        version_bits = (data[i + 1] >> 3) & 0x03
+        layer_bits = (data[i + 1] >> 1) & 0x03
+        bitrate_index = (data[i + 2] >> 4) & 0x0F
+        rate_index = (data[i + 2] >> 2) & 0x03
+        if version_bits == 1 or layer_bits != 1 or bitrate_index in (0, 15) or rate_index == 3:
+            continue
+
+        sample_rate = _MP3_SAMPLE_RATES[version_bits][rate_index]
+        samples_per_frame = 1152 if version_bits == 3 else 576
+
+        # VBRファイル: Xing/Infoヘッダーの総フレーム数を使う
+        frame = data[i:i + 200]
+        for tag in (b'Xing', b'Info'):
+            tag_pos = frame.find(tag)
+            if tag_pos != -1 and len(frame) >= tag_pos + 12:
+                flags = struct.unpack('>I', frame[tag_pos + 4:tag_pos + 8])[0]
+                if flags & 0x01:
+                    frames = struct.unpack('>I', frame[tag_pos + 8:tag_pos + 12])[0]
+                    return frames * samples_per_frame / sample_rate
+
+        # CBRとみなしてビットレートから計算
+        table = 1 if version_bits == 3 else 2
+        bitrate = _MP3_BITRATES[table][bitrate_index] * 1000
+        return (file_size - offset - i) * 8 / bitrate
+
+    return None
+
+
+def get_thread_count() -> int:
+    """推論に使われるスレッド数を取得"""
+    try:
+        import torch
+        return torch.get_num_threads()
+    except ImportError:
+        return os.cpu_count() or 1
+
+
+def _record_mode(record: Dict) -> str:
+    """レコードの実行方式（mode導入前のレコードは付加情報から判定）"""
+    if record.get("mode"):
+        return record["mode"]
+    if record.get("batched"):
+        return "batched"
+    if record.get("cascade_stage"):
+        return f"cascade-{record['cascade_stage']}"
+    return "single"
+
+
+def _profile_cost_factor(record: Dict) -> float:
+    """レコードのデコード設定の"balanced"比コスト（不明なら1.0）"""
+    for profile in DECODE_PROFILES:
+        if record.get("profile") == profile["name"]:
+            return profile["cost_factor"]
+    if "beam_size" in record:
+        for profile in DECODE_PROFILES:
+            if (record.get("beam_size"), record.get("best_of")) == (profile["beam_size"], profile["best_of"]):
+                return profile["cost_factor"]
+    return 1.0
+
+
+def _factor_key(model: str, device: str, mode: str = "single") -> str:
+    """実時間係数の集計キー（1ファイル単位の実行は従来どおり"model@device"）"""
+    key = f"{model}@{device}"
+    return key if mode == "single" else f"{key}#{mode}"
+
+
+class TelemetryStore:
+    """文字起こし実行記録のローカルストア（JSON Lines形式）"""
+
+    def __init__(self, store_path: Optional[str] = None):
+        """
+        初期化
+
+        Args:
+            store_path: 記録ファイルのパス（省略時は設定値）
+        """
+        self.store_path = Path(store_path or TELEMETRY_SETTINGS["store_path"])
+        self.store_path.parent.mkdir(parents=True, exist_ok=True)
+        self.lock_file = self.store_path.with_suffix('.lock')
+        self._lock = threading.Lock()
+        self._factors_cache: Optional[Dict[str, Dict]] = None
+
+    @contextmanager
+    def _locked(self):
+        """記録の追記・削減をスレッド・他プロセス（並列実行・ワーカー）と排他制御"""
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            with open(self.lock_file, 'w') as lock:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def record(self, audio_file: str, audio_duration_sec: float, model: str,
+               device: str, processing_time_sec: float,
+               threads: Optional[int] = None, mode: str = "single",
+               profile: Optional[str] = None, **extra) -> Dict:
+        """
+        1回分の文字起こし実行を記録
+
+        Args:
+            audio_file: 音声ファイル名
+            audio_duration_sec: 音声の長さ（秒、ヘッダーから取得した値）
+            model: 使用モデル
+            device: 使用デバイス
+            processing_time_sec: 処理時間（秒）
+            threads: 推論スレッド数（省略時は自動取得）
+            mode: 実行方式（"single", "batched", "cascade-fast", "cascade-accurate"）
+            profile: デコード設定プロファイル名（DECODE_PROFILES、不明ならNone）
+            **extra: 追加情報（デコード設定など）
+
+        Returns:
+            記録したレコード
+        """
+        record = {
+            "recorded_at": get_now(),
+            "audio_file": audio_file,
+            "audio_duration_sec": round(float(audio_duration_sec), 3),
+            "model": model,
+            "device": device,
+            "threads": threads if threads is not None else get_thread_count(),
+            "processing_time_sec": round(float(processing_time_sec), 3),
+            "mode": mode,
+        }
+        if profile:
+            record["profile"] = profile
+        record.update(extra)
+
+        # 削減（読み込み→置き換え）の間に別プロセスが追記した行を失わないようロック内で行う
+        with self._locked():
+            with open(self.store_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self._factors_cache = None
+            self._trim_if_needed()
+
+        return record
+
+    def load_records(self) -> List[Dict]:
+        """記録済みレコードを全て読み込む"""
+        if not self.store_path.exists():
+            return []
+
+        records = []
+        with open(self.store_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # 書き込み途中の行は無視
+                    continue
+        return records
+
+    def _trim_if_needed(self):
+        """保持上限を超えたら古いレコードを削除"""
+        max_records = TELEMETRY_SETTINGS["max_records"]
+        # 行数を数える前にサイズで粗く判定（1レコードは最小でも約150バイトのため、これ未満なら上限以下）
+        if self.store_path.stat().st_size < max_records * 150:
+            return
+
+        records = self.load_records()
+        if len(records) <= max_records:
+            return
+
+        tmp_path = self.store_path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for record in records[-max_records:]:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        os.replace(tmp_path, self.store_path)
+
+    def fit_real_time_factors(self) -> Dict[str, Dict]:
+        """
+        モデル・デバイス・実行方式別の実時間係数を算出
+
+        実時間係数は"balanced"プロファイル相当に正規化する（ビーム幅の違う実行を同じ
+        バケットで混ぜず、締切プランナーがcost_factorを掛け直せるようにする）。
+        バッチ・カスケードは1ファイル単位の実行と速度が違うため別キーで集計する
+
+        Returns:
+            {"model@device[#mode]": {"rtf": 中央値, "samples": 件数, "threads": 直近のスレッド数}}
+        """
+        if self._factors_cache is not None:
+            return self._factors_cache
+
+        grouped: Dict[str, List[float]] = {}
+        threads: Dict[str, int] = {}
+        for record in self.load_records():
+            duration = record.get("audio_duration_sec") or 0
+            processing = record.get("processing_time_sec") or 0
+            if duration <= 0 or processing <= 0:
+                continue
+            key = _factor_key(record.get("model"), record.get("device"), _record_mode(record))
+            grouped.setdefault(key, []).append(processing / duration / _profile_cost_factor(record))
+            threads[key] = record.get("threads", 0)
+
+        factors = {}
+        for key, values in grouped.items():
+            # 外れ値に強い中央値を採用
+            factors[key] = {
+                "rtf": round(median(values), 4),
+                "samples": len(values),
+                "threads": threads.get(key, 0)
+            }
+
+        self._factors_cache = factors
+        return factors
+
+    def get_real_time_factor(self, model: str, device: str,
+                             mode: str = "single") -> Optional[float]:
+        """
+        実測の実時間係数を取得（"balanced"プロファイル相当）
+
+        Args:
+            model: モデルサイズ
+            device: デバイス（get_device_labelの値）
+            mode: 実行方式
+
+        Returns:
+            実時間係数（サンプル不足の場合はNone）
+        """
+        factor = self.fit_real_time_factors().get(_factor_key(model, device, mode))
+        if factor and factor["samples"] >= TELEMETRY_SETTINGS["min_samples"]:
+            return factor["rtf"]
+        return None
+
+    def estimate_processing_seconds(self, model: str, device: str,
+                                    audio_duration_sec: float) -> Optional[float]:
+        """
+        実測値から処理時間を推定
+
+        Args:
+            model: モデルサイズ
+            device: デバイス
+            audio_duration_sec: 音声の長さ（秒）
+
+        Returns:
+            推定処理時間（秒、実測データがない場合はNone）
+        """
+        rtf = self.get_real_time_factor(model, device)
+        if rtf is None:
+            return None
+        return audio_duration_sec * rtf
+
+    def select_model(self, audio_duration_sec: float, device: str,
+                     candidates: Optional[List[str]] = None,
+                     target_seconds: Optional[float] = None,
+                     heuristic_model: Optional[str] = None) -> Optional[str]:
+        """
+        目標処理時間内に収まる最も大きいモデルを選択
+
+        ヒューリスティック（ファイルサイズ・キーワード）が選ぶモデルが未計測で、
+        目標内に収まる計測済みモデルより大きい場合はそれを返して計測させる
+        （小さいモデルだけが計測済みになり、以降ずっとそれに固定されるのを防ぐ）
+
+        Args:
+            audio_duration_sec: 音声の長さ（秒）
+            device: デバイス
+            candidates: 候補モデル（大きい順、省略時はフォールバック順序）
+            target_seconds: 目標処理時間（省略時は設定値）
+            heuristic_model: 実測がない場合に使うモデル
+
+        Returns:
+            モデル名（実測データで判断できない場合はNone）
+        """
+        candidates = candidates or ERROR_HANDLING["fallback_models"]
+        if target_seconds is None:
+            target_seconds = TELEMETRY_SETTINGS["target_processing_seconds"]
+
+        measured = False
+        for model in candidates:
+            estimate = self.estimate_processing_seconds(model, device, audio_duration_sec)
+            if estimate is None:
+                if model == heuristic_model:
+                    return model
+                continue
+            measured = True
+            if estimate <= target_seconds:
+                return model
+
+        # 実測済みモデルが全て目標超過の場合は最小モデル
+        return candidates[-1] if measured else None
+
+
+_default_store: Optional[TelemetryStore] = None
+
+
+def get_telemetry_store() -> Optional[TelemetryStore]:
+    """共有のテレメトリストアを取得（無効化されている場合はNone）"""
+    global _default_store
+    if not TELEMETRY_SETTINGS["enable_telemetry"]:
+        return None
+    if _default_store is None:
+        _default_store = TelemetryStore()
+    return _default_store
+
+
+def main():
+    """実時間係数の一覧を表示"""
+    store = get_telemetry_store()
+    if store is None:
+        print("⚠️  テレメトリは無効化されています")
+        return
+
+    factors = store.fit_real_time_factors()
+    if not factors:
+        print("📊 記録された文字起こし実行はまだありません")
+        return
+
+    print("📊 モデル別の実時間係数（処理時間 ÷ 音声長）")
+    print("=" * 50)
+    for key, factor in sorted(factors.items()):
+        status = "" if factor["samples"] >= TELEMETRY_SETTINGS["min_samples"] else "（サンプル不足）"
+        print(f"  {key:20s} RTF={factor['rtf']:.3f}  n={factor['samples']}  "
+              f"threads={factor['threads']}{status}")
+
+
+if __name__ == "__main__":
+    main()
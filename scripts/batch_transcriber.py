@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+短い音声メモのバッチ文字起こし
+10〜60秒程度のクリップを少しずつ重ねた30秒窓に分割・パディングし、メルスペクトログラムを
+1つのバッチにまとめてエンコーダ・デコーダに通す（ファイルごとのモデル呼び出しを削減）
+"""
+import time
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+# 設定・共通処理のインポート（相対/絶対インポートの両方に対応）
+try:
+    from .audio_processor_config import BATCH_PROCESSING
+    from .audio_telemetry import probe_audio_duration, get_telemetry_store
+    from .audio_processor_no_ffmpeg import save_transcription_outputs
+    from .model_cache import get_whisper_model, get_default_device, get_device_label, model_inference
+    from .tracing import span
+    from .structured_logging import get_logger
+except ImportError:
+    from audio_processor_config import BATCH_PROCESSING
+    from audio_telemetry import probe_audio_duration, get_telemetry_store
+    from audio_processor_no_ffmpeg import save_transcription_outputs
+    from model_cache import get_whisper_model, get_default_device, get_device_label, model_inference
+    from tracing import span
+    from structured_logging import get_logger
+
+logger = get_logger("audio")
+
+SAMPLE_RATE = 16000
+WINDOW_SAMPLES = 30 * SAMPLE_RATE
+
+
+def select_short_clips(audio_paths: List[Path],
+                       max_seconds: Optional[float] = None) -> List[Path]:
+    """
+    ヘッダーの長さからバッチ推論対象の短いクリップを抽出
+
+    Args:
+        audio_paths: 音声ファイルパスのリスト
+        max_seconds: 短いクリップとみなす最大長（省略時は設定値）
+
+    Returns:
+        短いクリップのリスト
+    """
+    max_seconds = max_seconds or BATCH_PROCESSING["short_clip_max_seconds"]
+    short_clips = []
+    for path in audio_paths:
+        duration = probe_audio_duration(path)
+        if duration is not None and duration <= max_seconds:
+            short_clips.append(path)
+    return short_clips
+
+
+def plan_windows(num_samples: int, overlap_samples: int = 0) -> List[Tuple[int, int, float, float]]:
+    """
+    クリップを30秒窓に分割する位置を計算
+
+    隣り合う窓はoverlap_samplesだけ重ね、重なり部分のセグメントは
+    中点より前を前の窓、後ろを次の窓から採用する
+
+    Args:
+        num_samples: クリップのサンプル数
+        overlap_samples: 隣り合う窓を重ねるサンプル数
+
+    Returns:
+        [(開始サンプル, 終了サンプル, 採用開始秒, 採用終了秒)]
+    """
+    hop = WINDOW_SAMPLES - overlap_samples
+    starts = [0]
+    while starts[-1] + WINDOW_SAMPLES < num_samples:
+        starts.append(starts[-1] + hop)
+
+    windows = []
+    for index, start in enumerate(starts):
+        keep_from = 0.0 if index == 0 else (start + overlap_samples / 2) / SAMPLE_RATE
+        keep_until = (float("inf") if index == len(starts) - 1
+                      else (starts[index + 1] + overlap_samples / 2) / SAMPLE_RATE)
+        windows.append((start, min(start + WINDOW_SAMPLES, num_samples), keep_from, keep_until))
+    return windows
+
+
+def window_segments(tokens: List[int], tokenizer, window_start: float,
+                    window_end: float) -> List[Dict[str, Any]]:
+    """
+    窓のデコード結果をタイムスタンプトークンで区切ってセグメントに変換
+
+    Args:
+        tokens: デコード結果のトークン（タイムスタンプトークンを含む）
+        tokenizer: Whisperのトークナイザー
+        window_start: 窓の開始時刻（クリップ先頭からの秒数）
+        window_end: 窓の終了時刻（音声の末尾を超える時刻は切り詰める）
+
+    Returns:
+        セグメントのリスト（開始・終了はクリップ先頭からの秒数）
+    """
+    segments = []
+    segment_start = None
+    text_tokens: List[int] = []
+
+    def add_segment(end: float):
+        start = window_start + (segment_start or 0.0)
+        segments.append({
+            "start": round(min(start, window_end), 2),
+            "end": round(min(window_start + end, window_end), 2),
+            "text": tokenizer.decode(text_tokens),
+            "tokens": list(text_tokens),
+        })
+
+    for token in tokens:
+        if token >= tokenizer.timestamp_begin:
+            timestamp = (token - tokenizer.timestamp_begin) * 0.02
+            if segment_start is not None and text_tokens:
+                add_segment(timestamp)
+                segment_start, text_tokens = None, []
+            else:
+                segment_start = timestamp
+        elif token < tokenizer.eot:
+            text_tokens.append(token)
+
+    # 終了タイムスタンプがない末尾のテキストは窓の終わりまで
+    if text_tokens:
+        add_segment(window_end - window_start)
+    return segments
+
+
+def transcribe_short_clips(audio_paths: List[Path], output_dir: Path,
+                           model_size: Optional[str] = None, language: str = "ja",
+                           batch_size: Optional[int] = None,
+                           device: Optional[str] = None) -> Dict[Path, Tuple[Path, Dict[str, Any]]]:
+    """
+    短いクリップをまとめて文字起こしし、ファイルごとに結果を保存
+
+    出力ファイル（_transcribed.txt / _metadata.json / _segments.npz）は
+    process_audio_without_ffmpegと同じ形式
+
+    Args:
+        audio_paths: 音声ファイルパスのリスト
+        output_dir: 出力ディレクトリ
+        model_size: モデルサイズ（省略時は設定値）
+        language: 言語コード（autoは窓ごとにWhisperが判定）
+        batch_size: 1回のデコードにまとめる窓の数（省略時は設定値）
+        device: デバイス（Noneで自動選択）
+
+    Returns:
+        {音声ファイルパス: (テキストファイルパス, メタデータ)}
+    """
+    import torch
+    import whisper
+    import librosa
+
+    model_size = model_size or BATCH_PROCESSING["short_clip_model"]
+    batch_size = batch_size or BATCH_PROCESSING["short_clip_batch_size"]
+    device = device or get_default_device()
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    model = get_whisper_model(model_size, device)
+    n_mels = model.dims.n_mels
+    tokenizer = whisper.tokenizer.get_tokenizer(model.is_multilingual,
+                                                num_languages=model.num_languages, task="transcribe")
+    overlap_samples = int(BATCH_PROCESSING["short_clip_overlap_seconds"] * SAMPLE_RATE)
+
+    # 各クリップを読み込み、境界を重ねた30秒窓に分割
+    logger.info("📦 %d個の短い音声メモをバッチ処理します (%sモデル)", len(audio_paths), model_size,
+                extra={"model": model_size})
+    clips = []
+    windows: List[Tuple[int, Any, Tuple[int, int, float, float]]] = []
+    for clip_index, path in enumerate(audio_paths):
+        with span("decode", file=path.name, size_bytes=path.stat().st_size):
+            audio_data, _ = librosa.load(str(path), sr=SAMPLE_RATE)
+        clips.append({"path": path, "duration": len(audio_data) / SAMPLE_RATE, "segments": [], "languages": []})
+        for window in plan_windows(len(audio_data), overlap_samples):
+            windows.append((clip_index, audio_data[window[0]:window[1]], window))
+
+    # "auto"はクリップ（窓）ごとにWhisperが判定。セグメントに分けるためタイムスタンプも出力する
+    options = whisper.DecodingOptions(
+        language=None if language == "auto" else language,
+        without_timestamps=False,
+        fp16=(device != "cpu")
+    )
+
+    # 窓をバッチにまとめてデコード
+    total_time = 0.0
+    for batch_start in range(0, len(windows), batch_size):
+        batch = windows[batch_start:batch_start + batch_size]
+        mel = torch.stack([
+            whisper.log_mel_spectrogram(whisper.pad_or_trim(torch.from_numpy(chunk)), n_mels)
+            for _, chunk, _ in batch
+        ]).to(model.device)
+
+        with model_inference(model), \
+                span("transcribe", mode="batch", model=model_size, windows=len(batch)), torch.no_grad():
+            start = time.time()
+            results = whisper.decode(model, mel, options)
+            total_time += time.time() - start
+
+        for (clip_index, _, (start, end, keep_from, keep_until)), result in zip(batch, results):
+            # 無音窓の幻覚出力を除外（Whisperのtranscribeと同じ判定）
+            if result.no_speech_prob > 0.6 and result.avg_logprob < -1.0:
+                continue
+            clip = clips[clip_index]
+            for segment in window_segments(result.tokens, tokenizer,
+                                           start / SAMPLE_RATE, end / SAMPLE_RATE):
+                # 重なり部分は中点で前後の窓に振り分け、同じ発話を二重に採用しない
+                if not keep_from <= (segment["start"] + segment["end"]) / 2 < keep_until:
+                    continue
+                segment.update(temperature=options.temperature, avg_logprob=result.avg_logprob,
+                               compression_ratio=result.compression_ratio,
+                               no_speech_prob=result.no_speech_prob)
+                clip["segments"].append(segment)
+            clip["languages"].append(result.language)
+
+    # クリップごとに保存（処理時間は音声長で按分）
+    total_duration = sum(clip["duration"] for clip in clips) or 1.0
+    telemetry = get_telemetry_store()
+    outputs = {}
+    for clip in clips:
+        path = clip["path"]
+        # 窓はクリップ内の順にバッチへ入るため、セグメントも時刻順に並んでいる
+        segments = [dict(segment, id=index) for index, segment in enumerate(clip["segments"])]
+        transcribed_text = "".join(segment["text"] for segment in segments)
+        processing_time = total_time * clip["duration"] / total_duration
+        languages = clip["languages"]
+        clip_language = max(set(languages), key=languages.count) if languages else language
+
+        if telemetry and clip["duration"] > 0:
+            telemetry.record(path.name, clip["duration"], model_size, get_device_label(device),
+                             processing_time, mode="batched", batched=True, batch_size=batch_size)
+
+        metadata = {
+            "original_file": path.name,
+            "audio_duration_sec": round(clip["duration"], 2),
+            "processing_time_sec": round(processing_time, 2),
+            "char_count": len(transcribed_text),
+            "model_used": model_size,
+            "language": clip_language,
+            "segments_count": len(segments)
+        }
+        text_path = save_transcription_outputs(path, output_dir, transcribed_text, metadata, segments)
+        outputs[path] = (text_path, metadata)
+
+    logger.info("✅ バッチ文字起こし完了: %dファイル / %d窓 / 推論%.1f秒 (音声%.0f秒)",
+                len(clips), len(windows), total_time, total_duration,
+                extra={"model": model_size, "processing_sec": round(total_time, 2)})
+    return outputs
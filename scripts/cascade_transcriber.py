@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+2段階カスケード文字起こし
+高速モデル（tiny/base）で全体を文字起こしし、avg_logprob・no_speech_prob・
+compression_ratioが閾値を超えた低信頼区間だけを高精度モデルで再デコードして差し替える
+"""
+import time
+from typing import Dict, Any, List, Optional
+
+# 設定・モデルキャッシュのインポート（相対/絶対インポートの両方に対応）
+try:
+    from .audio_processor_config import CASCADE_SETTINGS
+    from .model_cache import get_whisper_model, model_inference
+    from .structured_logging import get_logger
+except ImportError:
+    from audio_processor_config import CASCADE_SETTINGS
+    from model_cache import get_whisper_model, model_inference
+    from structured_logging import get_logger
+
+logger = get_logger("audio")
+
+SAMPLE_RATE = 16000
+
+
+def is_low_confidence(segment: Dict[str, Any], settings: Optional[Dict] = None) -> bool:
+    """
+    セグメントが再デコード対象か判定
+
+    Args:
+        segment: Whisperのセグメント
+        settings: カスケード設定（省略時はCASCADE_SETTINGS）
+
+    Returns:
+        低信頼区間ならTrue
+    """
+    settings = settings or CASCADE_SETTINGS
+    return (
+        segment.get("avg_logprob", 0.0) < settings["avg_logprob_threshold"]
+        or segment.get("no_speech_prob", 0.0) > settings["no_speech_prob_threshold"]
+        or segment.get("compression_ratio", 0.0) > settings["compression_ratio_threshold"]
+    )
+
+
+def find_redecode_windows(segments: List[Dict[str, Any]],
+                          settings: Optional[Dict] = None) -> List[Dict[str, Any]]:
+    """
+    低信頼セグメントを再デコード用の区間にまとめる
+
+    Args:
+        segments: 高速モデルのセグメント一覧
+        settings: カスケード設定
+
+    Returns:
+        区間のリスト（start, end, segment_indices）。segment_indicesには間に挟まった
+        高信頼セグメントも含める（区間ごと再デコードされ、差し替え時に元の結果を残さないため）
+    """
+    settings = settings or CASCADE_SETTINGS
+    windows = []
+    current = None
+
+    for index, segment in enumerate(segments):
+        if not is_low_confidence(segment, settings):
+            continue
+
+        if (current is not None
+                and segment["start"] - current["end"] <= settings["merge_gap_seconds"]
+                and segment["end"] - current["start"] <= settings["max_window_seconds"]):
+            current["end"] = segment["end"]
+            current["segment_indices"] = list(range(current["segment_indices"][0], index + 1))
+        else:
+            current = {"start": segment["start"], "end": segment["end"], "segment_indices": [index]}
+            windows.append(current)
+
+    return windows
+
+
+def _mean_logprob(segments: List[Dict[str, Any]]) -> float:
+    """セグメント長で重み付けした平均avg_logprob"""
+    total = sum(max(s["end"] - s["start"], 0.01) for s in segments)
+    if total == 0:
+        return float("-inf")
+    return sum(s.get("avg_logprob", -10.0) * max(s["end"] - s["start"], 0.01) for s in segments) / total
+
+
+def cascade_transcribe(audio_data, language: Optional[str] = "ja",
+                       fast_model: Optional[str] = None,
+                       accurate_model: Optional[str] = None,
+                       device: Optional[str] = None,
+                       settings: Optional[Dict] = None) -> Dict[str, Any]:
+    """
+    カスケード方式で文字起こし
+
+    Args:
+        audio_data: 16kHzモノラルの音声データ（numpy配列）
+        language: 言語コード（Noneで自動検出）
+        fast_model: 1段目のモデル（省略時は設定値）
+        accurate_model: 再デコード用のモデル（省略時は設定値）
+        device: デバイス
+        settings: カスケード設定
+
+    Returns:
+        Whisper互換の結果辞書（text, segments, language, cascade）
+    """
+    settings = settings or CASCADE_SETTINGS
+    fast_model = fast_model or settings["fast_model"]
+    accurate_model = accurate_model or settings["accurate_model"]
+    fp16 = device not in (None, "cpu")
+
+    # 1段目: 高速モデルで全体を文字起こし
+    model = get_whisper_model(fast_model, device)
+    with model_inference(model):
+        start = time.time()
+        result = model.transcribe(audio_data, language=language, verbose=False, fp16=fp16)
+        fast_time = time.time() - start
+    language = language or result.get("language")
+    segments = list(result.get("segments", []))
+
+    windows = find_redecode_windows(segments, settings)
+    logger.info("🔍 カスケード: %dセグメント中 %d個が低信頼 → %sで再デコード", len(segments),
+                sum(len(w['segment_indices']) for w in windows), accurate_model,
+                extra={"model": accurate_model})
+
+    # 2段目: 低信頼区間のみ高精度モデルで再デコード
+    replacements = {}
+    redecoded_seconds = 0.0
+    accurate_time = 0.0
+    if windows:
+        accurate = get_whisper_model(accurate_model, device)
+        audio_seconds = len(audio_data) / SAMPLE_RATE
+
+        for window in windows:
+            window_start = max(window["start"] - settings["padding_seconds"], 0.0)
+            window_end = min(window["end"] + settings["padding_seconds"], audio_seconds)
+            chunk = audio_data[int(window_start * SAMPLE_RATE):int(window_end * SAMPLE_RATE)]
+
+            # 直前の確定テキストを文脈として渡す
+            first_index = window["segment_indices"][0]
+            prompt = segments[first_index - 1]["text"] if first_index > 0 else None
+
+            with model_inference(accurate):
+                chunk_start = time.time()
+                redo = accurate.transcribe(chunk, language=language, verbose=False, fp16=fp16,
+                                           condition_on_previous_text=False, initial_prompt=prompt)
+                accurate_time += time.time() - chunk_start
+            redecoded_seconds += window_end - window_start
+
+            new_segments = []
+            for seg in redo.get("segments", []):
+                seg = dict(seg)
+                # 中点が余白部分にあるセグメントは前後の元セグメントと重複するため捨てる
+                midpoint = window_start + (seg["start"] + seg["end"]) / 2
+                if not window["start"] <= midpoint <= window["end"]:
+                    continue
+                # 余白部分にはみ出した時刻は元の区間内に収める
+                seg["start"] = round(min(max(seg["start"] + window_start, window["start"]), window["end"]), 2)
+                seg["end"] = round(min(max(seg["end"] + window_start, window["start"]), window["end"]), 2)
+                seg["cascade_model"] = accurate_model
+                if seg["end"] > seg["start"] and seg["text"].strip():
+                    new_segments.append(seg)
+
+            # 再デコードの方が信頼度が低ければ元の結果を残す
+            original = [segments[i] for i in window["segment_indices"]]
+            if new_segments and _mean_logprob(new_segments) >= _mean_logprob(original):
+                replacements[first_index] = (window["segment_indices"], new_segments)
+
+    # セグメント一覧に差し替え結果を組み込む
+    merged = []
+    skip = set()
+    for index, segment in enumerate(segments):
+        if index in skip:
+            continue
+        if index in replacements:
+            indices, new_segments = replacements[index]
+            skip.update(indices)
+            merged.extend(new_segments)
+        else:
+            merged.append(segment)
+
+    for new_id, segment in enumerate(merged):
+        segment["id"] = new_id
+
+    return {
+        "text": "".join(segment["text"] for segment in merged),
+        "segments": merged,
+        "language": language,
+        "cascade": {
+            "fast_model": fast_model,
+            "accurate_model": accurate_model,
+            "windows": len(windows),
+            "replaced_windows": len(replacements),
+            "redecoded_seconds": round(redecoded_seconds, 2),
+            "redecoded_ratio": round(redecoded_seconds / max(len(audio_data) / SAMPLE_RATE, 0.01), 3),
+            "fast_processing_sec": round(fast_time, 2),
+            "accurate_processing_sec": round(accurate_time, 2),
+        }
+    }
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+一括処理のチェックポイント管理
+実行IDごとに、ファイル単位で完了したステージ（文字起こし・解析結果の保存・アーカイブ）を記録する。
+ステージ完了は data/.checkpoints/{実行ID}.jsonl に1行ずつ追記してfsyncし（1件あたりの書き込みは
+ファイル数によらず一定）、実行の開始・再開・終了時に {実行ID}.json へまとめ直す。
+まとめ直しは一時ファイル経由の置き換えで行い、直前の世代をローテーションして残すため、
+途中で強制終了しても失うのは処理中のファイルだけになる
+"""
+import os
+import sys
+import json
+import time
+import threading
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+# 設定・共通処理のインポート（相対/絶対インポートの両方に対応）
+try:
+    from .audio_processor_config import CHECKPOINT_SETTINGS
+    from .date_utils import get_now, get_timestamp
+except ImportError:
+    from audio_processor_config import CHECKPOINT_SETTINGS
+    from date_utils import get_now, get_timestamp
+
+
+class CheckpointManager:
+    """実行IDごとのファイル×ステージ完了状況"""
+
+    def __init__(self, run_id: Optional[str] = None, checkpoint_dir: Optional[str] = None):
+        """
+        初期化
+
+        Args:
+            run_id: 再開する実行ID（省略時は現在時刻から新しいIDを発行）
+            checkpoint_dir: 保存先（省略時は設定値）
+        """
+        self.checkpoint_dir = Path(checkpoint_dir or CHECKPOINT_SETTINGS["checkpoint_dir"])
+        self.resumed = run_id is not None
+        self.run_id = run_id or get_timestamp()
+        self.path = self.checkpoint_dir / f"{self.run_id}.json"
+        self.journal_path = self.checkpoint_dir / f"{self.run_id}.jsonl"
+        self._lock = threading.Lock()
+        self._compacted = False
+
+        if self.resumed:
+            checkpoint = self._load()
+            if checkpoint is None:
+                raise FileNotFoundError(f"チェックポイントが見つかりません: {self.run_id}")
+            self.timestamp = checkpoint["timestamp"]
+            self.state = checkpoint["state"]
+            self.state.setdefault("files", {})
+            self.state["status"] = "running"
+            # 前回の追記分をまとめてから再開する
+            with self._lock:
+                self._save()
+        else:
+            self.timestamp = get_now()
+            self.state = {"status": "running", "files": {}}
+
+    def _generation_path(self, generation: int) -> Path:
+        """ローテーションした世代のパス（0が最新）"""
+        return self.path if generation == 0 else self.path.with_name(f"{self.path.name}.{generation}")
+
+    def _load(self) -> Optional[Dict[str, Any]]:
+        """最新の世代から順に、読み込めるチェックポイントを返す（追記分を反映済み）"""
+        for generation in range(CHECKPOINT_SETTINGS["keep_generations"] + 1):
+            path = self._generation_path(generation)
+            if not path.exists():
+                continue
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    checkpoint = json.load(f)
+            except (json.JSONDecodeError, OSError) as e:
+                print(f"⚠️ チェックポイントを読み込めません（前の世代を使用）: {path.name}: {e}")
+                continue
+            _replay_journal(checkpoint.setdefault("state", {}), self.journal_path)
+            return checkpoint
+        return None
+
+    def _append(self, record: Dict[str, Any]):
+        """ステージ完了を1行追記してディスクに書き出す"""
+        with open(self.journal_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _save(self):
+        """
+        全体を書き直して追記分をまとめる（実行の開始・再開・終了時のみ）
+
+        一時ファイルに書いてから置き換え、既存の世代は1つずつずらす。
+        置き換え後に追記ファイルを削除する（途中で落ちても再読み込み時に重複して反映されるだけ）
+        """
+        self.checkpoint_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"id": self.run_id, "timestamp": self.timestamp, "state": self.state},
+                      f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+
+        for generation in range(CHECKPOINT_SETTINGS["keep_generations"], 0, -1):
+            previous = self._generation_path(generation - 1)
+            if previous.exists():
+                os.replace(previous, self._generation_path(generation))
+        os.replace(tmp_path, self.path)
+        self.journal_path.unlink(missing_ok=True)
+        self._compacted = True
+
+    @staticmethod
+    def get_file_key(file_path: Path) -> str:
+        """ファイルの識別キー（絶対パス）"""
+        return str(Path(file_path).resolve())
+
+    def get_stage(self, file_path: Path, stage: str) -> Optional[Dict[str, Any]]:
+        """
+        完了済みステージの記録を取得
+
+        記録後にファイルが差し替えられた（サイズが変わった）場合は未完了とみなす
+
+        Args:
+            file_path: 対象ファイル
+            stage: ステージ名
+
+        Returns:
+            mark時に渡したデータと完了時刻、未完了ならNone
+        """
+        with self._lock:
+            entry = self.state["files"].get(self.get_file_key(file_path))
+        if not entry or stage not in entry["stages"]:
+            return None
+        if file_path.exists() and file_path.stat().st_size != entry["size"]:
+            return None
+        return entry["stages"][stage]
+
+    def is_completed(self, file_path: Path, stage: str) -> bool:
+        """ステージが完了済みか"""
+        return self.get_stage(file_path, stage) is not None
+
+    def mark(self, file_path: Path, stage: str, **data):
+        """
+        ステージの完了を記録してすぐに保存（追記のみ、最初の1件は一覧に出るよう全体を保存）
+
+        Args:
+            file_path: 対象ファイル
+            stage: ステージ名
+            **data: 再開時に使うデータ（出力パスなど、JSONに保存できる値）
+        """
+        key = self.get_file_key(file_path)
+        with self._lock:
+            entry = self.state["files"].get(key)
+            if entry is None:
+                size = file_path.stat().st_size if file_path.exists() else None
+                entry = self.state["files"][key] = {"name": file_path.name, "size": size, "stages": {}}
+            entry["stages"][stage] = dict(data, completed_at=get_now())
+            if not self._compacted:
+                self._save()
+            else:
+                self._append({"key": key, "name": entry["name"], "size": entry["size"],
+                              "stage": stage, "data": entry["stages"][stage]})
+
+    def finish(self):
+        """実行の完了を記録"""
+        with self._lock:
+            self.state["status"] = "completed"
+            self.state["finished_at"] = get_now()
+            if self.state["files"]:
+                self._save()
+
+    def summary(self) -> Dict[str, int]:
+        """ステージごとの完了ファイル数"""
+        counts: Dict[str, int] = {}
+        with self._lock:
+            for entry in self.state["files"].values():
+                for stage in entry["stages"]:
+                    counts[stage] = counts.get(stage, 0) + 1
+        return counts
+
+
+def _replay_journal(state: Dict[str, Any], journal_path: Path):
+    """追記ファイルのステージ完了をstateに反映（書き込み途中の最終行は無視）"""
+    if not journal_path.exists():
+        return
+    files = state.setdefault("files", {})
+    with open(journal_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            entry = files.setdefault(record["key"], {"name": record["name"], "size": record["size"],
+                                                     "stages": {}})
+            entry["stages"][record["stage"]] = record["data"]
+
+
+def list_checkpoints(checkpoint_dir: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    保存済みのチェックポイント一覧（新しい順）
+
+    Args:
+        checkpoint_dir: 保存先（省略時は設定値）
+
+    Returns:
+        [{"id", "timestamp", "status", "files"}, ...]
+    """
+    directory = Path(checkpoint_dir or CHECKPOINT_SETTINGS["checkpoint_dir"])
+    runs = []
+    for path in sorted(directory.glob("*.json"), reverse=True):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                checkpoint = json.load(f)
+        except (json.JSONDecodeError, OSError):
+            continue
+        state = checkpoint.get("state", {})
+        _replay_journal(state, path.with_suffix('.jsonl'))
+        runs.append({
+            "id": checkpoint.get("id", path.stem),
+            "timestamp": checkpoint.get("timestamp"),
+            "status": state.get("status", "unknown"),
+            "files": len(state.get("files", {})),
+        })
+    return runs
+
+
+def gc_checkpoints(max_age_days: Optional[float] = None, checkpoint_dir: Optional[str] = None,
+                   keep: Optional[str] = None) -> int:
+    """
+    古いチェックポイントを削除
+
+    Args:
+        max_age_days: 保持日数（省略時は設定値）
+        checkpoint_dir: 保存先（省略時は設定値）
+        keep: 削除しない実行ID（実行中のもの）
+
+    Returns:
+        削除した実行の数
+    """
+    directory = Path(checkpoint_dir or CHECKPOINT_SETTINGS["checkpoint_dir"])
+    if not directory.exists():
+        return 0
+    if max_age_days is None:
+        max_age_days = CHECKPOINT_SETTINGS["max_age_days"]
+    cutoff = time.time() - max_age_days * 86400
+
+    removed = set()
+    for path in directory.iterdir():
+        run_id = path.name.split(".")[0]
+        if run_id == keep or not path.is_file() or path.stat().st_mtime >= cutoff:
+            continue
+        path.unlink()
+        removed.add(run_id)
+    return len(removed)
+
+
+def main():
+    """チェックポイントの一覧表示と削除"""
+    if len(sys.argv) > 1 and sys.argv[1] == "gc":
+        max_age_days = float(sys.argv[2]) if len(sys.argv) > 2 else None
+        print(f"🧹 {gc_checkpoints(max_age_days)}件の古いチェックポイントを削除しました")
+        return
+
+    runs = list_checkpoints()
+    if not runs:
+        print("📂 チェックポイントはありません")
+        return
+    print("🔖 チェックポイント一覧（--resume 実行ID で再開）")
+    for run in runs:
+        print(f"  {run['id']}  {run['status']:9s}  {run['files']:4d}ファイル  ({run['timestamp']})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+ステージ単位のCPUプロファイル
+tracing.span()のうち指定したステージの区間だけcProfileを有効にし（スレッドごと）、
+同時にバックグラウンドのサンプラーで該当スレッドのスタックを定期取得する。
+終了時にスレッドごとのプロファイルをまとめて .pstats（snakeviz・pstatsで表示）と
+.collapsed（flamegraph.pl・speedscopeで表示できる折りたたみスタック）に書き出す。
+複数プロセス・複数ホストの出力は merge サブコマンドで1つにまとめられる
+
+    python scripts/cpu_profiler.py show output/profiles/cpu_xxx.pstats
+    python scripts/cpu_profiler.py merge output/profiles/merged output/profiles/cpu_*.pstats
+"""
+import os
+import sys
+import pstats
+import cProfile
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Sequence
+
+# 設定・共通処理のインポート（相対/絶対インポートの両方に対応）
+try:
+    from .audio_processor_config import CPU_PROFILE_SETTINGS
+    from .date_utils import get_timestamp
+    from .tracing import add_span_hook
+except ImportError:
+    from audio_processor_config import CPU_PROFILE_SETTINGS
+    from date_utils import get_timestamp
+    from tracing import add_span_hook
+
+
+def _frame_label(code) -> str:
+    return f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})"
+
+
+class CpuProfiler:
+    """span()のフックとして指定ステージだけをプロファイル"""
+
+    def __init__(self, stages: Optional[Sequence[str]] = None, settings: Optional[Dict[str, Any]] = None):
+        """
+        初期化
+
+        Args:
+            stages: 対象のステージ名（省略時は設定値、空なら全ステージ）
+            settings: CPU_PROFILE_SETTINGSの上書き
+        """
+        self.settings = dict(CPU_PROFILE_SETTINGS, **(settings or {}))
+        self.stages = set(stages if stages is not None else self.settings["stages"])
+        self.samples: Counter = Counter()
+        self.skipped = 0
+        self._local = threading.local()
+        self._profiles: List[cProfile.Profile] = []
+        self._active: Dict[int, List[str]] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+
+    def start(self):
+        """サンプラーを開始"""
+        self._sampler = threading.Thread(target=self._sample_loop, name="cpu-sampler", daemon=True)
+        self._sampler.start()
+
+    def stop(self):
+        """サンプラーを停止"""
+        self._stop.set()
+        if self._sampler:
+            self._sampler.join()
+
+    def _thread_state(self):
+        """このスレッドのプロファイルとステージのスタック（初回のみ作成）"""
+        local = self._local
+        if not hasattr(local, "stack"):
+            local.stack = []
+            local.profile = cProfile.Profile()
+            with self._lock:
+                self._profiles.append(local.profile)
+                self._active[threading.get_ident()] = local.stack
+        return local.profile, local.stack
+
+    @contextmanager
+    def hook(self, name: str, category: str, attributes: Dict[str, Any]):
+        """span()から呼ばれるフック（入れ子の場合は一番外側の対象ステージで有効化）"""
+        if self.stages and name not in self.stages:
+            yield
+            return
+        profile, stack = self._thread_state()
+        enabled = False
+        if not stack:
+            try:
+                profile.enable()
+                enabled = True
+            except ValueError:
+                # 他のプロファイラが有効（Python 3.12以降は同時に1つまで）ならサンプラーのみ
+                self.skipped += 1
+        stack.append(name)
+        try:
+            yield
+        finally:
+            stack.pop()
+            if enabled:
+                profile.disable()
+
+    def _sample_loop(self):
+        interval = self.settings["sample_interval_seconds"]
+        max_depth = self.settings["max_stack_depth"]
+        own_ident = threading.get_ident()
+        while not self._stop.wait(interval):
+            frames = sys._current_frames()
+            with self._lock:
+                active = [(ident, stack[0]) for ident, stack in self._active.items() if stack]
+            for ident, stage in active:
+                frame = frames.get(ident)
+                if frame is None or ident == own_ident:
+                    continue
+                labels = []
+                while frame is not None and len(labels) < max_depth:
+                    labels.append(_frame_label(frame.f_code))
+                    frame = frame.f_back
+                labels.append(stage)
+                self.samples[";".join(reversed(labels))] += 1
+
+    def get_stats(self) -> Optional[pstats.Stats]:
+        """スレッドごとのプロファイルをまとめた統計（記録がなければNone）"""
+        with self._lock:
+            profiles = list(self._profiles)
+        stats = None
+        for profile in profiles:
+            profile.create_stats()
+            if not profile.stats:
+                continue
+            if stats is None:
+                stats = pstats.Stats(profile)
+            else:
+                stats.add(profile)
+        return stats
+
+
+def write_collapsed(samples: Counter, path: Path):
+    """折りたたみスタック（"stage;func (file:line);... 件数"）を書き出す"""
+    with open(path, 'w', encoding='utf-8') as f:
+        for stack, count in sorted(samples.items()):
+            f.write(f"{stack} {count}\n")
+
+
+def read_collapsed(path: Path) -> Counter:
+    """折りたたみスタックを読み込む"""
+    samples: Counter = Counter()
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            stack, _, count = line.rstrip("\n").rpartition(" ")
+            if stack:
+                samples[stack] += int(count)
+    return samples
+
+
+def print_top(stats: pstats.Stats, limit: int = 15):
+    """累積時間の上位を表示"""
+    stats.sort_stats("cumulative").print_stats(limit)
+
+
+_profiler: Optional[CpuProfiler] = None
+
+
+def enable_cpu_profiling(stages: Optional[Sequence[str]] = None) -> CpuProfiler:
+    """
+    CPUプロファイルを有効化（以降の対象ステージのspan()が記録される）
+
+    Args:
+        stages: 対象のステージ名（省略時は設定値、空なら全ステージ）
+
+    Returns:
+        有効にしたプロファイラ
+    """
+    global _profiler
+    _profiler = CpuProfiler(stages)
+    _profiler.start()
+    add_span_hook(_profiler.hook)
+    return _profiler
+
+
+def export_cpu_profile(path: Optional[str] = None) -> Optional[Path]:
+    """
+    プロファイルを停止して .pstats と .collapsed を書き出す
+
+    Args:
+        path: 出力先（拡張子なし、省略時は output/profiles/cpu_{タイムスタンプ}_{PID}）
+
+    Returns:
+        出力先（拡張子なし、無効時はNone）
+    """
+    if _profiler is None:
+        return None
+    _profiler.stop()
+    base = Path(path) if path else \
+        Path(_profiler.settings["output_dir"]) / f"cpu_{get_timestamp()}_{os.getpid()}"
+    base.parent.mkdir(parents=True, exist_ok=True)
+
+    stats = _profiler.get_stats()
+    print(f"\n🔥 CPUプロファイルを保存しました: {base}.pstats / {base}.collapsed "
+          f"（対象: {', '.join(sorted(_profiler.stages)) or '全ステージ'}）")
+    if stats is not None:
+        stats.dump_stats(f"{base}.pstats")
+        print_top(stats)
+    if _profiler.skipped:
+        print(f"   ⚠️ 他のプロファイラが有効だったため{_profiler.skipped}区間はサンプリングのみです")
+    write_collapsed(_profiler.samples, Path(f"{base}.collapsed"))
+    return base
+
+
+def merge_profiles(output: str, inputs: Sequence[str]) -> Path:
+    """
+    複数プロセスの .pstats / .collapsed を1つにまとめる
+
+    Args:
+        output: 出力先（拡張子なし）
+        inputs: 入力ファイル（拡張子の有無どちらでも可）
+
+    Returns:
+        出力先（拡張子なし）
+    """
+    bases = sorted({str(Path(p).with_suffix("")) if Path(p).suffix in (".pstats", ".collapsed") else p
+                    for p in inputs})
+    stats = None
+    samples: Counter = Counter()
+    for base in bases:
+        if Path(f"{base}.pstats").exists():
+            if stats is None:
+                stats = pstats.Stats(f"{base}.pstats")
+            else:
+                stats.add(f"{base}.pstats")
+        if Path(f"{base}.collapsed").exists():
+            samples.update(read_collapsed(Path(f"{base}.collapsed")))
+
+    output_base = Path(output)
+    output_base.parent.mkdir(parents=True, exist_ok=True)
+    if stats is not None:
+        stats.dump_stats(f"{output_base}.pstats")
+    write_collapsed(samples, Path(f"{output_base}.collapsed"))
+    print(f"🔥 {len(bases)}件のプロファイルをまとめました: {output_base}.pstats / {output_base}.collapsed")
+    return output_base
+
+
+def main():
+    """プロファイルの表示（show）とまとめ（merge）"""
+    if len(sys.argv) >= 3 and sys.argv[1] == "show":
+        print_top(pstats.Stats(sys.argv[2]), limit=int(sys.argv[3]) if len(sys.argv) > 3 else 30)
+    elif len(sys.argv) >= 4 and sys.argv[1] == "merge":
+        merge_profiles(sys.argv[2], sys.argv[3:])
+    else:
+        print("使用例:")
+        print("  python scripts/cpu_profiler.py show PROFILE.pstats [件数]")
+        print("  python scripts/cpu_profiler.py merge OUTPUT INPUT.pstats ...")
+
+
+if __name__ == "__main__":
+    main()
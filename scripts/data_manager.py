@@ -7,26 +7,82 @@ import os
 import shutil
 import json
 import hashlib
+import time
+import threading
+from contextlib import contextmanager
 from datetime import datetime, timedelta
 
-# date_utilsのインポート（相対/絶対インポートの両方に対応）
+try:
+    import fcntl
+except ImportError:  # Windowsではプロセス間ロックなし
+    fcntl = None
+
+# date_utils・トレース・ログのインポート（相対/絶対インポートの両方に対応）
 try:
     from .date_utils import get_today, get_now
+    from .tracing import span
+    from .structured_logging import get_logger
+    from .work_spool import get_worker_id
 except ImportError:
     from date_utils import get_today, get_now
+    from tracing import span
+    from structured_logging import get_logger
+    from work_spool import get_worker_id
 from pathlib import Path
-from typing import List, Tuple, Optional
+from typing import Dict, Any, List, Tuple, Optional
+
+logger = get_logger("data_manager")
+
+
+class FileClaim:
+    """
+    取り込みファイルの処理権
+    
+    data/.claims/ のロックファイルにflockをかけて保持する。プロセスが異常終了しても
+    ロックはOSが解放するため、次に取得したプロセスがそのまま引き継げる（ロックファイルの
+    所有者情報は上書きされる）。完了・失敗のどちらでもrelease()で手放し、ファイルは
+    移動済み（完了）か取り込みフォルダに残ったまま（失敗・中断）になる
+    """
+    
+    def __init__(self, file_path: Path, lock_path: Optional[Path] = None, fd: Optional[int] = None):
+        self.file_path = file_path
+        self.lock_path = lock_path
+        self._fd = fd
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+    
+    def release(self):
+        """処理権を手放す（ロックファイルは削除してから解放し、待っていた側に作り直させる）"""
+        if self._fd is None:
+            return
+        try:
+            os.unlink(self.lock_path)
+        except FileNotFoundError:
+            pass
+        fcntl.flock(self._fd, fcntl.LOCK_UN)
+        os.close(self._fd)
+        self._fd = None
 
 
 class DataManager:
     """データのライフサイクルを管理するクラス"""
     
+    # 並列処理時の処理履歴ログ（読み込み→更新→書き込み）の排他制御
+    _log_lock = threading.RLock()
+    
     def __init__(self, base_dir: str = "data"):
         self.base_dir = Path(base_dir)
         self.new_dir = self.base_dir / "00_new"
         self.analyzed_dir = self.base_dir / "01_analyzed"
         self.archive_dir = self.base_dir / "02_archive"
         self.log_file = self.base_dir / "analysis_log.json"
+        self.lock_file = self.base_dir / ".analysis_log.lock"
+        self.claims_dir = self.base_dir / ".claims"
+        self.intake_times_file = self.base_dir / ".intake_times.json"
         
         # 外部データソース管理（シンプルに）
         self.sources_dir = self.base_dir / "sources"
@@ -57,7 +113,8 @@ class DataManager:
     def calculate_file_hash(self, file_path: Path) -> str:
         """ファイルのハッシュ値を計算"""
         hash_md5 = hashlib.md5()
-        with open(file_path, "rb") as f:
+        with span("hash", file=file_path.name, size_bytes=file_path.stat().st_size), \
+                open(file_path, "rb") as f:
             for chunk in iter(lambda: f.read(4096), b""):
                 hash_md5.update(chunk)
         return hash_md5.hexdigest()
@@ -112,7 +169,45 @@ class DataManager:
         for ext in text_extensions:  # Notionは主にテキストファイル
             files.extend(self.notion_dir.glob(ext))
         
-        return sorted(files)
+        files = sorted(files)
+        self._record_intake_times(files)
+        return files
+    
+    def _load_intake_times(self) -> Dict[str, float]:
+        if not self.intake_times_file.exists():
+            return {}
+        try:
+            with open(self.intake_times_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (json.JSONDecodeError, OSError):
+            return {}
+    
+    def _record_intake_times(self, files: List[Path]):
+        """
+        取り込みフォルダで最初に見つけた時刻を記録（なくなったファイルの記録は削除）
+        
+        mv・cp -p・同期クライアントは録音時の更新時刻を保つため、mtimeは投入時刻にならない
+        """
+        keys = {str(file_path.resolve()) for file_path in files}
+        with self._interprocess_lock():
+            recorded = self._load_intake_times()
+            if set(recorded) == keys:
+                return
+            now = time.time()
+            updated = {key: recorded.get(key, now) for key in keys}
+            tmp_path = self.intake_times_file.with_name(f".{self.intake_times_file.name}.{os.getpid()}.tmp")
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(updated, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.intake_times_file)
+    
+    def get_intake_time(self, file_path: Path) -> Optional[float]:
+        """
+        取り込みフォルダで最初に見つけた時刻（UNIX時刻）
+        
+        Returns:
+            記録がなければNone（一覧を取得していない取り込みフォルダ外のファイルなど）
+        """
+        return self._load_intake_times().get(str(Path(file_path).resolve()))
     
     def get_notion_files(self) -> List[Path]:
         """Notion未処理ファイルのリストを取得"""
@@ -137,12 +232,125 @@ class DataManager:
         
         return False, None
     
+    @contextmanager
+    def _interprocess_lock(self):
+        """
+        処理履歴ログの他プロセス・他ホスト（ワーカーモード）との排他制御
+        
+        他ホストとの排他はflockを転送するファイルシステム（NFSv4、lockd付きのNFSv3）上でのみ有効
+        """
+        if fcntl is None:
+            yield
+            return
+        with open(self.lock_file, 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+    
+    def _claim_lock_path(self, file_path: Path) -> Path:
+        """ファイルごとのロックファイル（絶対パスのハッシュ）"""
+        digest = hashlib.md5(str(file_path.resolve()).encode('utf-8')).hexdigest()[:16]
+        return self.claims_dir / f"{digest}.lock"
+    
+    def claim_file(self, file_path: Path) -> Optional[FileClaim]:
+        """
+        取り込みファイルの処理権を取得（同時に動く別の実行と同じファイルを処理しない）
+        
+        Args:
+            file_path: 取り込みフォルダのファイル
+        
+        Returns:
+            処理権（別のプロセスが処理中、または処理済みで移動された場合はNone）
+        """
+        if fcntl is None:
+            # Windowsではプロセス間の排他なし（同時実行しない前提）
+            return FileClaim(file_path) if file_path.exists() else None
+        
+        self.claims_dir.mkdir(parents=True, exist_ok=True)
+        lock_path = self._claim_lock_path(file_path)
+        while True:
+            fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                os.close(fd)
+                return None
+            # 取得までの間に前の所有者が解放（ロックファイルを削除）していたら作り直して取り直す
+            try:
+                if os.fstat(fd).st_ino == os.stat(lock_path).st_ino:
+                    break
+            except FileNotFoundError:
+                pass
+            os.close(fd)
+        
+        claim = FileClaim(file_path, lock_path, fd)
+        # 待っている間に先に処理した側が処理済みフォルダに移動した
+        if not file_path.exists():
+            claim.release()
+            return None
+        
+        previous = os.read(fd, 4096)
+        if previous:
+            try:
+                owner = json.loads(previous)
+                logger.warning("♻️  停止した実行 %s の処理権を引き継ぎました: %s", owner.get("worker"),
+                               file_path.name, extra={"file": file_path.name})
+            except ValueError:
+                pass
+        os.ftruncate(fd, 0)
+        os.pwrite(fd, json.dumps({"file": str(file_path), "worker": get_worker_id(),
+                                  "claimed_at": get_now()}, ensure_ascii=False).encode('utf-8'), 0)
+        return claim
+    
+    def list_claims(self) -> List[Dict[str, Any]]:
+        """
+        処理中のファイル一覧（所有者が停止して残ったロックファイルは削除）
+        
+        Returns:
+            ロックファイルの所有者情報（file, worker, claimed_at）
+        """
+        if fcntl is None or not self.claims_dir.exists():
+            return []
+        claims = []
+        for lock_path in sorted(self.claims_dir.glob("*.lock")):
+            try:
+                fd = os.open(lock_path, os.O_RDWR)
+            except FileNotFoundError:
+                continue
+            try:
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    try:
+                        claims.append(json.loads(os.read(fd, 4096) or b"{}"))
+                    except ValueError:
+                        claims.append({"file": lock_path.name})
+                    continue
+                # ロックできた = 所有者がいない
+                os.unlink(lock_path)
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            finally:
+                os.close(fd)
+        return claims
+    
     def move_to_analyzed(self, file_path: Path, analysis_result_path: Optional[str] = None):
         """処理済みファイルを日付フォルダに移動"""
+        with span("move", file=file_path.name), self._log_lock, self._interprocess_lock():
+            return self._move_to_analyzed(file_path, analysis_result_path)
+    
+    def _move_to_analyzed(self, file_path: Path, analysis_result_path: Optional[str] = None):
+        """処理済みファイルを日付フォルダに移動（ロック取得済み）"""
+        if not file_path.exists():
+            logger.warning("⚠️  別の実行が移動済みです: %s", file_path.name, extra={"file": file_path.name})
+            return False
+        
         # 重複チェック
         is_duplicate, processed_date = self.check_duplicate(file_path)
         if is_duplicate:
-            print(f"⚠️  既に処理済みです: {file_path.name} (処理日: {processed_date})")
+            logger.warning("⚠️  既に処理済みです: %s (処理日: %s)", file_path.name, processed_date,
+                           extra={"file": file_path.name})
             return False
         
         # 移動先ディレクトリ作成
@@ -162,7 +370,8 @@ class DataManager:
         # ログ更新
         self._update_log(file_path, dest_path, analysis_result_path)
         
-        print(f"✅ 処理完了: {file_path.name} → {dest_path.relative_to(self.base_dir)}")
+        logger.info("✅ 処理完了: %s → %s", file_path.name, dest_path.relative_to(self.base_dir),
+                    extra={"file": file_path.name})
         return True
     
     def _update_log(self, original_path: Path, dest_path: Path, analysis_result_path: Optional[str]):
@@ -202,7 +411,7 @@ class DataManager:
                         dest = self.archive_dir / date_dir.name
                         shutil.move(str(date_dir), str(dest))
                         archived_count += 1
-                        print(f"📦 アーカイブ: {date_dir.name}")
+                        logger.info("📦 アーカイブ: %s", date_dir.name)
                 except ValueError:
                     # 日付形式でないディレクトリはスキップ
                     continue
@@ -268,7 +477,9 @@ class DataManager:
     
     def get_new_files_by_type(self) -> dict:
         """ファイルタイプ別に未処理ファイルを取得"""
-        all_files = self.get_new_files()
+        with span("scan", directory=str(self.new_dir)) as scan_span:
+            all_files = self.get_new_files()
+            scan_span.set(files=len(all_files))
         files_by_type = {
             'audio': [],
             'text': [],
@@ -303,6 +514,16 @@ def main():
         elif command == "cleanup":
             dm.cleanup_duplicates()
         
+        elif command == "claims":
+            claims = dm.list_claims()
+            if claims:
+                print(f"🔒 処理中のファイル ({len(claims)}個):")
+                for claim in claims:
+                    print(f"  - {Path(claim.get('file', '?')).name}  {claim.get('worker', '?')}  "
+                          f"{claim.get('claimed_at', '')[:19]}")
+            else:
+                print("✅ 処理中のファイルはありません")
+        
         elif command == "list":
             files_by_type = dm.get_new_files_by_type()
             total_files = sum(len(files) for files in files_by_type.values())
@@ -349,6 +570,7 @@ def main():
             print("  python data_manager.py list      # 未処理一覧")
             print("  python data_manager.py archive   # アーカイブ実行")
             print("  python data_manager.py cleanup   # 重複チェック")
+            print("  python data_manager.py claims    # 処理中のファイル（停止した実行のロックは削除）")
     
     else:
         # デフォルトは統計表示
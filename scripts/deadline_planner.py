@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+締切付き文字起こしプランナー
+レイテンシ予算（例: 投入から10分以内）に収まる最大のWhisperモデルとデコード設定を選び、
+ERROR_HANDLINGのタイムアウト・再試行・代替モデル順序を実際に適用して実行する
+"""
+import time
+import multiprocessing
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+# 設定・テレメトリのインポート（相対/絶対インポートの両方に対応）
+try:
+    from .audio_processor_config import (
+        ERROR_HANDLING, DECODE_PROFILES, DEADLINE_SETTINGS, global_config
+    )
+    from .audio_telemetry import probe_audio_duration, get_telemetry_store
+    from .model_cache import get_device_label
+    from .retry_queue import classify_error
+    from .structured_logging import get_logger
+except ImportError:
+    from audio_processor_config import (
+        ERROR_HANDLING, DECODE_PROFILES, DEADLINE_SETTINGS, global_config
+    )
+    from audio_telemetry import probe_audio_duration, get_telemetry_store
+    from model_cache import get_device_label
+    from retry_queue import classify_error
+    from structured_logging import get_logger
+
+logger = get_logger("audio")
+
+
+class DeadlineExceededError(Exception):
+    """締切内に文字起こしが完了しなかった"""
+
+
+def get_audio_duration(audio_path: Path) -> float:
+    """
+    音声の長さを取得（ヘッダー優先、取得できなければビットレート128kbps相当で推定）
+
+    Args:
+        audio_path: 音声ファイルパス
+
+    Returns:
+        音声の長さ（秒）
+    """
+    duration = probe_audio_duration(audio_path)
+    if duration:
+        return duration
+    return audio_path.stat().st_size * 8 / 128000
+
+
+def get_received_at(audio_path: Path) -> float:
+    """
+    締切の起点（measure_from_dropなら取り込みフォルダで最初に見つけた時刻、それ以外は現在時刻）
+
+    mtimeは録音時刻のまま移動・コピーされることが多いため使わない
+    """
+    if DEADLINE_SETTINGS["measure_from_drop"]:
+        try:
+            from .data_manager import DataManager
+        except ImportError:
+            from data_manager import DataManager
+        received_at = DataManager().get_intake_time(audio_path)
+        if received_at is not None:
+            return received_at
+    return time.time()
+
+
+def get_real_time_factor(model: str, device: str) -> float:
+    """実測の実時間係数を取得（"balanced"プロファイル相当、未計測なら設定の目安値）"""
+    telemetry = get_telemetry_store()
+    if telemetry:
+        rtf = telemetry.get_real_time_factor(model, device)
+        if rtf is not None:
+            return rtf
+    return DEADLINE_SETTINGS["default_real_time_factors"].get(model, 1.0)
+
+
+def plan_transcription(audio_path: Path, budget_seconds: float, device: str = "cpu",
+                       models: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    予算内に終わると予測される最大のモデルとデコード設定を選択
+
+    Args:
+        audio_path: 音声ファイルパス
+        budget_seconds: 処理に使える残り時間（秒）
+        device: 推論デバイス
+        models: 候補モデル（大きい順、省略時はフォールバック順序）
+
+    Returns:
+        実行計画の辞書（model, beam_size, best_of, predicted_seconds など）
+    """
+    models = models or ERROR_HANDLING["fallback_models"]
+    duration = get_audio_duration(audio_path)
+    usable_seconds = max(budget_seconds, 0) * DEADLINE_SETTINGS["safety_margin"]
+    # 子プロセスは量子化なしでロードするため非量子化の実測値を使う
+    device_label = get_device_label(device, quantized=False)
+
+    plan = None
+    for model in models:
+        rtf = get_real_time_factor(model, device_label)
+        for profile in DECODE_PROFILES:
+            predicted = duration * rtf * profile["cost_factor"]
+            if predicted <= usable_seconds:
+                plan = (model, profile, predicted)
+                break
+        if plan:
+            break
+
+    # どれも間に合わない場合は最小モデル・最速設定
+    if plan is None:
+        model = models[-1]
+        profile = DECODE_PROFILES[-1]
+        plan = (model, profile, duration * get_real_time_factor(model, device_label) * profile["cost_factor"])
+
+    model, profile, predicted = plan
+    return {
+        "model": model,
+        "profile": profile["name"],
+        "beam_size": profile["beam_size"],
+        "best_of": profile["best_of"],
+        "predicted_seconds": round(predicted, 1),
+        "audio_duration_sec": round(duration, 2),
+        "budget_seconds": round(budget_seconds, 1),
+    }
+
+
+def _transcribe_worker(audio_path: str, model_size: str, device: str,
+                       decode_options: Dict, language: Optional[str], conn):
+    """子プロセスで文字起こしを実行し、結果をパイプで返す"""
+    try:
+        import whisper
+        import librosa
+
+        model = whisper.load_model(model_size, device=device)
+        audio_data, _ = librosa.load(audio_path, sr=16000)
+
+        options = {k: v for k, v in decode_options.items() if v is not None}
+        start = time.time()
+        result = model.transcribe(audio_data, language=language, verbose=False,
+                                  fp16=(device != "cpu"), **options)
+        conn.send({
+            "ok": True,
+            "result": {
+                "text": result["text"],
+                "segments": result.get("segments", []),
+                "language": result.get("language", language),
+            },
+            "processing_time": time.time() - start,
+            "audio_duration": len(audio_data) / 16000,
+        })
+    except Exception as e:
+        # 再試行キューと同じエラー種別に分類（MemoryErrorはmemory_error）
+        conn.send({"ok": False, "error_type": classify_error(e), "error": str(e)})
+    finally:
+        conn.close()
+
+
+def _run_attempt(audio_path: Path, plan: Dict, device: str, language: Optional[str],
+                 timeout: float) -> Dict:
+    """1回分の試行をタイムアウト付きの子プロセスで実行"""
+    ctx = multiprocessing.get_context("spawn")
+    parent_conn, child_conn = ctx.Pipe(duplex=False)
+    decode_options = {"beam_size": plan["beam_size"], "best_of": plan["best_of"]}
+    process = ctx.Process(
+        target=_transcribe_worker,
+        args=(str(audio_path), plan["model"], device, decode_options, language, child_conn),
+        daemon=True
+    )
+    process.start()
+    child_conn.close()
+
+    outcome = None
+    try:
+        if parent_conn.poll(timeout):
+            outcome = parent_conn.recv()
+        else:
+            outcome = {"ok": False, "error_type": "timeout_error",
+                       "error": f"{timeout:.0f}秒以内に完了しませんでした"}
+    except EOFError:
+        pass
+    finally:
+        if process.is_alive():
+            process.terminate()
+        process.join(5)
+        parent_conn.close()
+
+    if outcome is None:
+        outcome = {"ok": False, "error_type": "unknown_error",
+                   "error": f"子プロセスが異常終了しました (exit={process.exitcode})"}
+
+    return outcome
+
+
+def transcribe_with_deadline(audio_path: Path, budget_seconds: float,
+                             language: Optional[str] = "ja",
+                             device: str = "cpu") -> Tuple[Dict, Dict]:
+    """
+    締切を守るように文字起こしを実行
+
+    予算内で最大のモデルを選び、タイムアウトした場合はフォールバック順序で
+    小さいモデルに切り替える。エラー時はmax_retries回まで再試行する
+
+    Args:
+        audio_path: 音声ファイルパス
+        budget_seconds: レイテンシ予算（秒）
+        language: 言語コード（Noneで自動検出）
+        device: 推論デバイス
+
+    Returns:
+        (文字起こし結果, 実行情報)
+
+    Raises:
+        DeadlineExceededError: 全ての代替モデル・再試行が失敗した場合
+    """
+    deadline_at = get_received_at(audio_path) + budget_seconds
+
+    hard_timeout = ERROR_HANDLING["timeout_seconds"]
+    max_retries = ERROR_HANDLING["max_retries"]
+    fallback_models = ERROR_HANDLING["fallback_models"]
+    models = list(fallback_models)
+    attempts = []
+    retries = 0
+
+    while True:
+        remaining = deadline_at - time.time()
+        plan = plan_transcription(audio_path, remaining, device, models)
+        # 予算が残っていれば予算まで、超過後は予測時間に猶予を掛けた時間まで待つ
+        timeout = max(remaining, plan["predicted_seconds"] * DEADLINE_SETTINGS["timeout_grace_factor"])
+        timeout = min(timeout, hard_timeout)
+
+        logger.info("⏱️  締切まで残り%.0f秒 → %sモデル (%s, 予測%.0f秒)", max(remaining, 0),
+                    plan['model'], plan['profile'], plan['predicted_seconds'],
+                    extra={"file": audio_path.name, "model": plan['model']})
+
+        attempt_start = time.time()
+        outcome = _run_attempt(audio_path, plan, device, language, timeout)
+        attempts.append({
+            "model": plan["model"],
+            "profile": plan["profile"],
+            "elapsed_sec": round(time.time() - attempt_start, 1),
+            "ok": outcome["ok"],
+            "error_type": outcome.get("error_type"),
+        })
+
+        if outcome["ok"]:
+            telemetry = get_telemetry_store()
+            if telemetry and outcome["audio_duration"] > 0:
+                telemetry.record(
+                    audio_path.name, outcome["audio_duration"], plan["model"],
+                    get_device_label(device, quantized=False), outcome["processing_time"],
+                    profile=plan["profile"], beam_size=plan["beam_size"], best_of=plan["best_of"]
+                )
+            run_info = dict(plan)
+            run_info.update({
+                "processing_time_sec": round(outcome["processing_time"], 2),
+                "audio_duration_sec": round(outcome["audio_duration"], 2),
+                "met_deadline": time.time() <= deadline_at,
+                "attempts": attempts,
+            })
+            return outcome["result"], run_info
+
+        strategy = global_config.get_error_recovery_strategy(outcome["error_type"])
+        logger.warning("⚠️  %sモデルで失敗: %s\n   %s", plan['model'], outcome['error'], strategy['message'],
+                       extra={"file": audio_path.name, "model": plan['model'],
+                              "error_type": outcome['error_type']})
+
+        if strategy["action"] == "retry" and retries < max_retries:
+            retries += 1
+            time.sleep(ERROR_HANDLING["retry_delay_seconds"])
+            continue
+
+        # タイムアウト・メモリ不足・モデルエラーは小さいモデルへ切り替え
+        next_model = global_config.get_fallback_model(plan["model"])
+        if next_model is None:
+            raise DeadlineExceededError(
+                f"{audio_path.name}: 全ての代替モデルで失敗しました ({len(attempts)}回試行)"
+            )
+        models = fallback_models[fallback_models.index(next_model):]
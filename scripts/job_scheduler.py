@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+分析ジョブスケジューラ
+予測処理時間の短い順（Shortest Job First）とBATCH_PROCESSINGの優先順位で
+ジョブを並べ、max_parallel_jobsの並列度で実行して待ち時間を報告する
+"""
+import math
+import time
+import threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Any, List, Optional
+
+# 設定のインポート（相対/絶対インポートの両方に対応）
+try:
+    from .audio_processor_config import BATCH_PROCESSING, global_config
+    from .structured_logging import get_logger, flush_logging
+except ImportError:
+    from audio_processor_config import BATCH_PROCESSING, global_config
+    from structured_logging import get_logger, flush_logging
+
+logger = get_logger("scheduler")
+
+
+def describe_job(file_path: Path, file_type: str) -> Dict[str, Any]:
+    """
+    ジョブの処理時間と必要メモリを予測
+
+    音声はヘッダーの長さ × 文字起こしが実際に選ぶモデルの実時間係数、
+    それ以外はファイルサイズと処理速度の目安から予測する
+
+    Args:
+        file_path: ファイルパス
+        file_type: ファイルタイプ（audio, text, document, email）
+
+    Returns:
+        ジョブ情報（path, file_type, predicted_seconds, 音声ならmodel・memory_bytesなど）
+
+    Raises:
+        FileNotFoundError: 別の実行が処理済みフォルダに移動した
+    """
+    size_mb = file_path.stat().st_size / (1024 * 1024)
+    job = {"path": file_path, "file_type": file_type}
+
+    if file_type == 'audio':
+        try:
+            from .audio_processor_no_ffmpeg import select_transcription_model
+            from .deadline_planner import get_audio_duration, get_real_time_factor
+            from .memory_admission import get_admission_controller, estimate_audio_bytes
+            from .model_cache import get_default_device, get_device_label
+        except ImportError:
+            from audio_processor_no_ffmpeg import select_transcription_model
+            from deadline_planner import get_audio_duration, get_real_time_factor
+            from memory_admission import get_admission_controller, estimate_audio_bytes
+            from model_cache import get_default_device, get_device_label
+        raw_device = get_default_device()
+        duration = get_audio_duration(file_path)
+        model = select_transcription_model(file_path, raw_device)
+        device = get_device_label(raw_device)
+        job.update({
+            "model": model,
+            "audio_duration_sec": duration,
+            "predicted_seconds": duration * get_real_time_factor(model, device),
+            "device": device,
+            "audio_bytes": estimate_audio_bytes(duration),
+            "memory_bytes": get_admission_controller().estimate_job_bytes(model, duration, device),
+        })
+    else:
+        job["predicted_seconds"] = 0.5 + size_mb / BATCH_PROCESSING["text_throughput_mb_per_sec"]
+
+    return job
+
+
+def _percentile(values: List[float], percent: float) -> float:
+    """パーセンタイル値（最近傍法）"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(math.ceil(percent / 100 * len(ordered)) - 1, 0)
+    return ordered[index]
+
+
+class JobScheduler:
+    """SJF + ファイルタイプ優先順位でジョブを実行するスケジューラ"""
+
+    def __init__(self, max_parallel_jobs: Optional[int] = None):
+        """
+        初期化
+
+        Args:
+            max_parallel_jobs: 同時実行数（省略時はメモリ量に応じた設定値）
+        """
+        self.max_parallel_jobs = max_parallel_jobs or global_config.get_max_parallel_jobs()
+        self.priority_order = BATCH_PROCESSING["priority_order"]
+        self.bucket_seconds = BATCH_PROCESSING["sjf_bucket_seconds"]
+
+    def build_jobs(self, files_by_type: Dict[str, List[Path]]) -> List[Dict[str, Any]]:
+        """
+        ファイルタイプ別のファイル一覧からジョブを作成し、実行順に並べる
+
+        Args:
+            files_by_type: DataManager.get_new_files_by_typeの戻り値
+
+        Returns:
+            実行順のジョブリスト
+        """
+        jobs = []
+        for file_type, files in files_by_type.items():
+            if file_type == 'unknown':
+                continue
+            for file_path in files:
+                try:
+                    jobs.append(describe_job(file_path, file_type))
+                except FileNotFoundError:
+                    # 一覧の取得後に別の実行が処理して移動した
+                    logger.info("⏭️  %s は別の実行が処理済みです（スキップ）", file_path.name,
+                                extra={"file": file_path.name})
+        return self.order_jobs(jobs)
+
+    def order_jobs(self, jobs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        予測時間の短い順に並べる（同じ時間帯のジョブは優先順位順）
+
+        Args:
+            jobs: ジョブリスト
+
+        Returns:
+            並べ替えたジョブリスト
+        """
+        def sort_key(job):
+            file_type = job["file_type"]
+            priority = (self.priority_order.index(file_type)
+                        if file_type in self.priority_order else len(self.priority_order))
+            bucket = int(job["predicted_seconds"] // self.bucket_seconds)
+            return bucket, priority, job["predicted_seconds"], job["path"].name
+
+        return sorted(jobs, key=sort_key)
+
+    def run(self, jobs: List[Dict[str, Any]], worker: Callable[[Path], Any],
+            parallel: bool = True) -> Dict[str, Any]:
+        """
+        ジョブを実行
+
+        Args:
+            jobs: 実行順のジョブリスト
+            worker: ファイルパスを受け取って処理する関数
+            parallel: 並列実行するか（Falseなら1件ずつ順番に実行）
+
+        Returns:
+            実行レポート（待ち時間・結果までの時間の平均とp95）
+        """
+        try:
+            from .memory_admission import get_admission_controller
+        except ImportError:
+            from memory_admission import get_admission_controller
+
+        workers = self.max_parallel_jobs if parallel else 1
+        enqueued_at = time.time()
+        lock = threading.Lock()
+        admission = get_admission_controller()
+
+        def run_job(job):
+            # 音声ジョブはメモリに余裕ができるまで受付を待つ（待ち時間に含める）
+            if "memory_bytes" in job:
+                with admission.admit(job["audio_bytes"], job["path"].name,
+                                     model_size=job["model"], device=job["device"]):
+                    execute(job)
+            else:
+                execute(job)
+
+        def execute(job):
+            job["queue_wait_sec"] = time.time() - enqueued_at
+            started = time.time()
+            try:
+                worker(job["path"])
+                job["status"] = "completed"
+            except MemoryError as e:
+                job["status"] = "failed"
+                job["error"] = f"メモリ不足: {e}"
+                job["exception"] = e
+                logger.error("❌ %s の処理中にメモリ不足: %s", job['path'].name, admission.status())
+            except Exception as e:
+                job["status"] = "failed"
+                job["error"] = str(e)
+                job["exception"] = e
+                logger.error("❌ %s の処理中にエラー: %s", job['path'].name, e)
+            job["service_sec"] = time.time() - started
+            job["time_to_result_sec"] = time.time() - enqueued_at
+            with lock:
+                done = sum(1 for j in jobs if "status" in j)
+            logger.info("📌 [%d/%d] %s (待ち %.1f秒 / 処理 %.1f秒)", done, len(jobs), job['path'].name,
+                        job['queue_wait_sec'], job['service_sec'],
+                        extra={"file": job['path'].name, "queue_wait_sec": round(job['queue_wait_sec'], 2),
+                               "service_sec": round(job['service_sec'], 2)})
+
+        if workers > 1:
+            # ThreadPoolExecutorの投入順（FIFO）がそのまま実行順になる
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                list(executor.map(run_job, jobs))
+        else:
+            for job in jobs:
+                run_job(job)
+
+        return self.build_report(jobs, workers)
+
+    def build_report(self, jobs: List[Dict[str, Any]], workers: int) -> Dict[str, Any]:
+        """実行結果から待ち時間のレポートを作成"""
+        waits = [job["queue_wait_sec"] for job in jobs if "queue_wait_sec" in job]
+        results = [job["time_to_result_sec"] for job in jobs if "time_to_result_sec" in job]
+
+        return {
+            "workers": workers,
+            "total_jobs": len(jobs),
+            "completed": sum(1 for job in jobs if job.get("status") == "completed"),
+            "failed": sum(1 for job in jobs if job.get("status") == "failed"),
+            "queue_wait_mean_sec": round(sum(waits) / len(waits), 2) if waits else 0.0,
+            "queue_wait_p95_sec": round(_percentile(waits, 95), 2),
+            "time_to_result_mean_sec": round(sum(results) / len(results), 2) if results else 0.0,
+            "time_to_result_p95_sec": round(_percentile(results, 95), 2),
+            "makespan_sec": round(max(results), 2) if results else 0.0,
+        }
+
+
+def print_schedule_report(report: Dict[str, Any]):
+    """スケジューラのレポートを表示"""
+    flush_logging()
+    print("\n⏳ スケジューリング結果")
+    print(f"   並列数: {report['workers']} / 完了: {report['completed']} / 失敗: {report['failed']}")
+    print(f"   待ち時間: 平均 {report['queue_wait_mean_sec']:.1f}秒 / p95 {report['queue_wait_p95_sec']:.1f}秒")
+    print(f"   結果まで: 平均 {report['time_to_result_mean_sec']:.1f}秒 / "
+          f"p95 {report['time_to_result_p95_sec']:.1f}秒 (全体 {report['makespan_sec']:.1f}秒)")
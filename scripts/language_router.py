@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+言語ルーティング
+language="auto"の音声について、冒頭30秒だけで言語を判定し、
+その文字起こしに含まれるLANGUAGE_SETTINGSのキーワード統計で確認する。
+判定結果は話者セット（または録音元のサブフォルダ）ごとにキャッシュし、
+同じ判定が続いたキーでは判定自体を省略する。取り込みフォルダ直下のように
+言語の異なる録音が混ざる場所はキャッシュせず、キャッシュも期限と定期的な
+再判定で古い判定に固定されないようにする
+"""
+import os
+import re
+import json
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+# 設定・共通処理のインポート（相対/絶対インポートの両方に対応）
+try:
+    from .audio_processor_config import LANGUAGE_SETTINGS
+    from .date_utils import get_now
+    from .tracing import span
+    from .structured_logging import get_logger
+except ImportError:
+    from audio_processor_config import LANGUAGE_SETTINGS
+    from date_utils import get_now
+    from tracing import span
+    from structured_logging import get_logger
+
+logger = get_logger("audio")
+
+SAMPLE_RATE = 16000
+
+
+def count_keywords(text: str) -> Dict[str, int]:
+    """
+    言語ごとのキーワード出現数を数える
+
+    空白で区切られる言語（英語）は単語単位、それ以外は部分文字列で数える
+
+    Args:
+        text: 文字起こしテキスト
+
+    Returns:
+        {言語コード: 出現数}
+    """
+    words = re.findall(r"[a-z']+", text.lower())
+    counts = {}
+    for language, keywords in LANGUAGE_SETTINGS["auto_detect_keywords"].items():
+        if all(keyword.isascii() for keyword in keywords):
+            counts[language] = sum(1 for word in words if word in keywords)
+        else:
+            counts[language] = sum(text.count(keyword) for keyword in keywords)
+    return counts
+
+
+def decide_language(detected: str, probabilities: Dict[str, float],
+                    keyword_counts: Dict[str, int]) -> Dict[str, Any]:
+    """
+    音響判定とキーワード統計から言語を決める
+
+    Args:
+        detected: Whisperが判定した言語
+        probabilities: 言語ごとの確率
+        keyword_counts: 冒頭の文字起こしのキーワード出現数
+
+    Returns:
+        {"language", "probability", "source", "mixed", "keyword_counts"}
+    """
+    ranked = sorted(probabilities.items(), key=lambda item: item[1], reverse=True)
+    probability = probabilities.get(detected, 0.0)
+    runner_up = ranked[1][1] if len(ranked) > 1 else 0.0
+    keyword_language = max(keyword_counts, key=keyword_counts.get) if any(keyword_counts.values()) else None
+
+    language, source = detected, "detected"
+    # 判定が曖昧でキーワードが別の言語を示す場合はキーワードを優先
+    if (probability < LANGUAGE_SETTINGS["min_probability"]
+            and keyword_language and keyword_language != detected):
+        language, source = keyword_language, "keywords"
+
+    return {
+        "language": language,
+        "probability": round(probability, 3),
+        "source": source,
+        "mixed": runner_up >= LANGUAGE_SETTINGS["mixed_probability"],
+        "keyword_counts": keyword_counts,
+    }
+
+
+class LanguageRouter:
+    """冒頭判定 + キーワード確認 + フォルダ単位キャッシュによる言語ルーティング"""
+
+    _lock = threading.Lock()
+
+    def __init__(self, cache_path: Optional[str] = None):
+        """
+        初期化
+
+        Args:
+            cache_path: 判定キャッシュの保存先（省略時は設定値）
+        """
+        self.cache_path = Path(cache_path or LANGUAGE_SETTINGS["cache_path"])
+
+    def _load_cache(self) -> Dict[str, Any]:
+        if not self.cache_path.exists():
+            return {}
+        with open(self.cache_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _save_cache(self, cache: Dict[str, Any]):
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.cache_path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(cache, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.cache_path)
+
+    @staticmethod
+    def get_cache_key(audio_path: Path, speaker_key: Optional[str] = None) -> Optional[str]:
+        """
+        キャッシュのキー
+
+        Returns:
+            話者セット指定時はそれ、なければ録音元フォルダ
+            （取り込みフォルダ直下などキャッシュしないフォルダならNone）
+        """
+        if speaker_key:
+            return f"speakers:{speaker_key}"
+        folder = Path(audio_path).resolve().parent
+        if any(folder == Path(uncached).resolve() for uncached in LANGUAGE_SETTINGS["uncached_folders"]):
+            return None
+        return f"folder:{folder}"
+
+    @staticmethod
+    def _is_usable(entry: Optional[Dict[str, Any]]) -> bool:
+        """キャッシュを使えるか（確認回数・期限・定期的な再判定）"""
+        if not entry or entry["confirmations"] < LANGUAGE_SETTINGS["cache_min_confirmations"]:
+            return False
+        age = datetime.fromisoformat(get_now()) - datetime.fromisoformat(entry["updated"])
+        if age > timedelta(days=LANGUAGE_SETTINGS["cache_ttl_days"]):
+            return False
+        return (entry.get("hits", 0) + 1) % LANGUAGE_SETTINGS["cache_recheck_every"] != 0
+
+    def route(self, audio_path: Path, audio_data=None, model=None,
+              speaker_key: Optional[str] = None) -> Dict[str, Any]:
+        """
+        音声の言語を決める
+
+        Args:
+            audio_path: 音声ファイルパス
+            audio_data: デコード済みの16kHz音声（あれば冒頭を切り出して使う）
+            model: 判定に使うWhisperモデル（省略時は設定の軽量モデル）
+            speaker_key: 話者セットの識別子（フォルダの代わりにキャッシュキーにする）
+
+        Returns:
+            判定結果（language, probability, source, mixed, keyword_counts）
+        """
+        key = self.get_cache_key(audio_path, speaker_key)
+        if key is not None:
+            with self._lock:
+                cache = self._load_cache()
+                cached = cache.get(key)
+                usable = self._is_usable(cached)
+                if cached:
+                    # 使わなかった回（再判定）も数えて、次の再判定までの間隔を保つ
+                    cached["hits"] = cached.get("hits", 0) + 1
+                    self._save_cache(cache)
+            if usable:
+                logger.info("🌐 言語: %s（%sの判定キャッシュ）", cached['language'], key,
+                            extra={"file": Path(audio_path).name})
+                return {"language": cached["language"], "probability": cached["probability"],
+                        "source": "cache", "mixed": False, "keyword_counts": {}}
+
+        with span("language_detect", file=Path(audio_path).name) as detect_span:
+            decision = self.detect(audio_path, audio_data, model)
+            detect_span.set(language=decision["language"], probability=decision["probability"])
+        logger.info("🌐 言語: %s (確率 %.2f, %s判定%s)", decision['language'], decision['probability'],
+                    'キーワード' if decision['source'] == 'keywords' else '音響',
+                    ', 混在あり' if decision['mixed'] else '', extra={"file": Path(audio_path).name})
+
+        # 混在した録音はフォルダ全体の判定に使わない
+        if key is not None and not decision["mixed"]:
+            with self._lock:
+                cache = self._load_cache()
+                entry = cache.get(key)
+                if entry and entry["language"] == decision["language"]:
+                    entry["confirmations"] += 1
+                else:
+                    # 再判定で言語が変わったら確認回数からやり直す
+                    entry = {"language": decision["language"], "confirmations": 1, "hits": 0}
+                entry.update({"probability": decision["probability"], "updated": get_now()})
+                cache[key] = entry
+                self._save_cache(cache)
+        return decision
+
+    def detect(self, audio_path: Path, audio_data=None, model=None) -> Dict[str, Any]:
+        """
+        冒頭だけをデコードして言語を判定
+
+        言語未指定のデコードで判定確率と冒頭の文字起こしを同時に得て、
+        キーワード統計で確認する
+
+        Args:
+            audio_path: 音声ファイルパス
+            audio_data: デコード済みの16kHz音声
+            model: Whisperモデル
+
+        Returns:
+            判定結果
+        """
+        import torch
+        import whisper
+
+        try:
+            from .model_cache import get_whisper_model, model_inference
+        except ImportError:
+            from model_cache import get_whisper_model, model_inference
+
+        seconds = LANGUAGE_SETTINGS["detection_seconds"]
+        if audio_data is None:
+            import librosa
+            # 冒頭だけを読み込む（全体はデコードしない）
+            audio_data, _ = librosa.load(str(audio_path), sr=SAMPLE_RATE, duration=seconds)
+        head = torch.from_numpy(audio_data[:int(seconds * SAMPLE_RATE)])
+
+        model = model or get_whisper_model(LANGUAGE_SETTINGS["detection_model"])
+        mel = whisper.log_mel_spectrogram(whisper.pad_or_trim(head), model.dims.n_mels).to(model.device)
+        options = whisper.DecodingOptions(language=None, without_timestamps=True,
+                                          fp16=(model.device.type != "cpu"))
+        with model_inference(model), torch.no_grad():
+            result = whisper.decode(model, mel, options)
+
+        return decide_language(result.language, result.language_probs or {result.language: 1.0},
+                               count_keywords(result.text))
+
+
+_router: Optional[LanguageRouter] = None
+
+
+def resolve_language(audio_path: Path, language: str, audio_data=None, model=None,
+                     speaker_key: Optional[str] = None) -> str:
+    """
+    "auto"なら言語を判定し、それ以外は指定どおりの言語を返す
+
+    判定に失敗した場合はLANGUAGE_SETTINGSのデフォルト言語を使う
+    """
+    global _router
+    if language != "auto":
+        return language
+    if _router is None:
+        _router = LanguageRouter()
+    try:
+        return _router.route(audio_path, audio_data, model, speaker_key)["language"]
+    except Exception as e:
+        logger.warning("⚠️ 言語判定に失敗しました（%sで続行）: %s", LANGUAGE_SETTINGS['default'], e)
+        return LANGUAGE_SETTINGS["default"]
@@ -0,0 +1,371 @@
+#!/usr/bin/env python3
+"""
+書き込み中の録音の逐次文字起こし
+同期フォルダに直接録音されている長い会議のWAVファイルを追跡し、
+追記された音声だけを重なり付きの固定長窓で文字起こしして
+文字起こしファイルに随時追記する（既に処理した音声は再デコードしない）
+"""
+import sys
+import time
+import struct
+import argparse
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+# 設定・共通処理のインポート（相対/絶対インポートの両方に対応）
+try:
+    from .audio_processor_config import LIVE_TRANSCRIPTION_SETTINGS, ERROR_HANDLING
+    from .audio_processor import AudioProcessor
+    from .deadline_planner import get_real_time_factor
+    from .segment_store import save_segments, get_segment_store_path
+    from .language_router import resolve_language
+except ImportError:
+    from audio_processor_config import LIVE_TRANSCRIPTION_SETTINGS, ERROR_HANDLING
+    from audio_processor import AudioProcessor
+    from deadline_planner import get_real_time_factor
+    from segment_store import save_segments, get_segment_store_path
+    from language_router import resolve_language
+
+SAMPLE_RATE = 16000
+WAVE_FORMAT_PCM = 1
+WAVE_FORMAT_IEEE_FLOAT = 3
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+# 書き込み中の録音ソフトがdataチャンクのサイズ欄に入れる仮の値
+PLACEHOLDER_SIZES = (0, 0xFFFFFFFF)
+
+
+class GrowingWavReader:
+    """伸び続けるWAVファイルから追記分のサンプルだけを読み出す"""
+
+    def __init__(self, path: Path):
+        """
+        初期化
+
+        Args:
+            path: WAVファイルパス
+        """
+        self.path = Path(path)
+        self.audio_format = None
+        self.channels = 0
+        self.sample_rate = 0
+        self.bits_per_sample = 0
+        self.block_align = 0
+        self.data_offset: Optional[int] = None
+        self.consumed_bytes = 0
+
+    def _read_header(self) -> bool:
+        """
+        RIFFチャンクを順に読み、fmtとdataチャンクの位置を取得
+
+        Returns:
+            dataチャンクまで読めたか（ヘッダー書き込み前ならFalse）
+        """
+        with open(self.path, 'rb') as f:
+            riff = f.read(12)
+            if len(riff) < 12 or riff[:4] != b'RIFF' or riff[8:12] != b'WAVE':
+                return False
+
+            while True:
+                chunk_header = f.read(8)
+                if len(chunk_header) < 8:
+                    return False
+                chunk_id, chunk_size = struct.unpack('<4sI', chunk_header)
+
+                if chunk_id == b'fmt ':
+                    fmt = f.read(chunk_size)
+                    if len(fmt) < 16:
+                        return False
+                    (self.audio_format, self.channels, self.sample_rate, _,
+                     self.block_align, self.bits_per_sample) = struct.unpack('<HHIIHH', fmt[:16])
+                    if self.audio_format == WAVE_FORMAT_EXTENSIBLE and len(fmt) >= 26:
+                        # WAVE_FORMAT_EXTENSIBLEは実際の形式がSubFormat GUIDの先頭2バイトにある
+                        self.audio_format = struct.unpack('<H', fmt[24:26])[0]
+                    f.seek(chunk_size & 1, 1)
+                elif chunk_id == b'data':
+                    if not self.block_align:
+                        return False
+                    self.data_offset = f.tell()
+                    return True
+                else:
+                    f.seek(chunk_size + (chunk_size & 1), 1)
+
+    def _read_declared_size(self) -> Optional[int]:
+        """dataチャンクのサイズ欄（書き込み中の仮の値ならNone）"""
+        with open(self.path, 'rb') as f:
+            f.seek(self.data_offset - 4)
+            data_size = struct.unpack('<I', f.read(4))[0]
+        if data_size in PLACEHOLDER_SIZES or self.data_offset + data_size > self.path.stat().st_size:
+            return None
+        return data_size
+
+    def _get_data_bytes(self) -> int:
+        """
+        読み出せるdataチャンクのバイト数
+
+        サイズ欄が確定していればその値（後続のLISTチャンク等を含めない）、
+        書き込み中はファイル末尾までとする
+        """
+        declared = self._read_declared_size()
+        if declared is not None:
+            return declared
+        return max(self.path.stat().st_size - self.data_offset, 0)
+
+    def is_finalized(self) -> bool:
+        """録音ソフトがdataチャンクのサイズを確定させたか（録音終了の目安）"""
+        return self.data_offset is not None and self._read_declared_size() is not None
+
+    @property
+    def available_seconds(self) -> float:
+        """現在ファイルにある音声の長さ（秒）"""
+        if self.data_offset is None:
+            return 0.0
+        return self._get_data_bytes() / self.block_align / self.sample_rate
+
+    def read_new(self):
+        """
+        前回以降に追記されたサンプルを読み出す
+
+        Returns:
+            モノラルfloat32配列（元のサンプルレート）、ヘッダー未確定ならNone
+        """
+        import numpy as np
+
+        if self.data_offset is None and not self._read_header():
+            return None
+
+        data_bytes = self._get_data_bytes()
+        # 書き込み途中のフレームは次回に回す
+        readable = (data_bytes // self.block_align) * self.block_align - self.consumed_bytes
+        if readable <= 0:
+            return np.zeros(0, dtype=np.float32)
+
+        with open(self.path, 'rb') as f:
+            f.seek(self.data_offset + self.consumed_bytes)
+            raw = f.read(readable)
+        readable = (len(raw) // self.block_align) * self.block_align
+        self.consumed_bytes += readable
+        return self._to_float(raw[:readable])
+
+    def _to_float(self, raw: bytes):
+        """PCM/浮動小数点のバイト列をモノラルfloat32に変換"""
+        import numpy as np
+
+        bits = self.bits_per_sample
+        if self.audio_format == WAVE_FORMAT_IEEE_FLOAT:
+            samples = np.frombuffer(raw, dtype='<f4' if bits == 32 else '<f8').astype(np.float32)
+        elif bits == 8:
+            samples = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128) / 128
+        elif bits == 16:
+            samples = np.frombuffer(raw, dtype='<i2').astype(np.float32) / 32768
+        elif bits == 24:
+            triplets = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+            values = triplets[:, 0] | (triplets[:, 1] << 8) | (triplets[:, 2] << 16)
+            values = np.where(values >= 1 << 23, values - (1 << 24), values)
+            samples = values.astype(np.float32) / (1 << 23)
+        elif bits == 32:
+            samples = np.frombuffer(raw, dtype='<i4').astype(np.float32) / (1 << 31)
+        else:
+            raise ValueError(f"未対応のWAV形式です: {bits}bit")
+
+        if self.channels > 1:
+            samples = samples.reshape(-1, self.channels).mean(axis=1)
+        return samples
+
+
+class LiveTranscriber:
+    """書き込み中のWAVファイルを窓ごとに逐次文字起こしする"""
+
+    def __init__(self, audio_path: Path, output_dir: Path,
+                 processor: Optional[AudioProcessor] = None,
+                 model_size: str = "base", language: str = "ja",
+                 settings: Optional[Dict[str, Any]] = None):
+        """
+        初期化
+
+        Args:
+            audio_path: 録音中のWAVファイル
+            output_dir: 文字起こしの出力ディレクトリ
+            processor: 使用するAudioProcessor（省略時はmodel_sizeで作成）
+            model_size: モデルサイズ
+            language: 言語コード
+            settings: LIVE_TRANSCRIPTION_SETTINGSの上書き
+        """
+        import numpy as np
+
+        self.settings = {**LIVE_TRANSCRIPTION_SETTINGS, **(settings or {})}
+        self.processor = processor or AudioProcessor(model_size=model_size)
+        self.language = language
+        self.reader = GrowingWavReader(audio_path)
+
+        output_dir.mkdir(parents=True, exist_ok=True)
+        self.output_dir = output_dir
+        self.transcript_path = output_dir / f"{Path(audio_path).stem}_live.txt"
+
+        # 未処理の音声（元のサンプルレート）と、その先頭の録音内時刻
+        self._buffer = np.zeros(0, dtype=np.float32)
+        self._buffer_start_sec = 0.0
+        self._committed_until = 0.0
+        self.segments: List[Dict[str, Any]] = []
+        self.stats = {
+            "windows": 0, "processing_sec": 0.0, "max_lag_sec": 0.0,
+            "models": [self.processor.model_size]
+        }
+
+    def run(self) -> Dict[str, Any]:
+        """
+        録音が終わるまで追跡して文字起こし
+
+        Returns:
+            処理結果のサマリー
+        """
+        import numpy as np
+
+        print(f"🎙️  録音中ファイルの追跡を開始: {self.reader.path.name}")
+        print(f"   窓 {self.settings['window_seconds']:.0f}秒 / 重なり {self.settings['overlap_seconds']:.0f}秒 "
+              f"→ {self.transcript_path}")
+        self.transcript_path.write_text("", encoding='utf-8')
+        last_growth = time.time()
+
+        while True:
+            new_samples = self.reader.read_new()
+            if new_samples is not None and len(new_samples):
+                self._buffer = np.concatenate([self._buffer, new_samples])
+                last_growth = time.time()
+
+            # 窓が埋まった分だけ文字起こし
+            while self.reader.sample_rate and len(self._buffer) >= self._window_samples():
+                self._transcribe_window(final=False)
+
+            # ヘッダー確定後もしばらく伸びなければ録音終了
+            idle = time.time() - last_growth
+            finished = self.reader.is_finalized() and idle >= self.settings["poll_seconds"] * 2
+            if finished or idle > self.settings["idle_timeout_seconds"]:
+                break
+            time.sleep(self.settings["poll_seconds"])
+
+        if self.reader.sample_rate and len(self._buffer):
+            self._transcribe_window(final=True)
+        return self._finish()
+
+    def _window_samples(self) -> int:
+        return int(self.settings["window_seconds"] * self.reader.sample_rate)
+
+    def _transcribe_window(self, final: bool):
+        """
+        バッファ先頭の1窓を文字起こしし、確定したセグメントを追記
+
+        窓の末尾から重なりの半分までを確定範囲とし、残りは次の窓で拾い直す
+
+        Args:
+            final: 録音終了後の最後の窓か（バッファ全体を確定させる）
+        """
+        sample_rate = self.reader.sample_rate
+        n_samples = len(self._buffer) if final else self._window_samples()
+        window = self._buffer[:n_samples]
+        window_start = self._buffer_start_sec
+        window_end = window_start + n_samples / sample_rate
+        overlap = self.settings["overlap_seconds"]
+        boundary = window_end if final else window_end - overlap / 2
+
+        if sample_rate != SAMPLE_RATE:
+            import librosa
+            window = librosa.resample(window, orig_sr=sample_rate, target_sr=SAMPLE_RATE)
+
+        # 自動判定は最初の窓で1回だけ行う
+        if self.language == "auto":
+            self.language = resolve_language(self.reader.path, "auto", window, model=self.processor.model)
+
+        prompt = "".join(segment["text"] for segment in self.segments[-3:]) or None
+        started = time.time()
+        result = self.processor.transcribe_array(window, self.language, initial_prompt=prompt)
+        self.stats["processing_sec"] += time.time() - started
+        self.stats["windows"] += 1
+
+        committed = []
+        for segment in result.get("segments", []):
+            start = window_start + segment["start"]
+            # 前の窓で確定済みの範囲と、次の窓で拾い直す範囲は除外
+            if start < self._committed_until or start >= boundary:
+                continue
+            committed.append(dict(segment, start=start, end=min(window_start + segment["end"], window_end)))
+        self._commit(committed)
+        self._committed_until = boundary
+
+        # 重なり部分だけを残してバッファを進める（処理済み音声は保持しない）
+        if final:
+            consumed = n_samples
+        else:
+            consumed = n_samples - int(overlap * sample_rate)
+        self._buffer = self._buffer[consumed:]
+        self._buffer_start_sec += consumed / sample_rate
+
+        lag = self.reader.available_seconds - self._committed_until
+        self.stats["max_lag_sec"] = max(self.stats["max_lag_sec"], lag)
+        if not final and lag > self.settings["max_lag_seconds"]:
+            self._downgrade_model(lag)
+
+    def _commit(self, segments: List[Dict[str, Any]]):
+        """確定したセグメントを文字起こしファイルに追記"""
+        if not segments:
+            return
+        self.segments.extend(segments)
+        with open(self.transcript_path, 'a', encoding='utf-8') as f:
+            for segment in segments:
+                minutes, seconds = divmod(int(segment["start"]), 60)
+                f.write(f"[{minutes:02d}:{seconds:02d}] {segment['text'].strip()}\n")
+        print(f"📝 {self._committed_until / 60:.1f}分まで確定 (+{len(segments)}セグメント)")
+
+    def _downgrade_model(self, lag: float):
+        """遅れが上限を超えたら、実時間係数がより小さいモデルに切り替える"""
+        current = self.processor.model_size
+        device = self.processor.device_label
+        current_rtf = get_real_time_factor(current, device)
+        for model_size in ERROR_HANDLING["fallback_models"]:
+            if get_real_time_factor(model_size, device) < current_rtf:
+                print(f"⚠️  文字起こしが{lag:.0f}秒遅れています。{current} → {model_size} に切り替えます")
+                self.processor = AudioProcessor(model_size=model_size, device=self.processor.device,
+                                                quantize=self.processor.quantize)
+                self.stats["models"].append(model_size)
+                return
+
+    def _finish(self) -> Dict[str, Any]:
+        """セグメントを保存してサマリーを返す"""
+        segments_path = get_segment_store_path(self.output_dir, self.transcript_path.stem)
+        save_segments(segments_path, self.segments)
+
+        summary = {
+            "audio_file": self.reader.path.name,
+            "transcript": str(self.transcript_path),
+            "segment_store": segments_path.name,
+            "audio_duration_sec": round(self.reader.available_seconds, 2),
+            "segments_count": len(self.segments),
+            "windows": self.stats["windows"],
+            "processing_time_sec": round(self.stats["processing_sec"], 2),
+            "max_lag_sec": round(self.stats["max_lag_sec"], 2),
+            "models_used": self.stats["models"],
+        }
+        print(f"✅ 逐次文字起こし完了: {summary['audio_duration_sec'] / 60:.1f}分 / "
+              f"{summary['segments_count']}セグメント / 最大遅延 {summary['max_lag_sec']:.0f}秒")
+        return summary
+
+
+def main():
+    """録音中のWAVファイルを逐次文字起こし"""
+    parser = argparse.ArgumentParser(description='書き込み中のWAVファイルを逐次文字起こし')
+    parser.add_argument('audio', type=Path, help='録音中のWAVファイル')
+    parser.add_argument('--output-dir', type=Path, default=Path('data/01_analyzed/live'),
+                        help='出力ディレクトリ')
+    parser.add_argument('--model', default='base', help='モデルサイズ')
+    parser.add_argument('--language', default='ja', help='言語コード')
+    args = parser.parse_args()
+
+    if not args.audio.exists():
+        print(f"❌ ファイルが見つかりません: {args.audio}")
+        sys.exit(1)
+
+    LiveTranscriber(args.audio, args.output_dir, model_size=args.model,
+                    language=args.language).run()
+
+
+if __name__ == "__main__":
+    main()
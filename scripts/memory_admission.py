@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+メモリ考慮の受付制御（アドミッションコントロール）
+ロード済みWhisperモデルの常駐サイズとデコード済み音声の使用量を追跡し、
+予測RSSがERROR_HANDLING['memory_threshold_gb']に収まる場合だけ音声ジョブを受け付ける。
+空きメモリが逼迫している間は受付を一時停止し、回復したら再開する
+"""
+import threading
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+
+# 設定のインポート（相対/絶対インポートの両方に対応）
+try:
+    from .audio_processor_config import ERROR_HANDLING, WHISPER_MODELS
+    from .structured_logging import get_logger
+except ImportError:
+    from audio_processor_config import ERROR_HANDLING, WHISPER_MODELS
+    from structured_logging import get_logger
+
+logger = get_logger("admission")
+
+GB = 1024 ** 3
+MB = 1024 ** 2
+SAMPLE_RATE = 16000
+
+
+def get_process_rss() -> int:
+    """現在のプロセスの常駐メモリ（バイト、取得できなければ0）"""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        return 0
+
+
+def get_available_memory() -> Optional[int]:
+    """システムの空きメモリ（バイト、取得できなければNone）"""
+    try:
+        import psutil
+        return psutil.virtual_memory().available
+    except ImportError:
+        return None
+
+
+def estimate_model_bytes(model_size: str, int8: bool = False) -> int:
+    """
+    モデルの常駐サイズを推定（実測値がない場合の目安）
+
+    WHISPER_MODELSのsize_mbはパラメータ数（百万）に相当するため、
+    fp32の重み（4バイト、int8量子化時は1バイト）に推論時の作業領域を加えて見積もる
+    """
+    params_million = WHISPER_MODELS.get(model_size, {}).get("size_mb", 800)
+    bytes_per_param = 1 if int8 else 4
+    return int(params_million * MB * bytes_per_param * 1.2)
+
+
+def estimate_audio_bytes(duration_sec: float) -> int:
+    """
+    デコード済み音声の使用量を推定
+
+    librosaは元のサンプルレートで読み込んでから16kHzへリサンプルするため、
+    16kHz float32の配列サイズの約3倍をピークとして見積もる
+    """
+    return int(max(duration_sec, 0) * SAMPLE_RATE * 4 * 3)
+
+
+class MemoryAdmissionController:
+    """予測RSSが上限に収まるときだけジョブを受け付けるコントローラ"""
+
+    def __init__(self, budget_gb: Optional[float] = None,
+                 pressure_free_gb: Optional[float] = None,
+                 poll_seconds: Optional[float] = None):
+        """
+        初期化
+
+        Args:
+            budget_gb: 予測RSSの上限（GB、省略時はmemory_threshold_gb）
+            pressure_free_gb: 受付を止める空きメモリの下限（GB）
+            poll_seconds: 待機中にメモリ状況を確認する間隔（秒）
+        """
+        self.budget_bytes = int((budget_gb or ERROR_HANDLING["memory_threshold_gb"]) * GB)
+        self.pressure_free_bytes = int(
+            (pressure_free_gb if pressure_free_gb is not None
+             else ERROR_HANDLING["memory_pressure_free_gb"]) * GB
+        )
+        self.poll_seconds = poll_seconds or ERROR_HANDLING["admission_poll_seconds"]
+
+        self._condition = threading.Condition()
+        self._base_rss = get_process_rss()
+        self._models: Dict[str, int] = {}
+        # チケット → (音声などの使用量, 使用モデルのキー, 未ロード時のモデルの常駐サイズ)
+        self._reserved: Dict[int, Tuple[int, Optional[str], int]] = {}
+        self._next_ticket = 0
+        self._paused = False
+
+    def register_model(self, model_key: str, resident_bytes: int):
+        """ロード済みモデルの常駐サイズを登録"""
+        with self._condition:
+            self._models[model_key] = resident_bytes
+            self._condition.notify_all()
+
+    def unregister_model(self, model_key: str):
+        """破棄したモデルの登録を解除"""
+        with self._condition:
+            self._models.pop(model_key, None)
+            self._condition.notify_all()
+
+    def is_model_resident(self, model_key: str) -> bool:
+        """モデルがロード済みか"""
+        with self._condition:
+            return model_key in self._models
+
+    def estimate_job_bytes(self, model_size: str, duration_sec: float,
+                           device: str = "cpu") -> int:
+        """
+        音声ジョブが追加で必要とするメモリを推定
+
+        Args:
+            model_size: 使用モデル
+            duration_sec: 音声の長さ（秒）
+            device: デバイス（量子化モデルは"cpu-int8"）
+
+        Returns:
+            必要メモリ（バイト）。モデルが未ロードならその分も含む
+        """
+        job_bytes = estimate_audio_bytes(duration_sec)
+        if not self.is_model_resident(f"{model_size}@{device}"):
+            job_bytes += estimate_model_bytes(model_size, int8=device.endswith("-int8"))
+        return job_bytes
+
+    def _reserved_bytes(self, extra: Optional[Tuple[int, Optional[str], int]] = None) -> int:
+        """
+        受付済みジョブ（と追加分）の予約量
+
+        モデルの常駐サイズは、そのモデルがまだロードされていない間だけ、
+        同じモデルを使うジョブ全体で1回分だけ数える（ロード後は_modelsの側で数える）
+        """
+        reservations = list(self._reserved.values()) + ([extra] if extra else [])
+        total = 0
+        missing_models: Dict[str, int] = {}
+        for job_bytes, model_key, model_bytes in reservations:
+            total += job_bytes
+            if model_key is not None and model_key not in self._models:
+                missing_models[model_key] = max(missing_models.get(model_key, 0), model_bytes)
+        return total + sum(missing_models.values())
+
+    def projected_rss(self, extra: Optional[Tuple[int, Optional[str], int]] = None) -> int:
+        """予測RSS（ベース + ロード済みモデル + 受付済みジョブ + 追加分）"""
+        return self._base_rss + sum(self._models.values()) + self._reserved_bytes(extra)
+
+    def under_pressure(self) -> bool:
+        """空きメモリが下限を下回っているか"""
+        available = get_available_memory()
+        return available is not None and available < self.pressure_free_bytes
+
+    def acquire(self, job_bytes: int, label: str = "", model_size: Optional[str] = None,
+                device: str = "cpu") -> int:
+        """
+        メモリに余裕ができるまで待ってからジョブを受け付ける
+
+        実行中のジョブが1件もない場合は上限を超えていても受け付ける（デッドロック回避）。
+        model_sizeを渡すとモデルの常駐サイズは待機中も現在のロード状況で見積もり直す
+
+        Args:
+            job_bytes: ジョブの必要メモリ（バイト、model_size指定時はモデルを除いた分）
+            label: 表示用のジョブ名
+            model_size: 使用モデル（省略時はjob_bytesにモデル分も含まれているとみなす）
+            device: デバイス（量子化モデルは"cpu-int8"）
+
+        Returns:
+            受付チケット（releaseに渡す）
+        """
+        model_key = f"{model_size}@{device}" if model_size else None
+        model_bytes = estimate_model_bytes(model_size, int8=device.endswith("-int8")) if model_size else 0
+        reservation = (job_bytes, model_key, model_bytes)
+        with self._condition:
+            waiting_reported = False
+            while True:
+                pressure = self.under_pressure()
+                projected = self.projected_rss(reservation)
+                fits = projected <= self.budget_bytes
+
+                if not pressure and self._paused:
+                    self._paused = False
+                    logger.info("▶️  メモリが回復したため受付を再開します")
+
+                if not self._reserved or (fits and not pressure):
+                    break
+
+                if pressure and not self._paused:
+                    self._paused = True
+                    logger.warning("⏸️  空きメモリが逼迫しているため受付を一時停止します")
+                elif not waiting_reported:
+                    logger.info("⏳ メモリ待ち: %s (必要 %.1fGB / 予測 %.1fGB > 上限 %.1fGB)", label,
+                                (projected - self.projected_rss()) / GB, projected / GB,
+                                self.budget_bytes / GB, extra={"file": label})
+                waiting_reported = True
+
+                # 他ジョブの完了通知か、定期的なメモリ再確認で起床
+                self._condition.wait(self.poll_seconds)
+
+            ticket = self._next_ticket
+            self._next_ticket += 1
+            self._reserved[ticket] = reservation
+            return ticket
+
+    def release(self, ticket: int):
+        """ジョブ完了時に予約を解放"""
+        with self._condition:
+            self._reserved.pop(ticket, None)
+            self._condition.notify_all()
+
+    @contextmanager
+    def admit(self, job_bytes: int, label: str = "", model_size: Optional[str] = None,
+              device: str = "cpu"):
+        """acquire/releaseのコンテキストマネージャ版"""
+        ticket = self.acquire(job_bytes, label, model_size, device)
+        try:
+            yield ticket
+        finally:
+            self.release(ticket)
+
+    def status(self) -> Dict[str, float]:
+        """現在の状況（GB単位）"""
+        with self._condition:
+            return {
+                "budget_gb": round(self.budget_bytes / GB, 2),
+                "models_gb": round(sum(self._models.values()) / GB, 2),
+                "reserved_gb": round(self._reserved_bytes() / GB, 2),
+                "projected_rss_gb": round(self.projected_rss() / GB, 2),
+                "jobs_in_flight": len(self._reserved),
+                "paused": self._paused,
+            }
+
+
+_controller: Optional[MemoryAdmissionController] = None
+_controller_lock = threading.Lock()
+
+
+def get_admission_controller() -> MemoryAdmissionController:
+    """プロセス共有の受付コントローラを取得"""
+    global _controller
+    with _controller_lock:
+        if _controller is None:
+            _controller = MemoryAdmissionController()
+        return _controller
@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+ステージ・ファイル単位のメモリプロファイル
+tracing.span()の区間ごとにtracemallocのピークとRSS（バックグラウンドで定期取得）を記録し、
+指定したステージでは開始・終了時のスナップショットの差分から確保量の多い行を集計する。
+結果は実行ごとに同じ構造のJSONに書き出すので、ワーカー数の見積もりや
+常駐実行でのリーク調査に実行間で比較できる
+
+tracemallocのピークはプロセス全体の値のため、並行して動いている区間には
+同じピークが計上される（ステージパイプライン・サービス実行時は上限値として読む）
+"""
+import os
+import sys
+import json
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+# 設定・共通処理のインポート（相対/絶対インポートの両方に対応）
+try:
+    from .audio_processor_config import MEMORY_PROFILE_SETTINGS
+    from .date_utils import get_now, get_timestamp
+    from .memory_admission import get_process_rss
+    from .tracing import add_span_hook
+except ImportError:
+    from audio_processor_config import MEMORY_PROFILE_SETTINGS
+    from date_utils import get_now, get_timestamp
+    from memory_admission import get_process_rss
+    from tracing import add_span_hook
+
+MB = 1024 ** 2
+
+# 集計から除外するフレーム（プロファイラ自身の確保）
+_SNAPSHOT_FILTERS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, __file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+]
+
+
+class _ActiveSpan:
+    """計測中の区間のピーク"""
+
+    __slots__ = ("name", "attributes", "traced_start", "traced_peak", "rss_start", "rss_peak", "snapshot")
+
+    def __init__(self, name: str, attributes: Dict[str, Any], traced: int, rss: int):
+        self.name = name
+        self.attributes = attributes
+        self.traced_start = traced
+        self.traced_peak = traced
+        self.rss_start = rss
+        self.rss_peak = rss
+        self.snapshot = None
+
+
+class MemoryProfiler:
+    """span()のフックとしてステージ別のメモリ使用量を集計"""
+
+    def __init__(self, settings: Optional[Dict[str, Any]] = None):
+        self.settings = dict(MEMORY_PROFILE_SETTINGS, **(settings or {}))
+        self.snapshot_stages = set(self.settings["snapshot_stages"])
+        self.started_at = get_now()
+        self.stages: Dict[str, Dict[str, Any]] = {}
+        self.files: List[Dict[str, Any]] = []
+        self._sites: Dict[str, Dict[str, Dict[str, float]]] = {}
+        self._active: List[_ActiveSpan] = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+        self.rss_start = get_process_rss()
+        self.rss_peak = self.rss_start
+        self.traced_peak = 0
+
+    def start(self):
+        """tracemallocとRSSの定期取得を開始"""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.settings["traceback_frames"])
+        self._sampler = threading.Thread(target=self._sample_loop, name="memory-sampler", daemon=True)
+        self._sampler.start()
+
+    def stop(self):
+        """定期取得とtracemallocを停止"""
+        self._stop.set()
+        if self._sampler:
+            self._sampler.join()
+        with self._lock:
+            self._fold_peaks()
+        tracemalloc.stop()
+
+    def _fold_peaks(self) -> int:
+        """前回以降のピークを計測中の全区間に反映してリセット（ロック内で呼ぶ）"""
+        current, peak = tracemalloc.get_traced_memory()
+        self.traced_peak = max(self.traced_peak, peak)
+        for active in self._active:
+            active.traced_peak = max(active.traced_peak, peak)
+        tracemalloc.reset_peak()
+        return current
+
+    def _sample_loop(self):
+        interval = self.settings["rss_interval_seconds"]
+        while not self._stop.wait(interval):
+            rss = get_process_rss()
+            with self._lock:
+                self.rss_peak = max(self.rss_peak, rss)
+                for active in self._active:
+                    active.rss_peak = max(active.rss_peak, rss)
+                self._fold_peaks()
+
+    @contextmanager
+    def hook(self, name: str, category: str, attributes: Dict[str, Any]):
+        """span()から呼ばれるフック"""
+        snapshot = self._take_snapshot() if name in self.snapshot_stages else None
+        rss = get_process_rss()
+        with self._lock:
+            active = _ActiveSpan(name, attributes, self._fold_peaks(), rss)
+            active.snapshot = snapshot
+            self._active.append(active)
+        try:
+            yield
+        finally:
+            rss = get_process_rss()
+            with self._lock:
+                current = self._fold_peaks()
+                self._active.remove(active)
+                active.rss_peak = max(active.rss_peak, rss)
+                self.rss_peak = max(self.rss_peak, rss)
+                self._record(active, current, rss)
+            if active.snapshot is not None:
+                self._record_sites(name, active.snapshot, self._take_snapshot())
+
+    @staticmethod
+    def _take_snapshot() -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces(_SNAPSHOT_FILTERS)
+
+    def _record(self, active: _ActiveSpan, traced_end: int, rss_end: int):
+        """区間の結果をステージ別・ファイル別に集計（ロック内で呼ぶ）"""
+        stage = self.stages.setdefault(active.name, {
+            "count": 0, "traced_peak_mb": 0.0, "traced_growth_mb_total": 0.0,
+            "rss_peak_mb": 0.0, "rss_growth_mb_max": 0.0,
+        })
+        stage["count"] += 1
+        stage["traced_peak_mb"] = max(stage["traced_peak_mb"], active.traced_peak / MB)
+        stage["traced_growth_mb_total"] += (traced_end - active.traced_start) / MB
+        stage["rss_peak_mb"] = max(stage["rss_peak_mb"], active.rss_peak / MB)
+        stage["rss_growth_mb_max"] = max(stage["rss_growth_mb_max"], (active.rss_peak - active.rss_start) / MB)
+
+        if active.name == "file":
+            self.files.append({
+                "file": str(active.attributes.get("file", "")),
+                "traced_peak_mb": round(active.traced_peak / MB, 2),
+                "rss_peak_mb": round(active.rss_peak / MB, 2),
+                "retained_mb": round((traced_end - active.traced_start) / MB, 3),
+                "traced_after_mb": round(traced_end / MB, 2),
+                "rss_after_mb": round(rss_end / MB, 2),
+            })
+
+    def _record_sites(self, name: str, before: tracemalloc.Snapshot, after: tracemalloc.Snapshot):
+        """スナップショットの差分を確保箇所ごとに合算"""
+        stats = [stat for stat in after.compare_to(before, "lineno")[:self.settings["top_n"] * 5]
+                 if stat.size_diff > 0]
+        with self._lock:
+            sites = self._sites.setdefault(name, {})
+            for stat in stats:
+                frame = stat.traceback[0]
+                site = sites.setdefault(f"{frame.filename}:{frame.lineno}", {"size_mb": 0.0, "count": 0})
+                site["size_mb"] += stat.size_diff / MB
+                site["count"] += stat.count_diff
+            if len(sites) > self.settings["top_n"] * 20:
+                keep = sorted(sites.items(), key=lambda item: -item[1]["size_mb"])[:self.settings["top_n"] * 10]
+                self._sites[name] = dict(keep)
+
+    def _retained_per_file(self) -> Optional[float]:
+        """ファイル1件ごとに残るメモリ（処理後の確保量の傾き、MB/件）"""
+        values = [entry["traced_after_mb"] for entry in self.files]
+        n = len(values)
+        if n < 3:
+            return None
+        mean_x = (n - 1) / 2
+        mean_y = sum(values) / n
+        numerator = sum((i - mean_x) * (y - mean_y) for i, y in enumerate(values))
+        denominator = sum((i - mean_x) ** 2 for i in range(n))
+        return round(numerator / denominator, 4)
+
+    def report(self) -> Dict[str, Any]:
+        """実行間で比較できる形式のレポート"""
+        with self._lock:
+            stages = {name: dict(stage) for name, stage in self.stages.items()}
+            sites = {name: dict(values) for name, values in self._sites.items()}
+            files = list(self.files)
+        for name, stage in stages.items():
+            for key in ("traced_peak_mb", "traced_growth_mb_total", "rss_peak_mb", "rss_growth_mb_max"):
+                stage[key] = round(stage[key], 2)
+            top = sorted(sites.get(name, {}).items(), key=lambda item: -item[1]["size_mb"])
+            stage["top_sites"] = [{"site": site, "size_mb": round(value["size_mb"], 3),
+                                   "count": value["count"]}
+                                  for site, value in top[:self.settings["top_n"]]]
+        return {
+            "started_at": self.started_at,
+            "finished_at": get_now(),
+            "pid": os.getpid(),
+            "process": {
+                "rss_start_mb": round(self.rss_start / MB, 2),
+                "rss_peak_mb": round(self.rss_peak / MB, 2),
+                "traced_peak_mb": round(self.traced_peak / MB, 2),
+                "retained_mb_per_file": self._retained_per_file(),
+            },
+            "stages": dict(sorted(stages.items())),
+            "files": files,
+        }
+
+
+_profiler: Optional[MemoryProfiler] = None
+
+
+def enable_memory_profiling(settings: Optional[Dict[str, Any]] = None) -> MemoryProfiler:
+    """
+    メモリプロファイルを有効化（以降のspan()の区間が集計される）
+
+    Args:
+        settings: MEMORY_PROFILE_SETTINGSの上書き
+
+    Returns:
+        有効にしたプロファイラ
+    """
+    global _profiler
+    _profiler = MemoryProfiler(settings)
+    _profiler.start()
+    add_span_hook(_profiler.hook)
+    return _profiler
+
+
+def export_memory_profile(path: Optional[Path] = None) -> Optional[Path]:
+    """
+    プロファイルを停止してJSONに書き出し、ステージ別のピークを表示
+
+    Args:
+        path: 出力先（省略時は output/profiles/memory_{タイムスタンプ}.json）
+
+    Returns:
+        出力先のパス（無効時はNone）
+    """
+    if _profiler is None:
+        return None
+    _profiler.stop()
+    report = _profiler.report()
+    path = Path(path) if path else Path(_profiler.settings["report_dir"]) / f"memory_{get_timestamp()}.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    print(f"\n🧠 メモリプロファイルを保存しました: {path}")
+    _print_report(report)
+    return path
+
+
+def _print_report(report: Dict[str, Any]):
+    process = report["process"]
+    print(f"   RSS {process['rss_start_mb']:.0f}MB → ピーク {process['rss_peak_mb']:.0f}MB  "
+          f"tracemallocピーク {process['traced_peak_mb']:.1f}MB")
+    if process["retained_mb_per_file"] is not None:
+        print(f"   1件あたりの残留メモリ: {process['retained_mb_per_file']:.3f}MB")
+    for name, stage in sorted(report["stages"].items(), key=lambda item: -item[1]["traced_peak_mb"]):
+        print(f"   {name:18s} {stage['count']:4d}回  ピーク {stage['traced_peak_mb']:8.1f}MB  "
+              f"RSS最大増加 {stage['rss_growth_mb_max']:7.1f}MB")
+        for site in stage["top_sites"][:3]:
+            print(f"      {site['size_mb']:8.2f}MB  {site['site']}")
+
+
+def compare_reports(base: Dict[str, Any], target: Dict[str, Any]):
+    """2つのレポートのステージ別ピークを比較して表示"""
+    print(f"🧠 {base['started_at']} → {target['started_at']}")
+    for key in ("rss_peak_mb", "traced_peak_mb"):
+        print(f"   {key:18s} {base['process'][key]:8.1f} → {target['process'][key]:8.1f}MB")
+    for name in sorted(set(base["stages"]) | set(target["stages"])):
+        before = base["stages"].get(name, {}).get("traced_peak_mb", 0.0)
+        after = target["stages"].get(name, {}).get("traced_peak_mb", 0.0)
+        print(f"   {name:18s} {before:8.1f} → {after:8.1f}MB ({after - before:+.1f})")
+
+
+def main():
+    """レポートの表示（2つ指定すると比較）"""
+    if len(sys.argv) < 2:
+        print("使用例: python scripts/memory_profiler.py REPORT.json [REPORT2.json]")
+        return
+    reports = []
+    for path in sys.argv[1:3]:
+        with open(path, 'r', encoding='utf-8') as f:
+            reports.append(json.load(f))
+    if len(reports) == 2:
+        compare_reports(*reports)
+    else:
+        _print_report(reports[0])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+パイプラインのメトリクス（Prometheus形式）
+カウンター・ゲージ・ヒストグラムをプロセス内のレジストリに集め、
+node_exporterのtextfileコレクター用ファイル、またはローカルの /metrics で公開する。
+更新はラベルごとの子オブジェクトに対するロック付き加算だけなので、ループ内から呼んでよい
+"""
+import os
+import sys
+import math
+import bisect
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# 設定のインポート（相対/絶対インポートの両方に対応）
+try:
+    from .audio_processor_config import METRICS_SETTINGS
+except ImportError:
+    from audio_processor_config import METRICS_SETTINGS
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+                   30.0, 60.0, 120.0, 300.0, 600.0, 1800.0)
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape_label(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _CounterValue:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+
+class _GaugeValue(_CounterValue):
+    __slots__ = ()
+
+    def set(self, value: float):
+        self.value = float(value)
+
+    def dec(self, amount: float = 1.0):
+        self.inc(-amount)
+
+
+class _HistogramValue:
+    __slots__ = ("buckets", "counts", "sum", "count", "_lock")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+
+class Metric:
+    """ラベル付きメトリクス（labels()でラベル値ごとの値を取得）"""
+
+    def __init__(self, name: str, documentation: str, kind: str,
+                 labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.kind = kind
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._values: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values: str):
+        """ラベル値に対応する値オブジェクト（初回のみ作成）"""
+        key = tuple(str(value) for value in values)
+        child = self._values.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name}のラベルは{self.labelnames}です")
+            with self._lock:
+                child = self._values.get(key)
+                if child is None:
+                    if self.kind == "histogram":
+                        child = _HistogramValue(self.buckets)
+                    elif self.kind == "gauge":
+                        child = _GaugeValue()
+                    else:
+                        child = _CounterValue()
+                    self._values[key] = child
+        return child
+
+    # ラベルなしメトリクス用のショートカット
+    def inc(self, amount: float = 1.0):
+        self.labels().inc(amount)
+
+    def set(self, value: float):
+        self.labels().set(value)
+
+    def observe(self, value: float):
+        self.labels().observe(value)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        現在値の写し（実行前後の差分をとる用）
+
+        Returns:
+            ラベル値を","で連結したキーごとの値（ヒストグラムは count・sum・累積バケット）
+        """
+        with self._lock:
+            values = list(self._values.items())
+        result: Dict[str, Any] = {}
+        for key, child in values:
+            if self.kind != "histogram":
+                result[",".join(key)] = child.value
+                continue
+            with child._lock:
+                counts, total, count = list(child.counts), child.sum, child.count
+            cumulative, running = [], 0
+            for bucket_count in counts:
+                running += bucket_count
+                cumulative.append(running)
+            result[",".join(key)] = {"count": count, "sum": total, "buckets": cumulative}
+        return result
+
+    def render(self) -> List[str]:
+        """Prometheusテキスト形式の行"""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            values = sorted(self._values.items(), key=lambda item: item[0])
+        for key, child in values:
+            labels = _format_labels(self.labelnames, key)
+            if self.kind != "histogram":
+                lines.append(f"{self.name}{labels} {_format_value(child.value)}")
+                continue
+            with child._lock:
+                counts, total, count = list(child.counts), child.sum, child.count
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """メトリクスの登録と書き出し"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, name: str, documentation: str, kind: str, labelnames: Sequence[str],
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Metric:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = Metric(name, documentation, kind, labelnames, buckets)
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Metric:
+        """カウンターを登録（登録済みならそれを返す）"""
+        return self._register(name, documentation, "counter", labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Metric:
+        """ゲージを登録（登録済みならそれを返す）"""
+        return self._register(name, documentation, "gauge", labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Metric:
+        """ヒストグラムを登録（登録済みならそれを返す）"""
+        return self._register(name, documentation, "histogram", labelnames, buckets)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """全メトリクスの現在値の写し"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {metric.name: metric.snapshot() for metric in metrics}
+
+    def render(self) -> str:
+        """全メトリクスをPrometheusテキスト形式で出力"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, job: str = "analysis", path: Optional[str] = None) -> Optional[Path]:
+        """
+        textfileコレクター用ファイルに書き出す（一時ファイル経由で置き換え）
+
+        Args:
+            job: ジョブ名（分析とNotion同期が互いのファイルを上書きしないよう分ける）
+            path: 出力先（省略時は設定のディレクトリの ago_{job}.prom、設定も空なら書き出さない）
+
+        Returns:
+            出力先のパス
+        """
+        if path is None:
+            if not METRICS_SETTINGS["textfile_dir"]:
+                return None
+            path = Path(METRICS_SETTINGS["textfile_dir"]) / f"ago_{job}.prom"
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        tmp_path.write_text(self.render(), encoding='utf-8')
+        os.replace(tmp_path, path)
+        return path
+
+
+REGISTRY = MetricsRegistry()
+
+# パイプライン共通のメトリクス
+FILES_INGESTED = REGISTRY.counter("ago_files_ingested_total", "取り込んだファイル数", ["type"])
+BYTES_INGESTED = REGISTRY.counter("ago_bytes_ingested_total", "取り込んだファイルのバイト数", ["type"])
+STAGE_SECONDS = REGISTRY.histogram("ago_stage_duration_seconds", "ステージごとの処理時間", ["stage"])
+QUEUE_DEPTH = REGISTRY.gauge("ago_queue_depth", "キューに滞留しているジョブ数", ["queue"])
+FILES_FAILED = REGISTRY.counter("ago_files_failed_total", "処理に失敗したファイル数", ["type"])
+TRANSCRIPTIONS = REGISTRY.counter("ago_transcriptions_total", "文字起こしに使ったモデル別の件数", ["model"])
+MODEL_CACHE = REGISTRY.counter("ago_model_cache_requests_total", "Whisperモデルキャッシュの参照数", ["result"])
+NOTION_API_CALLS = REGISTRY.counter("ago_notion_api_calls_total", "Notion API呼び出し数", ["endpoint"])
+NOTION_RATE_LIMITED = REGISTRY.counter("ago_notion_rate_limited_total", "Notion APIの429応答数", ["endpoint"])
+
+
+def record_ingest(file_type: str, size_bytes: int):
+    """ファイルの取り込みを記録"""
+    FILES_INGESTED.labels(file_type).inc()
+    BYTES_INGESTED.labels(file_type).inc(size_bytes)
+
+
+def start_http_server(port: Optional[int] = None, host: str = "127.0.0.1"):
+    """
+    /metrics を返すHTTPサーバーをバックグラウンドで起動
+
+    Args:
+        port: ポート番号（省略時は設定値）
+        host: 待ち受けアドレス（既定はローカルのみ）
+
+    Returns:
+        起動したサーバー
+    """
+    from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = REGISTRY.render().encode('utf-8')
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port or METRICS_SETTINGS["http_port"]), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    print(f"📈 メトリクスを公開しました: http://{host}:{server.server_address[1]}/metrics")
+    return server
+
+
+def main():
+    """textfileコレクター用ファイルの内容を表示（引数でジョブ名を指定、省略時は全ジョブ）"""
+    textfile_dir = Path(METRICS_SETTINGS["textfile_dir"] or "data/metrics")
+    pattern = f"ago_{sys.argv[1]}.prom" if len(sys.argv) > 1 else "ago_*.prom"
+    paths = sorted(textfile_dir.glob(pattern))
+    if not paths:
+        print(f"📂 メトリクスファイルがありません: {textfile_dir / pattern}")
+        return
+    for path in paths:
+        print(f"# {path}")
+        print(path.read_text(encoding='utf-8'))
+
+
+if __name__ == "__main__":
+    main()
@@ -10,6 +10,12 @@ from pathlib import Path
 from datetime import datetime
 from typing import List, Dict, Any
 
+# 実行履歴のインポート（相対/絶対インポートの両方に対応）
+try:
+    from .run_history import RunRecorder, describe_inputs
+except ImportError:
+    from run_history import RunRecorder, describe_inputs
+
 def migrate_notion_data():
     """既存のNotionデータを新しいディレクトリ構造に移行"""
     
@@ -28,6 +34,9 @@ def migrate_notion_data():
         print("❌ 移行対象のNotionファイルが見つかりません")
         return
     
+    recorder = RunRecorder("migration", inputs=describe_inputs(old_dir, "notion_*.txt"))
+    errors = 0
+    
     print(f"📁 {len(notion_files)}個のNotionファイルを移行します...")
     
     # 移行実行
@@ -50,6 +59,7 @@ def migrate_notion_data():
             print(f"✅ 移行完了: {file_path.name}")
             
         except Exception as e:
+            errors += 1
             print(f"❌ 移行エラー: {file_path.name} - {e}")
     
     # 移行ログを更新
@@ -67,6 +77,7 @@ def migrate_notion_data():
         with open(analysis_log, 'w', encoding='utf-8') as f:
             json.dump(log_data, f, ensure_ascii=False, indent=2)
     
+    recorder.finish("completed" if errors == 0 else "failed", migrated=len(migrated_files), errors=errors)
     print(f"\n🎉 移行完了: {len(migrated_files)}個のファイルを移行しました")
     print(f"📂 新しい保存先: {new_notion_dir}")
     print(f"📊 詳細ログ: {analysis_log}")
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Whisperモデルキャッシュ
+プロセス内でロード済みモデルを共有し、ファイルごとの再ロードを避ける
+
+共有モデルのデコードは model_inference() で囲む。Whisperのデコーダーはモジュールに
+KVキャッシュのフックを登録するため、同じインスタンスで同時にデコードすると
+互いのキャッシュを壊す（並列ジョブ・パイプライン・常駐サービスから同時に呼ばれる）
+"""
+import threading
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple, Union
+
+# 受付制御のインポート（相対/絶対インポートの両方に対応）
+try:
+    from .audio_processor_config import QUANTIZATION_SETTINGS
+    from .memory_admission import get_admission_controller, get_process_rss, estimate_model_bytes
+    from .tracing import span
+    from .metrics import MODEL_CACHE
+except ImportError:
+    from audio_processor_config import QUANTIZATION_SETTINGS
+    from memory_admission import get_admission_controller, get_process_rss, estimate_model_bytes
+    from tracing import span
+    from metrics import MODEL_CACHE
+
+
+_models: Dict[Tuple[str, str, bool], object] = {}
+_lock = threading.Lock()
+# (モデルサイズ, デバイス, 量子化)ごとの推論ロックと、モデルインスタンス → キー
+_inference_locks: Dict[Union[Tuple[str, str, bool], int], threading.Lock] = {}
+_model_keys: Dict[int, Tuple[str, str, bool]] = {}
+
+
+def get_default_device() -> str:
+    """利用可能なデバイスを取得（cuda > cpu）"""
+    import torch
+    return "cuda" if torch.cuda.is_available() else "cpu"
+
+
+def use_quantization(device: str, quantized: Optional[bool] = None) -> bool:
+    """
+    int8量子化モデルを使うか判定（CPUのみ対応）
+
+    Args:
+        device: デバイス
+        quantized: 明示指定（Noneで設定値に従う）
+
+    Returns:
+        量子化モデルを使うか
+    """
+    if quantized is None:
+        quantized = QUANTIZATION_SETTINGS["enable_int8_cpu"]
+    return bool(quantized) and device == "cpu"
+
+
+def get_device_label(device: str, quantized: Optional[bool] = None) -> str:
+    """テレメトリ記録用のデバイス名（量子化モデルは"cpu-int8"として別に集計）"""
+    return f"{device}-int8" if use_quantization(device, quantized) else device
+
+
+def get_whisper_model(model_size: str, device: Optional[str] = None,
+                      quantized: Optional[bool] = None):
+    """
+    Whisperモデルを取得（ロード済みなら再利用）
+
+    Args:
+        model_size: モデルサイズ
+        device: デバイス（Noneで自動選択）
+        quantized: int8量子化モデルを使うか（Noneで設定値、CPU以外では無視）
+
+    Returns:
+        Whisperモデル
+    """
+    import whisper
+
+    device = device or get_default_device()
+    quantized = use_quantization(device, quantized)
+    key = (model_size, device, quantized)
+
+    with _lock:
+        model = _models.get(key)
+        MODEL_CACHE.labels("miss" if model is None else "hit").inc()
+        if model is None:
+            print(f"📥 Whisperモデル読み込み中... ({model_size}, {get_device_label(device, quantized)})")
+            rss_before = get_process_rss()
+            with span("model_load", model=model_size, device=get_device_label(device, quantized)):
+                if quantized:
+                    try:
+                        from .quantized_whisper import load_quantized_model
+                    except ImportError:
+                        from quantized_whisper import load_quantized_model
+                    model = load_quantized_model(model_size)
+                else:
+                    model = whisper.load_model(model_size, device=device)
+            _models[key] = model
+            _model_keys[id(model)] = key
+
+            # 実測の常駐サイズ（取得できなければ推定値）を受付制御に登録
+            resident_bytes = get_process_rss() - rss_before
+            if resident_bytes <= 0:
+                resident_bytes = estimate_model_bytes(model_size, int8=quantized)
+            get_admission_controller().register_model(
+                f"{model_size}@{get_device_label(device, quantized)}", resident_bytes
+            )
+        return model
+
+
+def unload_model(model_size: str, device: Optional[str] = None) -> bool:
+    """
+    キャッシュからモデルを破棄
+
+    Args:
+        model_size: モデルサイズ
+        device: デバイス（Noneで全デバイス）
+
+    Returns:
+        破棄したかどうか
+    """
+    with _lock:
+        keys = [k for k in _models if k[0] == model_size and (device is None or k[1] == device)]
+        for key in keys:
+            _model_keys.pop(id(_models.pop(key)), None)
+            get_admission_controller().unregister_model(f"{key[0]}@{get_device_label(key[1], key[2])}")
+    return bool(keys)
+
+
+@contextmanager
+def model_inference(model):
+    """
+    モデルでの推論を直列化（同じモデルのtranscribe/decodeは同時に1つだけ）
+
+    Args:
+        model: get_whisper_model()で取得したモデル（キャッシュ外のモデルはインスタンス単位でロック）
+    """
+    with _lock:
+        lock_key = _model_keys.get(id(model), id(model))
+        lock = _inference_locks.setdefault(lock_key, threading.Lock())
+    with lock:
+        yield
+
+
+def get_loaded_models() -> list:
+    """ロード済みモデルの一覧を取得"""
+    with _lock:
+        return list(_models.keys())
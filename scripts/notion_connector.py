@@ -11,6 +11,12 @@ from typing import Dict, List, Optional, Any
 from notion_client import Client
 import hashlib
 
+# メトリクスのインポート（相対/絶対インポートの両方に対応）
+try:
+    from .metrics import NOTION_API_CALLS, NOTION_RATE_LIMITED
+except ImportError:
+    from metrics import NOTION_API_CALLS, NOTION_RATE_LIMITED
+
 
 class NotionConnector:
     """Notionから議事録データを取得してAGAIシステムに統合するコネクター"""
@@ -41,6 +47,26 @@ class NotionConnector:
         self.processed_dir = self.data_dir.parent / "processed"
         self.processed_dir.mkdir(parents=True, exist_ok=True)
         
+    def _call(self, endpoint: str, func, **kwargs) -> Dict[str, Any]:
+        """
+        Notion APIを呼び出して呼び出し数・429応答数をメトリクスに記録
+        
+        Args:
+            endpoint: メトリクスのラベル（databases.query など）
+            func: notion-clientのメソッド
+            **kwargs: メソッドの引数
+            
+        Returns:
+            APIのレスポンス
+        """
+        NOTION_API_CALLS.labels(endpoint).inc()
+        try:
+            return func(**kwargs)
+        except Exception as e:
+            if getattr(e, "status", None) == 429 or getattr(e, "code", None) == "rate_limited":
+                NOTION_RATE_LIMITED.labels(endpoint).inc()
+            raise
+    
     def get_database_pages(self, database_id: str, 
                           filter_params: Optional[Dict] = None) -> List[Dict[str, Any]]:
         """
@@ -65,13 +91,13 @@ class NotionConnector:
                 query_params["filter"] = filter_params
             
             # データベースをクエリ
-            response = self.client.databases.query(**query_params)
+            response = self._call("databases.query", self.client.databases.query, **query_params)
             pages = response.get("results", [])
             
             # ページネーション対応
             while response.get("has_more"):
                 query_params["start_cursor"] = response.get("next_cursor")
-                response = self.client.databases.query(**query_params)
+                response = self._call("databases.query", self.client.databases.query, **query_params)
                 pages.extend(response.get("results", []))
             
             return pages
@@ -93,12 +119,14 @@ class NotionConnector:
         try:
             # ページのブロックを取得
             blocks = []
-            response = self.client.blocks.children.list(block_id=page_id)
+            response = self._call("blocks.children.list", self.client.blocks.children.list,
+                                  block_id=page_id)
             blocks.extend(response.get("results", []))
             
             # ページネーション対応
             while response.get("has_more"):
-                response = self.client.blocks.children.list(
+                response = self._call(
+                    "blocks.children.list", self.client.blocks.children.list,
                     block_id=page_id, 
                     start_cursor=response.get("next_cursor")
                 )
@@ -167,7 +195,7 @@ class NotionConnector:
         """
         try:
             # ページ情報を取得
-            page = self.client.pages.retrieve(page_id=page_id)
+            page = self._call("pages.retrieve", self.client.pages.retrieve, page_id=page_id)
             
             # タイトルを取得
             if not title:
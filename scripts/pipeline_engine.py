@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+パイプラインステージエンジン
+各ステージが実行方式（thread / process / inline）と並列度を宣言し、
+ステージ間を上限付きキューでつなぐ。下流が詰まると上流のputがブロックして
+背圧がかかるため、ステージごとの並列度を調整してボトルネックを特定できる
+"""
+import time
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Any, Iterable, List, Optional
+
+# 設定のインポート（相対/絶対インポートの両方に対応）
+try:
+    from .audio_processor_config import PIPELINE_SETTINGS
+    from .tracing import span
+    from .metrics import QUEUE_DEPTH
+    from .structured_logging import get_logger, flush_logging
+except ImportError:
+    from audio_processor_config import PIPELINE_SETTINGS
+    from tracing import span
+    from metrics import QUEUE_DEPTH
+    from structured_logging import get_logger, flush_logging
+
+logger = get_logger("pipeline")
+
+EXECUTORS = ("thread", "process", "inline")
+_END = object()
+
+
+class Stage:
+    """パイプラインの1ステージ"""
+
+    def __init__(self, name: str, func: Callable[[Dict[str, Any]], Optional[Dict[str, Any]]],
+                 executor: Optional[str] = None, concurrency: Optional[int] = None):
+        """
+        初期化
+
+        Args:
+            name: ステージ名
+            func: ジョブ（辞書）を受け取って次のステージに渡す辞書を返す関数
+                  （Noneを返すとそのジョブは以降のステージに流さない）
+            executor: thread（スレッド並列）、process（別プロセス、funcと辞書はpickle可能であること）、
+                      inline（パイプライン側の1スレッドで順に実行）。省略時はPIPELINE_SETTINGSの値
+            concurrency: 同時実行数（inlineは常に1）。省略時はPIPELINE_SETTINGSの値
+        """
+        defaults = PIPELINE_SETTINGS["stages"].get(name, {})
+        self.name = name
+        self.func = func
+        self.executor = executor or defaults.get("executor", "thread")
+        if self.executor not in EXECUTORS:
+            raise ValueError(f"未対応の実行方式です: {self.executor}")
+        self.concurrency = 1 if self.executor == "inline" else (concurrency or defaults.get("concurrency", 1))
+
+        self.stats = {
+            "processed": 0, "failed": 0, "dropped": 0,
+            "busy_sec": 0.0,        # 処理に使った時間の合計
+            "starved_sec": 0.0,     # 上流を待っていた時間の合計
+            "blocked_sec": 0.0,     # 下流のキューが満杯で待っていた時間の合計（背圧）
+            "max_queue": 0
+        }
+
+
+class PipelineEngine:
+    """ステージを上限付きキューでつないで実行するエンジン"""
+
+    def __init__(self, stages: List[Stage], queue_size: Optional[int] = None):
+        """
+        初期化
+
+        Args:
+            stages: 実行順のステージ
+            queue_size: ステージ間キューの上限（省略時は設定値）
+        """
+        self.stages = stages
+        self.queue_size = queue_size or PIPELINE_SETTINGS["queue_size"]
+        self.failures: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def run(self, items: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        ジョブを流して全ステージの完了を待つ
+
+        Args:
+            items: 先頭ステージに渡すジョブ（辞書）
+
+        Returns:
+            ステージ別の統計とボトルネック
+        """
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in self.stages]
+        done: queue.Queue = queue.Queue()
+        pools = {
+            stage.name: ProcessPoolExecutor(max_workers=stage.concurrency)
+            for stage in self.stages if stage.executor == "process"
+        }
+        started = time.time()
+
+        workers = []
+        remaining = {}
+        for index, stage in enumerate(self.stages):
+            remaining[stage.name] = stage.concurrency
+            out_queue = queues[index + 1] if index + 1 < len(self.stages) else done
+            for worker_index in range(stage.concurrency):
+                thread = threading.Thread(
+                    target=self._worker, name=f"{stage.name}-{worker_index}",
+                    args=(stage, queues[index], out_queue, pools.get(stage.name), remaining),
+                    daemon=True
+                )
+                thread.start()
+                workers.append(thread)
+
+        # 投入側も背圧を受ける（先頭キューが満杯ならここで待つ）
+        submitted = 0
+        for item in items:
+            queues[0].put(item)
+            submitted += 1
+        for _ in range(self.stages[0].concurrency):
+            queues[0].put(_END)
+
+        for thread in workers:
+            thread.join()
+        for pool in pools.values():
+            pool.shutdown()
+
+        completed = []
+        while not done.empty():
+            item = done.get()
+            if item is not _END:
+                completed.append(item)
+
+        return self._build_report(submitted, completed, time.time() - started)
+
+    def _worker(self, stage: Stage, in_queue: queue.Queue, out_queue: queue.Queue,
+                pool: Optional[ProcessPoolExecutor], remaining: Dict[str, int]):
+        """ステージのワーカー（入力キューから取り出して処理し、出力キューに流す）"""
+        while True:
+            wait_start = time.time()
+            item = in_queue.get()
+            waited = time.time() - wait_start
+            depth = in_queue.qsize()
+            QUEUE_DEPTH.labels(stage.name).set(depth)
+
+            if item is _END:
+                with self._lock:
+                    remaining[stage.name] -= 1
+                    last_worker = remaining[stage.name] == 0
+                # ステージの最後のワーカーが下流に終了を伝える
+                if last_worker:
+                    next_concurrency = self._next_concurrency(stage)
+                    for _ in range(next_concurrency):
+                        out_queue.put(_END)
+                return
+
+            busy_start = time.time()
+            try:
+                with span(stage.name, category="pipeline", file=self._describe(item),
+                          queue_depth=depth):
+                    if pool is not None:
+                        result = pool.submit(stage.func, item).result()
+                    else:
+                        result = stage.func(item)
+                error = None
+            except Exception as e:
+                result, error = None, e
+            busy = time.time() - busy_start
+
+            with self._lock:
+                stage.stats["starved_sec"] += waited
+                stage.stats["busy_sec"] += busy
+                stage.stats["max_queue"] = max(stage.stats["max_queue"], depth)
+                if error is not None:
+                    stage.stats["failed"] += 1
+                    self.failures.append({"stage": stage.name, "item": item,
+                                          "error": str(error), "exception": error})
+                elif result is None:
+                    stage.stats["dropped"] += 1
+                else:
+                    stage.stats["processed"] += 1
+
+            if error is not None:
+                logger.error("❌ [%s] %s の処理中にエラー: %s", stage.name, self._describe(item), error,
+                             extra={"stage": stage.name})
+                continue
+            if result is None:
+                continue
+
+            put_start = time.time()
+            out_queue.put(result)
+            with self._lock:
+                stage.stats["blocked_sec"] += time.time() - put_start
+
+    def _next_concurrency(self, stage: Stage) -> int:
+        """下流ステージのワーカー数（最後のステージなら1）"""
+        index = self.stages.index(stage)
+        return self.stages[index + 1].concurrency if index + 1 < len(self.stages) else 1
+
+    @staticmethod
+    def _describe(item: Dict[str, Any]) -> str:
+        path = item.get("path") if isinstance(item, dict) else None
+        return getattr(path, "name", str(path)) if path is not None else "ジョブ"
+
+    def _build_report(self, submitted: int, completed: List[Dict[str, Any]],
+                      elapsed: float) -> Dict[str, Any]:
+        """ステージ別の統計から稼働率とボトルネックを求める"""
+        stages = {}
+        for stage in self.stages:
+            capacity = elapsed * stage.concurrency
+            stages[stage.name] = dict(
+                stage.stats,
+                executor=stage.executor,
+                concurrency=stage.concurrency,
+                utilization=round(stage.stats["busy_sec"] / capacity, 3) if capacity else 0.0,
+                busy_sec=round(stage.stats["busy_sec"], 2),
+                starved_sec=round(stage.stats["starved_sec"], 2),
+                blocked_sec=round(stage.stats["blocked_sec"], 2),
+            )
+
+        bottleneck = max(stages, key=lambda name: stages[name]["utilization"]) if stages else None
+        return {
+            "submitted": submitted,
+            "completed": len(completed),
+            "failed": len(self.failures),
+            "elapsed_sec": round(elapsed, 2),
+            "bottleneck": bottleneck,
+            "stages": stages,
+            "results": completed,
+            "failures": self.failures,
+        }
+
+
+def print_pipeline_report(report: Dict[str, Any]):
+    """パイプラインの統計を表示"""
+    flush_logging()
+    print("\n🔧 パイプライン実行結果")
+    print(f"   投入: {report['submitted']} / 完了: {report['completed']} / 失敗: {report['failed']} "
+          f"({report['elapsed_sec']:.1f}秒)")
+    for name, stats in report["stages"].items():
+        marker = " ← ボトルネック" if name == report["bottleneck"] else ""
+        print(f"   {name:16s} {stats['executor']:7s} x{stats['concurrency']}  "
+              f"処理 {stats['processed']:3d}  稼働率 {stats['utilization'] * 100:5.1f}%  "
+              f"上流待ち {stats['starved_sec']:6.1f}秒  背圧 {stats['blocked_sec']:6.1f}秒{marker}")
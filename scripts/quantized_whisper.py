@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Whisperモデルのint8動的量子化（CPU専用）
+Linear層をPyTorchの動的量子化でint8に変換し、量子化済みstate_dictを
+ディスクにキャッシュして次回以降のロードで再量子化を省く。
+参照音声でfp32との処理速度・WER/CERの差を計測するベンチマーク付き
+"""
+import sys
+import time
+import argparse
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+# 設定のインポート（相対/絶対インポートの両方に対応）
+try:
+    from .audio_processor_config import QUANTIZATION_SETTINGS
+except ImportError:
+    from audio_processor_config import QUANTIZATION_SETTINGS
+
+
+def _get_cache_path(model_size: str) -> Path:
+    """量子化済みstate_dictのキャッシュパス（torchのバージョン別）"""
+    import torch
+    version = torch.__version__.split("+")[0]
+    return Path(QUANTIZATION_SETTINGS["cache_dir"]) / f"{model_size}_int8_torch{version}.pt"
+
+
+def quantize_model(model):
+    """
+    WhisperモデルのLinear層をint8に動的量子化
+
+    WhisperのLinearはnn.Linearのサブクラス（forwardでdtypeを合わせるだけ）のため、
+    quantize_dynamicの対象になるようnn.Linearとして扱わせてから変換する
+
+    Args:
+        model: CPU上のfp32 Whisperモデル
+
+    Returns:
+        量子化済みモデル
+    """
+    import torch
+    from torch import nn
+
+    for module in model.modules():
+        if isinstance(module, nn.Linear) and type(module) is not nn.Linear:
+            module.__class__ = nn.Linear
+
+    quantized = torch.quantization.quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8)
+    quantized.eval()
+    return quantized
+
+
+def _set_alignment_heads(model, model_size: str):
+    """単語タイムスタンプ用のアライメントヘッドを設定（state_dictに含まれないため）"""
+    import whisper
+
+    alignment_heads = getattr(whisper, "_ALIGNMENT_HEADS", {}).get(model_size)
+    if alignment_heads is not None:
+        model.set_alignment_heads(alignment_heads)
+
+
+def load_quantized_model(model_size: str):
+    """
+    int8量子化済みWhisperモデルをロード
+
+    キャッシュがあればモデル構造だけ作って量子化済みstate_dictを読み込み、
+    なければfp32モデルを量子化してキャッシュに保存する
+
+    Args:
+        model_size: モデルサイズ
+
+    Returns:
+        量子化済みWhisperモデル（CPU）
+    """
+    import torch
+    import whisper
+    from whisper.model import ModelDimensions, Whisper
+
+    cache_path = _get_cache_path(model_size)
+
+    if cache_path.exists():
+        try:
+            checkpoint = torch.load(cache_path, map_location="cpu")
+            model = quantize_model(Whisper(ModelDimensions(**checkpoint["dims"])))
+            model.load_state_dict(checkpoint["state_dict"])
+            _set_alignment_heads(model, model_size)
+            print(f"✅ 量子化済みモデルをキャッシュから読み込み: {cache_path.name}")
+            return model
+        except Exception as e:
+            print(f"⚠️  量子化キャッシュの読み込みに失敗、再量子化します: {e}")
+
+    print(f"🔧 {model_size}モデルをint8に量子化中...")
+    start = time.time()
+    model = quantize_model(whisper.load_model(model_size, device="cpu"))
+
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = cache_path.with_suffix(".tmp")
+    torch.save({"dims": vars(model.dims), "state_dict": model.state_dict()}, tmp_path)
+    tmp_path.replace(cache_path)
+    print(f"✅ 量子化完了 ({time.time() - start:.1f}秒) → {cache_path}")
+    return model
+
+
+def _edit_distance(reference: list, hypothesis: list) -> int:
+    """編集距離（置換・挿入・削除）"""
+    previous = list(range(len(hypothesis) + 1))
+    for i, ref_item in enumerate(reference, 1):
+        current = [i]
+        for j, hyp_item in enumerate(hypothesis, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (ref_item != hyp_item)
+            ))
+        previous = current
+    return previous[-1]
+
+
+def error_rates(reference: str, hypothesis: str) -> Dict[str, float]:
+    """
+    WERとCERを計算
+
+    日本語は単語区切りがないためCERを主な指標とし、
+    WERは空白区切りのトークンで計算する
+
+    Args:
+        reference: 正解（または基準）テキスト
+        hypothesis: 比較対象テキスト
+
+    Returns:
+        {"wer": 単語誤り率, "cer": 文字誤り率}
+    """
+    ref_words = reference.split()
+    ref_chars = [c for c in reference if not c.isspace()]
+    hyp_chars = [c for c in hypothesis if not c.isspace()]
+    return {
+        "wer": _edit_distance(ref_words, hypothesis.split()) / max(len(ref_words), 1),
+        "cer": _edit_distance(ref_chars, hyp_chars) / max(len(ref_chars), 1),
+    }
+
+
+def benchmark_quantization(audio_path: Path, model_size: str = "small",
+                           language: Optional[str] = None,
+                           reference_text: Optional[str] = None) -> Dict[str, Any]:
+    """
+    参照音声でfp32とint8の処理速度・精度を比較
+
+    reference_textがない場合はfp32の出力を基準にint8の誤り率を計算する
+
+    Args:
+        audio_path: 参照音声ファイル
+        model_size: モデルサイズ
+        language: 言語コード（省略時は設定値）
+        reference_text: 正解テキスト
+
+    Returns:
+        比較結果
+    """
+    import whisper
+    import librosa
+
+    language = language or QUANTIZATION_SETTINGS["benchmark_language"]
+    audio_data, _ = librosa.load(str(audio_path), sr=16000)
+    audio_duration = len(audio_data) / 16000
+
+    runs = {}
+    for precision in ("fp32", "int8"):
+        if precision == "int8":
+            model = load_quantized_model(model_size)
+        else:
+            model = whisper.load_model(model_size, device="cpu")
+        start = time.time()
+        result = model.transcribe(audio_data, language=language, fp16=False, verbose=None)
+        elapsed = time.time() - start
+        runs[precision] = {
+            "processing_time_sec": round(elapsed, 2),
+            "real_time_factor": round(elapsed / audio_duration, 3) if audio_duration else None,
+            "text": result["text"],
+        }
+        del model
+
+    baseline = reference_text if reference_text is not None else runs["fp32"]["text"]
+    for run in runs.values():
+        run.update({k: round(v, 4) for k, v in error_rates(baseline, run["text"]).items()})
+
+    fp32_time = runs["fp32"]["processing_time_sec"]
+    int8_time = runs["int8"]["processing_time_sec"]
+    return {
+        "audio_file": audio_path.name,
+        "audio_duration_sec": round(audio_duration, 2),
+        "model": model_size,
+        "reference": "text" if reference_text is not None else "fp32",
+        "fp32": runs["fp32"],
+        "int8": runs["int8"],
+        "speedup": round(fp32_time / int8_time, 2) if int8_time else None,
+        "wer_delta": round(runs["int8"]["wer"] - runs["fp32"]["wer"], 4),
+        "cer_delta": round(runs["int8"]["cer"] - runs["fp32"]["cer"], 4),
+    }
+
+
+def main():
+    """参照音声でint8量子化の効果を計測"""
+    parser = argparse.ArgumentParser(description='Whisper int8量子化のベンチマーク')
+    parser.add_argument('audio', type=Path, help='参照音声ファイル')
+    parser.add_argument('--model', default='small', help='モデルサイズ')
+    parser.add_argument('--language', default=None, help='言語コード')
+    parser.add_argument('--reference', type=Path, default=None, help='正解テキストファイル')
+    args = parser.parse_args()
+
+    if not args.audio.exists():
+        print(f"❌ ファイルが見つかりません: {args.audio}")
+        sys.exit(1)
+
+    reference_text = args.reference.read_text(encoding='utf-8') if args.reference else None
+    report = benchmark_quantization(args.audio, args.model, args.language, reference_text)
+
+    print(f"\n📊 int8量子化ベンチマーク ({report['model']}モデル / "
+          f"{report['audio_file']} {report['audio_duration_sec']:.0f}秒)")
+    print("=" * 50)
+    for precision in ("fp32", "int8"):
+        run = report[precision]
+        print(f"  {precision}: {run['processing_time_sec']:.1f}秒 (RTF {run['real_time_factor']})  "
+              f"WER {run['wer']:.2%}  CER {run['cer']:.2%}")
+    print(f"  高速化: {report['speedup']}倍  WER差: {report['wer_delta']:+.2%}  "
+          f"CER差: {report['cer_delta']:+.2%}  (基準: {report['reference']})")
+
+
+if __name__ == "__main__":
+    main()
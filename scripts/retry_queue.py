@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+失敗ファイルの再試行キュー
+一括処理で失敗したファイルを試行回数・エラー種別とともに記録し、
+指数バックオフで次の試行時刻を決める。試行回数を使い切ったファイルは
+エラー履歴を添えてデッドレター（data/03_failed）に移動する
+"""
+import sys
+import json
+import time
+import shutil
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windowsではプロセス間ロックなし
+    fcntl = None
+
+# 設定・共通処理のインポート（相対/絶対インポートの両方に対応）
+try:
+    from .audio_processor_config import RETRY_SETTINGS, global_config
+    from .date_utils import get_now
+    from .structured_logging import get_logger
+except ImportError:
+    from audio_processor_config import RETRY_SETTINGS, global_config
+    from date_utils import get_now
+    from structured_logging import get_logger
+
+logger = get_logger("retry")
+
+
+class TranscriptionFailedError(RuntimeError):
+    """文字起こしが失敗してフォールバック結果しか得られなかった"""
+
+    def __init__(self, message: str, error_type: str = "unknown_error", model: Optional[str] = None):
+        super().__init__(message)
+        self.error_type = error_type
+        self.model = model
+
+
+def classify_error(error: BaseException) -> str:
+    """
+    例外をAudioProcessorConfig.get_error_recovery_strategyのエラー種別に分類
+
+    Args:
+        error: 発生した例外
+
+    Returns:
+        memory_error / timeout_error / model_error / unknown_error
+    """
+    if isinstance(error, TranscriptionFailedError):
+        return error.error_type
+    if isinstance(error, MemoryError):
+        return "memory_error"
+    name = type(error).__name__
+    if isinstance(error, TimeoutError) or "Timeout" in name or "Deadline" in name:
+        return "timeout_error"
+    if "model" in str(error).lower():
+        return "model_error"
+    return "unknown_error"
+
+
+class RetryQueue:
+    """試行回数とバックオフを永続化する再試行キュー"""
+
+    _lock = threading.Lock()
+
+    def __init__(self, queue_path: Optional[str] = None, dead_letter_dir: Optional[str] = None):
+        """
+        初期化
+
+        Args:
+            queue_path: キューの保存先（省略時は設定値）
+            dead_letter_dir: デッドレターの移動先（省略時は設定値）
+        """
+        self.queue_path = Path(queue_path or RETRY_SETTINGS["queue_path"])
+        self.dead_letter_dir = Path(dead_letter_dir or RETRY_SETTINGS["dead_letter_dir"])
+        self.lock_file = self.queue_path.with_suffix('.lock')
+
+    @contextmanager
+    def _locked(self):
+        """キューの読み書きをスレッド・他プロセス（並列実行・ワーカー）と排他制御"""
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            self.queue_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.lock_file, 'w') as lock:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _load(self) -> Dict[str, Any]:
+        if not self.queue_path.exists():
+            return {}
+        with open(self.queue_path, 'r', encoding='utf-8') as f:
+            return json.load(f).get("entries", {})
+
+    def _save(self, entries: Dict[str, Any]):
+        self.queue_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.queue_path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"entries": entries}, f, ensure_ascii=False, indent=2)
+        tmp_path.replace(self.queue_path)
+
+    @staticmethod
+    def get_key(file_path: Path) -> str:
+        """キューのキー（絶対パス）"""
+        return str(Path(file_path).resolve())
+
+    def get_entry(self, file_path: Path) -> Optional[Dict[str, Any]]:
+        """ファイルの再試行エントリ（なければNone）"""
+        with self._locked():
+            return self._load().get(self.get_key(file_path))
+
+    def is_deferred(self, file_path: Path, now: Optional[float] = None) -> bool:
+        """バックオフ中（次の試行時刻前）か"""
+        entry = self.get_entry(file_path)
+        return entry is not None and entry["retry_at"] > (now or time.time())
+
+    def due_paths(self, now: Optional[float] = None) -> List[Path]:
+        """次の試行時刻を過ぎた失敗ファイル（取り込みフォルダに残っているもののみ）"""
+        now = now or time.time()
+        with self._locked():
+            entries = self._load()
+        return [Path(key) for key, entry in entries.items()
+                if entry["retry_at"] <= now and Path(key).exists()]
+
+    def get_model_hint(self, file_path: Path) -> Optional[str]:
+        """メモリ不足・モデルエラーで失敗したファイルの次回のモデル（それ以外はNone）"""
+        entry = self.get_entry(file_path)
+        return entry.get("model_hint") if entry else None
+
+    def record_success(self, file_path: Path):
+        """成功したファイルをキューから外す"""
+        key = self.get_key(file_path)
+        with self._locked():
+            entries = self._load()
+            if entries.pop(key, None) is not None:
+                self._save(entries)
+
+    def record_failure(self, file_path: Path, file_type: str, error: BaseException) -> Dict[str, Any]:
+        """
+        失敗を記録して次の試行時刻を決める
+
+        Args:
+            file_path: 失敗したファイル
+            file_type: ファイルタイプ
+            error: 発生した例外
+
+        Returns:
+            更新後のエントリ（デッドレターに移動した場合は"dead_letter"にパス）
+        """
+        error_type = classify_error(error)
+        strategy = global_config.get_error_recovery_strategy(error_type)
+        key = self.get_key(file_path)
+
+        with self._locked():
+            entries = self._load()
+            entry = entries.get(key) or {"name": file_path.name, "file_type": file_type,
+                                         "attempts": 0, "history": []}
+            entry["attempts"] += 1
+            entry["error_type"] = error_type
+            entry["action"] = strategy["action"]
+            entry["history"].append({"at": get_now(), "error_type": error_type, "error": str(error)})
+
+            # メモリ不足・モデルエラーは次回小さいモデルで試す
+            failed_model = getattr(error, "model", None) or entry.get("model_hint")
+            if strategy["action"] in ("use_smaller_model", "fallback_model") and failed_model:
+                entry["model_hint"] = global_config.get_fallback_model(failed_model)
+
+            delay = min(RETRY_SETTINGS["backoff_base_seconds"] * 2 ** (entry["attempts"] - 1),
+                        RETRY_SETTINGS["backoff_max_seconds"])
+            entry["retry_at"] = time.time() + delay
+
+            if entry["attempts"] >= RETRY_SETTINGS["max_attempts"]:
+                entries.pop(key, None)
+                entry["dead_letter"] = str(self._move_to_dead_letter(file_path, entry))
+            else:
+                entries[key] = entry
+            self._save(entries)
+
+        if entry.get("dead_letter"):
+            logger.warning("🪦 %s: %d回失敗したためデッドレターに移動しました (%s)", file_path.name,
+                           entry['attempts'], entry['dead_letter'],
+                           extra={"file": file_path.name, "error_type": entry['error_type']})
+        else:
+            logger.info("🔁 %s: %s（%d回目の失敗、%.0f分後以降に再試行）", file_path.name, strategy['message'],
+                        entry['attempts'], delay / 60,
+                        extra={"file": file_path.name, "error_type": entry['error_type']})
+        return entry
+
+    def _move_to_dead_letter(self, file_path: Path, entry: Dict[str, Any]) -> Path:
+        """ファイルとエラー履歴をデッドレターに移動"""
+        self.dead_letter_dir.mkdir(parents=True, exist_ok=True)
+        dest_path = self.dead_letter_dir / file_path.name
+        counter = 1
+        while dest_path.exists():
+            dest_path = self.dead_letter_dir / f"{file_path.stem}_{counter}{file_path.suffix}"
+            counter += 1
+
+        if file_path.exists():
+            shutil.move(str(file_path), str(dest_path))
+        with open(dest_path.with_name(dest_path.name + ".error.json"), 'w', encoding='utf-8') as f:
+            json.dump(dict(entry, original_path=str(file_path), dead_letter=str(dest_path)),
+                      f, ensure_ascii=False, indent=2)
+        return dest_path
+
+    def list_dead_letters(self) -> List[Dict[str, Any]]:
+        """デッドレターのエラー履歴一覧"""
+        if not self.dead_letter_dir.exists():
+            return []
+        letters = []
+        for path in sorted(self.dead_letter_dir.glob("*.error.json")):
+            with open(path, 'r', encoding='utf-8') as f:
+                letters.append(dict(json.load(f), error_file=str(path)))
+        return letters
+
+    def requeue_dead_letters(self, intake_dir: Path) -> int:
+        """
+        デッドレターのファイルを取り込みフォルダに戻す（試行回数はリセット）
+
+        Args:
+            intake_dir: 戻し先（data/00_new）
+
+        Returns:
+            戻したファイル数（取り込みフォルダに同名ファイルがあるものはデッドレターに残す）
+        """
+        count = 0
+        for letter in self.list_dead_letters():
+            source = Path(letter["dead_letter"])
+            dest_path = intake_dir / letter["name"]
+            if source.exists():
+                if dest_path.exists():
+                    print(f"⚠️  {letter['name']}: 取り込みフォルダに同名ファイルがあるため戻しません")
+                    continue
+                shutil.move(str(source), str(dest_path))
+                count += 1
+            Path(letter["error_file"]).unlink()
+        return count
+
+
+def main():
+    """再試行キューとデッドレターの表示（requeueでデッドレターを取り込みフォルダに戻す）"""
+    queue = RetryQueue()
+    if len(sys.argv) > 1 and sys.argv[1] == "requeue":
+        count = queue.requeue_dead_letters(Path("data/00_new"))
+        print(f"📥 {count}個のファイルを data/00_new に戻しました")
+        return
+
+    with queue._lock:
+        entries = queue._load()
+    print(f"🔁 再試行待ち: {len(entries)}件")
+    for entry in entries.values():
+        wait = max(0.0, entry["retry_at"] - time.time())
+        print(f"  {entry['name']}  {entry['attempts']}回失敗  {entry['error_type']}  "
+              f"{'再試行可能' if wait == 0 else f'あと{wait / 60:.0f}分'}")
+
+    letters = queue.list_dead_letters()
+    print(f"🪦 デッドレター: {len(letters)}件")
+    for letter in letters:
+        print(f"  {letter['name']}  {letter['error_type']}: {letter['history'][-1]['error']}")
+
+
+if __name__ == "__main__":
+    main()
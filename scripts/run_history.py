@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+"""
+実行履歴ストア
+分析・Notion同期・移行スクリプトの各実行について、入力・バージョン・ホスト情報・
+ステージ別の処理時間・スループット・エラー数・使用モデルをマニフェストとして
+data/.runs/{種別}/ に保存し、2つの実行の比較や直近の推移を表示する。
+ステージ別の処理時間などはメトリクス（scripts/metrics.py）の実行前後の差分から求める
+
+    python scripts/run_history.py list [種別]
+    python scripts/run_history.py show RUN_ID
+    python scripts/run_history.py compare [RUN_A RUN_B]   # 省略時は分析の直近2回
+    python scripts/run_history.py trend [種別] [件数]
+"""
+import os
+import sys
+import json
+import time
+import socket
+import hashlib
+import platform
+import subprocess
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+# 設定・共通処理のインポート（相対/絶対インポートの両方に対応）
+try:
+    from . import audio_processor_config
+    from .audio_processor_config import RUN_HISTORY_SETTINGS
+    from .date_utils import get_now, get_timestamp
+    from .metrics import REGISTRY, STAGE_SECONDS
+except ImportError:
+    import audio_processor_config
+    from audio_processor_config import RUN_HISTORY_SETTINGS
+    from date_utils import get_now, get_timestamp
+    from metrics import REGISTRY, STAGE_SECONDS
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+# マニフェストに記録するパッケージ（インポートせずにバージョンだけ取得）
+TRACKED_PACKAGES = ["openai-whisper", "torch", "librosa", "numpy", "openai", "notion-client"]
+
+
+def get_versions() -> Dict[str, Optional[str]]:
+    """Python・主要パッケージ・コードのバージョン"""
+    from importlib import metadata
+
+    versions: Dict[str, Optional[str]] = {"python": platform.python_version()}
+    for package in TRACKED_PACKAGES:
+        try:
+            versions[package] = metadata.version(package)
+        except metadata.PackageNotFoundError:
+            versions[package] = None
+    try:
+        versions["git_commit"] = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT, capture_output=True,
+            text=True, timeout=5
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        versions["git_commit"] = None
+    return versions
+
+
+def get_host_info() -> Dict[str, Any]:
+    """実行ホストの情報"""
+    return {
+        "hostname": socket.gethostname(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "pid": os.getpid(),
+    }
+
+
+def _fingerprint_file(path: Path) -> Optional[str]:
+    """ファイル内容の短いハッシュ（なければNone）"""
+    if not path.exists():
+        return None
+    return hashlib.sha256(path.read_bytes()).hexdigest()[:12]
+
+
+def get_config_fingerprints() -> Dict[str, Optional[str]]:
+    """設定・知識ベースのハッシュ（実行間で何が変わったかの判定用）"""
+    settings = {name: value for name, value in vars(audio_processor_config).items()
+                if name.isupper() and isinstance(value, (dict, list))}
+    return {
+        "audio_processor_config": hashlib.sha256(
+            json.dumps(settings, sort_keys=True, default=str).encode('utf-8')).hexdigest()[:12],
+        "knowledge_base": _fingerprint_file(Path(RUN_HISTORY_SETTINGS["knowledge_base_path"])),
+    }
+
+
+def describe_inputs(directory: Path, pattern: str = "*") -> Dict[str, Any]:
+    """
+    入力ディレクトリの概要
+
+    Args:
+        directory: 入力ディレクトリ（data/00_new など）
+        pattern: 対象ファイルのパターン
+
+    Returns:
+        ディレクトリ・ファイル数・合計バイト数・拡張子別の件数
+    """
+    directory = Path(directory)
+    files = [path for path in directory.glob(pattern) if path.is_file()] if directory.exists() else []
+    by_suffix: Dict[str, int] = {}
+    for path in files:
+        by_suffix[path.suffix.lower()] = by_suffix.get(path.suffix.lower(), 0) + 1
+    return {
+        "directory": str(directory),
+        "files": len(files),
+        "bytes": sum(path.stat().st_size for path in files),
+        "by_suffix": dict(sorted(by_suffix.items())),
+    }
+
+
+def _diff_counter(before: Dict[str, float], after: Dict[str, float]) -> Dict[str, float]:
+    diff = {key: value - before.get(key, 0.0) for key, value in after.items()}
+    return {key: value for key, value in diff.items() if value}
+
+
+def _bucket_quantile(bounds: List[float], counts: List[int], quantile: float) -> Optional[float]:
+    """累積バケットから分位点の上限を求める（最後のバケットに入る場合はNone）"""
+    total = counts[-1] if counts else 0
+    if total == 0:
+        return None
+    for bound, count in zip(bounds, counts):
+        if count >= total * quantile:
+            return bound
+    return None
+
+
+def _stage_timings(before: Dict[str, Any], after: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """ステージ別処理時間のヒストグラムの差分を集計"""
+    stages = {}
+    for stage, value in after.items():
+        previous = before.get(stage, {"count": 0, "sum": 0.0, "buckets": [0] * len(value["buckets"])})
+        count = value["count"] - previous["count"]
+        if count <= 0:
+            continue
+        total = value["sum"] - previous["sum"]
+        buckets = [a - b for a, b in zip(value["buckets"], previous["buckets"])]
+        stages[stage] = {
+            "count": count,
+            "total_sec": round(total, 3),
+            "mean_sec": round(total / count, 4),
+            "p50_le_sec": _bucket_quantile(list(STAGE_SECONDS.buckets), buckets, 0.5),
+            "p95_le_sec": _bucket_quantile(list(STAGE_SECONDS.buckets), buckets, 0.95),
+        }
+    return dict(sorted(stages.items()))
+
+
+class RunRecorder:
+    """1回の実行のマニフェストを記録"""
+
+    def __init__(self, kind: str, inputs: Optional[Dict[str, Any]] = None,
+                 options: Optional[Dict[str, Any]] = None, store_dir: Optional[str] = None):
+        """
+        実行開始を記録
+
+        Args:
+            kind: 実行の種別（analysis, notion_sync, migration など）
+            inputs: 入力の概要（ファイル数・バイト数など）
+            options: コマンドライン引数などの実行オプション
+            store_dir: 保存先（省略時は設定値）
+        """
+        self.kind = kind
+        self.store_dir = Path(store_dir or RUN_HISTORY_SETTINGS["store_dir"])
+        self.run_id = f"{get_timestamp()}_{kind}_{os.getpid()}"
+        self.manifest: Dict[str, Any] = {
+            "run_id": self.run_id,
+            "kind": kind,
+            "started_at": get_now(),
+            "inputs": inputs or {},
+            "options": {key: value for key, value in (options or {}).items()
+                        if isinstance(value, (str, int, float, bool)) or value is None},
+            "host": get_host_info(),
+            "versions": get_versions(),
+            "config": get_config_fingerprints(),
+        }
+        self._start = time.perf_counter()
+        self._before = REGISTRY.snapshot()
+
+    def finish(self, status: str = "completed", **results) -> Path:
+        """
+        実行終了を記録してマニフェストを保存
+
+        Args:
+            status: completed / interrupted / failed
+            **results: 件数などの実行結果
+
+        Returns:
+            マニフェストのパス
+        """
+        elapsed = time.perf_counter() - self._start
+        after = REGISTRY.snapshot()
+
+        def diff(name: str) -> Dict[str, float]:
+            return _diff_counter(self._before.get(name, {}), after.get(name, {}))
+
+        files = diff("ago_files_ingested_total")
+        size = diff("ago_bytes_ingested_total")
+        errors = diff("ago_files_failed_total")
+        minutes = elapsed / 60 if elapsed > 0 else None
+        self.manifest.update({
+            "finished_at": get_now(),
+            "status": status,
+            "duration_sec": round(elapsed, 3),
+            "results": results,
+            "throughput": {
+                "files": int(sum(files.values())),
+                "bytes": int(sum(size.values())),
+                "files_per_min": round(sum(files.values()) / minutes, 3) if minutes else None,
+                "mb_per_min": round(sum(size.values()) / 1024 ** 2 / minutes, 3) if minutes else None,
+                "files_by_type": files,
+            },
+            "errors": {
+                "total": int(sum(errors.values())) + int(results.get("errors", 0)),
+                "files_by_type": errors,
+            },
+            "models": diff("ago_transcriptions_total"),
+            "stages": _stage_timings(self._before.get(STAGE_SECONDS.name, {}),
+                                     after.get(STAGE_SECONDS.name, {})),
+            "notion": {
+                "api_calls": diff("ago_notion_api_calls_total"),
+                "rate_limited": diff("ago_notion_rate_limited_total"),
+            },
+        })
+
+        path = self.store_dir / self.kind / f"{self.run_id}.json"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+        prune_runs(self.kind, store_dir=self.store_dir)
+        print(f"🗂️  実行履歴を記録しました: {self.run_id}")
+        return path
+
+
+def list_runs(kind: Optional[str] = None, store_dir: Optional[Path] = None) -> List[Dict[str, Any]]:
+    """
+    保存済みのマニフェスト（古い順）
+
+    Args:
+        kind: 種別（省略時は全種別）
+        store_dir: 保存先（省略時は設定値）
+    """
+    store_dir = Path(store_dir or RUN_HISTORY_SETTINGS["store_dir"])
+    pattern = f"{kind}/*.json" if kind else "*/*.json"
+    runs = []
+    for path in store_dir.glob(pattern):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                runs.append(json.load(f))
+        except (OSError, json.JSONDecodeError):
+            continue
+    return sorted(runs, key=lambda run: run["started_at"])
+
+
+def prune_runs(kind: str, store_dir: Optional[Path] = None) -> int:
+    """種別ごとに保存件数の上限を超えた古いマニフェストを削除"""
+    store_dir = Path(store_dir or RUN_HISTORY_SETTINGS["store_dir"])
+    paths = sorted((store_dir / kind).glob("*.json"))
+    excess = paths[:max(0, len(paths) - RUN_HISTORY_SETTINGS["keep_runs"])]
+    for path in excess:
+        path.unlink()
+    return len(excess)
+
+
+def find_run(run_id: str, store_dir: Optional[Path] = None) -> Dict[str, Any]:
+    """実行IDに一致するマニフェスト（前方一致可）"""
+    matches = [run for run in list_runs(store_dir=store_dir) if run["run_id"].startswith(run_id)]
+    if len(matches) != 1:
+        raise KeyError(f"実行IDが特定できません: {run_id}（{len(matches)}件一致）")
+    return matches[0]
+
+
+def _format_change(before: Optional[float], after: Optional[float], unit: str = "") -> str:
+    if before is None or after is None:
+        return f"{before} → {after}{unit}"
+    change = f" ({(after - before) / before * 100:+.1f}%)" if before else ""
+    return f"{before:g} → {after:g}{unit}{change}"
+
+
+def compare_runs(base: Dict[str, Any], target: Dict[str, Any]):
+    """2つの実行を比較して表示"""
+    print(f"🗂️  {base['run_id']} → {target['run_id']}")
+    print(f"   所要時間      {_format_change(base.get('duration_sec'), target.get('duration_sec'), '秒')}")
+    for key, label in (("files_per_min", "ファイル/分"), ("mb_per_min", "MB/分")):
+        print(f"   {label:12s}  {_format_change(base.get('throughput', {}).get(key), target.get('throughput', {}).get(key))}")
+    print(f"   エラー        {_format_change(base.get('errors', {}).get('total'), target.get('errors', {}).get('total'))}")
+
+    # 遅くなった原因の候補（入力・設定・バージョン・ホスト・モデルの違い）
+    for section in ("inputs", "options", "config", "versions", "models"):
+        before, after = base.get(section, {}), target.get(section, {})
+        changed = {key for key in set(before) | set(after) if before.get(key) != after.get(key)}
+        for key in sorted(changed):
+            print(f"   ≠ {section}.{key}: {before.get(key)} → {after.get(key)}")
+    if base.get("host", {}).get("hostname") != target.get("host", {}).get("hostname"):
+        print(f"   ≠ host: {base['host']['hostname']} → {target['host']['hostname']}")
+
+    print("   ステージ別（平均秒 / 合計秒）:")
+    stages = set(base.get("stages", {})) | set(target.get("stages", {}))
+    for stage in sorted(stages, key=lambda s: -target.get("stages", {}).get(s, {}).get("total_sec", 0)):
+        before = base.get("stages", {}).get(stage, {})
+        after = target.get("stages", {}).get(stage, {})
+        print(f"   {stage:18s} 平均 {_format_change(before.get('mean_sec'), after.get('mean_sec'))}  "
+              f"合計 {_format_change(before.get('total_sec'), after.get('total_sec'))}")
+
+
+def show_trend(kind: str = "analysis", limit: int = 10):
+    """直近の実行の推移を表示"""
+    runs = list_runs(kind)[-limit:]
+    if not runs:
+        print(f"📂 {kind}の実行履歴がありません")
+        return
+    top_stages = sorted(runs[-1].get("stages", {}),
+                        key=lambda s: -runs[-1]["stages"][s]["total_sec"])[:4]
+    print(f"🗂️  {kind}の直近{len(runs)}回")
+    print(f"   {'実行ID':34s} {'秒':>8s} {'件/分':>7s} {'エラー':>5s}  " +
+          "  ".join(f"{stage[:12]:>12s}" for stage in top_stages))
+    for run in runs:
+        stages = run.get("stages", {})
+        print(f"   {run['run_id']:34s} {run.get('duration_sec', 0):8.1f} "
+              f"{run.get('throughput', {}).get('files_per_min') or 0:7.2f} "
+              f"{run.get('errors', {}).get('total', 0):5d}  " +
+              "  ".join(f"{stages.get(stage, {}).get('mean_sec', 0):12.3f}" for stage in top_stages))
+
+
+def main():
+    """実行履歴の一覧・表示・比較・推移"""
+    command = sys.argv[1] if len(sys.argv) > 1 else "list"
+    args = sys.argv[2:]
+    if command == "list":
+        for run in list_runs(args[0] if args else None):
+            print(f"  {run['run_id']:34s} {run.get('status', '-'):11s} "
+                  f"{run.get('duration_sec', 0):8.1f}秒  {run.get('throughput', {}).get('files', 0)}件")
+    elif command == "show" and args:
+        print(json.dumps(find_run(args[0]), ensure_ascii=False, indent=2))
+    elif command == "compare":
+        if len(args) >= 2:
+            compare_runs(find_run(args[0]), find_run(args[1]))
+        else:
+            runs = list_runs(args[0] if args else "analysis")
+            if len(runs) < 2:
+                print("📂 比較できる実行が2回分ありません")
+                return
+            compare_runs(runs[-2], runs[-1])
+    elif command == "trend":
+        show_trend(args[0] if args else "analysis", int(args[1]) if len(args) > 1 else 10)
+    else:
+        print(__doc__)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+文字起こしセグメントの列指向ストア
+Whisperのセグメント（開始・終了時刻、対数確率、トークンID）をNumPy配列として
+.npzに保存し、本文は1つのUTF-8バイト列とオフセットで保持する。
+JSONを読み込まずに時間範囲のテキストや文字位置の時刻を引ける
+"""
+import os
+import sys
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+SEGMENT_STORE_SUFFIX = "_segments.npz"
+
+
+def save_segments(path: Path, segments: List[Dict[str, Any]]) -> Path:
+    """
+    セグメントを.npzに保存
+
+    Args:
+        path: 保存先（.npz）
+        segments: Whisperのセグメントリスト
+
+    Returns:
+        保存したファイルパス
+    """
+    import numpy as np
+
+    texts = [segment.get("text", "") for segment in segments]
+    encoded = [text.encode("utf-8") for text in texts]
+    tokens = [segment.get("tokens", []) for segment in segments]
+
+    arrays = {
+        "start": np.array([s.get("start", 0.0) for s in segments], dtype=np.float32),
+        "end": np.array([s.get("end", 0.0) for s in segments], dtype=np.float32),
+        "avg_logprob": np.array([s.get("avg_logprob", np.nan) for s in segments], dtype=np.float32),
+        "no_speech_prob": np.array([s.get("no_speech_prob", np.nan) for s in segments], dtype=np.float32),
+        "compression_ratio": np.array([s.get("compression_ratio", np.nan) for s in segments], dtype=np.float32),
+        # トークンIDは連結して保持し、セグメント境界をオフセットで表す
+        "token_ids": np.array([t for seg_tokens in tokens for t in seg_tokens], dtype=np.int32),
+        "token_offsets": np.cumsum([0] + [len(t) for t in tokens], dtype=np.int64),
+        # 本文はUTF-8の1バイト列（スライス用のバイト位置と検索用の文字位置）
+        "text_blob": np.frombuffer(b"".join(encoded), dtype=np.uint8),
+        "byte_offsets": np.cumsum([0] + [len(b) for b in encoded], dtype=np.int64),
+        "char_offsets": np.cumsum([0] + [len(t) for t in texts], dtype=np.int64),
+    }
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # np.savezは拡張子.npzを自動付与するため、一時ファイルも.npzで終わらせる
+    tmp_path = path.with_name(f"{path.stem}.tmp.npz")
+    np.savez_compressed(tmp_path, **arrays)
+    os.replace(tmp_path, path)
+    return path
+
+
+class SegmentStore:
+    """保存済みセグメントの読み取り専用ビュー"""
+
+    def __init__(self, path: Path):
+        """
+        初期化（配列を読み込む）
+
+        Args:
+            path: save_segmentsで保存した.npz
+        """
+        import numpy as np
+
+        self.path = Path(path)
+        with np.load(self.path, allow_pickle=False) as data:
+            self.start = data["start"]
+            self.end = data["end"]
+            self.avg_logprob = data["avg_logprob"]
+            self.no_speech_prob = data["no_speech_prob"]
+            self.compression_ratio = data["compression_ratio"]
+            self.token_ids = data["token_ids"]
+            self.token_offsets = data["token_offsets"]
+            self.byte_offsets = data["byte_offsets"]
+            self.char_offsets = data["char_offsets"]
+            self._blob = data["text_blob"].tobytes()
+
+    def __len__(self) -> int:
+        return len(self.start)
+
+    @property
+    def text(self) -> str:
+        """全文"""
+        return self._blob.decode("utf-8")
+
+    def segment_text(self, index: int) -> str:
+        """セグメントのテキスト"""
+        return self._blob[self.byte_offsets[index]:self.byte_offsets[index + 1]].decode("utf-8")
+
+    def segment_tokens(self, index: int) -> List[int]:
+        """セグメントのトークンID"""
+        return self.token_ids[self.token_offsets[index]:self.token_offsets[index + 1]].tolist()
+
+    def get_segment(self, index: int) -> Dict[str, Any]:
+        """セグメントを辞書で取得（Whisperのセグメントと同じキー）"""
+        return {
+            "id": index,
+            "start": float(self.start[index]),
+            "end": float(self.end[index]),
+            "text": self.segment_text(index),
+            "tokens": self.segment_tokens(index),
+            "avg_logprob": float(self.avg_logprob[index]),
+            "no_speech_prob": float(self.no_speech_prob[index]),
+            "compression_ratio": float(self.compression_ratio[index]),
+        }
+
+    def find_segments(self, start_sec: float, end_sec: float) -> range:
+        """
+        時間範囲と重なるセグメントの番号範囲
+
+        セグメントは時刻順に並んでいるため二分探索で求める
+        """
+        import numpy as np
+
+        first = int(np.searchsorted(self.end, start_sec, side="right"))
+        last = int(np.searchsorted(self.start, end_sec, side="left"))
+        return range(first, max(first, last))
+
+    def text_for_range(self, start_sec: float, end_sec: float) -> str:
+        """
+        時間範囲のテキストを取得
+
+        Args:
+            start_sec: 開始時刻（秒）
+            end_sec: 終了時刻（秒）
+
+        Returns:
+            範囲と重なるセグメントのテキスト
+        """
+        indices = self.find_segments(start_sec, end_sec)
+        if not indices:
+            return ""
+        return self._blob[self.byte_offsets[indices.start]:self.byte_offsets[indices.stop]].decode("utf-8")
+
+    def time_at_char(self, char_offset: int) -> Optional[float]:
+        """
+        全文中の文字位置に対応する時刻を取得
+
+        セグメント内は文字数で線形補間する
+
+        Args:
+            char_offset: 全文中の文字位置
+
+        Returns:
+            時刻（秒）、範囲外ならNone
+        """
+        import numpy as np
+
+        if len(self) == 0 or char_offset < 0 or char_offset >= self.char_offsets[-1]:
+            return None
+        index = int(np.searchsorted(self.char_offsets, char_offset, side="right")) - 1
+        seg_chars = self.char_offsets[index + 1] - self.char_offsets[index]
+        ratio = (char_offset - self.char_offsets[index]) / seg_chars if seg_chars else 0.0
+        return float(self.start[index] + (self.end[index] - self.start[index]) * ratio)
+
+
+def get_segment_store_path(output_dir: Path, base_filename: str) -> Path:
+    """文字起こし結果に対応するセグメントストアのパス"""
+    return Path(output_dir) / f"{base_filename}{SEGMENT_STORE_SUFFIX}"
+
+
+def main():
+    """時間範囲のテキストを表示"""
+    if len(sys.argv) < 2:
+        print("使い方: python segment_store.py <segments.npz> [開始秒] [終了秒]")
+        sys.exit(1)
+
+    store = SegmentStore(Path(sys.argv[1]))
+    start_sec = float(sys.argv[2]) if len(sys.argv) > 2 else 0.0
+    end_sec = float(sys.argv[3]) if len(sys.argv) > 3 else float(store.end[-1]) if len(store) else 0.0
+
+    print(f"📑 {store.path.name}: {len(store)}セグメント / {len(store.token_ids)}トークン")
+    for index in store.find_segments(start_sec, end_sec):
+        print(f"  [{store.start[index]:7.1f} - {store.end[index]:7.1f}] {store.segment_text(index)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+構造化ログ（JSON Lines）
+"ago.{サブシステム}" のロガーに出したログをキュー経由でバックグラウンドスレッドに渡し、
+コンソール（従来どおりメッセージのみ）と logs/ago.jsonl（1行1レコードのJSON）に書き出す。
+呼び出し側はキューに積むだけなので、ファイル・コンソールへの書き込みで処理が止まらない
+（printで出す対話表示の前には flush_logging() で順序を揃える）
+
+サブシステムごとの出力レベルは設定・環境変数・--log-level で指定できる
+    AGO_LOG_LEVEL="INFO,audio=DEBUG,data_manager=WARNING"
+quietでは警告未満をロガーの段階で捨てるため、info()/debug()の呼び出しはほぼ無コスト
+（メッセージは "%s" 形式の引数で渡し、無効なレベルでは文字列を組み立てない）
+"""
+import os
+import sys
+import json
+import queue
+import copy
+import atexit
+import logging
+import threading
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
+from pathlib import Path
+from typing import Dict, Any, Iterable, Optional
+
+# 設定のインポート（相対/絶対インポートの両方に対応）
+try:
+    from .audio_processor_config import LOGGING_SETTINGS
+except ImportError:
+    from audio_processor_config import LOGGING_SETTINGS
+
+ROOT_LOGGER = "ago"
+
+# LogRecordの標準属性（これ以外はextraで渡された項目としてJSONに含める）
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """1レコード1行のJSON"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "subsystem": record.name[len(ROOT_LOGGER) + 1:] if record.name.startswith(ROOT_LOGGER + ".")
+            else record.name,
+            "msg": record.getMessage(),
+            "pid": record.process,
+            "thread": record.threadName,
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value if isinstance(value, (str, int, float, bool)) or value is None else str(value)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+
+_EXC_FORMATTER = logging.Formatter()
+
+
+class _DroppingQueueHandler(QueueHandler):
+    """キューが満杯なら警告未満のレコードを捨てる（処理側を待たせない）"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """メッセージを確定し、例外はメッセージに混ぜずexc_textとして渡す"""
+        record = copy.copy(record)
+        if record.exc_info:
+            record.exc_text = _EXC_FORMATTER.formatException(record.exc_info)
+        record.msg = record.message = record.getMessage()
+        record.args = None
+        record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        if record.levelno >= logging.WARNING:
+            self.queue.put(record)
+            return
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class _DrainingQueueListener(QueueListener):
+    """停止時はキューに空きができるまで待って終了の目印を積む（満杯でもqueue.Fullにしない）"""
+
+    def enqueue_sentinel(self):
+        # 書き出しスレッドは動いているため、残りのレコードを書き出すにつれて空きができる
+        self.queue.put(self._sentinel)
+
+
+def parse_levels(spec: Optional[str]) -> Dict[str, int]:
+    """
+    レベル指定を解析
+
+    Args:
+        spec: "INFO" または "INFO,audio=DEBUG,data_manager=WARNING"
+
+    Returns:
+        サブシステム名 → レベル（""は全体の既定）
+    """
+    levels: Dict[str, int] = {}
+    for part in (spec or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        subsystem, _, level = part.rpartition("=")
+        levels[subsystem.strip()] = logging.getLevelName(level.strip().upper())
+        if not isinstance(levels[subsystem.strip()], int):
+            raise ValueError(f"不明なログレベルです: {level}")
+    return levels
+
+
+def _configure_levels(level: Optional[str] = None, quiet: bool = False):
+    """サブシステムごとのレベルを設定（設定値 → 環境変数 → 引数の順に上書き）"""
+    levels = {"": logging.getLevelName(LOGGING_SETTINGS["default_level"])}
+    levels.update({name: logging.getLevelName(value) for name, value in LOGGING_SETTINGS["levels"].items()})
+    levels.update(parse_levels(os.environ.get("AGO_LOG_LEVEL")))
+    levels.update(parse_levels(level))
+    if quiet:
+        levels = {name: max(value, logging.WARNING) for name, value in levels.items()}
+
+    logging.getLogger(ROOT_LOGGER).setLevel(levels.pop(""))
+    for name in list(logging.root.manager.loggerDict):
+        if name.startswith(ROOT_LOGGER + "."):
+            logging.getLogger(name).setLevel(logging.NOTSET)
+    for name, value in levels.items():
+        logging.getLogger(f"{ROOT_LOGGER}.{name}").setLevel(value)
+
+
+class _LazyHandler(logging.Handler):
+    """最初のログが出た時点で既定の設定のキューを開始（ログを出さないコマンドはスレッドもファイルも作らない）"""
+
+    def handle(self, record: logging.LogRecord) -> bool:
+        with _lock:
+            if _handler is None:
+                _start_listener()
+        return _handler.handle(record)
+
+    def emit(self, record: logging.LogRecord):
+        pass
+
+
+_lock = threading.Lock()
+_listener: Optional[QueueListener] = None
+_handler: Optional[_DroppingQueueHandler] = None
+
+
+def _start_listener(log_path: Optional[str] = None, console: Optional[bool] = None,
+                    extra_handlers: Iterable[logging.Handler] = ()):
+    """キューとバックグラウンドの書き出しスレッドを開始（ロック内で呼ぶ）"""
+    global _listener, _handler
+    handlers = []
+    if LOGGING_SETTINGS["console"] if console is None else console:
+        console_handler = logging.StreamHandler(sys.stdout)
+        console_handler.setFormatter(logging.Formatter("%(message)s"))
+        handlers.append(console_handler)
+    log_path = LOGGING_SETTINGS["log_path"] if log_path is None else log_path
+    if log_path:
+        Path(log_path).parent.mkdir(parents=True, exist_ok=True)
+        file_handler = logging.FileHandler(log_path, encoding='utf-8')
+        file_handler.setFormatter(JsonFormatter())
+        handlers.append(file_handler)
+    handlers.extend(extra_handlers)
+
+    _stop_listener()
+    log_queue: queue.Queue = queue.Queue(LOGGING_SETTINGS["queue_size"])
+    _handler = _DroppingQueueHandler(log_queue)
+    _listener = _DrainingQueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    logging.getLogger(ROOT_LOGGER).handlers = [_handler]
+
+
+def _stop_listener():
+    """キューに残ったログを書き出してリスナーを停止（ロック内で呼ぶ）"""
+    global _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    for handler in _listener.handlers:
+        handler.close()
+    if _handler is not None and _handler.dropped:
+        print(f"⚠️ ログのキューが満杯のため{_handler.dropped}件のログを破棄しました", file=sys.stderr)
+    _listener = None
+
+
+def setup_logging(level: Optional[str] = None, quiet: bool = False, log_path: Optional[str] = None,
+                  console: Optional[bool] = None, extra_handlers: Iterable[logging.Handler] = ()):
+    """
+    構造化ログを設定（再設定可、既存のキューは書き出してから置き換える）
+
+    Args:
+        level: レベル指定（"INFO,audio=DEBUG" 形式、省略時は環境変数AGO_LOG_LEVEL・設定値）
+        quiet: 警告以上のみ出力
+        log_path: JSON Linesの出力先（省略時は設定値、空文字で出力しない）
+        console: コンソールに出力するか（省略時は設定値）
+        extra_handlers: 追加のハンドラー（従来形式のテキストログなど、同じキューから書き出す）
+    """
+    with _lock:
+        _configure_levels(level, quiet)
+        _start_listener(log_path, console, extra_handlers)
+
+
+def flush_logging():
+    """キューに積まれたログを書き出し終えるまで待つ（printと混在する対話表示の前に呼ぶ）"""
+    handler = _handler
+    if handler is not None and _listener is not None:
+        handler.queue.join()
+
+
+def shutdown_logging():
+    """残りのログを書き出して停止（終了時に自動で呼ばれる）"""
+    with _lock:
+        _stop_listener()
+
+
+def get_logger(subsystem: str) -> logging.Logger:
+    """
+    サブシステムのロガー
+
+    Args:
+        subsystem: analyzer, data_manager, audio, pipeline, scheduler, worker, admission, retry, sync など
+    """
+    return logging.getLogger(f"{ROOT_LOGGER}.{subsystem}")
+
+
+# 既定のレベルと遅延初期化のハンドラーを設定
+_root = logging.getLogger(ROOT_LOGGER)
+if not _root.handlers:
+    _root.handlers = [_LazyHandler()]
+    _root.propagate = False
+    _configure_levels()
+atexit.register(shutdown_logging)
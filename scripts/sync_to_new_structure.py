@@ -12,21 +12,27 @@ import sys
 from datetime import datetime
 from pathlib import Path
 
+# Run history and logging (works both as package module and standalone script)
+try:
+    from .run_history import RunRecorder, describe_inputs
+    from .structured_logging import get_logger, setup_logging
+except ImportError:
+    from run_history import RunRecorder, describe_inputs
+    from structured_logging import get_logger, setup_logging
+
 # Setup logging
 LOG_DIR = Path("/Users/ago/AG_AI/logs")
 LOG_DIR.mkdir(exist_ok=True)
 LOG_FILE = LOG_DIR / "sync_log.txt"
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(LOG_FILE),
-        logging.StreamHandler()
-    ]
-)
+logger = get_logger("sync")
+
 
-logger = logging.getLogger(__name__)
+def setup_sync_logging():
+    """Route sync logs through the shared queue, keeping the plain-text sync_log.txt for monitor_migration"""
+    file_handler = logging.FileHandler(LOG_FILE)
+    file_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+    setup_logging(extra_handlers=[file_handler])
 
 # Base paths
 BASE_DIR = Path("/Users/ago/AG_AI/data")
@@ -87,20 +93,20 @@ def sync_directory(source_dir, target_dir, preserve_subdirs=False, dry_run=False
                                 target_hash = get_file_hash(target_path)
                                 
                                 if source_hash == target_hash:
-                                    logger.debug(f"Skipping duplicate: {file_path.name}")
+                                    logger.debug("Skipping duplicate: %s", file_path.name)
                                     skipped += 1
                                     continue
                             
                             # Copy file
                             if dry_run:
-                                logger.info(f"[DRY RUN] Would copy: {subdir.name}/{file_path.name} -> {target_path}")
+                                logger.info("[DRY RUN] Would copy: %s/%s -> %s", subdir.name, file_path.name, target_path)
                             else:
                                 shutil.copy2(file_path, target_path)
-                                logger.info(f"Copied: {subdir.name}/{file_path.name} -> {target_path}")
+                                logger.info("Copied: %s/%s -> %s", subdir.name, file_path.name, target_path)
                             copied += 1
                             
                         except Exception as e:
-                            logger.error(f"Error copying {file_path}: {str(e)}")
+                            logger.error("Error copying %s: %s", file_path, e)
                             stats["errors"] += 1
     else:
         # Handle flat directory structure (like 00_new)
@@ -115,35 +121,38 @@ def sync_directory(source_dir, target_dir, preserve_subdirs=False, dry_run=False
                         target_hash = get_file_hash(target_path)
                         
                         if source_hash == target_hash:
-                            logger.debug(f"Skipping duplicate: {file_path.name}")
+                            logger.debug("Skipping duplicate: %s", file_path.name)
                             skipped += 1
                             continue
                     
                     # Copy file
                     if dry_run:
-                        logger.info(f"[DRY RUN] Would copy: {file_path.name} -> {target_path}")
+                        logger.info("[DRY RUN] Would copy: %s -> %s", file_path.name, target_path)
                     else:
                         shutil.copy2(file_path, target_path)
-                        logger.info(f"Copied: {file_path.name} -> {target_path}")
+                        logger.info("Copied: %s -> %s", file_path.name, target_path)
                     copied += 1
                     
                 except Exception as e:
-                    logger.error(f"Error copying {file_path}: {str(e)}")
+                    logger.error("Error copying %s: %s", file_path, e)
                     stats["errors"] += 1
     
     return copied, skipped
 
 
-def main():
-    """Main sync function"""
+def main(dry_run=None):
+    """Main sync function (dry_run defaults to the --dry-run command line flag)"""
     # Check for command line arguments
-    dry_run = '--dry-run' in sys.argv
+    if dry_run is None:
+        dry_run = '--dry-run' in sys.argv
     
+    setup_sync_logging()
     if dry_run:
         logger.info("=== Starting sync process (DRY RUN MODE) ===")
     else:
         logger.info("=== Starting sync process ===")
     
+    recorder = RunRecorder("structure_sync", inputs=describe_inputs(OLD_NEW_DIR), options={"dry_run": dry_run})
     try:
         # Ensure directories exist
         ensure_directories()
@@ -179,8 +188,13 @@ def main():
     except Exception as e:
         logger.error(f"Fatal error during sync: {str(e)}")
         stats["errors"] += 1
+        recorder.finish("failed", files_copied=stats["files_copied"],
+                        files_skipped=stats["files_skipped"], errors=stats["errors"])
         raise
     
+    recorder.finish("completed" if stats["errors"] == 0 else "failed", files_copied=stats["files_copied"],
+                    files_skipped=stats["files_skipped"], errors=stats["errors"])
+    
     logger.info("=== Sync process completed ===")
     return stats["errors"] == 0
 
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+ステージ単位のトレース
+走査・ハッシュ・デコード・文字起こし・抽出・知識適用・保存・移動などの区間を
+スパンとして記録し、Chrome/Perfetto のトレースイベント形式（JSON）で書き出す。
+chrome://tracing または https://ui.perfetto.dev で開くと、ファイル・ワーカーごとに
+一括処理がどこで時間を使ったかを時系列で確認できる
+
+トレースを有効にしていないときのspan()は所要時間をメトリクス（ステージ別ヒストグラム）に
+加えるだけなので、常時呼び出してよい
+"""
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager, ExitStack
+from pathlib import Path
+from typing import Callable, Dict, Any, List, Optional
+
+# 共通処理のインポート（相対/絶対インポートの両方に対応）
+try:
+    from .date_utils import get_now, get_timestamp
+    from .metrics import STAGE_SECONDS
+except ImportError:
+    from date_utils import get_now, get_timestamp
+    from metrics import STAGE_SECONDS
+
+
+class Span:
+    """計測中の区間（終了までset()で属性を追加できる）"""
+
+    __slots__ = ("name", "category", "attributes", "start")
+
+    def __init__(self, name: str, category: str, attributes: Dict[str, Any]):
+        self.name = name
+        self.category = category
+        self.attributes = attributes
+        self.start = time.perf_counter()
+
+    def set(self, **attributes):
+        """属性を追加（文字数・使用モデルなど終了時に分かる値）"""
+        self.attributes.update(attributes)
+
+
+class _NullSpan:
+    """トレース無効時のスパン"""
+
+    __slots__ = ()
+
+    def set(self, **attributes):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Tracer:
+    """スパンを集めてトレースイベントに変換"""
+
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.started_at = get_now()
+        self.events: List[Dict[str, Any]] = []
+        self._threads: Dict[int, str] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name: str, category: str = "stage", **attributes):
+        """
+        区間を計測
+
+        Args:
+            name: スパン名（decode, transcribe など）
+            category: 分類（stage, file, io など）
+            **attributes: ファイル名・サイズ・モデルなどの属性
+        """
+        span = Span(name, category, attributes)
+        try:
+            yield span
+        except BaseException as e:
+            span.set(error=f"{type(e).__name__}: {e}")
+            raise
+        finally:
+            end = time.perf_counter()
+            STAGE_SECONDS.labels(name).observe(end - span.start)
+            self._record(span, end)
+
+    def _record(self, span: Span, end: float):
+        thread = threading.current_thread()
+        event = {
+            "name": span.name,
+            "cat": span.category,
+            "ph": "X",
+            "ts": round((span.start - self.origin) * 1e6, 1),
+            "dur": round((end - span.start) * 1e6, 1),
+            "pid": os.getpid(),
+            "tid": thread.ident,
+            "args": {key: _to_json_value(value) for key, value in span.attributes.items()},
+        }
+        with self._lock:
+            self.events.append(event)
+            self._threads.setdefault(thread.ident, thread.name)
+
+    def to_chrome_trace(self) -> Dict[str, Any]:
+        """Chrome/Perfettoのトレースイベント形式に変換"""
+        with self._lock:
+            events = list(self.events)
+            threads = dict(self._threads)
+        metadata = [{"name": "process_name", "ph": "M", "pid": os.getpid(),
+                     "args": {"name": "AGO analysis"}}]
+        metadata += [{"name": "thread_name", "ph": "M", "pid": os.getpid(), "tid": tid,
+                      "args": {"name": name}} for tid, name in threads.items()]
+        return {
+            "traceEvents": metadata + sorted(events, key=lambda event: event["ts"]),
+            "displayTimeUnit": "ms",
+            "otherData": {"started_at": self.started_at},
+        }
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """スパン名ごとの回数・合計・最大（秒）"""
+        totals: Dict[str, Dict[str, float]] = {}
+        with self._lock:
+            for event in self.events:
+                entry = totals.setdefault(event["name"], {"count": 0, "total_sec": 0.0, "max_sec": 0.0})
+                seconds = event["dur"] / 1e6
+                entry["count"] += 1
+                entry["total_sec"] += seconds
+                entry["max_sec"] = max(entry["max_sec"], seconds)
+        return totals
+
+    def export(self, path: Optional[Path] = None) -> Path:
+        """
+        トレースをJSONに書き出す
+
+        Args:
+            path: 出力先（省略時は output/traces/trace_{タイムスタンプ}.json）
+
+        Returns:
+            出力先のパス
+        """
+        path = Path(path) if path else Path("output/traces") / f"trace_{get_timestamp()}.json"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_chrome_trace(), f, ensure_ascii=False)
+        return path
+
+
+def _to_json_value(value: Any) -> Any:
+    """属性値をJSONに保存できる形に変換"""
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    return str(value)
+
+
+_tracer: Optional[Tracer] = None
+_span_hooks: List[Callable] = []
+
+
+def add_span_hook(hook: Callable):
+    """
+    span()の前後で実行するフックを登録（メモリ・CPUプロファイラ用）
+
+    Args:
+        hook: (name, category, attributes) を受け取りコンテキストマネージャーを返す関数
+    """
+    _span_hooks.append(hook)
+
+
+@contextmanager
+def _timed(name: str):
+    start = time.perf_counter()
+    try:
+        yield _NULL_SPAN
+    finally:
+        STAGE_SECONDS.labels(name).observe(time.perf_counter() - start)
+
+
+def enable_tracing() -> Tracer:
+    """トレースを有効化（以降のspan()が記録される）"""
+    global _tracer
+    _tracer = Tracer()
+    return _tracer
+
+
+def get_tracer() -> Optional[Tracer]:
+    """有効なトレーサー（無効ならNone）"""
+    return _tracer
+
+
+@contextmanager
+def span(name: str, category: str = "stage", **attributes):
+    """
+    区間を計測（トレース無効時は所要時間をメトリクスに加えるだけ）
+
+    使用例:
+        with span("transcribe", model=model_size) as s:
+            result = model.transcribe(audio)
+            s.set(char_count=len(result["text"]))
+    """
+    tracer = _tracer
+    if not _span_hooks:
+        with (_timed(name) if tracer is None else tracer.span(name, category, **attributes)) as active:
+            yield active
+        return
+    with ExitStack() as stack:
+        for hook in _span_hooks:
+            stack.enter_context(hook(name, category, attributes))
+        if tracer is None:
+            yield stack.enter_context(_timed(name))
+        else:
+            yield stack.enter_context(tracer.span(name, category, **attributes))
+
+
+def export_trace(path: Optional[Path] = None) -> Optional[Path]:
+    """
+    有効なトレースを書き出してスパン別の集計を表示
+
+    Args:
+        path: 出力先（省略時は output/traces/ 以下）
+
+    Returns:
+        出力先のパス（トレース無効時はNone）
+    """
+    if _tracer is None:
+        return None
+    output_path = _tracer.export(path)
+    print(f"\n🧭 トレースを保存しました: {output_path} (chrome://tracing / ui.perfetto.dev で表示)")
+    for name, entry in sorted(_tracer.summary().items(), key=lambda item: -item[1]["total_sec"]):
+        print(f"   {name:18s} {int(entry['count']):4d}回  合計 {entry['total_sec']:8.2f}秒  "
+              f"最大 {entry['max_sec']:7.2f}秒")
+    return output_path
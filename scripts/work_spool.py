@@ -0,0 +1,379 @@
+#!/usr/bin/env python3
+"""
+共有データディレクトリ上のジョブスプール（複数ホストのワーカーモード）
+取り込みフォルダのファイルごとにチケットを作り、ワーカーはチケットを
+pending/ から leased/{id}@{ワーカーID}.json へのrenameで取得する（renameは原子的なので
+同じチケットを取れるのは1台だけ）。リース中はハートビートでチケットの更新時刻を延長し、
+更新が途絶えたチケットは別のワーカーが同じくrenameで引き取る
+
+    data/.spool/registry/  取り込み済みファイルの印（O_EXCLで作成し二重登録を防ぐ）
+    data/.spool/pending/   未処理チケット
+    data/.spool/leased/    処理中チケット（ファイル名にリース保持者）
+    data/.spool/done/      完了チケット
+    data/.spool/failed/    失敗チケット
+
+スプール自体はrenameとmtimeだけを使うためNFSでも動くが、処理本体が使うflock
+（処理履歴ログ・取り込みファイルの処理権・再試行キュー）がホスト間で効くのは、
+ロックをサーバーに転送するファイルシステム（NFSv4、またはlockd付きのNFSv3）だけ。
+SMBやlocal_lock付きでマウントした共有ディレクトリでは同じホストのプロセス間でしか
+排他されないため、ワーカーモードでは使わない
+"""
+import os
+import sys
+import json
+import time
+import socket
+import hashlib
+import threading
+from pathlib import Path
+from typing import Callable, Dict, Any, Iterable, Optional
+
+# 設定・共通処理のインポート（相対/絶対インポートの両方に対応）
+try:
+    from .audio_processor_config import WORKER_SETTINGS
+    from .date_utils import get_now
+    from .structured_logging import get_logger
+except ImportError:
+    from audio_processor_config import WORKER_SETTINGS
+    from date_utils import get_now
+    from structured_logging import get_logger
+
+logger = get_logger("worker")
+
+STATES = ("registry", "pending", "leased", "done", "failed")
+
+
+class LeaseLostError(RuntimeError):
+    """リースが期限切れになり、別のワーカーに引き取られた"""
+
+
+class LeaseDeferredError(RuntimeError):
+    """今は処理できない（前のリース保持者がまだ処理中など）ため、チケットを後回しにする"""
+
+
+def get_worker_id() -> str:
+    """ワーカーID（ホスト名-プロセスID）"""
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class Lease:
+    """取得したチケットのリース（ハートビートで延長し、完了・失敗で手放す）"""
+
+    def __init__(self, spool: "WorkSpool", ticket: Dict[str, Any], lease_path: Path):
+        self.spool = spool
+        self.ticket = ticket
+        self.lease_path = lease_path
+        self.file_path = spool.base_dir / ticket["file"]
+        self.lost = False
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._heartbeat_loop, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def _heartbeat_loop(self):
+        while not self._stop.wait(self.spool.settings["heartbeat_seconds"]):
+            if not self.heartbeat():
+                return
+
+    def check(self):
+        """
+        リースを保持しているか確認（ステージの合間に呼び、失っていれば中断する）
+
+        Raises:
+            LeaseLostError: 別のワーカーに引き取られている
+        """
+        if self.lost or not self.heartbeat():
+            raise LeaseLostError(f"{self.ticket['name']} のリースが失われたため処理を中断します")
+
+    def heartbeat(self) -> bool:
+        """
+        リースを延長
+
+        Returns:
+            延長できたか（Falseなら別のワーカーに引き取られている）
+        """
+        try:
+            os.utime(self.lease_path)
+            return True
+        except FileNotFoundError:
+            self.lost = True
+            logger.warning("⚠️ %s のリースが失われました（別のワーカーが引き取り済み）", self.ticket['name'])
+            return False
+
+    def complete(self):
+        """完了チケットに移す"""
+        self._finish("done")
+
+    def fail(self, error: BaseException):
+        """
+        失敗チケットに移す
+
+        取り込みの印も消すため、ファイルが取り込みフォルダに残っていれば
+        次の取り込みで再登録される（再試行の間隔はenqueueのacceptで制御する）
+        """
+        self.ticket["error"] = str(error)
+        self._finish("failed")
+        try:
+            os.unlink(self.spool.dirs["registry"] / self.ticket["id"])
+        except FileNotFoundError:
+            pass
+
+    def defer(self, delay: Optional[float] = None):
+        """
+        チケットを未処理に戻し、delay秒（省略時はpoll_seconds）経つまで取得されないようにする
+
+        後回しはリース切れの回数（max_leases）に数えない
+        """
+        self.ticket["leases"].pop()
+        self.ticket["deferrals"] = self.ticket.get("deferrals", 0) + 1
+        self.ticket["retry_at"] = time.time() + (self.spool.settings["poll_seconds"] if delay is None else delay)
+        self.spool._rewrite(self.lease_path, self.ticket)
+        try:
+            os.rename(self.lease_path, self.spool.dirs["pending"] / f"{self.ticket['id']}.json")
+        except FileNotFoundError:
+            self.lost = True
+            raise LeaseLostError(f"{self.ticket['name']} のリースは既に失われています")
+
+    def _finish(self, state: str):
+        self.ticket[f"{state}_at"] = get_now()
+        self.spool._rewrite(self.lease_path, self.ticket)
+        try:
+            os.rename(self.lease_path, self.spool.dirs[state] / f"{self.ticket['id']}.json")
+        except FileNotFoundError:
+            self.lost = True
+            raise LeaseLostError(f"{self.ticket['name']} のリースは既に失われています")
+
+
+class WorkSpool:
+    """rename（原子的）とリースによるジョブの分配"""
+
+    def __init__(self, spool_dir: Optional[str] = None, intake_dir: Optional[Path] = None,
+                 worker_id: Optional[str] = None, settings: Optional[Dict[str, Any]] = None):
+        """
+        初期化
+
+        Args:
+            spool_dir: スプールの場所（省略時は設定値、全ワーカーで共有するディスク上に置く）
+            intake_dir: 取り込みフォルダ（チケットのファイルパスはこの親からの相対パスで保存）
+            worker_id: ワーカーID（省略時はホスト名-プロセスID）
+            settings: WORKER_SETTINGSの上書き
+        """
+        self.settings = dict(WORKER_SETTINGS, **(settings or {}))
+        self.spool_dir = Path(spool_dir or self.settings["spool_dir"])
+        self.intake_dir = Path(intake_dir or "data/00_new")
+        self.base_dir = self.intake_dir.parent
+        self.worker_id = (worker_id or get_worker_id()).replace("@", "_")
+        self.dirs = {state: self.spool_dir / state for state in STATES}
+        for directory in self.dirs.values():
+            directory.mkdir(parents=True, exist_ok=True)
+
+    def make_ticket_id(self, file_path: Path) -> str:
+        """ファイルのチケットID（相対パス・サイズ・更新時刻から決まるので全ホストで同じ値）"""
+        stat = file_path.stat()
+        relative = file_path.resolve().relative_to(self.base_dir.resolve())
+        return hashlib.sha1(f"{relative}|{stat.st_size}|{int(stat.st_mtime)}".encode()).hexdigest()[:16]
+
+    def _rewrite(self, path: Path, ticket: Dict[str, Any]):
+        """チケットを書き換え（一時ファイル経由で置き換えるので更新時刻も新しくなる）"""
+        tmp_path = path.with_name(f".{path.name}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(ticket, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+
+    def enqueue(self, files: Iterable[Path], accept: Optional[Callable[[Path], bool]] = None) -> int:
+        """
+        取り込みフォルダのファイルをチケットにする（登録済みのファイルは無視）
+
+        Args:
+            files: 取り込みフォルダのファイル
+            accept: 登録するかを判定する関数（再試行待ちのファイルを除くなど）
+
+        Returns:
+            新しく登録したチケット数
+        """
+        added = 0
+        for file_path in files:
+            if accept is not None and not accept(file_path):
+                continue
+            try:
+                ticket_id = self.make_ticket_id(file_path)
+                # 取り込みの印をO_EXCLで作れたワーカーだけがチケットを作る
+                fd = os.open(self.dirs["registry"] / ticket_id, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except (FileExistsError, FileNotFoundError):
+                continue
+            os.close(fd)
+
+            ticket = {
+                "id": ticket_id,
+                "name": file_path.name,
+                "file": str(file_path.resolve().relative_to(self.base_dir.resolve())),
+                "enqueued_at": get_now(),
+                "enqueued_by": self.worker_id,
+                "leases": [],
+            }
+            self._rewrite(self.dirs["pending"] / f"{ticket_id}.json", ticket)
+            added += 1
+        return added
+
+    def claim(self) -> Optional[Lease]:
+        """
+        チケットを1件取得（未処理を優先し、なければ期限切れのリースを引き取る）
+
+        Returns:
+            取得したリース、なければNone
+        """
+        now = time.time()
+        for ticket_path in sorted(self.dirs["pending"].glob("*.json")):
+            if self._retry_at(ticket_path) > now:
+                continue
+            lease = self._take(ticket_path, ticket_path.stem)
+            if lease:
+                return lease
+
+        expires_before = time.time() - self.settings["lease_seconds"]
+        for lease_path in sorted(self.dirs["leased"].glob("*.json")):
+            ticket_id, _, holder = lease_path.stem.partition("@")
+            if holder == self.worker_id:
+                continue
+            try:
+                if lease_path.stat().st_mtime >= expires_before:
+                    continue
+            except FileNotFoundError:
+                continue
+            lease = self._take(lease_path, ticket_id)
+            if lease:
+                logger.info("♻️  %s のリース切れチケットを引き取りました: %s", holder, lease.ticket['name'])
+                return lease
+        return None
+
+    @staticmethod
+    def _retry_at(ticket_path: Path) -> float:
+        """後回しにしたチケットの次の取得可能時刻（後回しでなければ0）"""
+        try:
+            with open(ticket_path, 'r', encoding='utf-8') as f:
+                return json.load(f).get("retry_at", 0)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return 0
+
+    def _take(self, source: Path, ticket_id: str) -> Optional[Lease]:
+        """チケットをrenameで自分のリースにする（他のワーカーが先に取った場合はNone）"""
+        lease_path = self.dirs["leased"] / f"{ticket_id}@{self.worker_id}.json"
+        try:
+            # rename前に更新時刻を進め、取得直後のチケットが期限切れに見えないようにする
+            os.utime(source)
+            os.rename(source, lease_path)
+            with open(lease_path, 'r', encoding='utf-8') as f:
+                ticket = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+        ticket["leases"].append({"worker": self.worker_id, "claimed_at": get_now()})
+        lease = Lease(self, ticket, lease_path)
+        if len(ticket["leases"]) > self.settings["max_leases"]:
+            logger.error("❌ %s: リースが%d回切れたため失敗扱いにします", ticket['name'], self.settings['max_leases'])
+            lease.fail(RuntimeError("リースの期限切れが続いたため中止"))
+            return None
+        self._rewrite(lease_path, ticket)
+        return lease
+
+    def run(self, handler: Callable[[Path], Any], list_files: Optional[Callable[[], Iterable[Path]]] = None,
+            accept: Optional[Callable[[Path], bool]] = None, max_jobs: Optional[int] = None) -> Dict[str, int]:
+        """
+        ワーカーとしてジョブを処理し続ける
+
+        Args:
+            handler: ファイルパスとリースを受け取って処理する関数
+                （ステージの合間にlease.check()を呼び、リースを失っていれば中断する。
+                今は処理できない場合はLeaseDeferredErrorを送出するとチケットを後回しにする）
+            list_files: 取り込みフォルダのファイル一覧を返す関数（各ワーカーが登録も行う）
+            accept: enqueueに渡す判定関数
+            max_jobs: この件数を処理したら終了（Noneで無制限）
+
+        Returns:
+            {"completed", "failed", "lost", "deferred"}
+        """
+        stats = {"completed": 0, "failed": 0, "lost": 0, "deferred": 0}
+        idle_since = time.time()
+        idle_exit = self.settings["idle_exit_seconds"]
+        print(f"👷 ワーカー {self.worker_id} を開始しました（スプール: {self.spool_dir}）")
+
+        while max_jobs is None or stats["completed"] + stats["failed"] + stats["lost"] < max_jobs:
+            if list_files is not None:
+                self.enqueue(list_files(), accept)
+            lease = self.claim()
+            if lease is None:
+                if idle_exit is not None and time.time() - idle_since >= idle_exit:
+                    break
+                time.sleep(self.settings["poll_seconds"])
+                continue
+
+            with lease:
+                try:
+                    handler(lease.file_path, lease)
+                    lease.complete()
+                    stats["completed"] += 1
+                except LeaseDeferredError as e:
+                    logger.info("⏸️  %s（%s秒後に再確認）", e, self.settings["poll_seconds"])
+                    try:
+                        # retry_atまではclaimで取り直さない（他になければpoll_secondsずつ待つ）
+                        lease.defer()
+                    except LeaseLostError:
+                        pass
+                    stats["deferred"] += 1
+                except LeaseLostError as e:
+                    logger.warning("⚠️ %s", e)
+                    stats["lost"] += 1
+                except Exception as e:
+                    logger.error("❌ %s の処理中にエラー: %s", lease.ticket['name'], e)
+                    try:
+                        lease.fail(e)
+                    except LeaseLostError:
+                        pass
+                    stats["failed"] += 1
+            idle_since = time.time()
+
+        print(f"👷 ワーカー {self.worker_id} を終了します "
+              f"(完了 {stats['completed']} / 失敗 {stats['failed']} / リース喪失 {stats['lost']})")
+        return stats
+
+    def gc(self) -> int:
+        """保持期間を過ぎた完了チケットとその取り込みの印を削除"""
+        cutoff = time.time() - self.settings["done_retention_days"] * 86400
+        removed = 0
+        for ticket_path in self.dirs["done"].glob("*.json"):
+            if ticket_path.stat().st_mtime < cutoff:
+                ticket_path.unlink()
+                (self.dirs["registry"] / ticket_path.stem).unlink(missing_ok=True)
+                removed += 1
+        return removed
+
+    def status(self) -> Dict[str, int]:
+        """状態ごとのチケット数"""
+        return {state: len(list(self.dirs[state].glob("*.json")))
+                for state in ("pending", "leased", "done", "failed")}
+
+
+def main():
+    """スプールの状態表示・完了チケットの削除"""
+    command = sys.argv[1] if len(sys.argv) > 1 else "status"
+    spool = WorkSpool()
+    if command == "gc":
+        print(f"🧹 {spool.gc()}件の完了チケットを削除しました")
+        return
+
+    print(f"📬 スプール {spool.spool_dir}: {spool.status()}")
+    for lease_path in sorted(spool.dirs["leased"].glob("*.json")):
+        age = time.time() - lease_path.stat().st_mtime
+        print(f"  {lease_path.stem}  最終ハートビート {age:.0f}秒前")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,7 +7,9 @@ echo "================================"
 # プロジェクトディレクトリの確認
 PROJECT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
 PYTHON_ENV="$PROJECT_DIR/venv/bin/python"
-SYNC_SCRIPT="$PROJECT_DIR/notion_sync.py"
+SYNC_SCRIPT="$PROJECT_DIR/ago.py"
+# 同期コマンド（末尾に日数を付ける）
+SYNC_COMMAND="$SYNC_SCRIPT sync-notion --days"
 
 echo "📁 プロジェクトディレクトリ: $PROJECT_DIR"
 
@@ -38,23 +40,23 @@ read -p "選択してください (1-6): " choice
 case $choice in
     1)
         # 毎日朝9時
-        CRON_ENTRY="0 9 * * * cd $PROJECT_DIR && $PYTHON_ENV $SYNC_SCRIPT 1 >> logs/notion_sync.log 2>&1"
+        CRON_ENTRY="0 9 * * * cd $PROJECT_DIR && $PYTHON_ENV $SYNC_COMMAND 1 >> logs/notion_sync.log 2>&1"
         echo "設定: 毎日朝9時に前日の議事録を同期"
         ;;
     2)
         # 毎日2回
-        CRON_ENTRY1="0 9 * * * cd $PROJECT_DIR && $PYTHON_ENV $SYNC_SCRIPT 1 >> logs/notion_sync.log 2>&1"
-        CRON_ENTRY2="0 18 * * * cd $PROJECT_DIR && $PYTHON_ENV $SYNC_SCRIPT 1 >> logs/notion_sync.log 2>&1"
+        CRON_ENTRY1="0 9 * * * cd $PROJECT_DIR && $PYTHON_ENV $SYNC_COMMAND 1 >> logs/notion_sync.log 2>&1"
+        CRON_ENTRY2="0 18 * * * cd $PROJECT_DIR && $PYTHON_ENV $SYNC_COMMAND 1 >> logs/notion_sync.log 2>&1"
         echo "設定: 毎日朝9時・夕方18時に前日の議事録を同期"
         ;;
     3)
         # 平日のみ
-        CRON_ENTRY="0 9 * * 1-5 cd $PROJECT_DIR && $PYTHON_ENV $SYNC_SCRIPT 1 >> logs/notion_sync.log 2>&1"
+        CRON_ENTRY="0 9 * * 1-5 cd $PROJECT_DIR && $PYTHON_ENV $SYNC_COMMAND 1 >> logs/notion_sync.log 2>&1"
         echo "設定: 平日（月-金）朝9時に前日の議事録を同期"
         ;;
     4)
         # 毎時間（営業時間内）
-        CRON_ENTRY="0 9-18 * * * cd $PROJECT_DIR && $PYTHON_ENV $SYNC_SCRIPT 1 >> logs/notion_sync.log 2>&1"
+        CRON_ENTRY="0 9-18 * * * cd $PROJECT_DIR && $PYTHON_ENV $SYNC_COMMAND 1 >> logs/notion_sync.log 2>&1"
         echo "設定: 営業時間内（9-18時）毎時間、前日の議事録を同期"
         ;;
     5)
@@ -62,7 +64,7 @@ case $choice in
         echo "例: '0 */4 * * *' = 4時間毎"
         echo "例: '0 9,13,17 * * 1-5' = 平日の9時,13時,17時"
         read -p "cron形式で入力: " custom_cron
-        CRON_ENTRY="$custom_cron cd $PROJECT_DIR && $PYTHON_ENV $SYNC_SCRIPT 1 >> logs/notion_sync.log 2>&1"
+        CRON_ENTRY="$custom_cron cd $PROJECT_DIR && $PYTHON_ENV $SYNC_COMMAND 1 >> logs/notion_sync.log 2>&1"
         echo "設定: カスタム - $custom_cron"
         ;;
     6)
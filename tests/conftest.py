@@ -0,0 +1,21 @@
+#!/usr/bin/env python3
+"""
+テスト共通設定
+プロジェクトルートをインポートパスに追加し、構造化ログをファイルに書き出さないようにする
+"""
+import sys
+from pathlib import Path
+
+import pytest
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+if str(PROJECT_DIR) not in sys.path:
+    sys.path.insert(0, str(PROJECT_DIR))
+
+
+@pytest.fixture(autouse=True, scope="session")
+def _no_log_file():
+    """テスト中のログで logs/ago.jsonl を作らない"""
+    from scripts.structured_logging import setup_logging
+    setup_logging(log_path="", console=False)
+    yield
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+ago.py の起動時間と読み込むモジュールのテスト
+cronで頻繁に呼ぶサブコマンドが音声処理・分析のモジュールを読み込まないことを確認する
+"""
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+AGO_SCRIPT = PROJECT_DIR / "ago.py"
+
+# 軽量なサブコマンドで読み込まれてはいけないモジュール
+HEAVY_MODULES = ("torch", "whisper", "librosa", "numpy", "bin.analyze")
+
+# インタープリタの起動を含めた上限（遅いCI環境でも超えない値）
+STARTUP_BUDGET_SECONDS = 2.0
+
+# ago.py を実行し、最終行に読み込まれた重いモジュールと確認用のモジュールをJSONで出力する
+PROBE = """
+import json, runpy, sys
+sys.path.insert(0, {project_dir!r})
+{setup}
+sys.argv = [{script!r}] + {argv!r}
+try:
+    runpy.run_path({script!r}, run_name="__main__")
+except SystemExit:
+    pass
+print(json.dumps([sorted(name for name in {heavy!r} if name in sys.modules),
+                  sorted(name for name in {expected!r} if name in sys.modules)]))
+"""
+
+# notion-clientの代わりに読み込ませる、空のデータベースを返すクライアント
+NOTION_CLIENT_STUB = """
+import types
+class _Databases:
+    def query(self, **kwargs):
+        return {"results": [], "has_more": False, "next_cursor": None}
+class _Client:
+    def __init__(self, auth=None, **kwargs):
+        self.databases = _Databases()
+sys.modules["notion_client"] = types.ModuleType("notion_client")
+sys.modules["notion_client"].Client = _Client
+"""
+
+
+def run_ago(argv, cwd: Path, setup: str = "", expected=(), env=None):
+    """
+    ago.py をサブプロセスで実行
+
+    Returns:
+        (所要秒数, 読み込まれた重いモジュール, 読み込まれたexpectedのモジュール, 標準出力)
+    """
+    code = PROBE.format(project_dir=str(PROJECT_DIR), script=str(AGO_SCRIPT), argv=list(argv),
+                        heavy=HEAVY_MODULES, expected=tuple(expected), setup=setup)
+    started = time.perf_counter()
+    completed = subprocess.run([sys.executable, "-c", code], cwd=cwd, capture_output=True,
+                               text=True, timeout=60, env=env)
+    elapsed = time.perf_counter() - started
+    assert completed.returncode == 0, completed.stderr
+    heavy, loaded = json.loads(completed.stdout.strip().splitlines()[-1])
+    return elapsed, heavy, loaded, completed.stdout
+
+
+@pytest.mark.parametrize("argv", [
+    ["--help"],
+    ["stats"],
+    ["stats", "--runs"],
+])
+def test_light_subcommands_start_fast_without_heavy_imports(argv, tmp_path):
+    # 作業ディレクトリを分けて実データ（data/）に触れない
+    elapsed, heavy, _, _ = run_ago(argv, tmp_path)
+    assert heavy == [], f"{' '.join(argv)} が重いモジュールを読み込みました: {heavy}"
+    assert elapsed < STARTUP_BUDGET_SECONDS, f"{' '.join(argv)} の起動に{elapsed:.2f}秒かかりました"
+
+
+def test_sync_notion_runs_real_module_fast_without_heavy_imports(tmp_path):
+    # --helpは同期モジュールを読み込む前に終わるため、スタブのクライアントで実際に同期まで通す
+    env = dict(os.environ, NOTION_INTEGRATION_TOKEN="ntn_test", NOTION_DATABASE_ID="db_test")
+    elapsed, heavy, loaded, stdout = run_ago(
+        ["sync-notion", "--days", "1"], tmp_path, setup=NOTION_CLIENT_STUB,
+        expected=("notion_sync", "scripts.notion_connector"), env=env
+    )
+    assert loaded == ["notion_sync", "scripts.notion_connector"]
+    assert "同期する議事録がありませんでした" in stdout
+    assert heavy == [], f"sync-notion が重いモジュールを読み込みました: {heavy}"
+    assert elapsed < STARTUP_BUDGET_SECONDS, f"sync-notion の起動に{elapsed:.2f}秒かかりました"
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+常駐分析サービスのテスト
+不正なアップロード要求がサーバーエラーではなく400になることを確認する
+"""
+import asyncio
+import json
+
+import pytest
+
+from scripts.analysis_service import AnalysisService
+
+
+class FakeWriter:
+    """送信内容を記録するStreamWriterの代わり"""
+
+    def __init__(self):
+        self.data = b""
+
+    def write(self, data: bytes):
+        self.data += data
+
+    async def drain(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def request(service: AnalysisService, raw: bytes):
+    """生のHTTPリクエストを処理し、(ステータス, JSON本文) を返す"""
+    async def handle():
+        reader = asyncio.StreamReader()
+        reader.feed_data(raw)
+        reader.feed_eof()
+        writer = FakeWriter()
+        await service._handle(reader, writer)
+        return writer.data
+
+    head, _, body = asyncio.run(handle()).partition(b"\r\n\r\n")
+    return int(head.split(b" ")[1]), json.loads(body)
+
+
+@pytest.fixture
+def service(tmp_path):
+    service = AnalysisService({"work_dir": str(tmp_path / "service")})
+    yield service
+    service.executor.shutdown(wait=False)
+
+
+@pytest.mark.parametrize("length", [b"abc", b"-5", b"1e3"])
+def test_invalid_content_length_is_bad_request(service, length):
+    status, payload = request(service, b"POST /jobs HTTP/1.1\r\nContent-Length: " + length
+                              + b"\r\nContent-Type: application/json\r\n\r\n{}")
+    assert status == 400
+    assert "Content-Length" in payload["error"]
+
+
+@pytest.mark.parametrize("body", [b"{not json", b'{"text": "\xff\xfe"}'])
+def test_undecodable_json_body_is_bad_request(service, body):
+    status, payload = request(service, b"POST /jobs HTTP/1.1\r\nContent-Type: application/json\r\n"
+                              b"Content-Length: " + str(len(body)).encode() + b"\r\n\r\n" + body)
+    assert status == 400
+    assert "JSON" in payload["error"]
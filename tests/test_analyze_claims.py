@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+一括処理の処理権のテスト
+バッチ文字起こし・先読みデコードの前に処理権を取得し、取得できたファイルだけを対象にすることを確認する
+"""
+import pytest
+
+from scripts.data_manager import DataManager
+
+
+@pytest.fixture
+def analyzer(tmp_path, monkeypatch):
+    from bin.analyze import IntelligentBusinessAnalyzer
+
+    monkeypatch.chdir(tmp_path)
+    return IntelligentBusinessAnalyzer()
+
+
+def make_files(analyzer, names):
+    analyzer.data_manager.new_dir.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for name in names:
+        path = analyzer.data_manager.new_dir / name
+        path.write_bytes(b"\0" * 1024)
+        paths.append(path)
+    return paths
+
+
+def test_batch_transcribes_and_prefetches_only_claimed_files(analyzer, monkeypatch):
+    import scripts.audio_prefetcher as audio_prefetcher
+    import scripts.batch_transcriber as batch_transcriber
+
+    a, b, c = make_files(analyzer, ["a.mp3", "b.mp3", "c.mp3"])
+    held = DataManager().claim_file(b)
+    assert held is not None
+
+    batched = []
+    prefetched = []
+    monkeypatch.setattr(batch_transcriber, "select_short_clips",
+                        lambda paths: batched.extend(paths) or [])
+
+    class FakePrefetcher:
+        def __init__(self, paths):
+            prefetched.extend(paths)
+
+        def start(self):
+            return self
+
+        def close(self):
+            pass
+
+    monkeypatch.setattr(audio_prefetcher, "AudioPrefetcher", FakePrefetcher)
+    seen = {}
+
+    def run_scheduled(files_by_type):
+        jobs = [{"path": path, "file_type": "audio"} for path in files_by_type["audio"]]
+        seen["files"] = list(files_by_type["audio"])
+        seen["claimed"] = set(analyzer.claims)
+        analyzer._start_prefetch(jobs)
+        return {}
+
+    monkeypatch.setattr(analyzer, "run_scheduled", run_scheduled)
+    with held:
+        analyzer.run_batch({"audio": [a, b, c], "text": []})
+
+    assert batched == [a, c]
+    assert prefetched == [a, c]
+    assert seen["files"] == [a, c]
+    assert seen["claimed"] == {a, c}
+    assert analyzer.unclaimed == {b}
+    # 処理されなかった処理権も一括処理の終わりに手放す
+    assert analyzer.claims == {}
+    reclaimed = DataManager().claim_file(a)
+    assert reclaimed is not None
+    reclaimed.release()
+
+
+def test_single_file_reuses_claim_taken_for_batch(analyzer, monkeypatch):
+    (memo,) = make_files(analyzer, ["memo.txt"])
+    analyzer._claim_batch({"text": [memo]})
+    claim = analyzer.claims[memo]
+
+    used = []
+    monkeypatch.setattr(analyzer, "_analyze_claimed_file", used.append)
+    analyzer._analyze_single_file(memo)
+
+    assert used == [memo]
+    assert analyzer.unclaimed == set()
+    assert claim._fd is None
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+音声デコードの先読みのテスト
+破棄したファイルの枠が、デコードの成否にかかわらず戻ることを確認する
+"""
+import sys
+import threading
+import types
+from pathlib import Path
+
+import pytest
+
+from scripts.audio_prefetcher import AudioPrefetcher
+
+
+@pytest.fixture
+def fake_librosa(monkeypatch):
+    """デコード開始を通知し、解放されるまで待ってから結果を返す（fail.*は読み込み失敗）"""
+    started = {}
+    proceed = {}
+
+    def load(path, sr):
+        name = Path(path).name
+        started.setdefault(name, threading.Event()).set()
+        proceed.setdefault(name, threading.Event()).wait(timeout=10)
+        if name.startswith("fail"):
+            raise RuntimeError(f"cannot decode {name}")
+        return [0.0] * 16, sr
+
+    def event(table, name):
+        return table.setdefault(name, threading.Event())
+
+    monkeypatch.setitem(sys.modules, "librosa", types.SimpleNamespace(load=load))
+    return types.SimpleNamespace(started=lambda name: event(started, name),
+                                 proceed=lambda name: event(proceed, name))
+
+
+@pytest.mark.parametrize("first", ["fail.mp3", "ok.mp3"])
+def test_discard_during_decode_releases_slot(first, fake_librosa):
+    paths = [Path(first), Path("next.mp3")]
+    prefetcher = AudioPrefetcher(paths, depth=1).start()
+    try:
+        assert fake_librosa.started(first).wait(timeout=10)
+        # デコード中に破棄してからデコードを終わらせる（失敗・成功のどちらでも枠が戻る）
+        prefetcher.discard(paths[0])
+        fake_librosa.proceed(first).set()
+
+        assert fake_librosa.started("next.mp3").wait(timeout=10)
+        fake_librosa.proceed("next.mp3").set()
+        assert prefetcher.get(paths[1]) == [0.0] * 16
+    finally:
+        prefetcher.close()
+
+
+def test_failed_decode_falls_back_to_caller(fake_librosa):
+    paths = [Path("fail.mp3"), Path("ok.mp3")]
+    fake_librosa.proceed("fail.mp3").set()
+    fake_librosa.proceed("ok.mp3").set()
+    with AudioPrefetcher(paths, depth=1) as prefetcher:
+        assert prefetcher.get(paths[0]) is None
+        assert prefetcher.get(paths[1]) == [0.0] * 16
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+音声処理テレメトリのテスト
+記録の追記・削減がプロセス間ロックの中で行われ、保持上限を守ることを確認する
+"""
+import fcntl
+import json
+import threading
+
+from scripts.audio_processor_config import TELEMETRY_SETTINGS
+from scripts.audio_telemetry import TelemetryStore
+
+
+def record(store: TelemetryStore, index: int):
+    return store.record(f"memo{index}.mp3", 30.0, "base", "cpu", 3.0, threads=4)
+
+
+def test_record_waits_for_lock_held_by_another_process(tmp_path):
+    store = TelemetryStore(str(tmp_path / "runs.jsonl"))
+    done = threading.Event()
+
+    # 別プロセスの追記・削減中を模してロックファイルを保持する
+    with open(store.lock_file, 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        writer = threading.Thread(target=lambda: (record(store, 0), done.set()))
+        writer.start()
+        assert not done.wait(timeout=0.3)
+        fcntl.flock(lock, fcntl.LOCK_UN)
+
+    assert done.wait(timeout=10)
+    writer.join()
+    assert [r["audio_file"] for r in store.load_records()] == ["memo0.mp3"]
+
+
+def test_trim_keeps_newest_records(tmp_path, monkeypatch):
+    monkeypatch.setitem(TELEMETRY_SETTINGS, "max_records", 5)
+    store = TelemetryStore(str(tmp_path / "runs.jsonl"))
+    sizes = []
+    for index in range(12):
+        sizes.append(len(json.dumps(record(store, index), ensure_ascii=False).encode('utf-8')))
+
+    # サイズによる粗い判定は1レコード150バイト以上を前提にしている
+    assert min(sizes) >= 150
+    assert [r["audio_file"] for r in store.load_records()] == [f"memo{i}.mp3" for i in range(7, 12)]
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+短い音声メモのバッチ文字起こしのテスト
+窓の分割（境界の重なりと採用範囲）と、デコード結果のセグメント化を確認する
+"""
+import pytest
+
+from scripts.batch_transcriber import SAMPLE_RATE, WINDOW_SAMPLES, plan_windows, window_segments
+
+
+class FakeTokenizer:
+    """テキストトークンは0〜99、終端は100、タイムスタンプは101以降（0.02秒刻み）"""
+    eot = 100
+    timestamp_begin = 101
+
+    def decode(self, tokens):
+        return "".join(f"<{token}>" for token in tokens)
+
+
+def ts(seconds):
+    return FakeTokenizer.timestamp_begin + int(round(seconds / 0.02))
+
+
+def test_short_clip_is_single_window():
+    assert plan_windows(10 * SAMPLE_RATE, 2 * SAMPLE_RATE) == [
+        (0, 10 * SAMPLE_RATE, 0.0, float("inf"))
+    ]
+
+
+@pytest.mark.parametrize("seconds", [31, 45, 58, 60, 61])
+def test_windows_overlap_and_keep_ranges_tile_the_clip(seconds):
+    num_samples = seconds * SAMPLE_RATE
+    overlap = 2 * SAMPLE_RATE
+    windows = plan_windows(num_samples, overlap)
+
+    assert windows[0][0] == 0 and windows[-1][1] == num_samples
+    for (start, end, keep_from, keep_until), following in zip(windows, windows[1:]):
+        assert end - start == WINDOW_SAMPLES
+        # 次の窓は重なり分だけ手前から始まり、採用範囲は重なりの中点で切り替わる
+        assert end - following[0] == overlap
+        assert keep_until == following[2] == (following[0] + overlap / 2) / SAMPLE_RATE
+    assert windows[0][2] == 0.0 and windows[-1][3] == float("inf")
+
+
+def test_window_segments_use_timestamps_and_window_offset():
+    tokens = [ts(0.0), 1, 2, ts(2.4), ts(2.4), 3, ts(5.0), ts(5.0), 4]
+    segments = window_segments(tokens, FakeTokenizer(), 28.0, 40.0)
+
+    assert [(s["start"], s["end"], s["text"], s["tokens"]) for s in segments] == [
+        (28.0, 30.4, "<1><2>", [1, 2]),
+        (30.4, 33.0, "<3>", [3]),
+        # 終了タイムスタンプがない末尾は窓の終わりまで
+        (33.0, 40.0, "<4>", [4]),
+    ]
+
+
+def test_window_segments_without_timestamps_cover_window():
+    segments = window_segments([1, 2, FakeTokenizer.eot], FakeTokenizer(), 0.0, 12.5)
+    assert [(s["start"], s["end"], s["text"]) for s in segments] == [(0.0, 12.5, "<1><2>")]
+
+
+def test_window_segments_clamp_to_audio_end():
+    segments = window_segments([ts(0.0), 1, ts(29.0)], FakeTokenizer(), 30.0, 45.0)
+    assert segments[0]["end"] == 45.0
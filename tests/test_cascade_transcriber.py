@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+カスケード文字起こしのテスト
+低信頼区間の結合と差し替えで、テキストが重複・順序入れ替わりしないことを確認する
+"""
+import pytest
+
+from scripts import cascade_transcriber
+from scripts.cascade_transcriber import cascade_transcribe, find_redecode_windows
+
+SETTINGS = dict(cascade_transcriber.CASCADE_SETTINGS, fast_model="tiny", accurate_model="small",
+                padding_seconds=1.0, merge_gap_seconds=6.0)
+
+
+def seg(start, end, text, logprob):
+    return {"start": start, "end": end, "text": text, "avg_logprob": logprob}
+
+
+class FakeModel:
+    """transcribeで固定のセグメント（チャンク先頭からの相対時刻）を返すモデル"""
+
+    def __init__(self, segments):
+        self.segments = segments
+
+    def transcribe(self, audio, **options):
+        return {"segments": [dict(s) for s in self.segments], "language": "ja"}
+
+
+@pytest.fixture
+def models(monkeypatch):
+    loaded = {}
+    monkeypatch.setattr(cascade_transcriber, "get_whisper_model", lambda size, device=None: loaded[size])
+    return loaded
+
+
+def test_window_covers_high_confidence_segment_in_merge_gap():
+    segments = [seg(0, 5, "A", -2.0), seg(5, 8, "B", -0.1), seg(8, 12, "C", -2.0), seg(20, 25, "D", -0.1)]
+    windows = find_redecode_windows(segments, SETTINGS)
+    assert windows == [{"start": 0, "end": 12, "segment_indices": [0, 1, 2]}]
+
+
+def test_replacement_does_not_duplicate_gap_segment(models):
+    models["tiny"] = FakeModel([seg(0, 5, "あ", -2.0), seg(5, 8, "い", -0.1),
+                                seg(8, 12, "う", -2.0), seg(12, 20, "え", -0.1)])
+    # 再デコードは0〜13秒（後ろに1秒の余白）
+    models["small"] = FakeModel([seg(0, 12, "アイウ", -0.1), seg(12, 13, "エ", -0.1)])
+
+    result = cascade_transcribe([0.0] * 16000 * 20, settings=SETTINGS)
+
+    assert result["text"] == "アイウえ"
+    assert [s["id"] for s in result["segments"]] == [0, 1]
+
+
+def test_padding_segments_are_dropped(models):
+    models["tiny"] = FakeModel([seg(0, 5, "AAA", -0.1), seg(5, 10, "BBB", -2.0), seg(10, 15, "CCC", -0.1)])
+    # 4〜11秒を再デコード（前後の余白に前後のセグメントの語が入る）
+    models["small"] = FakeModel([seg(0, 1, "A", -0.1), seg(1, 6, "bbb", -0.1), seg(6, 7, "C", -0.1)])
+
+    result = cascade_transcribe([0.0] * 16000 * 15, settings=SETTINGS)
+
+    assert result["text"] == "AAAbbbCCC"
+    assert result["cascade"]["replaced_windows"] == 1
+
+
+def test_worse_redecode_keeps_original(models):
+    models["tiny"] = FakeModel([seg(0, 5, "元", -1.0)])
+    models["small"] = FakeModel([seg(0, 5, "悪", -3.0)])
+    result = cascade_transcribe([0.0] * 16000 * 5, settings=SETTINGS)
+    assert result["text"] == "元"
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+チェックポイント管理のテスト
+ステージ完了の追記、再開時の追記分の反映とまとめ直し、破損時の前世代からの復旧を確認する
+"""
+import json
+
+import pytest
+
+from scripts.checkpoint_manager import CheckpointManager, list_checkpoints
+
+
+@pytest.fixture
+def files(tmp_path):
+    paths = []
+    for name in ("a.mp3", "b.mp3", "c.txt"):
+        path = tmp_path / "00_new" / name
+        path.parent.mkdir(exist_ok=True)
+        path.write_bytes(name.encode())
+        paths.append(path)
+    return paths
+
+
+def test_marks_after_first_are_appended_to_journal(tmp_path, files):
+    directory = str(tmp_path / "checkpoints")
+    checkpoint = CheckpointManager(checkpoint_dir=directory)
+    checkpoint.mark(files[0], "transcribe", text_path="a.txt")
+    snapshot = checkpoint.path.read_text(encoding='utf-8')
+    assert not checkpoint.journal_path.exists()
+
+    checkpoint.mark(files[0], "persist", output_file="a.json")
+    checkpoint.mark(files[1], "transcribe", text_path="b.txt")
+
+    # まとめたファイルは書き直さず、追記ファイルに1件1行で残る
+    assert checkpoint.path.read_text(encoding='utf-8') == snapshot
+    records = [json.loads(line) for line in checkpoint.journal_path.read_text(encoding='utf-8').splitlines()]
+    assert [(r["name"], r["stage"]) for r in records] == [("a.mp3", "persist"), ("b.mp3", "transcribe")]
+
+
+def test_resume_replays_journal_and_compacts(tmp_path, files):
+    directory = str(tmp_path / "checkpoints")
+    checkpoint = CheckpointManager(checkpoint_dir=directory)
+    checkpoint.mark(files[0], "transcribe", text_path="a.txt")
+    checkpoint.mark(files[0], "persist", output_file="a.json")
+    checkpoint.mark(files[1], "transcribe", text_path="b.txt")
+    # 強制終了で最後の行が書きかけになった
+    with open(checkpoint.journal_path, 'a', encoding='utf-8') as f:
+        f.write('{"key": "trunc')
+
+    resumed = CheckpointManager(checkpoint.run_id, directory)
+    assert resumed.resumed
+    assert resumed.get_stage(files[0], "persist")["output_file"] == "a.json"
+    assert resumed.is_completed(files[1], "transcribe")
+    assert not resumed.is_completed(files[2], "transcribe")
+    assert resumed.summary() == {"transcribe": 2, "persist": 1}
+
+    # 追記分はまとめ直され、直前の世代がローテーションして残る
+    assert not resumed.journal_path.exists()
+    assert resumed.path.with_name(f"{checkpoint.run_id}.json.1").exists()
+    with open(resumed.path, encoding='utf-8') as f:
+        assert len(json.load(f)["state"]["files"]) == 2
+
+
+def test_corrupt_latest_generation_falls_back_to_previous(tmp_path, files):
+    directory = str(tmp_path / "checkpoints")
+    checkpoint = CheckpointManager(checkpoint_dir=directory)
+    checkpoint.mark(files[0], "transcribe", text_path="a.txt")
+    CheckpointManager(checkpoint.run_id, directory).mark(files[1], "transcribe", text_path="b.txt")
+    checkpoint.path.write_text("{broken", encoding='utf-8')
+
+    resumed = CheckpointManager(checkpoint.run_id, directory)
+    assert resumed.is_completed(files[0], "transcribe")
+    # 壊れた世代の後に追記した分も反映される
+    assert resumed.is_completed(files[1], "transcribe")
+
+
+def test_replaced_file_is_not_completed(tmp_path, files):
+    checkpoint = CheckpointManager(checkpoint_dir=str(tmp_path / "checkpoints"))
+    checkpoint.mark(files[0], "transcribe", text_path="a.txt")
+    files[0].write_bytes(b"a different recording")
+    assert checkpoint.get_stage(files[0], "transcribe") is None
+
+
+def test_list_checkpoints_counts_journaled_files(tmp_path, files):
+    directory = str(tmp_path / "checkpoints")
+    checkpoint = CheckpointManager(checkpoint_dir=directory)
+    for path in files:
+        checkpoint.mark(path, "transcribe")
+
+    [run] = list_checkpoints(directory)
+    assert (run["id"], run["status"], run["files"]) == (checkpoint.run_id, "running", 3)
+
+    checkpoint.finish()
+    [run] = list_checkpoints(directory)
+    assert (run["status"], run["files"]) == ("completed", 3)
+    assert not checkpoint.journal_path.exists()
+
+
+def test_resume_unknown_run_raises(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        CheckpointManager("missing", str(tmp_path / "checkpoints"))
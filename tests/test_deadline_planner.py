@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+締切付き文字起こしプランナーのテスト
+締切の起点が録音ファイルのmtimeではなく取り込みフォルダで見つけた時刻になることを確認する
+"""
+import os
+import time
+
+import pytest
+
+from scripts.data_manager import DataManager
+from scripts.deadline_planner import get_received_at, plan_transcription
+
+
+@pytest.fixture
+def old_recording(tmp_path, monkeypatch):
+    """mtimeを保ったまま取り込みフォルダに移動された1日前の録音"""
+    monkeypatch.chdir(tmp_path)
+    manager = DataManager()
+    audio_path = manager.new_dir / "会議.mp3"
+    audio_path.write_bytes(b"\0" * 128000)
+    day_ago = time.time() - 86400
+    os.utime(audio_path, (day_ago, day_ago))
+    return manager, audio_path
+
+
+def test_received_at_is_first_sighting_not_mtime(old_recording):
+    manager, audio_path = old_recording
+    before = time.time()
+    manager.get_new_files()
+    received_at = get_received_at(audio_path)
+    assert before <= received_at <= time.time()
+
+    # 再度一覧を取っても最初に見つけた時刻のまま
+    time.sleep(0.01)
+    manager.get_new_files()
+    assert get_received_at(audio_path) == received_at
+
+
+def test_intake_time_is_dropped_when_file_leaves_intake(old_recording):
+    manager, audio_path = old_recording
+    manager.get_new_files()
+    audio_path.unlink()
+    manager.get_new_files()
+    assert manager.get_intake_time(audio_path) is None
+
+
+def test_old_recording_gets_the_full_budget(old_recording):
+    manager, audio_path = old_recording
+    manager.get_new_files()
+    remaining = get_received_at(audio_path) + 600 - time.time()
+    plan = plan_transcription(audio_path, remaining, models=["small", "base", "tiny"])
+    # 8秒の音声なら10分の予算で最小モデル・最速設定に落とす必要はない
+    assert plan["model"] == "small"
+    assert plan["profile"] == "accurate"
+
+
+class _Pipe:
+    def __init__(self):
+        self.sent = []
+
+    def send(self, message):
+        self.sent.append(message)
+
+    def close(self):
+        pass
+
+
+@pytest.mark.parametrize("error, error_type", [
+    (MemoryError("out of memory"), "memory_error"),
+    (TimeoutError("took too long"), "timeout_error"),
+    (RuntimeError("failed to load model weights"), "model_error"),
+    (ValueError("bad input"), "unknown_error"),
+])
+def test_worker_errors_use_retry_queue_classification(error, error_type, monkeypatch):
+    import sys
+    import types
+    from scripts import deadline_planner
+    from scripts.retry_queue import classify_error
+
+    def load_model(*args, **kwargs):
+        raise error
+
+    monkeypatch.setitem(sys.modules, "whisper", types.SimpleNamespace(load_model=load_model))
+    monkeypatch.setitem(sys.modules, "librosa", types.SimpleNamespace())
+    pipe = _Pipe()
+    deadline_planner._transcribe_worker("a.mp3", "base", "cpu", {}, "ja", pipe)
+    assert pipe.sent == [{"ok": False, "error_type": error_type, "error": str(error)}]
+    assert classify_error(error) == error_type
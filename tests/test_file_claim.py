@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+取り込みファイルの処理権のテスト
+ロックファイルの作り直し（inodeの再確認）、停止した所有者からの引き継ぎ、処理済みファイルの扱いを確認する
+"""
+import json
+import multiprocessing
+import os
+
+import pytest
+
+from scripts import data_manager as data_manager_module
+from scripts.data_manager import DataManager
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    manager = DataManager()
+    manager.new_dir.mkdir(parents=True, exist_ok=True)
+    return manager
+
+
+@pytest.fixture
+def memo(manager):
+    path = manager.new_dir / "memo.txt"
+    path.write_text("メモ", encoding='utf-8')
+    return path
+
+
+def test_claim_is_exclusive_until_released(manager, memo):
+    claim = manager.claim_file(memo)
+    assert claim is not None
+    assert DataManager().claim_file(memo) is None
+
+    claim.release()
+    assert not claim.lock_path.exists()
+    again = DataManager().claim_file(memo)
+    assert again is not None
+    again.release()
+
+
+def test_claim_retries_when_lock_file_was_replaced(manager, memo, monkeypatch):
+    # 開いてからロックするまでの間に前の所有者が解放し、別の実行がロックファイルを作り直した
+    lock_path = manager._claim_lock_path(memo)
+    real_flock = data_manager_module.fcntl.flock
+    replaced = []
+
+    def flock(fd, operation):
+        if not replaced and operation & data_manager_module.fcntl.LOCK_EX:
+            replaced.append(os.fstat(fd).st_ino)
+            os.unlink(lock_path)
+            # 新しいinodeを確実に割り当てるため、古いファイルとは別に作ってから置く
+            tmp_path = lock_path.with_suffix(".new")
+            tmp_path.write_bytes(b"")
+            os.replace(tmp_path, lock_path)
+        return real_flock(fd, operation)
+
+    monkeypatch.setattr(data_manager_module.fcntl, "flock", flock)
+    claim = manager.claim_file(memo)
+    assert claim is not None
+    monkeypatch.setattr(data_manager_module.fcntl, "flock", real_flock)
+
+    # 削除済みのinodeではなく、いまのロックファイルを保持している
+    assert os.fstat(claim._fd).st_ino == os.stat(lock_path).st_ino != replaced[0]
+    assert DataManager().claim_file(memo) is None
+    claim.release()
+
+
+def _hold_claim_and_exit(base_dir: str, file_path: str):
+    os.chdir(base_dir)
+    DataManager().claim_file(data_manager_module.Path(file_path))
+    os._exit(0)
+
+
+def test_claim_taken_over_from_crashed_owner(manager, memo, tmp_path):
+    process = multiprocessing.Process(target=_hold_claim_and_exit, args=(str(tmp_path), str(memo)))
+    process.start()
+    process.join(timeout=30)
+
+    # 所有者情報は残るがロックはOSが解放している
+    lock_path = manager._claim_lock_path(memo)
+    assert json.loads(lock_path.read_bytes())["file"] == str(memo)
+    claim = manager.claim_file(memo)
+    assert claim is not None
+    assert json.loads(lock_path.read_bytes())["worker"].endswith(str(os.getpid()))
+    claim.release()
+
+
+def test_claim_of_moved_file_is_none(manager, memo):
+    memo.unlink()
+    assert manager.claim_file(memo) is None
+    assert manager.list_claims() == []
+
+
+def test_list_claims_reports_held_and_removes_stale(manager, memo):
+    claim = manager.claim_file(memo)
+    stale = manager.claims_dir / "stale.lock"
+    stale.write_text("{}")
+
+    claims = manager.list_claims()
+    assert [c["file"] for c in claims] == [str(memo)]
+    assert not stale.exists()
+    claim.release()
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+分析ジョブスケジューラのテスト
+予測に使うモデル・デバイスが文字起こしの実際の選択と一致すること、
+一覧取得後に移動されたファイルでバッチ全体が止まらないことを確認する
+"""
+import pytest
+
+from scripts import model_cache
+from scripts.audio_processor_no_ffmpeg import select_transcription_model
+from scripts.job_scheduler import JobScheduler, describe_job
+
+
+@pytest.fixture
+def cuda_device(monkeypatch):
+    monkeypatch.setattr(model_cache, "get_default_device", lambda: "cuda")
+
+
+def test_audio_job_uses_the_transcriber_model_and_default_device(tmp_path, cuda_device, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    # 会議キーワード付きの大きいファイル（推奨設定ならmedium、文字起こしはtiny）
+    audio_path = tmp_path / "定例会議.mp3"
+    audio_path.write_bytes(b"\0" * (20 * 1024 * 1024))
+
+    job = describe_job(audio_path, "audio")
+
+    assert job["model"] == select_transcription_model(audio_path, "cuda") == "tiny"
+    controller = model_cache.get_admission_controller()
+    assert job["memory_bytes"] == controller.estimate_job_bytes("tiny", job["audio_duration_sec"], "cuda")
+
+
+def test_build_jobs_skips_files_moved_by_another_run(tmp_path, cuda_device):
+    present = tmp_path / "memo.txt"
+    present.write_text("メモ", encoding='utf-8')
+    moved = tmp_path / "archived.txt"
+
+    jobs = JobScheduler(max_parallel_jobs=1).build_jobs({"text": [present, moved]})
+
+    assert [job["path"] for job in jobs] == [present]
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+メモリ受付制御のテスト
+モデルの常駐サイズを二重に数えず、ロード後は音声分だけで並列に受け付けることを確認する
+"""
+import threading
+
+import pytest
+
+from scripts import memory_admission
+from scripts.memory_admission import (GB, MemoryAdmissionController, estimate_audio_bytes,
+                                      estimate_model_bytes)
+
+
+@pytest.fixture
+def controller(monkeypatch):
+    monkeypatch.setattr(memory_admission, "get_process_rss", lambda: 0)
+    monkeypatch.setattr(memory_admission, "get_available_memory", lambda: None)
+    # baseモデル1つ分と少しの音声が入る上限
+    budget = (estimate_model_bytes("base") + 4 * estimate_audio_bytes(60)) / GB
+    return MemoryAdmissionController(budget_gb=budget, poll_seconds=0.05)
+
+
+def test_model_bytes_counted_once_for_jobs_sharing_an_unloaded_model(controller):
+    audio = estimate_audio_bytes(60)
+    first = controller.acquire(audio, "a", model_size="base")
+    second = controller.acquire(audio, "b", model_size="base")
+    assert controller.projected_rss() == estimate_model_bytes("base") + 2 * audio
+    controller.release(first)
+    controller.release(second)
+
+
+def test_reservations_shrink_once_model_is_loaded(controller):
+    audio = estimate_audio_bytes(60)
+    ticket = controller.acquire(audio, "a", model_size="base")
+    controller.register_model("base@cpu", estimate_model_bytes("base"))
+    # ロード済みモデルと予約の両方でモデル分を数えない
+    assert controller.projected_rss() == estimate_model_bytes("base") + audio
+
+    admitted = []
+    for name in ("b", "c", "d"):
+        admitted.append(controller.acquire(audio, name, model_size="base"))
+    assert controller.status()["jobs_in_flight"] == 4
+    for other in admitted + [ticket]:
+        controller.release(other)
+
+
+def test_job_waits_until_memory_is_released(controller):
+    big = 3 * estimate_audio_bytes(60)
+    first = controller.acquire(big, "a", model_size="base")
+    admitted = threading.Event()
+
+    def second_job():
+        with controller.admit(big, "b", model_size="base"):
+            admitted.set()
+
+    thread = threading.Thread(target=second_job)
+    thread.start()
+    assert not admitted.wait(0.2)
+    controller.release(first)
+    assert admitted.wait(2)
+    thread.join()
@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""
+メトリクスのtextfile出力先のテスト
+ワーカーモードの各プロセスが単独実行や他のワーカーのファイルを上書きしないことを確認する
+"""
+import argparse
+
+import pytest
+
+import analyze_auto
+from bin.analyze import get_metrics_job
+from scripts import metrics
+
+
+def test_worker_job_name_is_per_process():
+    assert get_metrics_job() == "analysis"
+    assert get_metrics_job(worker=True).startswith("analysis_")
+    assert get_metrics_job(worker=True) != get_metrics_job()
+
+
+@pytest.mark.parametrize("worker", [False, True])
+def test_auto_main_writes_textfile_for_its_job(worker, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setitem(metrics.METRICS_SETTINGS, "textfile_dir", str(tmp_path / "metrics"))
+    # 分析本体は呼ばずに中断扱いにする（ワーカーの通常の止め方）
+    monkeypatch.setattr(analyze_auto, "auto_analyze", lambda args: (_ for _ in ()).throw(KeyboardInterrupt))
+    monkeypatch.setattr(analyze_auto, "setup_logging", lambda *args, **kwargs: None)
+    parser = argparse.ArgumentParser()
+    analyze_auto.add_analysis_arguments(parser)
+    args = parser.parse_args(["--worker"] if worker else [])
+
+    analyze_auto.main(args)
+
+    written = sorted(path.name for path in (tmp_path / "metrics").glob("*.prom"))
+    assert written == [f"ago_{get_metrics_job(worker)}.prom"]
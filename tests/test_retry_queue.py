@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+再試行キューのテスト
+失敗ごとのバックオフ、小さいモデルへの切り替え、デッドレターへの移動と戻しを確認する
+"""
+import time
+
+import pytest
+
+from scripts.audio_processor_config import RETRY_SETTINGS
+from scripts.retry_queue import RetryQueue, TranscriptionFailedError
+
+
+@pytest.fixture
+def queue(tmp_path, monkeypatch):
+    monkeypatch.setitem(RETRY_SETTINGS, "backoff_base_seconds", 10)
+    monkeypatch.setitem(RETRY_SETTINGS, "backoff_max_seconds", 25)
+    monkeypatch.setitem(RETRY_SETTINGS, "max_attempts", 4)
+    return RetryQueue(str(tmp_path / "retry_queue.json"), str(tmp_path / "03_failed"))
+
+
+@pytest.fixture
+def intake(tmp_path):
+    intake_dir = tmp_path / "00_new"
+    intake_dir.mkdir()
+    return intake_dir
+
+
+def make_file(directory, name="memo.mp3", content=b"audio"):
+    path = directory / name
+    path.write_bytes(content)
+    return path
+
+
+def test_backoff_doubles_up_to_maximum(queue, intake):
+    path = make_file(intake)
+
+    delays = []
+    for _ in range(3):
+        started = time.time()
+        entry = queue.record_failure(path, "audio", RuntimeError("decode failed"))
+        delays.append(entry["retry_at"] - started)
+
+    assert delays == [pytest.approx(10, abs=1), pytest.approx(20, abs=1), pytest.approx(25, abs=1)]
+    assert entry["attempts"] == 3
+    assert [h["error"] for h in entry["history"]] == ["decode failed"] * 3
+    retry_at = entry["retry_at"]
+    assert queue.is_deferred(path, now=retry_at - 1)
+    assert not queue.is_deferred(path, now=retry_at)
+    assert queue.due_paths(now=retry_at - 1) == []
+    assert queue.due_paths(now=retry_at) == [path.resolve()]
+
+
+def test_memory_error_hints_smaller_model(queue, intake):
+    path = make_file(intake)
+    entry = queue.record_failure(path, "audio", TranscriptionFailedError("OOM", "memory_error", model="medium"))
+    assert entry["model_hint"] == "small"
+
+    # 次の失敗ではヒントのモデルからさらに小さくする
+    queue.record_failure(path, "audio", MemoryError("OOM"))
+    assert queue.get_model_hint(path) == "base"
+
+
+def test_success_removes_entry(queue, intake):
+    path = make_file(intake)
+    queue.record_failure(path, "audio", RuntimeError("boom"))
+    queue.record_success(path)
+    assert queue.get_entry(path) is None
+    assert not queue.is_deferred(path)
+
+
+def test_dead_letter_after_max_attempts_and_requeue(queue, intake):
+    path = make_file(intake)
+    for _ in range(RETRY_SETTINGS["max_attempts"]):
+        entry = queue.record_failure(path, "audio", RuntimeError("boom"))
+
+    assert not path.exists()
+    assert queue.get_entry(path) is None
+    [letter] = queue.list_dead_letters()
+    assert letter["attempts"] == RETRY_SETTINGS["max_attempts"]
+    assert letter["dead_letter"] == entry["dead_letter"]
+    assert letter["original_path"] == str(path)
+
+    assert queue.requeue_dead_letters(intake) == 1
+    assert path.read_bytes() == b"audio"
+    assert queue.list_dead_letters() == []
+
+
+def test_requeue_keeps_dead_letter_when_intake_has_same_name(queue, intake):
+    path = make_file(intake)
+    for _ in range(RETRY_SETTINGS["max_attempts"]):
+        queue.record_failure(path, "audio", RuntimeError("boom"))
+    make_file(intake, content=b"new upload")
+
+    assert queue.requeue_dead_letters(intake) == 0
+    assert path.read_bytes() == b"new upload"
+    assert len(queue.list_dead_letters()) == 1
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+セグメントの列指向ストアのテスト
+保存・読み込みの往復と、時間範囲・文字位置からの引き当てを確認する
+"""
+import math
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from scripts.segment_store import SegmentStore, get_segment_store_path, save_segments
+
+SEGMENTS = [
+    {"start": 0.0, "end": 2.0, "text": "こんにちは", "tokens": [1, 2], "avg_logprob": -0.25,
+     "no_speech_prob": 0.01, "compression_ratio": 1.5},
+    {"start": 2.0, "end": 5.0, "text": " 今日は", "tokens": [3], "avg_logprob": -0.5,
+     "no_speech_prob": 0.02, "compression_ratio": 1.25},
+    # 5〜6秒は無音（セグメントなし）
+    {"start": 6.0, "end": 8.0, "text": " 会議です", "tokens": [4, 5, 6]},
+]
+
+
+@pytest.fixture
+def store(tmp_path):
+    path = get_segment_store_path(tmp_path, "memo")
+    save_segments(path, SEGMENTS)
+    return SegmentStore(path)
+
+
+def test_round_trip(store, tmp_path):
+    assert store.path.name == "memo_segments.npz"
+    assert [p.name for p in tmp_path.iterdir()] == ["memo_segments.npz"]
+    assert len(store) == 3
+    assert store.text == "こんにちは 今日は 会議です"
+    assert store.get_segment(1) == {
+        "id": 1, "start": 2.0, "end": 5.0, "text": " 今日は", "tokens": [3],
+        "avg_logprob": -0.5, "no_speech_prob": pytest.approx(0.02), "compression_ratio": 1.25,
+    }
+    # 値のないスコアはNaNとして保存する
+    segment = store.get_segment(2)
+    assert segment["tokens"] == [4, 5, 6]
+    assert math.isnan(segment["avg_logprob"])
+
+
+@pytest.mark.parametrize("start, end, indices, text", [
+    (0.0, 1.0, [0], "こんにちは"),
+    # 終了時刻ちょうどから始まる範囲は前のセグメントを含まない
+    (2.0, 5.5, [1], " 今日は"),
+    (5.2, 5.8, [], ""),
+    (4.0, 7.0, [1, 2], " 今日は 会議です"),
+    (0.0, 100.0, [0, 1, 2], "こんにちは 今日は 会議です"),
+])
+def test_find_segments_and_text_for_range(store, start, end, indices, text):
+    assert list(store.find_segments(start, end)) == indices
+    assert store.text_for_range(start, end) == text
+
+
+@pytest.mark.parametrize("char_offset, seconds", [
+    (0, 0.0),
+    (5, 2.0),
+    # " 今日は" の3文字目（4文字中2文字進んだ位置）
+    (7, 3.5),
+    (13, 6.0 + 2.0 * 4 / 5),
+    (14, None),
+    (-1, None),
+])
+def test_time_at_char(store, char_offset, seconds):
+    result = store.time_at_char(char_offset)
+    assert result == (None if seconds is None else pytest.approx(seconds))
+
+
+def test_empty_store(tmp_path):
+    store = SegmentStore(save_segments(tmp_path / "empty_segments.npz", []))
+    assert len(store) == 0
+    assert store.text == ""
+    assert store.text_for_range(0.0, 10.0) == ""
+    assert store.time_at_char(0) is None
@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""
+構造化ログのテスト
+キューが満杯のまま停止しても例外にならず、残りのログを書き出すことを確認する
+"""
+import logging
+import threading
+
+from scripts.audio_processor_config import LOGGING_SETTINGS
+from scripts.structured_logging import get_logger, setup_logging, shutdown_logging
+
+
+def test_shutdown_with_full_queue_flushes_remaining_records(monkeypatch):
+    monkeypatch.setitem(LOGGING_SETTINGS, "queue_size", 2)
+    gate = threading.Event()
+    handled = []
+
+    class SlowHandler(logging.Handler):
+        def emit(self, record):
+            gate.wait(timeout=10)
+            handled.append(record.getMessage())
+
+    setup_logging(log_path="", console=False, extra_handlers=[SlowHandler()])
+    try:
+        logger = get_logger("test")
+        # 1件は書き出し中で止まり、残りでキューが満杯になる
+        for index in range(3):
+            logger.warning("record %d", index)
+        threading.Timer(0.2, gate.set).start()
+        shutdown_logging()
+        assert handled == ["record 0", "record 1", "record 2"]
+    finally:
+        gate.set()
+        setup_logging(log_path="", console=False)
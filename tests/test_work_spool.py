@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+ワーカーモードのジョブスプールのテスト
+複数プロセスでの重複なし処理、リース切れの引き取り、処理中ファイルの後回しを確認する
+"""
+import multiprocessing
+import os
+import random
+import shutil
+import time
+from pathlib import Path
+
+import pytest
+
+from scripts.work_spool import WorkSpool, LeaseLostError, LeaseDeferredError
+
+FAST_SETTINGS = {"lease_seconds": 2, "heartbeat_seconds": 0.5, "poll_seconds": 0.1,
+                 "idle_exit_seconds": 3}
+
+
+def make_intake(base: Path, jobs: int):
+    """取り込みフォルダにジョブ用のファイルを作る"""
+    (base / "00_new").mkdir()
+    (base / "01_done").mkdir()
+    for index in range(jobs):
+        (base / "00_new" / f"job_{index:03d}.txt").write_text(str(index), encoding='utf-8')
+
+
+def list_intake(base: Path):
+    return sorted((base / "00_new").glob("*.txt"))
+
+
+def _worker(base_dir: str, index: int, crash_after):
+    """crash_after件目の処理中にプロセスごと落ちるワーカー"""
+    base = Path(base_dir)
+    spool = WorkSpool(base / ".spool", base / "00_new", worker_id=f"test-{index}",
+                      settings=FAST_SETTINGS)
+    handled = []
+
+    def handler(file_path: Path, lease):
+        handled.append(file_path)
+        if crash_after is not None and len(handled) == crash_after:
+            os._exit(1)
+        time.sleep(random.uniform(0.01, 0.05))
+        lease.check()
+        fd = os.open(base / "processed.log", os.O_WRONLY | os.O_APPEND | os.O_CREAT)
+        os.write(fd, f"{file_path.name}\n".encode())
+        os.close(fd)
+        shutil.move(str(file_path), str(base / "01_done" / file_path.name))
+
+    spool.run(handler, list_files=lambda: list_intake(base))
+
+
+def test_workers_process_each_file_exactly_once_despite_crash(tmp_path):
+    jobs, workers = 20, 3
+    make_intake(tmp_path, jobs)
+    context = multiprocessing.get_context("fork")
+    processes = [context.Process(target=_worker, args=(str(tmp_path), index, 2 if index == 0 else None))
+                 for index in range(workers)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(60)
+
+    processed = (tmp_path / "processed.log").read_text(encoding='utf-8').split()
+    assert sorted(processed) == [f"job_{index:03d}.txt" for index in range(jobs)]
+    status = WorkSpool(tmp_path / ".spool", tmp_path / "00_new").status()
+    assert status["pending"] == status["leased"] == 0
+    assert status["done"] == jobs
+
+
+def test_expired_lease_is_taken_over_and_old_holder_aborts(tmp_path):
+    make_intake(tmp_path, 1)
+    first = WorkSpool(tmp_path / ".spool", tmp_path / "00_new", worker_id="a", settings=FAST_SETTINGS)
+    second = WorkSpool(tmp_path / ".spool", tmp_path / "00_new", worker_id="b", settings=FAST_SETTINGS)
+    first.enqueue(list_intake(tmp_path))
+
+    stale = first.claim()
+    assert stale is not None
+    assert second.claim() is None  # リース中は引き取れない
+
+    expired = time.time() - FAST_SETTINGS["lease_seconds"] - 1
+    os.utime(stale.lease_path, (expired, expired))
+    taken = second.claim()
+    assert taken is not None and taken.ticket["id"] == stale.ticket["id"]
+    with pytest.raises(LeaseLostError):
+        stale.check()
+    taken.complete()
+    assert second.status()["done"] == 1
+
+
+def test_repeatedly_expired_ticket_is_failed(tmp_path):
+    make_intake(tmp_path, 1)
+    spool = WorkSpool(tmp_path / ".spool", tmp_path / "00_new", settings=dict(FAST_SETTINGS, max_leases=2))
+    spool.enqueue(list_intake(tmp_path))
+    for worker in ("a", "b"):
+        lease = WorkSpool(tmp_path / ".spool", tmp_path / "00_new", worker_id=worker,
+                          settings=dict(FAST_SETTINGS, max_leases=2)).claim()
+        expired = time.time() - FAST_SETTINGS["lease_seconds"] - 1
+        os.utime(lease.lease_path, (expired, expired))
+    assert WorkSpool(tmp_path / ".spool", tmp_path / "00_new", worker_id="c",
+                     settings=dict(FAST_SETTINGS, max_leases=2)).claim() is None
+    assert spool.status()["failed"] == 1
+
+
+def test_deferred_ticket_waits_poll_seconds_and_is_not_failed(tmp_path):
+    # 前のリース保持者がまだ処理権を持っている間は後回しにし、すぐに取り直さない
+    make_intake(tmp_path, 1)
+    settings = dict(FAST_SETTINGS, poll_seconds=0.3, idle_exit_seconds=1)
+    spool = WorkSpool(tmp_path / ".spool", tmp_path / "00_new", worker_id="a", settings=settings)
+    attempts = []
+
+    def handler(file_path: Path, lease):
+        attempts.append(time.time())
+        if len(attempts) < 3:
+            raise LeaseDeferredError(f"{file_path.name} は別の実行が処理中です")
+        shutil.move(str(file_path), str(tmp_path / "01_done" / file_path.name))
+
+    stats = spool.run(handler, list_files=lambda: list_intake(tmp_path))
+
+    assert stats == {"completed": 1, "failed": 0, "lost": 0, "deferred": 2}
+    gaps = [later - earlier for earlier, later in zip(attempts, attempts[1:])]
+    assert all(gap >= settings["poll_seconds"] for gap in gaps), gaps
+    assert spool.status() == {"pending": 0, "leased": 0, "done": 1, "failed": 0}
+
+
+def test_analyzer_defers_file_whose_claim_is_held_elsewhere(tmp_path, monkeypatch):
+    # リース切れ前の保持者が処理権を持ったままなら、失敗にせず後回しにする
+    from bin.analyze import IntelligentBusinessAnalyzer
+    from scripts.data_manager import DataManager
+
+    monkeypatch.chdir(tmp_path)
+    analyzer = IntelligentBusinessAnalyzer()
+    file_path = analyzer.data_manager.new_dir / "memo.txt"
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+    file_path.write_text("メモ", encoding='utf-8')
+
+    held = DataManager().claim_file(file_path)
+    assert held is not None
+    with held, pytest.raises(LeaseDeferredError):
+        analyzer._analyze_leased_file(file_path, None)
+    assert analyzer.retry_queue.get_entry(file_path) is None
+    assert file_path.exists()